@@ -0,0 +1,132 @@
+"""
+Benchmark do cálculo vetorizado de vale refeição
+
+Compara src/utils/vr_calculator.calcular_vale_refeicao com o laço por
+colaborador (iterrows) usado anteriormente em calculo_vale_refeicao_tool.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/bench_vr_calculator.py
+    python benchmarks/bench_vr_calculator.py --tamanhos 10000 100000 1000000 --max-legado 100000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.vr_calculator import (  # noqa: E402
+    calcular_vale_refeicao, TABELAS_EXCLUSAO, VALOR_SP, VALOR_OUTROS, DIAS_UTEIS_PADRAO
+)
+
+SINDICATOS = [
+    'SINDPD SP - SIND.TRAB.EM PROC DADOS E EMPR.EMPRESAS PROC DADOS ESTADO DE SP.',
+    'SINDPD RJ - SINDICATO PROFISSIONAIS DE PROC DADOS DO RIO DE JANEIRO',
+    'SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS DE PROC DE DADOS DE CURITIBA',
+    'SINDPPD RS - SINDICATO DOS TRAB. EM PROC. DE DADOS RIO GRANDE DO SUL',
+    'SP SINDICATO DOS COMERCIARIOS',
+]
+
+
+def gerar_dados(n: int, seed: int = 42):
+    """Gera colaboradores, exclusões e tabela de sindicatos sintéticos"""
+    rng = np.random.default_rng(seed)
+    matriculas = np.arange(10000, 10000 + n).astype(str)
+
+    colaboradores = pd.DataFrame({
+        'MATRICULA': matriculas,
+        'NOME': 'COLABORADOR ' + pd.Series(matriculas),
+        'SINDICATO': rng.choice(SINDICATOS, size=n),
+    })
+
+    # ~15% dos colaboradores em alguma exclusão (com sobreposição entre tabelas)
+    exclusoes = {
+        tabela: rng.choice(matriculas, size=max(1, n * 3 // 100), replace=False)
+        for tabela in TABELAS_EXCLUSAO
+    }
+
+    valores_sindicato = {SINDICATOS[2]: 36.00}
+    return colaboradores, exclusoes, valores_sindicato
+
+
+def calculo_legado(colaboradores, exclusoes, valores_sindicato):
+    """Reprodução do laço original (iterrows + dicts) para referência"""
+    exclusoes = {t: set(m) for t, m in exclusoes.items()}
+    resultados = []
+
+    for _, colaborador in colaboradores.iterrows():
+        matricula = str(colaborador.get('MATRICULA', ''))
+        nome = str(colaborador.get('NOME', 'Nome não informado'))
+        sindicato = str(colaborador.get('SINDICATO', ''))
+
+        motivo_exclusao = None
+        for tipo_exclusao, matriculas_excluidas in exclusoes.items():
+            if matricula in matriculas_excluidas:
+                motivo_exclusao = tipo_exclusao
+                break
+
+        sindicato_upper = sindicato.upper().strip()
+        eh_sp = (' SP ' in sindicato_upper or sindicato_upper.startswith('SP ')
+                 or sindicato_upper.endswith(' SP') or 'ESTADO DE SP' in sindicato_upper)
+
+        if motivo_exclusao:
+            resultados.append({
+                'MATRICULA': matricula, 'NOME': nome, 'SINDICATO': sindicato,
+                'ESTADO': 'SP' if eh_sp else 'OUTROS', 'STATUS': 'EXCLUÍDO',
+                'MOTIVO_EXCLUSAO': motivo_exclusao.upper(), 'DIAS_ELEGIVEL': 0,
+                'VALOR_DIARIO': 0.0, 'VALOR_TOTAL_VR': 0.0
+            })
+        else:
+            valor_diario = VALOR_SP if eh_sp else VALOR_OUTROS
+            estado_info = 'SP' if eh_sp else 'OUTROS'
+            if sindicato in valores_sindicato and valores_sindicato[sindicato] > 0:
+                valor_diario = valores_sindicato[sindicato]
+                estado_info += f' (Tabela: R$ {valor_diario})'
+            resultados.append({
+                'MATRICULA': matricula, 'NOME': nome, 'SINDICATO': sindicato,
+                'ESTADO': estado_info, 'STATUS': 'ELEGÍVEL', 'MOTIVO_EXCLUSAO': '',
+                'DIAS_ELEGIVEL': DIAS_UTEIS_PADRAO, 'VALOR_DIARIO': valor_diario,
+                'VALOR_TOTAL_VR': valor_diario * DIAS_UTEIS_PADRAO
+            })
+
+    return pd.DataFrame(resultados)
+
+
+def medir(func, *args):
+    """Executa func e retorna (resultado, segundos)"""
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--max-legado', type=int, default=100000,
+                        help='Maior tamanho em que o laço legado também é executado')
+    args = parser.parse_args()
+
+    print(f"{'colaboradores':>14} | {'vetorizado (s)':>14} | {'legado (s)':>10} | {'ganho':>7} | paridade")
+    print('-' * 70)
+
+    for n in args.tamanhos:
+        colaboradores, exclusoes, valores_sindicato = gerar_dados(n)
+
+        (resultado_df, _), t_vet = medir(calcular_vale_refeicao, colaboradores, exclusoes, valores_sindicato)
+
+        if n <= args.max_legado:
+            legado_df, t_leg = medir(calculo_legado, colaboradores, exclusoes, valores_sindicato)
+            pd.testing.assert_frame_equal(
+                resultado_df.reset_index(drop=True), legado_df, check_dtype=False
+            )
+            print(f"{n:>14,} | {t_vet:>14.3f} | {t_leg:>10.3f} | {t_leg / t_vet:>6.0f}x | ok")
+        else:
+            print(f"{n:>14,} | {t_vet:>14.3f} | {'-':>10} | {'-':>7} | -")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,14 +9,13 @@ from llama_index.core import (
     Document,
     Settings
 )
-from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
 from pathlib import Path
 import yaml
 import logging
 from datetime import datetime
 
 from ..config.settings import settings
+from ..utils.llm_registry import obter_embedding, obter_llm
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -64,15 +63,9 @@ class BaseAgent(ABC):
             logger.warning("OpenAI API key não configurada")
             return
             
-        self.llm = OpenAI(
-            model=settings.openai_model,
-            temperature=settings.agent_temperature,
-            api_key=settings.openai_api_key
-        )
-        
-        self.embed_model = OpenAIEmbedding(
-            api_key=settings.openai_api_key
-        )
+        # Instâncias compartilhadas entre agentes (mesmo pool de conexões)
+        self.llm = obter_llm(settings.openai_model, settings.agent_temperature)
+        self.embed_model = obter_embedding()
         
         # Configurar Settings globais
         Settings.llm = self.llm
@@ -7,14 +7,25 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, date
-from dateutil.relativedelta import relativedelta
 from llama_index.core import Document
+import hashlib
 import json
-import calendar
 
 from .base_agent import BaseAgent
 from ..config.settings import settings
 from ..data.models import CalculoValeRefeicao, FuncionarioVR
+from ..utils.business_calendar import competencias_entre, get_business_calendar
+from ..utils.intervals import calcular_dias_colaboradores, calcular_dias_colaboradores_meses
+from ..utils.llm_batch import completar_em_paralelo, em_lotes, extrair_json
+from ..utils.llm_cache import completar
+from ..utils.token_budget import comprimir_amostra
+from ..utils.money import centavos, multiplicar, percentual, reais, somar
+
+# Colunas fora da análise de elegibilidade pela IA (identificação e campos calculados)
+COLUNAS_IGNORADAS_ELEGIBILIDADE = [
+    'MATRICULA', 'NOME', 'CPF', 'EMAIL', 'ELEGIVEL_VR', 'DIAS_TRABALHADOS', 'DIAS_DESCONTO',
+    'VALOR_TOTAL_VR', 'DESCONTO_FUNCIONARIO', 'VALOR_LIQUIDO_EMPRESA'
+]
 
 class CalculationAgent(BaseAgent):
     """Agente especializado em cálculos de vale refeição"""
@@ -27,6 +38,9 @@ class CalculationAgent(BaseAgent):
         )
         self.calculation_rules = self._load_calculation_rules()
         
+        # Vereditos da IA por hash dos atributos relevantes (por instância/sessão)
+        self._cache_elegibilidade: Dict[str, Dict[str, Any]] = {}
+        
     def process(self, 
                 funcionarios_df: pd.DataFrame,
                 mes_referencia: str,
@@ -39,6 +53,7 @@ class CalculationAgent(BaseAgent):
             funcionarios_df: DataFrame com dados dos funcionários
             mes_referencia: Mês de referência (YYYY-MM)
             regras_customizadas: Regras específicas do cliente
+            tabelas_ausencia: (kwarg) Dict nome -> DataFrame de férias/afastamentos/desligados
             
         Returns:
             DataFrame com cálculos
@@ -51,8 +66,8 @@ class CalculationAgent(BaseAgent):
         # 1. Preparar dados
         df = self._prepare_data(funcionarios_df)
         
-        # 2. Calcular dias úteis
-        dias_uteis = self._calculate_working_days(mes_referencia)
+        # 2. Calcular dias úteis (por localidade e período ativo do funcionário)
+        dias_uteis = self._calculate_working_days(mes_referencia, df, kwargs.get('tabelas_ausencia'))
         
         # 3. Aplicar regras de elegibilidade
         df = self._apply_eligibility_rules(df, regras_customizadas)
@@ -76,6 +91,61 @@ class CalculationAgent(BaseAgent):
         
         return df
     
+    def process_periodo(self,
+                        funcionarios_df: pd.DataFrame,
+                        competencia_inicio: str,
+                        competencia_fim: str,
+                        regras_customizadas: Dict[str, Any] = None,
+                        **kwargs) -> pd.DataFrame:
+        """
+        Calcula vale refeição para um intervalo de competências em uma única passada
+        
+        Preparação e elegibilidade (incluindo consultas à IA) rodam uma vez por
+        funcionário; dias, valores e descontos são calculados sobre a grade
+        funcionário x competência.
+        
+        Args:
+            funcionarios_df: DataFrame com dados dos funcionários
+            competencia_inicio: Primeira competência (YYYY-MM)
+            competencia_fim: Última competência (YYYY-MM), inclusive
+            regras_customizadas: Regras específicas do cliente
+            tabelas_ausencia: (kwarg) Dict nome -> DataFrame de férias/afastamentos/desligados
+            
+        Returns:
+            DataFrame longo: uma linha por funcionário e competência (coluna COMPETENCIA)
+        """
+        competencias = competencias_entre(competencia_inicio, competencia_fim)
+        self.log_action("Iniciando cálculos por período", {
+            "funcionarios": len(funcionarios_df),
+            "competencias": len(competencias),
+            "periodo": f"{competencia_inicio} a {competencia_fim}"
+        })
+        
+        df = self._prepare_data(funcionarios_df)
+        df = self._apply_eligibility_rules(df, regras_customizadas)
+        
+        # Grade funcionário x competência
+        longo = df.iloc[np.tile(np.arange(len(df)), len(competencias))].reset_index(drop=True)
+        longo.insert(0, 'COMPETENCIA', np.repeat(competencias, len(df)))
+        
+        try:
+            dias = calcular_dias_colaboradores_meses(df, competencias, kwargs.get('tabelas_ausencia'))
+            dias_uteis = dias['DIAS_ELEGIVEL']
+        except Exception as e:
+            self.log_action("Erro ao calcular dias úteis", {"error": str(e)})
+            dias_uteis = self.calculation_rules['dias_uteis_padrao']
+        
+        longo = self._calculate_values(longo, dias_uteis, regras_customizadas)
+        longo = self._apply_discounts_and_adjustments(longo)
+        
+        totais = longo.groupby('COMPETENCIA')[['VALOR_TOTAL_VR', 'VALOR_LIQUIDO_EMPRESA']].agg(somar)
+        self.log_action("Cálculos por período concluídos", {
+            "competencias": len(competencias),
+            "totais_por_competencia": totais.to_dict('index')
+        })
+        
+        return longo
+    
     def _load_calculation_rules(self) -> Dict[str, Any]:
         """Carrega regras de cálculo padrão e customizadas"""
         default_rules = {
@@ -126,29 +196,24 @@ class CalculationAgent(BaseAgent):
             
         return df
     
-    def _calculate_working_days(self, mes_referencia: str) -> int:
-        """Calcula dias úteis do mês"""
+    def _calculate_working_days(self,
+                                mes_referencia: str,
+                                df: Optional[pd.DataFrame] = None,
+                                tabelas_ausencia: Optional[Dict[str, pd.DataFrame]] = None):
+        """
+        Calcula dias úteis do mês descontando feriados
+        
+        Sem df retorna os dias úteis considerando apenas feriados nacionais;
+        com df retorna uma Series (alinhada ao índice) com os dias elegíveis de
+        cada funcionário: dias úteis da localidade (UF/município ou sindicato)
+        entre admissão e desligamento, descontados os períodos de ausência.
+        """
         try:
-            # Parse mês referência
-            year, month = map(int, mes_referencia.split('-'))
+            if df is None:
+                return get_business_calendar().dias_uteis(mes_referencia)
             
-            # Obter primeiro e último dia do mês
-            first_day = date(year, month, 1)
-            last_day = date(year, month, calendar.monthrange(year, month)[1])
-            
-            # Contar dias úteis (segunda a sexta)
-            working_days = 0
-            current_day = first_day
-            
-            while current_day <= last_day:
-                if current_day.weekday() < 5:  # 0-4 são segunda a sexta
-                    working_days += 1
-                current_day += relativedelta(days=1)
-            
-            # Considerar feriados se disponível
-            # TODO: Integrar com API de feriados
-            
-            return working_days
+            dias = calcular_dias_colaboradores(df, mes_referencia, tabelas_ausencia)
+            return dias['DIAS_ELEGIVEL']
             
         except Exception as e:
             self.log_action("Erro ao calcular dias úteis", {"error": str(e)})
@@ -181,25 +246,19 @@ class CalculationAgent(BaseAgent):
             df.loc[mask_afastado, 'ELEGIVEL_VR'] = False
             df.loc[mask_afastado, 'OBSERVACOES'] = df.loc[mask_afastado, 'OBSERVACOES'] + '; Funcionário afastado'
         
-        # Regras baseadas em admissão/demissão
-        if 'DATA_ADMISSAO' in df.columns:
-            # TODO: Implementar cálculo proporcional para admitidos no mês
-            pass
-            
-        # Usar IA para casos complexos
+        # Usar IA para casos complexos (em lote, com cache por situação)
         if self.llm:
             casos_complexos = df[df['OBSERVACOES'].str.contains('revisar', na=False)]
             if len(casos_complexos) > 0:
-                for idx, row in casos_complexos.iterrows():
-                    elegibilidade = self._check_eligibility_with_ai(row)
-                    df.loc[idx, 'ELEGIVEL_VR'] = elegibilidade['elegivel']
-                    df.loc[idx, 'OBSERVACOES'] = elegibilidade['motivo']
+                elegibilidade = self._check_eligibility_batch(casos_complexos)
+                df.loc[elegibilidade.index, 'ELEGIVEL_VR'] = elegibilidade['elegivel']
+                df.loc[elegibilidade.index, 'OBSERVACOES'] = elegibilidade['motivo']
         
         return df
     
     def _calculate_values(self, 
                          df: pd.DataFrame, 
-                         dias_uteis: int,
+                         dias_uteis,
                          regras_customizadas: Dict[str, Any] = None) -> pd.DataFrame:
         """Calcula valores de vale refeição"""
         # Obter valores das regras
@@ -216,34 +275,21 @@ class CalculationAgent(BaseAgent):
         # Calcular para funcionários elegíveis
         mask_elegivel = df['ELEGIVEL_VR'] == True
         
-        # Dias trabalhados (por padrão, todos os dias úteis)
+        # Dias trabalhados: dias úteis da localidade, proporcionais para
+        # admitidos/desligados no mês (ver _calculate_working_days)
+        if isinstance(dias_uteis, pd.Series):
+            dias_uteis = dias_uteis[mask_elegivel]
         df.loc[mask_elegivel, 'DIAS_TRABALHADOS'] = dias_uteis
         
-        # Ajustar dias para admitidos/demitidos no mês
-        if 'DATA_ADMISSAO' in df.columns:
-            # TODO: Calcular dias proporcionais
-            pass
-        
-        # Valor total
-        df.loc[mask_elegivel, 'VALOR_TOTAL_VR'] = (
-            df.loc[mask_elegivel, 'DIAS_TRABALHADOS'] * valor_dia
-        )
-        
-        # Desconto do funcionário
-        df.loc[mask_elegivel, 'DESCONTO_FUNCIONARIO'] = (
-            df.loc[mask_elegivel, 'VALOR_TOTAL_VR'] * desconto_pct
-        )
-        
-        # Aplicar limite de desconto
-        desconto_maximo = self.calculation_rules['desconto_maximo']
-        mask_desconto_alto = df['DESCONTO_FUNCIONARIO'] > desconto_maximo
-        df.loc[mask_desconto_alto, 'DESCONTO_FUNCIONARIO'] = desconto_maximo
-        
-        # Valor líquido empresa
-        df.loc[mask_elegivel, 'VALOR_LIQUIDO_EMPRESA'] = (
-            df.loc[mask_elegivel, 'VALOR_TOTAL_VR'] - 
-            df.loc[mask_elegivel, 'DESCONTO_FUNCIONARIO']
+        # Valor total, desconto (limitado) e líquido em centavos inteiros
+        total = multiplicar(centavos(valor_dia), df.loc[mask_elegivel, 'DIAS_TRABALHADOS'])
+        desconto = np.minimum(
+            percentual(total, desconto_pct),
+            centavos(self.calculation_rules['desconto_maximo'])
         )
+        df.loc[mask_elegivel, 'VALOR_TOTAL_VR'] = reais(total)
+        df.loc[mask_elegivel, 'DESCONTO_FUNCIONARIO'] = reais(desconto)
+        df.loc[mask_elegivel, 'VALOR_LIQUIDO_EMPRESA'] = reais(total - desconto)
         
         # Zerar valores para não elegíveis
         mask_nao_elegivel = df['ELEGIVEL_VR'] == False
@@ -261,24 +307,15 @@ class CalculationAgent(BaseAgent):
             # Descontar dias de falta
             df.loc[mask_com_faltas, 'DIAS_DESCONTO'] = df.loc[mask_com_faltas, 'FALTAS']
             
-            # Recalcular valores
-            valor_dia = self.calculation_rules['valor_dia_util']
-            df.loc[mask_com_faltas, 'VALOR_TOTAL_VR'] = (
-                df.loc[mask_com_faltas, 'VALOR_TOTAL_VR'] - 
-                (df.loc[mask_com_faltas, 'DIAS_DESCONTO'] * valor_dia)
-            )
-            
-            # Recalcular desconto
-            desconto_pct = self.calculation_rules['desconto_funcionario_pct']
-            df.loc[mask_com_faltas, 'DESCONTO_FUNCIONARIO'] = (
-                df.loc[mask_com_faltas, 'VALOR_TOTAL_VR'] * desconto_pct
-            )
-            
-            # Recalcular líquido
-            df.loc[mask_com_faltas, 'VALOR_LIQUIDO_EMPRESA'] = (
-                df.loc[mask_com_faltas, 'VALOR_TOTAL_VR'] - 
-                df.loc[mask_com_faltas, 'DESCONTO_FUNCIONARIO']
+            # Recalcular valor, desconto e líquido (centavos)
+            total = (
+                centavos(df.loc[mask_com_faltas, 'VALOR_TOTAL_VR'])
+                - multiplicar(centavos(self.calculation_rules['valor_dia_util']), df.loc[mask_com_faltas, 'DIAS_DESCONTO'])
             )
+            desconto = percentual(total, self.calculation_rules['desconto_funcionario_pct'])
+            df.loc[mask_com_faltas, 'VALOR_TOTAL_VR'] = reais(total)
+            df.loc[mask_com_faltas, 'DESCONTO_FUNCIONARIO'] = reais(desconto)
+            df.loc[mask_com_faltas, 'VALOR_LIQUIDO_EMPRESA'] = reais(total - desconto)
             
             # Adicionar observação
             df.loc[mask_com_faltas, 'OBSERVACOES'] = (
@@ -303,9 +340,9 @@ class CalculationAgent(BaseAgent):
         validation = {
             'total_funcionarios': len(df),
             'funcionarios_elegiveis': len(df[df['ELEGIVEL_VR'] == True]),
-            'valor_total_vr': df['VALOR_TOTAL_VR'].sum(),
-            'total_desconto_funcionario': df['DESCONTO_FUNCIONARIO'].sum(),
-            'total_liquido_empresa': df['VALOR_LIQUIDO_EMPRESA'].sum(),
+            'valor_total_vr': somar(df['VALOR_TOTAL_VR']),
+            'total_desconto_funcionario': somar(df['DESCONTO_FUNCIONARIO']),
+            'total_liquido_empresa': somar(df['VALOR_LIQUIDO_EMPRESA']),
             'alertas': []
         }
         
@@ -320,9 +357,8 @@ class CalculationAgent(BaseAgent):
             validation['alertas'].append(f'{len(outliers)} funcionários com valores muito acima da média')
         
         # Verificar consistência
-        calc_total = (df['VALOR_TOTAL_VR'] - df['DESCONTO_FUNCIONARIO']).sum()
-        diff = abs(calc_total - validation['total_liquido_empresa'])
-        if diff > 0.01:
+        calc_total = somar(df['VALOR_TOTAL_VR']) - somar(df['DESCONTO_FUNCIONARIO'])
+        if centavos(calc_total) != centavos(validation['total_liquido_empresa']):
             validation['alertas'].append('Inconsistência nos cálculos detectada')
         
         return validation
@@ -357,23 +393,71 @@ class CalculationAgent(BaseAgent):
         return summary
     
     def _check_eligibility_with_ai(self, funcionario: pd.Series) -> Dict[str, Any]:
-        """Usa IA para verificar elegibilidade em casos complexos"""
-        prompt = self.get_system_prompt('eligibility_check',
-                                      funcionario=funcionario.to_dict())
+        """Usa IA para verificar elegibilidade de um caso complexo"""
+        return self._check_eligibility_batch(funcionario.to_frame().T).iloc[0].to_dict()
+    
+    def _check_eligibility_batch(self, casos: pd.DataFrame) -> pd.DataFrame:
+        """
+        Usa IA para verificar elegibilidade de vários casos complexos
         
-        if self.llm:
-            response = self.llm.complete(prompt)
-            # Parse da resposta
-            try:
-                result = json.loads(response.text)
-                return result
-            except:
-                return {
-                    'elegivel': True,
-                    'motivo': 'Análise automática não conclusiva'
-                }
+        Casos com os mesmos atributos relevantes compartilham o veredito (cache
+        por hash); as situações novas são enviadas em prompts com vários
+        registros, executados em paralelo sob o limite de requisições.
         
-        return {'elegivel': True, 'motivo': 'IA não disponível'}
+        Returns:
+            DataFrame com o índice de casos e as colunas elegivel e motivo
+        """
+        colunas = [c for c in casos.columns if str(c).upper() not in COLUNAS_IGNORADAS_ELEGIBILIDADE]
+        atributos = casos[colunas].astype(object)
+        registros = atributos.where(atributos.notna(), None).to_dict('records')
+        chaves = [
+            hashlib.sha256(json.dumps(registro, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+            for registro in registros
+        ]
+        
+        # Uma consulta por situação distinta ainda sem veredito
+        pendentes = {}
+        for chave, registro in zip(chaves, registros):
+            if chave not in self._cache_elegibilidade and chave not in pendentes:
+                pendentes[chave] = registro
+        
+        if pendentes and self.llm:
+            lotes = em_lotes(list(pendentes.items()), settings.llm_batch_size)
+            prompts = [
+                self.get_system_prompt(
+                    'eligibility_check_batch',
+                    casos=json.dumps([{'id': chave, **registro} for chave, registro in lote],
+                                     ensure_ascii=False, default=str, indent=1)
+                )
+                for lote in lotes
+            ]
+            respostas = completar_em_paralelo(self.llm, prompts)
+            
+            for resposta in respostas:
+                vereditos = extrair_json(resposta)
+                if isinstance(vereditos, dict):
+                    vereditos = vereditos.get('casos', [vereditos])
+                for veredito in vereditos if isinstance(vereditos, list) else []:
+                    if (isinstance(veredito, dict) and veredito.get('id') in pendentes
+                            and isinstance(veredito.get('elegivel'), bool)):
+                        self._cache_elegibilidade[veredito['id']] = {
+                            'elegivel': veredito['elegivel'],
+                            'motivo': str(veredito.get('motivo') or '')
+                        }
+            
+            self.log_action("Elegibilidade verificada com IA em lote", {
+                "casos": len(casos),
+                "situacoes_novas": len(pendentes),
+                "prompts": len(prompts),
+                "sem_resposta": sum(1 for chave in pendentes if chave not in self._cache_elegibilidade)
+            })
+        
+        # Sem veredito válido: mantém elegível (não entra no cache, será consultado de novo)
+        padrao = {
+            'elegivel': True,
+            'motivo': 'Análise automática não conclusiva' if self.llm else 'IA não disponível'
+        }
+        return pd.DataFrame([self._cache_elegibilidade.get(chave, padrao) for chave in chaves], index=casos.index)
     
     def _store_calculation_learning(self, 
                                    df: pd.DataFrame, 
@@ -402,10 +486,11 @@ class CalculationAgent(BaseAgent):
     def get_calculation_report(self, df: pd.DataFrame) -> str:
         """Gera relatório textual dos cálculos"""
         if self.llm:
+            # Amostra limitada a LLM_TOKENS_AMOSTRA; os totais vêm do resumo
             prompt = self.get_system_prompt('generate_report',
-                                          data=df.to_dict(),
+                                          data=comprimir_amostra(df, linhas=50),
                                           summary=self._generate_summary(df, {}))
-            response = self.llm.complete(prompt)
+            response = completar(self.llm, prompt)
             return response.text
         
         return "Relatório de cálculo não disponível"
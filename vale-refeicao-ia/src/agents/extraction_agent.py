@@ -10,11 +10,17 @@ from pathlib import Path
 from llama_index.core import Document
 import json
 import re
+import hashlib
+import unicodedata
 from datetime import datetime
 
 from .base_agent import BaseAgent
 from ..config.settings import settings
 from .log_utils import log_extraction_step
+from ..utils.file_readers import is_compressed, is_columnar, read_dataframe
+from ..utils.data_validation import validate_dataframe
+from ..utils.llm_cache import completar
+from ..utils.token_budget import comprimir_amostra
 
 class ExtractionAgent(BaseAgent):
     """Agente especializado em extração e limpeza de dados de planilhas"""
@@ -26,7 +32,7 @@ class ExtractionAgent(BaseAgent):
             collection_name="extraction_rules"
         )
         self.column_mappings = {}
-        self.validation_rules = {}
+        self.validation_rules = []  # Regras declarativas; vazio usa as regras padrão
         
     def process(self, file_path: Path, **kwargs) -> pd.DataFrame:
         """
@@ -35,6 +41,8 @@ class ExtractionAgent(BaseAgent):
         Args:
             file_path: Caminho do arquivo
             **kwargs: Argumentos adicionais
+                invalidar_mapeamento: Ignora e descarta o mapeamento de colunas em cache
+                member: Arquivo interno, quando file_path for um .zip
             
         Returns:
             DataFrame processado
@@ -44,12 +52,12 @@ class ExtractionAgent(BaseAgent):
         
         # 1. Carregar arquivo
         log_extraction_step("📂 Carregando arquivo...")
-        df = self._load_file(file_path)
+        df = self._load_file(file_path, member=kwargs.get('member'))
         log_extraction_step("✅ Arquivo carregado", linhas=len(df), colunas=len(df.columns))
         
         # 2. Detectar e mapear colunas
         log_extraction_step("🏷️ Detectando tipos de colunas...")
-        df = self._detect_and_map_columns(df)
+        df = self._detect_and_map_columns(df, invalidar_cache=kwargs.get('invalidar_mapeamento', False))
         log_extraction_step("✅ Colunas mapeadas", colunas=list(df.columns))
         
         # 3. Limpar dados
@@ -78,10 +86,18 @@ class ExtractionAgent(BaseAgent):
         
         return df
     
-    def _load_file(self, file_path: Path) -> pd.DataFrame:
-        """Carrega arquivo Excel ou CSV"""
+    def _load_file(self, file_path: Path, member: Optional[str] = None) -> pd.DataFrame:
+        """Carrega arquivo Excel, CSV (também compactado em .gz/.zip/.zst), Parquet ou Arrow"""
         try:
-            if file_path.suffix.lower() in ['.xlsx', '.xls']:
+            if is_compressed(file_path.name):
+                # Descompactação em stream direto para o parser
+                df = read_dataframe(file_path, member=member)
+            elif file_path.suffix.lower() == '.parquet':
+                df = pd.read_parquet(file_path)
+            elif is_columnar(file_path.name):
+                # Arrow IPC (.arrow/.feather/.ipc)
+                df = pd.read_feather(file_path)
+            elif file_path.suffix.lower() in ['.xlsx', '.xls']:
                 # Tentar ler todas as abas
                 excel_file = pd.ExcelFile(file_path)
                 if len(excel_file.sheet_names) > 1:
@@ -102,18 +118,47 @@ class ExtractionAgent(BaseAgent):
             self.log_action("Erro ao carregar arquivo", {"error": str(e)})
             raise
     
-    def _detect_and_map_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Detecta e mapeia colunas usando IA"""
-        # Obter amostra dos dados
-        sample_data = df.head(5).to_dict()
+    def _detect_and_map_columns(self, df: pd.DataFrame, invalidar_cache: bool = False) -> pd.DataFrame:
+        """
+        Detecta e mapeia colunas usando IA
+        
+        Layouts já conhecidos (mesma assinatura de cabeçalho) reutilizam o
+        mapeamento salvo no banco e não chamam o LLM.
+        """
+        from ..data.database import get_db_manager
         
-        # Usar LLM para detectar mapeamento
-        prompt = self.get_system_prompt('column_detection', 
-                                      columns=list(df.columns),
-                                      sample=json.dumps(sample_data, ensure_ascii=False))
+        assinatura, cabecalho = self._header_signature(df)
+        db = get_db_manager()
         
-        if self.llm:
-            response = self.llm.complete(prompt)
+        if invalidar_cache:
+            db.invalidate_column_mapping(assinatura)
+            mapeamento_cache = None
+        else:
+            mapeamento_cache = db.get_column_mapping(assinatura)
+        
+        # Mapeamento vazio (ex.: resposta do LLM que não pôde ser lida) conta como miss
+        if mapeamento_cache:
+            log_extraction_step("♻️ Layout conhecido, mapeamento reutilizado do cache",
+                              assinatura=assinatura[:12])
+            rename_dict = {}
+            for col in df.columns:
+                mapped = mapeamento_cache.get(self._normalize_column_name(col))
+                if mapped:
+                    rename_dict[col] = mapped
+            
+            df = df.rename(columns=rename_dict)
+            self.column_mappings.update(rename_dict)
+        
+        elif self.llm:
+            # Obter amostra dos dados (limitada a LLM_TOKENS_AMOSTRA)
+            sample_data = comprimir_amostra(df)
+            
+            # Usar LLM para detectar mapeamento
+            prompt = self.get_system_prompt('column_detection', 
+                                          columns=list(df.columns),
+                                          sample=json.dumps(sample_data, ensure_ascii=False, default=str))
+            
+            response = completar(self.llm, prompt)
             mappings = self._parse_column_mappings(response.text)
             
             # Aplicar mapeamentos
@@ -124,6 +169,15 @@ class ExtractionAgent(BaseAgent):
                     
             df = df.rename(columns=rename_dict)
             self.column_mappings.update(mappings)
+            
+            # Persistir para os próximos arquivos com o mesmo layout; sem
+            # mapeamento não há o que reutilizar e o próximo arquivo tenta de novo
+            if rename_dict:
+                db.save_column_mapping(
+                    assinatura,
+                    cabecalho,
+                    {self._normalize_column_name(orig): mapped for orig, mapped in rename_dict.items()}
+                )
         
         # Garantir que MATRICULA existe
         if 'MATRICULA' not in df.columns:
@@ -136,6 +190,36 @@ class ExtractionAgent(BaseAgent):
         
         return df
     
+    def _normalize_column_name(self, name: Any) -> str:
+        """Normaliza nome de coluna (sem acentos, espaços ou pontuação, maiúsculo)"""
+        name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+        return re.sub(r'[^A-Z0-9]', '', name.upper())
+    
+    def _header_signature(self, df: pd.DataFrame) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Gera assinatura do cabeçalho a partir dos nomes normalizados e tipos inferidos
+        
+        Returns:
+            Tupla (hash sha256 da assinatura, lista de colunas com tipo)
+        """
+        amostra = df.head(100)
+        cabecalho = []
+        for idx, col in enumerate(df.columns):
+            tipo = pd.api.types.infer_dtype(amostra.iloc[:, idx], skipna=True)
+            if tipo in ('integer', 'floating', 'mixed-integer-float', 'decimal'):
+                tipo = 'numero'
+            elif tipo.startswith('datetime') or tipo in ('date', 'time'):
+                tipo = 'data'
+            elif tipo != 'boolean':
+                # Colunas vazias ou mistas variam mês a mês; tratar como texto
+                tipo = 'texto'
+            cabecalho.append({'coluna': self._normalize_column_name(col), 'tipo': tipo})
+        
+        assinatura = hashlib.sha256(
+            json.dumps(cabecalho, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        return assinatura, cabecalho
+    
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Limpa e normaliza dados"""
         # Remover espaços extras
@@ -187,39 +271,14 @@ class ExtractionAgent(BaseAgent):
         return series
     
     def _validate_data(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Valida dados e retorna relatório"""
-        validation_results = {
-            'total_rows': len(df),
-            'valid_rows': 0,
-            'issues': [],
-            'warnings': []
-        }
-        
-        # Validar MATRICULA
-        if 'MATRICULA' in df.columns:
-            missing_matricula = df['MATRICULA'].isna().sum()
-            if missing_matricula > 0:
-                validation_results['issues'].append(
-                    f"{missing_matricula} registros sem MATRICULA"
-                )
-        else:
-            validation_results['issues'].append("Coluna MATRICULA não encontrada")
-        
-        # Validar outras colunas importantes
-        important_columns = ['NOME', 'CPF', 'CARGO', 'DEPARTAMENTO', 'SALARIO']
-        for col in important_columns:
-            if col in df.columns:
-                missing = df[col].isna().sum()
-                if missing > 0:
-                    validation_results['warnings'].append(
-                        f"{missing} registros sem {col}"
-                    )
-        
-        # Contar linhas válidas (com MATRICULA)
-        if 'MATRICULA' in df.columns:
-            validation_results['valid_rows'] = df['MATRICULA'].notna().sum()
+        """
+        Valida dados e retorna relatório
         
-        return validation_results
+        As regras declarativas (DEFAULT_VALIDATION_RULES) são compiladas em
+        verificações vetorizadas; o relatório traz falhas por regra e uma
+        amostra dos índices das linhas com problema.
+        """
+        return validate_dataframe(df, self.validation_rules or None)
     
     def _add_metadata(self, df: pd.DataFrame, file_path: Path) -> pd.DataFrame:
         """Adiciona metadados ao DataFrame"""
@@ -260,7 +319,7 @@ class ExtractionAgent(BaseAgent):
         if self.llm:
             prompt = self.get_system_prompt('sheet_selection', 
                                           sheets=json.dumps(sheet_info, ensure_ascii=False))
-            response = self.llm.complete(prompt)
+            response = completar(self.llm, prompt)
             # Extrair nome da aba da resposta
             for sheet in excel_file.sheet_names:
                 if sheet.lower() in response.text.lower():
@@ -15,6 +15,7 @@ from io import BytesIO
 
 from .base_agent import BaseAgent
 from ..config.settings import settings
+from ..utils.llm_cache import completar
 
 class ReportAgent(BaseAgent):
     """Agente especializado em geração de relatórios e insights"""
@@ -313,7 +314,7 @@ class ReportAgent(BaseAgent):
                                       data_summary=self._get_data_summary(df))
         
         try:
-            response = self.llm.complete(prompt)
+            response = completar(self.llm, prompt)
             # Parse insights da resposta
             insights = response.text.split('\n')
             return [insight.strip() for insight in insights if insight.strip()]
@@ -385,7 +386,7 @@ class ReportAgent(BaseAgent):
                                       data_summary=self._get_data_summary(df))
         
         try:
-            response = self.llm.complete(prompt)
+            response = completar(self.llm, prompt)
             # Parse recomendações
             recommendations = []
             # ... implementação de parsing
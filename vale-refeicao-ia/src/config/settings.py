@@ -39,18 +39,45 @@ class Settings(BaseSettings):
     # Configurações de upload
     max_file_size_mb: int = Field(default=50, env="MAX_FILE_SIZE_MB")
     allowed_extensions: str = Field(
-        default="csv,xlsx,xls",
+        default="csv,xlsx,xls,gz,zip,zst,parquet,arrow,feather",
         env="ALLOWED_EXTENSIONS"
     )
     
     # Configurações dos agentes
     agent_temperature: float = Field(default=0.1, env="AGENT_TEMPERATURE")
     agent_max_retries: int = Field(default=3, env="AGENT_MAX_RETRIES")
+    llm_batch_size: int = Field(default=20, env="LLM_BATCH_SIZE")  # registros por prompt em lote
+    llm_max_concurrency: int = Field(default=4, env="LLM_MAX_CONCURRENCY")  # requisições simultâneas
+    llm_requests_per_minute: int = Field(default=60, env="LLM_REQUESTS_PER_MINUTE")  # 0 = sem limite
+    llm_concorrencia_por_modelo: int = Field(default=8, env="LLM_CONCORRENCIA_POR_MODELO")  # chamadas simultâneas; 0 = sem limite
+    llm_max_connections: int = Field(default=20, env="LLM_MAX_CONNECTIONS")  # pool keep-alive compartilhado
+    llm_keepalive_segundos: float = Field(default=60.0, env="LLM_KEEPALIVE_SEGUNDOS")
+    llm_request_timeout: float = Field(default=60.0, env="LLM_REQUEST_TIMEOUT")
+    llm_cache_enabled: bool = Field(default=True, env="LLM_CACHE_ENABLED")  # respostas por (modelo, temperatura, prompt)
+    llm_cache_path: Path = Field(default=Path("./llm_cache.db"), env="LLM_CACHE_PATH")
+    llm_cache_ttl_horas: float = Field(default=24.0, env="LLM_CACHE_TTL_HORAS")  # 0 = sem validade
+    llm_cache_max_mb: float = Field(default=50.0, env="LLM_CACHE_MAX_MB")  # 0 = sem limite
+    llm_tokens_esquema: int = Field(default=2000, env="LLM_TOKENS_ESQUEMA")  # esquema das tabelas no prompt; 0 = sem limite
+    llm_tokens_amostra: int = Field(default=500, env="LLM_TOKENS_AMOSTRA")  # amostra de linhas no prompt; 0 = sem limite
+    llm_tokens_achados: int = Field(default=1500, env="LLM_TOKENS_ACHADOS")  # descobertas anteriores no prompt; 0 = sem limite
+    intent_router_enabled: bool = Field(default=True, env="INTENT_ROUTER_ENABLED")  # perguntas frequentes respondidas por template SQL, sem LLM
     
     # Configurações de cálculo de vale refeição
     valor_dia_util: float = Field(default=35.00, env="VALOR_DIA_UTIL")
     desconto_funcionario_pct: float = Field(default=0.20, env="DESCONTO_FUNCIONARIO_PCT")
     dias_uteis_mes_padrao: int = Field(default=22, env="DIAS_UTEIS_MES_PADRAO")
+    competencia_vr: str = Field(default="2025-05", env="COMPETENCIA_VR")  # YYYY-MM
+    competencia_vr_fim: str = Field(default="", env="COMPETENCIA_VR_FIM")  # YYYY-MM; preenchida = cálculo em lote
+    vr_sql_pushdown: bool = Field(default=True, env="VR_SQL_PUSHDOWN")  # elegibilidade/valores no SQLite
+    vr_incremental: bool = Field(default=False, env="VR_INCREMENTAL")  # recalcula só colaboradores afetados; lê as tabelas inteiras e tem precedência sobre o pushdown
+    batch_max_workers: int = Field(default=0, env="BATCH_MAX_WORKERS")  # execução em lote; 0 = nº de CPUs
+    sindicato_similaridade_minima: float = Field(default=0.6, env="SINDICATO_SIMILARIDADE_MINIMA")  # trigramas; 1 = só exato/contido
+    
+    # Calendário de dias úteis (feriados nacionais, estaduais e municipais)
+    feriados_file: Path = Field(
+        default=Path(__file__).parent / "feriados.yaml",
+        env="FERIADOS_FILE"
+    )
     
     # Diretórios
     upload_dir: Path = Field(default=Path("./uploads"), env="UPLOAD_DIR")
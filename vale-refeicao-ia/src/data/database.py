@@ -7,14 +7,19 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import Generator, Iterable, Optional, Dict, List
 import streamlit as st
 from datetime import datetime
 import pandas as pd
 
-from .models import Base, ImportacaoArquivo, AgentLog
+from .models import Base, ImportacaoArquivo, AgentLog, MapeamentoColunasCache
 from ..config.settings import settings
 
+# Tabelas internas do sistema (não são tabelas de dados do usuário)
+SYSTEM_TABLES = ['importacoes', 'agent_logs', 'calculation_configs', 'mapeamento_colunas_cache',
+                 'calculo_vr_resultado', 'calculo_vr_dependencias', 'calculo_vr_lote', 'calculo_vr_lote_totais',
+                 'calculo_vr_execucoes']
+
 class DatabaseManager:
     """Gerenciador de conexão com banco de dados"""
     
@@ -44,6 +49,10 @@ class DatabaseManager:
             
             # Criar tabela de configurações de cálculo
             self._create_calculation_configs_table()
+            self._update_calculation_configs_table()
+            
+            # Resultado persistido do cálculo de VR (recálculo incremental)
+            self._create_calculo_vr_tables()
             
             # Não criar mais configuração padrão automaticamente
             # self._create_default_calculation_config()
@@ -167,20 +176,13 @@ class DatabaseManager:
             # Limpar nome da tabela
             table_name = self._clean_table_name(table_name)
             
-            # Limpar nomes das colunas
-            df_clean = df.copy()
-            df_clean.columns = [self._clean_column_name(col) for col in df_clean.columns]
-            
-            # Adicionar metadados
-            df_clean['created_at'] = datetime.utcnow()
-            df_clean['updated_at'] = datetime.utcnow()
+            # Limpar nomes das colunas e adicionar metadados
+            df_clean = self._prepare_dataframe(df)
             
             # Salvar no banco usando pandas to_sql
             # Para SQLite, precisamos considerar o limite de variáveis (999)
             # Com 33 colunas, podemos processar no máximo ~30 linhas por vez
-            num_columns = len(df_clean.columns)
-            max_params = 999
-            rows_per_chunk = max(1, min(max_params // num_columns - 1, 100))
+            rows_per_chunk = self._rows_per_insert(len(df_clean.columns))
             
             # Se temos muitas linhas, usar chunks menores
             if len(df_clean) > rows_per_chunk:
@@ -244,10 +246,81 @@ class DatabaseManager:
             st.error(f"❌ Erro ao salvar dados na tabela '{table_name}': {str(e)}")
             raise
     
+    def save_chunks_to_table(self, chunks: Iterable[pd.DataFrame], table_name: str,
+                             total_rows: int = None, if_exists: str = 'replace') -> int:
+        """
+        Salva em uma tabela os dados lidos em chunks (ex.: record batches Parquet/Arrow)
+        
+        Cada chunk passa pela mesma preparação de save_dataframe_to_table; o
+        primeiro cria a tabela e os demais são anexados, então o resultado é o
+        mesmo de salvar o DataFrame inteiro sem materializá-lo.
+        
+        Args:
+            chunks: Iterável de DataFrames com as mesmas colunas
+            table_name: Nome da tabela
+            total_rows: Total esperado de linhas (apenas para a barra de progresso)
+            if_exists: 'replace', 'append', 'fail' (aplicado ao primeiro chunk)
+            
+        Returns:
+            Número de registros salvos
+        """
+        try:
+            table_name = self._clean_table_name(table_name)
+            
+            st.info(f"📊 Salvando registros na tabela '{table_name}' em lotes...")
+            progress_bar = st.progress(0)
+            progress_text = st.empty()
+            
+            total_saved = 0
+            first = True
+            for chunk in chunks:
+                df_clean = self._prepare_dataframe(chunk)
+                df_clean.to_sql(
+                    name=table_name,
+                    con=self.engine,
+                    if_exists=if_exists if first else 'append',
+                    index=False,
+                    method='multi',
+                    chunksize=self._rows_per_insert(len(df_clean.columns))
+                )
+                first = False
+                total_saved += len(df_clean)
+                progress_bar.progress(min(total_saved / max(total_rows or total_saved, 1), 1.0))
+                progress_text.text(f"Salvando... {total_saved}/{total_rows or total_saved} registros")
+            
+            progress_bar.empty()
+            progress_text.empty()
+            
+            if first:
+                st.warning(f"⚠️ Arquivo sem dados para a tabela '{table_name}'")
+                return 0
+            
+            st.success(f"✅ {total_saved} registros salvos na tabela '{table_name}'!")
+            return total_saved
+            
+        except Exception as e:
+            st.error(f"❌ Erro ao salvar dados na tabela '{table_name}': {str(e)}")
+            raise
+    
+    def _prepare_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Cópia do DataFrame com nomes de coluna limpos e colunas de metadados"""
+        df_clean = df.copy()
+        df_clean.columns = [self._clean_column_name(col) for col in df_clean.columns]
+        df_clean['created_at'] = datetime.utcnow()
+        df_clean['updated_at'] = datetime.utcnow()
+        return df_clean
+    
+    def _rows_per_insert(self, num_columns: int) -> int:
+        """Linhas por INSERT multi-valores dentro do limite de 999 variáveis do SQLite"""
+        max_params = 999
+        return max(1, min(max_params // num_columns - 1, 100))
+    
     def _clean_table_name(self, name: str) -> str:
         """Limpa nome da tabela para ser válido no SQL"""
         import re
-        # Remover extensão se houver
+        # Remover extensão de compactação e de dados se houver
+        name = re.sub(r'\.(gz|zip|zst)$', '', name, flags=re.IGNORECASE)
+        name = re.sub(r'\.(parquet|arrow|feather|ipc)$', '', name, flags=re.IGNORECASE)
         name = name.replace('.csv', '').replace('.xlsx', '').replace('.xls', '')
         # Substituir caracteres especiais por underscore
         name = re.sub(r'[^a-zA-Z0-9_]', '_', name)
@@ -304,6 +377,17 @@ class DatabaseManager:
             st.error(f"❌ Erro ao buscar dados da tabela '{table_name}': {str(e)}")
             return pd.DataFrame()
     
+    def get_table_columns(self, table_name: str) -> list:
+        """Retorna apenas os nomes das colunas de uma tabela (sem contar registros)"""
+        try:
+            table_name = self._clean_table_name(table_name)
+            with self.engine.connect() as conn:
+                result = conn.execute(text(f'PRAGMA table_info("{table_name}")'))
+                return [row[1] for row in result.fetchall()]
+        except Exception as e:
+            st.error(f"❌ Erro ao obter colunas da tabela '{table_name}': {str(e)}")
+            return []
+    
     def get_table_info(self, table_name: str) -> dict:
         """Retorna informações sobre uma tabela"""
         try:
@@ -473,10 +557,15 @@ class DatabaseManager:
     
     def log_to_session(self, agent_name: str, action: str, input_data: dict = None, 
                         output_data: dict = None, status: str = "success", 
-                        error_message: str = None) -> int:
+                        error_message: str = None, tokens_used: int = None,
+                        processing_time_ms: int = None) -> int:
         """
         Registra ação de agente
         
+        Args:
+            tokens_used: Tokens consumidos pelo LLM na ação (utils.token_budget.medir_tokens)
+            processing_time_ms: Duração da ação
+        
         Returns:
             ID do log criado
         """
@@ -488,6 +577,8 @@ class DatabaseManager:
                     # empresa_id removido - não existe mais na tabela
                     input_data=input_data or {},
                     output_data=output_data or {},
+                    tokens_used=tokens_used,
+                    processing_time_ms=processing_time_ms,
                     status=status,
                     error_message=error_message
                 )
@@ -501,6 +592,77 @@ class DatabaseManager:
             st.error(f"❌ Erro ao registrar log do agente: {str(e)}")
             raise
     
+    def get_column_mapping(self, assinatura: str) -> Optional[Dict[str, str]]:
+        """
+        Busca mapeamento de colunas em cache pela assinatura do cabeçalho
+        
+        Returns:
+            Mapeamento (coluna normalizada -> nome padronizado) ou None
+        """
+        try:
+            with self.get_session() as session:
+                registro = session.query(MapeamentoColunasCache).filter_by(
+                    assinatura=assinatura
+                ).first()
+                
+                if not registro:
+                    return None
+                
+                registro.total_usos = (registro.total_usos or 0) + 1
+                registro.last_used_at = datetime.utcnow()
+                return dict(registro.mapeamento or {})
+                
+        except Exception as e:
+            st.warning(f"⚠️ Erro ao consultar cache de mapeamentos: {str(e)}")
+            return None
+    
+    def save_column_mapping(self, assinatura: str, cabecalho: List[Dict[str, str]], 
+                           mapeamento: Dict[str, str]) -> bool:
+        """Salva (ou substitui) mapeamento de colunas para uma assinatura de cabeçalho"""
+        try:
+            with self.get_session() as session:
+                registro = session.query(MapeamentoColunasCache).filter_by(
+                    assinatura=assinatura
+                ).first()
+                
+                if registro:
+                    registro.cabecalho = cabecalho
+                    registro.mapeamento = mapeamento
+                    registro.last_used_at = datetime.utcnow()
+                else:
+                    session.add(MapeamentoColunasCache(
+                        assinatura=assinatura,
+                        cabecalho=cabecalho,
+                        mapeamento=mapeamento,
+                        total_usos=0
+                    ))
+            return True
+            
+        except Exception as e:
+            st.warning(f"⚠️ Erro ao salvar cache de mapeamentos: {str(e)}")
+            return False
+    
+    def invalidate_column_mapping(self, assinatura: str = None) -> int:
+        """
+        Remove mapeamentos do cache
+        
+        Args:
+            assinatura: Assinatura específica; se None, limpa todo o cache
+            
+        Returns:
+            Número de mapeamentos removidos
+        """
+        try:
+            with self.get_session() as session:
+                query = session.query(MapeamentoColunasCache)
+                if assinatura:
+                    query = query.filter_by(assinatura=assinatura)
+                return query.delete(synchronize_session=False)
+                
+        except Exception as e:
+            st.error(f"❌ Erro ao invalidar cache de mapeamentos: {str(e)}")
+            return 0
+    
     # Função removida: get_funcionarios
     # Os dados de funcionários agora vêm das tabelas dinâmicas criadas pelos uploads
     
@@ -521,6 +683,7 @@ class DatabaseManager:
                 exploration_depth TEXT DEFAULT 'Intermediária',
                 include_insights BOOLEAN DEFAULT TRUE,
                 show_reasoning BOOLEAN DEFAULT TRUE,
+                rules TEXT,  -- JSON com regras estruturadas (opcional, executadas sem LLM)
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 is_active BOOLEAN DEFAULT TRUE
@@ -534,9 +697,104 @@ class DatabaseManager:
         except Exception as e:
             st.error(f"Erro ao criar tabela de configurações de cálculo: {str(e)}")
     
+    def _update_calculation_configs_table(self):
+        """Adiciona a coluna rules em bancos criados antes das regras estruturadas"""
+        try:
+            with self.engine.begin() as conn:
+                result = conn.execute(text("PRAGMA table_info(calculation_configs)")).fetchall()
+                columns = [row[1] for row in result]
+                
+                if columns and 'rules' not in columns:
+                    print("🔄 Adicionando coluna rules em calculation_configs...")
+                    conn.execute(text("ALTER TABLE calculation_configs ADD COLUMN rules TEXT"))
+                    
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar tabela calculation_configs: {str(e)}")
+    
+    def _create_calculo_vr_tables(self):
+        """Cria tabelas do resultado persistido do VR (por competência, em lote e por execução) e de suas dependências"""
+        try:
+            create_sql = [
+                """
+                CREATE TABLE IF NOT EXISTS calculo_vr_resultado (
+                    COMPETENCIA TEXT NOT NULL,
+                    MATRICULA TEXT,
+                    NOME TEXT,
+                    SINDICATO TEXT,
+                    ESTADO TEXT,
+                    STATUS TEXT,
+                    MOTIVO_EXCLUSAO TEXT,
+                    DIAS_ELEGIVEL INTEGER,
+                    VALOR_DIARIO REAL,
+                    VALOR_TOTAL_VR REAL
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_calculo_vr_resultado ON calculo_vr_resultado (COMPETENCIA, MATRICULA)",
+                """
+                CREATE TABLE IF NOT EXISTS calculo_vr_dependencias (
+                    COMPETENCIA TEXT NOT NULL,
+                    TABELA TEXT NOT NULL,  -- tabela de origem ('__parametros__' para os parâmetros)
+                    CHAVE TEXT NOT NULL,  -- matrícula (ou sindicato) afetada pelas linhas
+                    HASH INTEGER NOT NULL  -- hash das linhas da tabela para a chave
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_calculo_vr_dependencias ON calculo_vr_dependencias (COMPETENCIA, TABELA, CHAVE)",
+                """
+                CREATE TABLE IF NOT EXISTS calculo_vr_lote (
+                    COMPETENCIA TEXT NOT NULL,
+                    MATRICULA TEXT,
+                    NOME TEXT,
+                    SINDICATO TEXT,
+                    ESTADO TEXT,
+                    STATUS TEXT,
+                    MOTIVO_EXCLUSAO TEXT,
+                    DIAS_ELEGIVEL INTEGER,
+                    VALOR_DIARIO REAL,
+                    VALOR_TOTAL_VR REAL
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_calculo_vr_lote ON calculo_vr_lote (COMPETENCIA, MATRICULA)",
+                """
+                CREATE TABLE IF NOT EXISTS calculo_vr_lote_totais (
+                    COMPETENCIA TEXT PRIMARY KEY,
+                    TOTAL_COLABORADORES INTEGER,
+                    TOTAL_ELEGIVEIS INTEGER,
+                    TOTAL_EXCLUIDOS INTEGER,
+                    ELEGIVEIS_SP INTEGER,
+                    ELEGIVEIS_OUTROS INTEGER,
+                    DIAS_ELEGIVEIS INTEGER,
+                    VALOR_TOTAL_GERAL REAL,
+                    VALOR_TOTAL_SP REAL,
+                    VALOR_TOTAL_OUTROS REAL,
+                    GERADO_EM TEXT
+                )
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS calculo_vr_execucoes (
+                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    CONFIGURACAO TEXT NOT NULL,
+                    COMPETENCIA TEXT NOT NULL,
+                    VERSAO_DADOS TEXT NOT NULL,  -- hash das tabelas de origem
+                    GERADO_EM TEXT,
+                    REGISTROS INTEGER,
+                    ELEGIVEIS INTEGER,
+                    VALOR_TOTAL REAL,
+                    RESULTADO BLOB,  -- resultado em Parquet (valores em centavos)
+                    UNIQUE (CONFIGURACAO, COMPETENCIA, VERSAO_DADOS)
+                )
+                """
+            ]
+            
+            with self.engine.begin() as conn:
+                for sql in create_sql:
+                    conn.execute(text(sql))
+                    
+        except Exception as e:
+            st.error(f"Erro ao criar tabelas do cálculo de VR: {str(e)}")
+    
     def save_calculation_config(self, name: str, description: str, prompt: str, 
-                              available_tools: list, config: dict) -> bool:
-        """Salva configuração de cálculo"""
+                              available_tools: list, config: dict, rules: dict = None) -> bool:
+        """Salva configuração de cálculo (rules: regras estruturadas opcionais)"""
         try:
             import json
             
@@ -599,6 +857,7 @@ class DatabaseManager:
             
             # Preparar dados
             tools_json = json.dumps(available_tools)
+            rules_json = json.dumps(rules, ensure_ascii=False) if rules else None
             
             # Verificar se já existe
             check_sql = "SELECT id FROM calculation_configs WHERE name = :name"
@@ -620,7 +879,8 @@ class DatabaseManager:
                     SET description = :description, prompt = :prompt, 
                         available_tools = :tools, max_iterations = :max_iter,
                         exploration_depth = :depth, include_insights = :insights,
-                        show_reasoning = :reasoning, updated_at = CURRENT_TIMESTAMP
+                        show_reasoning = :reasoning, rules = :rules,
+                        updated_at = CURRENT_TIMESTAMP
                     WHERE name = :name
                     """
                     
@@ -629,6 +889,7 @@ class DatabaseManager:
                         "description": description,
                         "prompt": prompt,
                         "tools": tools_json,
+                        "rules": rules_json,
                         "max_iter": config.get('max_iterations', 5),
                         "depth": config.get('exploration_depth', 'Intermediária'),
                         "insights": config.get('include_insights', True),
@@ -651,9 +912,9 @@ class DatabaseManager:
                     insert_sql = """
                     INSERT INTO calculation_configs 
                     (name, description, prompt, available_tools, max_iterations,
-                     exploration_depth, include_insights, show_reasoning, is_active)
+                     exploration_depth, include_insights, show_reasoning, rules, is_active)
                     VALUES (:name, :description, :prompt, :tools, :max_iter,
-                            :depth, :insights, :reasoning, 1)
+                            :depth, :insights, :reasoning, :rules, 1)
                     """
                     
                     params = {
@@ -661,6 +922,7 @@ class DatabaseManager:
                         "description": description,
                         "prompt": prompt,
                         "tools": tools_json,
+                        "rules": rules_json,
                         "max_iter": config.get('max_iterations', 5),
                         "depth": config.get('exploration_depth', 'Intermediária'),
                         "insights": config.get('include_insights', True),
@@ -746,7 +1008,7 @@ class DatabaseManager:
             sql = """
             SELECT id, name, description, prompt, available_tools, 
                    max_iterations, exploration_depth, include_insights, 
-                   show_reasoning, created_at, updated_at, is_active
+                   show_reasoning, created_at, updated_at, is_active, rules
             FROM calculation_configs 
             WHERE is_active = TRUE OR is_active IS NULL
             ORDER BY name
@@ -770,7 +1032,8 @@ class DatabaseManager:
                         'show_reasoning': bool(row[8]),
                         'created_at': row[9],
                         'updated_at': row[10],
-                        'is_active': bool(row[11])
+                        'is_active': bool(row[11]),
+                        'rules': json.loads(row[12]) if row[12] else None
                     }
                     configs.append(config)
                 
@@ -786,7 +1049,7 @@ class DatabaseManager:
             sql = """
             SELECT id, name, description, prompt, available_tools, 
                    max_iterations, exploration_depth, include_insights, 
-                   show_reasoning, created_at, updated_at, is_active
+                   show_reasoning, created_at, updated_at, is_active, rules
             FROM calculation_configs 
             WHERE name = :name AND is_active = TRUE
             """
@@ -808,7 +1071,8 @@ class DatabaseManager:
                         'show_reasoning': bool(result[8]),
                         'created_at': result[9],
                         'updated_at': result[10],
-                        'is_active': bool(result[11])
+                        'is_active': bool(result[11]),
+                        'rules': json.loads(result[12]) if result[12] else None
                     }
                 
                 return None
@@ -817,6 +1081,28 @@ class DatabaseManager:
             st.error(f"Erro ao obter configuração de cálculo: {str(e)}")
             return None
     
+    def save_calculation_rules(self, name: str, rules: dict) -> bool:
+        """Atualiza apenas as regras estruturadas de uma configuração"""
+        try:
+            import json
+            
+            sql = """
+            UPDATE calculation_configs 
+            SET rules = :rules, updated_at = CURRENT_TIMESTAMP
+            WHERE name = :name
+            """
+            
+            with self.engine.begin() as conn:
+                result = conn.execute(text(sql), {
+                    "name": name,
+                    "rules": json.dumps(rules, ensure_ascii=False) if rules else None
+                })
+                return result.rowcount > 0
+                
+        except Exception as e:
+            st.error(f"Erro ao salvar regras da configuração: {str(e)}")
+            return False
+    
     def delete_calculation_config(self, name: str) -> bool:
         """Remove configuração de cálculo (soft delete)"""
         try:
@@ -103,3 +103,27 @@ class AgentLog(Base):
         Index('idx_agent_log_timestamp', 'created_at'),
         Index('idx_agent_log_agent', 'agent_name'),
     )
+
+class MapeamentoColunasCache(Base):
+    """Cache de mapeamentos de colunas detectados pela IA, por assinatura de cabeçalho"""
+    __tablename__ = 'mapeamento_colunas_cache'
+    
+    id = Column(Integer, primary_key=True)
+    
+    # Assinatura normalizada do cabeçalho (nomes + tipos inferidos)
+    assinatura = Column(String(64), nullable=False, unique=True)
+    cabecalho = Column(JSON)
+    
+    # Mapeamento coluna normalizada -> nome padronizado
+    mapeamento = Column(JSON, nullable=False)
+    
+    # Uso
+    total_usos = Column(Integer, default=0)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime)
+    
+    # Índices
+    __table_args__ = (
+        Index('idx_mapeamento_assinatura', 'assinatura'),
+    )
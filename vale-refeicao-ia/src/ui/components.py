@@ -8,6 +8,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import time
 
 def render_header():
     """Renderiza o header principal da aplicação"""
@@ -591,3 +592,28 @@ def render_chat_interface(
     prompt = st.chat_input("Digite sua pergunta...", key=f"{key}_input")
     
     return prompt
+
+def render_streaming_text(container=None, language: Optional[str] = None, intervalo: float = 0.15):
+    """
+    Renderiza o texto de uma resposta do LLM à medida que chega
+    
+    Returns:
+        Função atualizar(texto, final=False); atualizações mais próximas que
+        `intervalo` segundos são agrupadas (a final sempre é exibida)
+    """
+    placeholder = (container or st).empty()
+    ultima = [0.0]
+    
+    def atualizar(texto: str, final: bool = False):
+        agora = time.monotonic()
+        if not final and agora - ultima[0] < intervalo:
+            return
+        ultima[0] = agora
+        cursor = '' if final else ' ▌'
+        if language:
+            placeholder.code(texto + cursor, language=language)
+        else:
+            placeholder.markdown(texto + cursor)
+    
+    atualizar.placeholder = placeholder
+    return atualizar
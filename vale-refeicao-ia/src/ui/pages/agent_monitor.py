@@ -50,6 +50,8 @@ def render_monitor_content():
     
     with tab3:
         render_metrics()
+        render_llm_cache_metrics()
+        render_llm_client_metrics()
 
 
 def render_realtime_logs():
@@ -113,6 +115,65 @@ def render_realtime_logs():
             else:
                 st.info(log_message)
 
+def render_llm_cache_metrics():
+    """Renderiza acertos e ocupação do cache de respostas do LLM"""
+    from ...utils.llm_cache import cache_llm
+    
+    st.divider()
+    st.subheader("Cache de Respostas do LLM")
+    
+    if not settings.llm_cache_enabled:
+        st.info("Cache desativado (LLM_CACHE_ENABLED=False).")
+        return
+    
+    try:
+        stats = cache_llm.estatisticas()
+    except Exception as e:
+        st.warning(f"Cache indisponível: {str(e)}")
+        return
+    
+    render_metrics_row([
+        {'label': 'Acertos', 'value': stats['acertos']},
+        {'label': 'Faltas', 'value': stats['faltas']},
+        {'label': 'Taxa de Acerto', 'value': f"{stats['taxa_acerto']:.0%}"},
+        {'label': 'Entradas', 'value': f"{stats['entradas']} ({stats['tamanho_mb']:.1f} MB)"}
+    ])
+    st.caption(
+        f"Validade: {settings.llm_cache_ttl_horas:g} h • Limite: {settings.llm_cache_max_mb:g} MB • "
+        f"{stats['descartes']} descarte(s) nesta sessão"
+    )
+    
+    if st.button("🗑️ Limpar Cache do LLM"):
+        cache_llm.limpar()
+        st.rerun()
+
+def render_llm_client_metrics():
+    """Renderiza latência e tokens das chamadas ao LLM por modelo"""
+    from ...utils.llm_registry import instancias_llm, metricas_llm
+    from ...utils.token_budget import uso_tokens
+    
+    st.divider()
+    st.subheader("Chamadas ao LLM")
+    
+    metricas = metricas_llm()
+    if not metricas:
+        st.info("Nenhuma chamada ao LLM nesta sessão.")
+        return
+    
+    df_metricas = pd.DataFrame(metricas).set_index('modelo')
+    tokens = uso_tokens()
+    if tokens:
+        df_metricas = df_metricas.join(pd.DataFrame(tokens).set_index('modelo'), how='left')
+    st.dataframe(df_metricas.round(1), use_container_width=True)
+    st.caption(
+        f"{instancias_llm()} cliente(s) compartilhado(s) • até {settings.llm_concorrencia_por_modelo or '∞'} "
+        f"chamada(s) simultânea(s) por modelo • pool de {settings.llm_max_connections} conexões keep-alive"
+    )
+    st.caption(
+        f"Orçamento por prompt: esquema {settings.llm_tokens_esquema or '∞'} • amostra "
+        f"{settings.llm_tokens_amostra or '∞'} • descobertas {settings.llm_tokens_achados or '∞'} tokens"
+    )
+
 def render_agent_actions():
     """Renderiza ações específicas dos agentes"""
     st.subheader("Ações Detalhadas dos Agentes")
@@ -9,8 +9,17 @@ import json
 from sqlalchemy import text
 
 from ..components import render_alert
-from ...data.database import get_db_manager
+from ...data.database import get_db_manager, SYSTEM_TABLES
 from ...agents.log_utils import log_agent_action
+from ...utils.calculation_rules import (
+    DOCUMENTACAO_REGRAS, EXEMPLO_REGRAS, carregar_regras, compilar_regras
+)
+from ...utils.batch_executor import executar_lote, prefixos_disponiveis
+from ...utils.llm_cache import completar
+from ...utils.vr_simulation import (
+    carregar_base, competencias_salvas, custo_por_sindicato, grade_cenarios, simular_cenarios
+)
+from ...utils.vr_execucoes import carregar_execucao, comparar_execucoes, listar_execucoes
 
 def render():
     """Renderiza página de agentes de IA"""
@@ -21,7 +30,7 @@ def render():
     db = get_db_manager()
     
     # Verificar se há tabelas de dados (excluir tabelas do sistema)
-    system_tables = ['importacoes', 'agent_logs', 'calculation_configs']
+    system_tables = SYSTEM_TABLES
     all_tables = db.list_tables()
     data_tables = [table for table in all_tables if table not in system_tables]
     
@@ -178,12 +187,31 @@ Gere um relatório com insights e recomendações estratégicas.""",
             include_insights = st.checkbox("💡 Incluir Insights", True)
             show_reasoning = st.checkbox("🧠 Mostrar Raciocínio", True)
         
+        # Regras estruturadas (opcional): executadas sem LLM
+        with st.expander("📐 Regras estruturadas (opcional)", expanded=False):
+            st.caption("Regras em JSON compiladas para SQL/pandas e executadas sem IA. "
+                       "Deixe em branco para usar apenas o agente.")
+            st.code(DOCUMENTACAO_REGRAS.strip(), language='text')
+            rules_text = st.text_area(
+                "📐 Regras estruturadas (JSON)",
+                placeholder=json.dumps(EXEMPLO_REGRAS, indent=2, ensure_ascii=False),
+                height=250,
+                help="Filtros de elegibilidade, tabelas de valores, percentuais de desconto e limites"
+            )
+        
         # Botão de salvar
         submitted = st.form_submit_button("💾 Salvar Configuração", type="primary")
         
         if submitted:
             # Usar o container fora do form para mostrar mensagens
             with validation_container.container():
+                rules, rules_error = None, None
+                if rules_text.strip():
+                    try:
+                        rules = carregar_regras(rules_text)
+                    except ValueError as e:
+                        rules_error = str(e)
+                
                 if not config_name.strip():
                     st.error("❌ Nome da configuração é obrigatório!")
                     st.stop()
@@ -193,6 +221,9 @@ Gere um relatório com insights e recomendações estratégicas.""",
                 elif not selected_tools:
                     st.error("❌ Selecione pelo menos uma ferramenta!")
                     st.stop()
+                elif rules_error:
+                    st.error(f"❌ Regras estruturadas inválidas: {rules_error}")
+                    st.stop()
                 elif config_name.strip().lower() in existing_names:
                     st.error(f"❌ Já existe uma configuração com o nome '{config_name}'!")
                     
@@ -237,7 +268,8 @@ Gere um relatório com insights e recomendações estratégicas.""",
                             config_description.strip(),
                             calculation_prompt.strip(),
                             selected_tools,
-                            config
+                            config,
+                            rules=rules
                         )
                         
                         if success:
@@ -351,11 +383,31 @@ Gere um relatório com insights e recomendações estratégicas.""",
                 st.markdown(f"**Descrição:** {config['description']}")
                 st.markdown(f"**Ferramentas:** {len(config['available_tools'])} selecionadas")
                 
-                col1, col2 = st.columns(2)
+                if config.get('rules'):
+                    st.markdown("**📐 Regras estruturadas:** ✅ definidas (execução sem IA)")
+                    st.json(config['rules'], expanded=False)
+                
+                col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.button("✏️ Editar", key=f"edit_{config['id']}"):
                         st.info("🚧 Em desenvolvimento")
                 with col2:
+                    if st.button("✨ Gerar regras com IA", key=f"rules_{config['id']}"):
+                        from .database_viewer import generate_schema_context
+                        
+                        with st.spinner("🤖 Rascunhando regras a partir do prompt..."):
+                            rules = generate_rules_from_prompt(
+                                config['prompt'], generate_schema_context(db, data_tables)
+                            )
+                        if rules and db.save_calculation_rules(config['name'], rules):
+                            log_agent_action(
+                                "calculation_rules",
+                                "✨ Regras estruturadas geradas por IA",
+                                {"configuracao": config['name']}
+                            )
+                            st.success("✅ Regras salvas! Revise-as antes de executar.")
+                            st.rerun()
+                with col3:
                     if st.button("🗑️ Remover", key=f"delete_{config['id']}"):
                         if db.delete_calculation_config(config['name']):
                             st.success("✅ Removido!")
@@ -393,11 +445,164 @@ def render_calculation_execution_tab(db, data_tables):
         # Container para o resultado do cálculo
         result_container = st.container()
         
+        if selected_config.get('rules'):
+            if st.button("⚡ Executar regras (sem IA)", key="exec_rules_btn"):
+                with result_container:
+                    st.markdown("---")
+                    execute_calculation_rules(db, selected_config)
+        
         if st.button("🚀 Iniciar Cálculo Autônomo", type="primary", key="exec_calc_btn"):
             # Executar no container dedicado para evitar mudança de tab
             with result_container:
                 st.markdown("---")
                 execute_autonomous_calculation(db, data_tables, selected_config, result_container)
+    
+    render_batch_execution(db, configs)
+    render_simulation(db)
+
+def render_batch_execution(db, configs):
+    """Execução em lote: várias empresas (prefixo das tabelas) x configurações, em paralelo"""
+    
+    with st.expander("🏭 Execução em lote (várias empresas)", expanded=False):
+        st.caption(
+            "Cada empresa usa as tabelas '<prefixo>_ativos', '<prefixo>_ferias', ... "
+            "Os cálculos rodam em paralelo pelo caminho determinístico (regras da configuração "
+            "ou cálculo padrão de VR), sem IA."
+        )
+        
+        prefixos = prefixos_disponiveis(db.list_tables())
+        if not prefixos:
+            st.info("💡 Nenhuma empresa encontrada (tabelas '<prefixo>_ativos').")
+            return
+        
+        config_options = {config['name']: config for config in configs}
+        empresas = st.multiselect("Empresas:", options=prefixos, default=prefixos, key="batch_empresas")
+        nomes_configs = st.multiselect(
+            "Configurações:", options=list(config_options.keys()),
+            default=list(config_options.keys())[:1], key="batch_configs"
+        )
+        
+        jobs = [(empresa, config_options[nome]) for empresa in empresas for nome in nomes_configs]
+        if not st.button(f"🏭 Executar {len(jobs)} cálculo(s) em paralelo", disabled=not jobs, key="exec_batch_btn"):
+            return
+        
+        try:
+            with st.spinner(f"Executando {len(jobs)} cálculo(s)..."):
+                lote = executar_lote(jobs, db.engine.url.render_as_string(hide_password=False))
+        except Exception as e:
+            st.error(f"❌ Erro na execução em lote: {str(e)}")
+            return
+        
+        resumo_df = lote['resumo_df']
+        concluidos = sum(job['sucesso'] for job in lote['jobs'])
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("✅ Concluídos", f"{concluidos}/{len(jobs)}")
+        col2.metric("💰 Valor Total", f"R$ {resumo_df['Valor Total (R$)'].iloc[:-1].sum():,.2f}")
+        col3.metric("⏱️ Tempo total", f"{lote['tempo_total_ms'] / 1000:.1f} s")
+        col4.metric("🧵 Processos", lote['workers'])
+        st.dataframe(resumo_df, use_container_width=True)
+        st.download_button(
+            "📥 Baixar resumo (CSV)",
+            resumo_df.to_csv(index=False, sep=';', decimal=',').encode('utf-8-sig'),
+            file_name=f"lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv"
+        )
+        
+        log_agent_action(
+            "batch_executor",
+            f"🏭 Lote concluído: {concluidos}/{len(jobs)} cálculo(s)",
+            {"workers": lote['workers'], "tempo_total_ms": round(lote['tempo_total_ms'], 1),
+             "tempo_jobs_ms": round(lote['tempo_jobs_ms'], 1),
+             "por_job": {f"{job['prefixo']} / {job['configuracao']}": round(job['tempo_ms'], 1) for job in lote['jobs']}}
+        )
+
+def _lista_valores(texto: str) -> list:
+    """'30; 35,5; 40' -> [30.0, 35.5, 40.0] (vazio = [None], valor atual)"""
+    valores = [float(v.strip().replace(',', '.')) for v in texto.split(';') if v.strip()]
+    return valores or [None]
+
+def render_simulation(db):
+    """Simulação what-if do custo de VR sobre o resultado gravado de uma competência"""
+    
+    with st.expander("🧪 Simulação de cenários (what-if)", expanded=False):
+        st.caption(
+            "Avalia todas as combinações dos parâmetros de uma vez sobre o último resultado "
+            "gravado da competência. Separe os valores com ';' (vazio = valor atual). "
+            "Valores SP/outros preenchidos substituem os da tabela de sindicatos; "
+            "os valores por sindicato têm prioridade sobre ambos."
+        )
+        
+        competencias = competencias_salvas(db.engine)
+        if not competencias:
+            st.info("💡 Nenhum resultado gravado. Execute o cálculo de vale refeição primeiro.")
+            return
+        
+        competencia = st.selectbox("Competência:", options=competencias, key="sim_competencia")
+        col1, col2, col3 = st.columns(3)
+        valor_sp = col1.text_input("Valor diário SP (R$)", "35; 37,5; 40", key="sim_valor_sp")
+        valor_outros = col2.text_input("Valor diário outros (R$)", "33; 35; 37", key="sim_valor_outros")
+        desconto = col3.text_input("Desconto funcionário (%)", "20", key="sim_desconto")
+        col1, col2, col3 = st.columns(3)
+        desconto_maximo = col1.text_input("Desconto máximo (R$)", "", key="sim_desconto_maximo")
+        valor_minimo = col2.text_input("Valor mínimo (R$)", "", key="sim_valor_minimo")
+        valor_maximo = col3.text_input("Valor máximo (R$)", "", key="sim_valor_maximo")
+        sobrescritas = st.text_area(
+            "Valores por sindicato (um 'SINDICATO=valor' por linha; simulados com e sem)",
+            "", key="sim_sindicatos"
+        )
+        
+        if not st.button("🧪 Simular", key="exec_sim_btn"):
+            return
+        
+        try:
+            valores_sindicato = {}
+            for linha in sobrescritas.splitlines():
+                if '=' in linha:
+                    sindicato, valor = linha.rsplit('=', 1)
+                    valores_sindicato[sindicato.strip()] = float(valor.strip().replace(',', '.'))
+            
+            cenarios = grade_cenarios(
+                valor_sp=_lista_valores(valor_sp),
+                valor_outros=_lista_valores(valor_outros),
+                desconto_funcionario_pct=[v / 100 if v is not None else None for v in _lista_valores(desconto)],
+                desconto_maximo=_lista_valores(desconto_maximo),
+                valor_minimo=_lista_valores(valor_minimo),
+                valor_maximo=_lista_valores(valor_maximo),
+                valores_sindicato=[None, valores_sindicato] if valores_sindicato else [None]
+            )
+            inicio = datetime.now()
+            base = carregar_base(db.engine, competencia)
+            custos_df = simular_cenarios(base, cenarios)
+            sindicatos_df = custo_por_sindicato(base, cenarios)
+            tempo_ms = (datetime.now() - inicio).total_seconds() * 1000
+        except Exception as e:
+            st.error(f"❌ Erro na simulação: {str(e)}")
+            return
+        
+        # Parâmetros que não variam não precisam de coluna
+        variaveis = [c for c in custos_df.columns[:-4] if custos_df[c].astype(str).nunique() > 1]
+        custos_df = custos_df[variaveis + list(custos_df.columns[-4:])]
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("🧪 Cenários", f"{len(cenarios):,}")
+        col2.metric("📉 Menor custo empresa", f"R$ {custos_df['CUSTO_EMPRESA'].min():,.2f}")
+        col3.metric("📈 Maior custo empresa", f"R$ {custos_df['CUSTO_EMPRESA'].max():,.2f}")
+        st.caption(f"{base['elegiveis']:,} elegíveis • {len(base['grupo_dias']):,} grupos • {tempo_ms:.0f} ms")
+        st.dataframe(custos_df, use_container_width=True)
+        st.markdown("**Custo empresa por sindicato**")
+        st.dataframe(sindicatos_df, use_container_width=True)
+        st.download_button(
+            "📥 Baixar cenários (CSV)",
+            custos_df.join(sindicatos_df.add_prefix('CUSTO_')).to_csv(sep=';', decimal=',').encode('utf-8-sig'),
+            file_name=f"simulacao_{competencia}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv"
+        )
+        
+        log_agent_action(
+            "vr_simulation",
+            f"🧪 {len(cenarios)} cenário(s) simulado(s)",
+            {"competencia": competencia, "elegiveis": base['elegiveis'], "tempo_ms": round(tempo_ms, 1)}
+        )
 
 def render_calculation_history_tab(db):
     """Renderiza aba de histórico"""
@@ -413,6 +618,77 @@ def render_calculation_history_tab(db):
                 st.markdown(f"**Iterações:** {calc.get('iterations', 'N/A')}")
     else:
         st.info("📝 Nenhum cálculo executado ainda.")
+    
+    render_execution_diff(db)
+
+def render_execution_diff(db):
+    """Comparação mês a mês entre duas execuções gravadas do cálculo de VR"""
+    
+    st.markdown("### 🔀 Comparar execuções")
+    
+    try:
+        execucoes = listar_execucoes(db.engine)
+    except Exception:
+        execucoes = pd.DataFrame()
+    if len(execucoes) < 2:
+        st.info("💡 São necessárias ao menos duas execuções gravadas do cálculo de vale refeição.")
+        return
+    
+    rotulos = {
+        linha['ID']: (
+            f"#{linha['ID']} • {linha['COMPETENCIA']} • {linha['CONFIGURACAO'] or 'sem configuração'} • "
+            f"{linha['GERADO_EM']} • dados {linha['VERSAO_DADOS'][:8]}"
+        )
+        for linha in execucoes.to_dict('records')
+    }
+    ids = list(rotulos)
+    col1, col2 = st.columns(2)
+    anterior_id = col1.selectbox("Execução anterior:", options=ids, index=1, format_func=rotulos.get, key="diff_anterior")
+    atual_id = col2.selectbox("Execução atual:", options=ids, index=0, format_func=rotulos.get, key="diff_atual")
+    
+    if not st.button("🔀 Comparar", key="exec_diff_btn"):
+        return
+    
+    try:
+        inicio = datetime.now()
+        diff = comparar_execucoes(carregar_execucao(db.engine, anterior_id), carregar_execucao(db.engine, atual_id))
+        tempo_ms = (datetime.now() - inicio).total_seconds() * 1000
+    except Exception as e:
+        st.error(f"❌ Erro ao comparar execuções: {str(e)}")
+        return
+    
+    resumo = diff['resumo']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("➕ Entraram", f"{resumo['entraram']:,}", f"R$ {resumo['delta_entraram']:,.2f}")
+    col2.metric("➖ Saíram", f"{resumo['sairam']:,}", f"R$ {resumo['delta_sairam']:,.2f}")
+    col3.metric("✏️ Alterados", f"{resumo['alterados']:,}", f"R$ {resumo['delta_alterados']:,.2f}")
+    col4.metric("💰 Valor total", f"R$ {resumo['valor_total_atual']:,.2f}", f"R$ {resumo['delta_total']:,.2f}")
+    st.caption(
+        f"{resumo['passaram_a_elegiveis']:,} passaram a elegíveis • "
+        f"{resumo['deixaram_de_ser_elegiveis']:,} deixaram de ser elegíveis • {tempo_ms:.0f} ms"
+    )
+    
+    for chave, titulo in (('entraram', '➕ Entraram'), ('sairam', '➖ Saíram'), ('alterados', '✏️ Alterados')):
+        quadro = diff[chave]
+        with st.expander(f"{titulo} ({len(quadro):,})", expanded=chave == 'alterados'):
+            st.dataframe(quadro, use_container_width=True)
+    
+    completo = pd.concat(
+        [diff[chave].assign(SITUACAO=chave.upper()) for chave in ('entraram', 'sairam', 'alterados')],
+        ignore_index=True
+    )
+    st.download_button(
+        "📥 Baixar diferenças (CSV)",
+        completo.to_csv(sep=';', decimal=',', index=False).encode('utf-8-sig'),
+        file_name=f"diferencas_{anterior_id}_{atual_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+    
+    log_agent_action(
+        "vr_execucoes",
+        f"🔀 Execuções #{anterior_id} e #{atual_id} comparadas",
+        {**resumo, "tempo_ms": round(tempo_ms, 1)}
+    )
 
 def get_available_tools():
     """Retorna ferramentas disponíveis (apenas as implementadas)"""
@@ -429,6 +705,90 @@ def get_available_tools():
         ]
     }
 
+def generate_rules_from_prompt(prompt: str, schema_context: str) -> dict:
+    """Rascunha regras estruturadas a partir do prompt usando LlamaIndex/OpenAI"""
+    try:
+        from ...utils.llm_registry import obter_llm
+        
+        llm = obter_llm(temperatura=0.1)
+        
+        system_prompt = f"""
+Você converte descrições de cálculo em regras estruturadas (JSON) que serão executadas sem IA.
+
+{DOCUMENTACAO_REGRAS}
+
+EXEMPLO:
+{json.dumps(EXEMPLO_REGRAS, indent=2, ensure_ascii=False)}
+
+ESQUEMA DO BANCO DE DADOS:
+{schema_context}
+
+REGRAS IMPORTANTES:
+1. Use apenas as tabelas e colunas fornecidas no esquema
+2. Omita exclusões, inclusões e tabelas de valores que não existirem no banco
+
+DESCRIÇÃO DO CÁLCULO: {prompt}
+
+Gere apenas o JSON, sem explicações adicionais.
+"""
+        
+        response = completar(llm, system_prompt)
+        return carregar_regras(response.text)
+        
+    except ImportError:
+        st.error("❌ LlamaIndex não está instalado corretamente")
+        return None
+    except Exception as e:
+        st.error(f"❌ Erro ao gerar regras: {str(e)}")
+        return None
+
+def execute_calculation_rules(db, config):
+    """Executa as regras estruturadas da configuração (plano compilado, sem LLM)"""
+    try:
+        plano = compilar_regras(config['rules'], db)
+        resultado = plano.executar(db.engine)
+    except Exception as e:
+        st.error(f"❌ Erro ao executar regras: {str(e)}")
+        return
+    
+    df = resultado['resultado_df']
+    stats = resultado['estatisticas']
+    
+    st.markdown(f"## ⚡ Resultado das Regras: {config['name']}")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("👥 Elegíveis", f"{stats['total_elegiveis']:,}")
+    col2.metric("🚫 Excluídos", f"{stats['total_excluidos']:,}")
+    col3.metric("💰 Valor Total", f"R$ {stats['valor_total_geral']:,.2f}")
+    col4.metric("🏢 Custo Empresa", f"R$ {stats['custo_empresa_total']:,.2f}")
+    st.caption(f"Modo: {resultado['modo']} • {resultado['tempo_ms']:.0f} ms • {len(df):,} registros")
+    
+    if plano.sql:
+        with st.expander("🧾 SQL compilado", expanded=False):
+            st.code(plano.sql, language='sql')
+    
+    st.dataframe(df.head(1000), use_container_width=True)
+    st.download_button(
+        "📥 Baixar resultado (CSV)",
+        df.to_csv(index=False, sep=';', decimal=',').encode('utf-8-sig'),
+        file_name=f"regras_{config['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+    
+    log_agent_action(
+        "calculation_rules",
+        "⚡ Regras estruturadas executadas",
+        {"configuracao": config['name'], "modo": resultado['modo'],
+         "tempo_ms": round(resultado['tempo_ms'], 1), "registros": len(df)}
+    )
+    
+    if 'calculation_history' not in st.session_state:
+        st.session_state['calculation_history'] = []
+    st.session_state['calculation_history'].append({
+        'config_name': config['name'],
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'status': 'Concluído (regras)'
+    })
+
 def execute_autonomous_calculation(db, data_tables, config, container):
     """Executa cálculo usando agente autônomo"""
     
@@ -4,20 +4,23 @@ Página para visualizar e gerenciar tabelas do banco de dados
 
 import streamlit as st
 import pandas as pd
+import time
 from datetime import datetime
 
 from ..components import (
     render_alert,
     render_metrics_row,
+    render_streaming_text,
     safe_columns
 )
-from ...data.database import get_db_manager
+from ...data.database import get_db_manager, SYSTEM_TABLES
 from ...config.settings import settings
 from ...agents.log_utils import log_agent_action
+from ...utils.llm_cache import completar
 
 def get_system_tables():
     """Retorna lista de tabelas do sistema que devem ser excluídas das análises"""
-    return ['importacoes', 'agent_logs', 'calculation_configs']
+    return list(SYSTEM_TABLES)
 
 def filter_data_tables(all_tables):
     """Filtra apenas tabelas de dados, excluindo tabelas do sistema"""
@@ -640,7 +643,13 @@ def render_system_tables(db, system_tables):
     table_descriptions = {
         'importacoes': '📥 Registro de importações de arquivos',
         'agent_logs': '🤖 Logs de atividades dos agentes',
-        'calculation_configs': '⚙️ Configurações de prompts para agentes de cálculo'
+        'calculation_configs': '⚙️ Configurações de prompts para agentes de cálculo',
+        'mapeamento_colunas_cache': '🏷️ Cache de mapeamentos de colunas por layout de arquivo',
+        'calculo_vr_resultado': '🍽️ Resultado persistido do cálculo de vale refeição por competência',
+        'calculo_vr_dependencias': '🔗 Dependências do cálculo de VR por colaborador (recálculo incremental)',
+        'calculo_vr_lote': '🗓️ Resultado do cálculo de VR em lote (uma linha por colaborador e competência)',
+        'calculo_vr_lote_totais': '📆 Totais do cálculo de VR em lote por competência',
+        'calculo_vr_execucoes': '🗄️ Execuções do cálculo de VR por configuração, competência e versão dos dados'
     }
     
     for table in existing_system_tables:
@@ -839,7 +848,7 @@ def render_advanced_sql_interface(db, tables):
         
         with col1:
             st.markdown("**📊 Tabelas de Dados:**")
-            system_tables = ['importacoes', 'agent_logs', 'calculation_configs']
+            system_tables = get_system_tables()
             data_tables = [t for t in tables if t not in system_tables]
             
             for table in data_tables:
@@ -1120,7 +1129,7 @@ def render_database_tools(db, tables):
     # Ferramentas de manutenção
     st.markdown("### 🛠️ Ferramentas de Manutenção")
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         if st.button("🔄 Testar Conexão"):
@@ -1140,6 +1149,12 @@ def render_database_tools(db, tables):
             st.cache_data.clear()
             st.success("✅ Cache limpo!")
     
+    with col4:
+        if st.button("🏷️ Limpar Mapeamentos"):
+            # Força nova detecção de colunas pela IA nos próximos arquivos
+            removidos = db.invalidate_column_mapping()
+            st.success(f"✅ {removidos} mapeamento(s) de colunas removido(s)!")
+    
     # Backup e restore
     st.markdown("### 💾 Backup e Restore")
     
@@ -1245,11 +1260,17 @@ def render_ai_query_interface(db, data_tables):
         else:
             with st.spinner("🤖 IA analisando sua pergunta e gerando SQL..."):
                 try:
-                    # Gerar contexto das tabelas
-                    schema_context = generate_schema_context(db, data_tables)
-                    
-                    # Gerar SQL usando IA
-                    generated_sql = generate_sql_from_prompt(user_question, schema_context)
+                    # Perguntas frequentes saem do template do roteador, sem LLM
+                    rota = rotear_pergunta(db, user_question, data_tables)
+                    if rota:
+                        generated_sql = rota.sql
+                        st.info(f"⚡ {rota.descricao} (consulta montada sem IA)")
+                    else:
+                        # Gerar contexto das tabelas
+                        schema_context = generate_schema_context(db, data_tables, user_question)
+                        
+                        # Gerar SQL usando IA
+                        generated_sql = generate_sql_from_prompt(user_question, schema_context, st.container(), db)
                     
                     if generated_sql:
                         # Salvar no session_state para manter
@@ -1259,7 +1280,7 @@ def render_ai_query_interface(db, data_tables):
                         # Log da ação
                         log_agent_action(
                             "query_ai_agent",
-                            "🤖 Consulta SQL gerada por IA",
+                            f"⚡ Consulta SQL pelo roteador ({rota.intencao})" if rota else "🤖 Consulta SQL gerada por IA",
                             {
                                 "pergunta": user_question,
                                 "sql_gerado": generated_sql[:200] + "..." if len(generated_sql) > 200 else generated_sql
@@ -1331,38 +1352,58 @@ def render_ai_query_interface(db, data_tables):
                 if st.button(f"▶️ Executar", key=f"exec_saved_{i}"):
                     execute_generated_sql(db, query_data['sql'])
 
-def generate_schema_context(db, data_tables):
-    """Gera contexto do esquema das tabelas para a IA"""
-    context = "Esquema do banco de dados SQLite:\n\n"
+def generate_schema_context(db, data_tables, pergunta: str = ''):
+    """
+    Gera contexto do esquema das tabelas para a IA
     
-    for table in data_tables:
-        table_info = db.get_table_info(table)
-        if table_info:
-            context += f"Tabela: {table}\n"
-            context += f"Registros: {table_info['total_rows']}\n"
-            context += "Colunas:\n"
-            
-            for col in table_info['columns']:
-                pk_indicator = " (PRIMARY KEY)" if col['primary_key'] else ""
-                null_indicator = " NOT NULL" if col['not_null'] else ""
-                context += f"  - {col['name']}: {col['type']}{pk_indicator}{null_indicator}\n"
-            
-            context += "\n"
+    Limitado a LLM_TOKENS_ESQUEMA: tabelas e colunas mais relacionadas à
+    pergunta entram primeiro (utils.token_budget.comprimir_esquema)
+    """
+    from ...utils.token_budget import comprimir_esquema
     
-    return context
+    return comprimir_esquema([db.get_table_info(table) for table in data_tables], pergunta)
 
-def generate_sql_from_prompt(question: str, schema_context: str) -> str:
-    """Gera SQL usando LlamaIndex/OpenAI"""
+def extrair_sql(texto: str) -> str:
+    """SQL da resposta do LLM (sem blocos markdown)"""
+    sql = texto.strip()
+    if sql.startswith('```sql'):
+        sql = sql.replace('```sql', '').replace('```', '').strip()
+    elif sql.startswith('```'):
+        sql = sql.replace('```', '').strip()
+    return sql
+
+def sql_completo(texto: str) -> str:
+    """SQL já completo no texto parcial do streaming (None enquanto ainda chega)"""
+    texto = texto.lstrip()
+    if texto.startswith('```'):
+        corpo = texto.split('\n', 1)[1] if '\n' in texto else ''
+        return corpo.split('```', 1)[0].strip() if '```' in corpo else None
+    if ';' in texto:
+        return texto.split(';', 1)[0].strip() + ';'
+    return None
+
+def validar_sql(db, sql: str) -> str:
+    """Valida o SQL contra o esquema com EXPLAIN (sem executar); None = válido"""
+    from sqlalchemy import text
     try:
-        # Importar LlamaIndex
-        from llama_index.llms.openai import OpenAI
-        
-        # Configurar LLM
-        llm = OpenAI(
-            api_key=settings.openai_api_key,
-            model=settings.openai_model,
-            temperature=0.1
-        )
+        with db.engine.connect() as conn:
+            conn.execute(text(f"EXPLAIN {sql}"))
+        return None
+    except Exception as e:
+        return str(e).split('\n')[0]
+
+def generate_sql_from_prompt(question: str, schema_context: str, container=None, db=None) -> str:
+    """
+    Gera SQL usando LlamaIndex/OpenAI
+    
+    Com container, o SQL aparece à medida que é gerado; com db, a validação
+    contra o esquema começa assim que a consulta termina de chegar no stream.
+    """
+    try:
+        # LLM compartilhado do processo (reaproveita conexões)
+        from ...utils.llm_registry import obter_llm
+        
+        llm = obter_llm(temperatura=0.1)
         
         # Prompt para gerar SQL
         system_prompt = f"""
@@ -1389,17 +1430,34 @@ PERGUNTA DO USUÁRIO: {question}
 Gere apenas a consulta SQL, sem explicações adicionais.
 """
         
-        # Gerar resposta
-        response = llm.complete(system_prompt)
+        # Gerar resposta (em streaming quando há onde exibir)
+        from ...utils.concurrent_tasks import iniciar
         
-        # Extrair SQL da resposta
-        sql = response.text.strip()
+        atualizar = render_streaming_text(container, language='sql') if container is not None else None
+        validacao = {}
+        
+        def ao_receber(texto: str):
+            if atualizar:
+                atualizar(texto)
+            parcial = sql_completo(texto) if db is not None and 'futuro' not in validacao else None
+            if parcial:
+                validacao.update(sql=parcial, futuro=iniciar(validar_sql, db, parcial))
         
-        # Limpar SQL (remover markdown se houver)
-        if sql.startswith('```sql'):
-            sql = sql.replace('```sql', '').replace('```', '').strip()
-        elif sql.startswith('```'):
-            sql = sql.replace('```', '').strip()
+        response = completar(llm, system_prompt, ao_receber=ao_receber if (atualizar or db is not None) else None)
+        
+        # Extrair SQL da resposta
+        sql = extrair_sql(response.text)
+        if atualizar:
+            atualizar(sql, final=True)
+        
+        if db is not None and container is not None:
+            if validacao.get('sql', '').rstrip(';').strip() != sql.rstrip(';').strip():
+                validacao['futuro'] = iniciar(validar_sql, db, sql)
+            erro = validacao['futuro'].result()
+            if erro:
+                container.warning(f"⚠️ O SQL gerado não passou na validação do esquema: {erro}")
+            else:
+                container.caption("✅ SQL validado contra o esquema do banco")
         
         return sql
         
@@ -1586,7 +1644,10 @@ def execute_autonomous_agent(db, data_tables, question: str, config: dict, conta
                 display_question = line.replace('OBJETIVO:', '').strip()
                 break
     
-    with container.container():
+    from ...utils.token_budget import medir_tokens
+    
+    inicio_execucao = time.perf_counter()
+    with container.container(), medir_tokens() as uso_tokens:
         st.markdown("## 🧠 Agente Autônomo em Ação")
         st.markdown(f"**Pergunta:** {display_question}")
         
@@ -1612,19 +1673,46 @@ def execute_autonomous_agent(db, data_tables, question: str, config: dict, conta
         # Container para etapas
         steps_container = st.container()
         
+        # Perguntas frequentes (contagens, médias, top-N...) sem ferramentas extras:
+        # SQL do template do roteador, sem planejamento nem LLM
+        rota = rotear_pergunta(db, question, data_tables) if not config.get('available_tools') else None
+        if rota:
+            resultado = executar_rota(db, rota)
+            analysis_steps = [{
+                'step': 1,
+                'action': 'Resposta Direta',
+                'description': rota.descricao,
+                'result': resultado
+            }]
+            with steps_container:
+                render_analysis_step(analysis_steps[0], config.get('show_reasoning', True))
+                if resultado.get('result_count', 0) > 1:
+                    st.dataframe(pd.DataFrame(resultado['query_result']), use_container_width=True)
+            progress_bar.progress(100)
+            status_text.text("⚡ Resposta direta pelo roteador de intenções (sem LLM)")
+            save_agent_analysis(question, analysis_steps, config, 0)
+            log_agent_action(
+                "autonomous_agent",
+                "⚡ Pergunta respondida pelo roteador de intenções",
+                {
+                    "pergunta": question[:100],
+                    "intencao": rota.intencao,
+                    "sql": rota.sql[:200],
+                    "tempo_ms": round((time.perf_counter() - inicio_execucao) * 1000, 1)
+                }
+            )
+            registrar_log_agente(
+                db, "⚡ Pergunta respondida pelo roteador de intenções", question, uso_tokens, inicio_execucao,
+                output_data={"intencao": rota.intencao, "sql": rota.sql},
+                status="success" if not resultado.get('error') else "error", error_message=resultado.get('error')
+            )
+            return not resultado.get('error')
+        
         try:
-            # Configurar LLM (nova instância para evitar cache)
-            from llama_index.llms.openai import OpenAI
-            import uuid
+            # LLM compartilhado do processo (reaproveita conexões)
+            from ...utils.llm_registry import obter_llm
             
-            llm = OpenAI(
-                api_key=settings.openai_api_key,
-                model=settings.openai_model,
-                temperature=0.3,
-                # Forçar nova sessão
-                request_timeout=60.0,
-                max_retries=3
-            )
+            llm = obter_llm(temperatura=0.3, max_retries=3)
             
             # Inicializar histórico de análise com ID único
             import uuid
@@ -1664,11 +1752,23 @@ Crie um plano estruturado em JSON com as chaves:
             iteration = 0
             max_iterations = config['max_iterations']
             
-            # Etapa 1: Análise inicial da pergunta
-            status_text.text("🔍 Etapa 1: Analisando pergunta e planejando abordagem...")
+            # Etapas 1 e 2 são independentes: o planejamento (LLM) roda enquanto o
+            # esquema é lido do banco; os resultados são exibidos na ordem das etapas
+            from ...utils.concurrent_tasks import iniciar
+            
+            status_text.text("🔍 Etapas 1 e 2: Planejando abordagem e explorando o esquema...")
             progress_bar.progress(10)
             
-            planning_result = plan_analysis_approach(llm, question, data_tables, db, config, execution_id)
+            with steps_container:
+                plano_stream = render_streaming_text(language='json')
+            futuro_plano = iniciar(
+                plan_analysis_approach, llm, question, data_tables, db, config, execution_id, plano_stream
+            )
+            tabelas_info = coletar_info_tabelas(db, data_tables[:8])
+            futuro_esquema = iniciar(explore_data_schema, llm, data_tables, db, config, tabelas_info)
+            
+            planning_result = futuro_plano.result()
+            plano_stream.placeholder.empty()
             analysis_steps.append({
                 'step': 1,
                 'action': 'Planejamento',
@@ -1689,7 +1789,7 @@ Crie um plano estruturado em JSON com as chaves:
             
             # Continuar com as etapas normais do agente autônomo
             
-            schema_analysis = explore_data_schema(llm, data_tables, db, config)
+            schema_analysis = futuro_esquema.result()
             analysis_steps.append({
                 'step': 2,
                 'action': 'Exploração do Esquema',
@@ -1706,6 +1806,7 @@ Crie um plano estruturado em JSON com as chaves:
                 'user_objective': question,  # Objetivo original do usuário
                 'plan': planning_result,
                 'schema': schema_analysis,
+                'tabelas_info': tabelas_info,
                 'findings': []
             }
             
@@ -1771,7 +1872,10 @@ Crie um plano estruturado em JSON com as chaves:
             status_text.text("🎯 Finalizando: Sintetizando resultados e gerando insights...")
             progress_bar.progress(90)
             
-            final_synthesis = synthesize_final_results(llm, current_context, config)
+            with steps_container:
+                sintese_stream = render_streaming_text()
+            final_synthesis = synthesize_final_results(llm, current_context, config, sintese_stream)
+            sintese_stream.placeholder.empty()
             analysis_steps.append({
                 'step': len(analysis_steps) + 1,
                 'action': 'Síntese Final',
@@ -1819,9 +1923,15 @@ Crie um plano estruturado em JSON com as chaves:
                     "pergunta": question[:100],
                     "total_iteracoes": iteration,
                     "total_etapas": len(analysis_steps),
-                    "insights_gerados": len(final_synthesis.get('insights', []))
+                    "insights_gerados": len(final_synthesis.get('insights', [])),
+                    "tokens": uso_tokens.total,
+                    "tokens_poupados_cache": uso_tokens.cache
                 }
             )
+            registrar_log_agente(
+                db, "✅ Análise autônoma concluída", question, uso_tokens, inicio_execucao,
+                output_data={"total_iteracoes": iteration, "total_etapas": len(analysis_steps)}
+            )
             
             # Mostrar resumo final
             st.markdown("---")
@@ -1829,18 +1939,21 @@ Crie um plano estruturado em JSON com as chaves:
             
             # Usar safe_columns para evitar erro de aninhamento
             try:
-                col1, col2, col3 = st.columns(3)
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
                     st.metric("🔄 Iterações", iteration)
                 with col2:
                     st.metric("📊 Etapas", len(analysis_steps))
                 with col3:
                     st.metric("💡 Insights", len(final_synthesis.get('insights', [])))
+                with col4:
+                    st.metric("🔤 Tokens", f"{uso_tokens.total:,}".replace(',', '.'))
             except:
                 # Fallback para exibição vertical se colunas não funcionarem
                 st.metric("🔄 Iterações", iteration)
                 st.metric("📊 Etapas", len(analysis_steps))
                 st.metric("💡 Insights", len(final_synthesis.get('insights', [])))
+                st.metric("🔤 Tokens", f"{uso_tokens.total:,}".replace(',', '.'))
             
             return True
             
@@ -1868,15 +1981,43 @@ Crie um plano estruturado em JSON com as chaves:
                     "erro": str(e),
                     "traceback": error_traceback[:500],
                     "pergunta": question[:100],
-                    "iteracao_atual": iteration
+                    "iteracao_atual": iteration,
+                    "tokens": uso_tokens.total
                 }
             )
+            registrar_log_agente(
+                db, "❌ Erro na análise autônoma", question, uso_tokens, inicio_execucao,
+                status="error", error_message=str(e)
+            )
             return False
 
+def registrar_log_agente(db, action: str, question: str, uso_tokens, inicio: float,
+                         output_data: dict = None, status: str = "success", error_message: str = None):
+    """Grava a execução do agente autônomo em agent_logs (tokens e duração)"""
+    try:
+        db.log_to_session(
+            "autonomous_agent", action,
+            input_data={"pergunta": question[:500]},
+            output_data={
+                **(output_data or {}),
+                "tokens_prompt": uso_tokens.prompt,
+                "tokens_resposta": uso_tokens.resposta,
+                "tokens_poupados_cache": uso_tokens.cache,
+                "chamadas_llm": uso_tokens.chamadas
+            },
+            status=status,
+            error_message=error_message,
+            tokens_used=uso_tokens.total,
+            processing_time_ms=int((time.perf_counter() - inicio) * 1000)
+        )
+    except Exception:
+        pass  # log_to_session já exibiu o erro; a análise não depende do registro
+
 # Funções auxiliares do agente autônomo
 
-def plan_analysis_approach(llm, question: str, data_tables: list, db, config: dict, execution_id: str = None) -> dict:
-    """Planeja abordagem usando o prompt do usuário como objetivo principal"""
+def plan_analysis_approach(llm, question: str, data_tables: list, db, config: dict, execution_id: str = None,
+                           ao_receber=None) -> dict:
+    """Planeja abordagem usando o prompt do usuário como objetivo principal (ao_receber: streaming do plano)"""
     
     # Extrair a pergunta real se vier com contexto adicional
     original_question = question
@@ -1922,7 +2063,7 @@ Crie um plano MÍNIMO em JSON:
     """
     
     try:
-        response = llm.complete(planning_prompt)
+        response = completar(llm, planning_prompt, ao_receber=ao_receber)
         
         # Tentar parsear como JSON
         import json
@@ -1956,14 +2097,21 @@ Crie um plano MÍNIMO em JSON:
             "user_objective": question
         }
 
-def explore_data_schema(llm, data_tables: list, db, config: dict) -> dict:
+def coletar_info_tabelas(db, tables: list) -> dict:
+    """Lê colunas e contagem das tabelas em paralelo (uma vez por execução do agente)"""
+    from ...utils.concurrent_tasks import mapear
+    
+    return dict(zip(tables, mapear(db.get_table_info, list(tables))))
+
+def explore_data_schema(llm, data_tables: list, db, config: dict, tabelas_info: dict = None) -> dict:
     """Explora o esquema dos dados de forma compacta"""
     
     schema_details = {}
+    tabelas_info = tabelas_info or {}
     
     # Obter apenas informações essenciais das tabelas (limitado para evitar tokens)
     for table in data_tables[:5]:  # Máximo 5 tabelas para análise de esquema
-        table_info = db.get_table_info(table)
+        table_info = tabelas_info[table] if table in tabelas_info else db.get_table_info(table)
         if table_info:
             # Manter apenas informações essenciais
             schema_details[table] = {
@@ -1982,7 +2130,7 @@ Resposta em 2-3 frases.
         """
         
         try:
-            response = llm.complete(analysis_prompt)
+            response = completar(llm, analysis_prompt)
             ai_insights = response.text[:300]  # Limitar resposta
         except:
             ai_insights = "Análise automática não disponível"
@@ -2014,6 +2162,54 @@ def generate_simple_sql(question: str, table: str) -> str:
     else:
         return f'SELECT COUNT(*) FROM "{table}"'
 
+def rotear_pergunta(db, question: str, data_tables: list, tabelas_info: dict = None):
+    """Rota do roteador de intenções para a pergunta (None = segue para o LLM)"""
+    if not settings.intent_router_enabled or not data_tables:
+        return None
+    from ...utils.intent_router import rotear
+    
+    try:
+        return rotear(question, tabelas_info or coletar_info_tabelas(db, data_tables))
+    except Exception as e:
+        log_agent_action("intent_router", "⚠️ Falha no roteador de intenções", {"erro": str(e)})
+        return None
+
+def executar_rota(db, rota) -> dict:
+    """Executa o SQL da rota e devolve o resultado no formato das etapas do agente"""
+    try:
+        df_result = pd.read_sql(rota.sql, db.engine)
+    except Exception as e:
+        return {
+            "action_type": "query_error",
+            "description": rota.descricao,
+            "error": str(e),
+            "sql_query": rota.sql,
+            "target_table": rota.tabela,
+            "analysis_complete": True,
+            "findings": f"Erro na consulta: {str(e)}"
+        }
+    
+    if df_result.shape == (1, 1):
+        valor = df_result.iat[0, 0]
+        if isinstance(valor, float):
+            valor = f"{valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+        resposta = f"{rota.descricao}: {valor}"
+    else:
+        resposta = f"{rota.descricao}: {len(df_result)} registro(s)"
+    
+    return {
+        "action_type": "intent_query",
+        "intent": rota.intencao,
+        "sql_query": rota.sql,
+        "description": rota.descricao,
+        "direct_answer": resposta,
+        "query_result": df_result.to_dict('records'),
+        "target_table": rota.tabela,
+        "analysis_complete": True,
+        "findings": resposta,
+        "result_count": len(df_result)
+    }
+
 def execute_analysis_iteration(llm, db, data_tables: list, context: dict, config: dict, iteration: int) -> dict:
     """Executa uma iteração de análise usando IA para determinar próxima ação"""
     
@@ -2096,9 +2292,11 @@ def execute_analysis_iteration(llm, db, data_tables: list, context: dict, config
     })
     
     # Preparar contexto das tabelas disponíveis (compacto para evitar excesso de tokens)
+    # Reaproveita o esquema lido no início da execução em vez de consultar o banco a cada iteração
+    tabelas_info = context.get('tabelas_info') or {}
     tables_context = ""
     for table in data_tables[:8]:  # Máximo 8 tabelas no contexto
-        table_info = db.get_table_info(table)
+        table_info = tabelas_info[table] if table in tabelas_info else db.get_table_info(table)
         if table_info:
             columns = [col['name'] for col in table_info['columns'][:4]]  # 4 primeiras colunas
             tables_context += f"- {table}: {table_info['total_rows']} registros\n"
@@ -2144,6 +2342,12 @@ def execute_analysis_iteration(llm, db, data_tables: list, context: dict, config
     if 'média' in user_question.lower() and 'mediana' in user_question.lower():
         is_simple_question = False
     
+    # Intenção reconhecida pelo roteador: SQL do template, sem consultar o LLM
+    if iteration == 1:
+        rota = rotear_pergunta(db, user_question, data_tables, tabelas_info)
+        if rota:
+            return executar_rota(db, rota)
+    
     # Para perguntas simples, forçar resposta direta SQL
     if is_simple_question and iteration == 1:
         action_prompt = f"""
@@ -2200,7 +2404,7 @@ Responda APENAS JSON:
     
     try:
         # Usar IA para determinar próxima ação
-        response = llm.complete(action_prompt)
+        response = completar(llm, action_prompt)
         
         # Tentar parsear resposta JSON
         import json
@@ -2557,7 +2761,10 @@ Responda APENAS JSON:
         
         # NOVA TOOL: Cálculo de Vale Refeição
         elif action_type == "calculo_vale_refeicao" and "calculo_vale_refeicao" in config.get('available_tools', []):
-            result = calculo_vale_refeicao_tool(db, data_tables)
+            result = calculo_vale_refeicao_tool(
+                db, data_tables, action_plan.get('competencia_inicio'), action_plan.get('competencia_fim')
+            )
+            registrar_execucao_vale_refeicao(db, data_tables, result, config.get('name'))
             
             # Se o cálculo foi bem-sucedido e tem Excel disponível, gerar automaticamente
             if result.get('success', False) and result.get('auto_export_excel', False) and "excel_export" in config.get('available_tools', []):
@@ -2620,6 +2827,7 @@ Responda APENAS JSON:
               "calcular" in action_plan.get("description", "").lower()):
             if "calculo_vale_refeicao" in config.get('available_tools', []):
                 result = calculo_vale_refeicao_tool(db, data_tables)
+                registrar_execucao_vale_refeicao(db, data_tables, result, config.get('name'))
                 
                 # Auto-gerar Excel se bem-sucedido
                 if result.get('success', False) and result.get('auto_export_excel', False) and "excel_export" in config.get('available_tools', []):
@@ -2665,7 +2873,7 @@ Responda APENAS JSON:
             
             if target_table:
                 # Gerar contexto do esquema para a tabela específica
-                schema_context = generate_schema_context(db, [target_table])
+                schema_context = generate_schema_context(db, [target_table], user_question)
                 
                 # Criar pergunta baseada no passo atual do plano
                 step_description = action_plan.get('description', f'análise passo {iteration}')
@@ -2684,8 +2892,10 @@ Responda APENAS JSON:
                     step_question = f"Para a tabela {target_table}: {step_description}"
                 
                 # Usar a função text-to-query existente que já valida colunas
+                # (o template do roteador, quando reconhece a pergunta, dispensa o LLM)
                 try:
-                    generated_sql = generate_sql_from_prompt(step_question, schema_context)
+                    rota = rotear_pergunta(db, step_question, [target_table]) if is_simple else None
+                    generated_sql = rota.sql if rota else generate_sql_from_prompt(step_question, schema_context)
                     if generated_sql and generated_sql.strip():
                         sql_query = generated_sql
                         
@@ -2806,14 +3016,291 @@ Responda APENAS JSON:
             "findings": f"Erro geral na iteração: {str(e)}"
         }
 
-def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
+def log_dias_vale_refeicao(dias_df, competencia: str):
+    """Registra os dias úteis por localidade e os casos proporcionais do cálculo de VR"""
+    dias_por_localidade = (
+        dias_df[['UF', 'MUNICIPIO', 'DIAS_UTEIS']].fillna('-')
+        .groupby(['UF', 'MUNICIPIO'])['DIAS_UTEIS'].agg(['first', 'size'])
+    )
+    st.session_state['agent_logs'].append({
+        'timestamp': datetime.now().strftime('%H:%M:%S'),
+        'agent': 'calculo_vale_refeicao',
+        'action': f'📅 Dias úteis de {competencia} calculados para {len(dias_por_localidade)} localidade(s)',
+        'details': {
+            'competencia': competencia,
+            'dias_por_localidade': {
+                f'{uf}/{municipio}': f"{linha['first']} dias ({linha['size']} colaboradores)"
+                for (uf, municipio), linha in dias_por_localidade.iterrows()
+            },
+            'proporcionais': int(((dias_df['DIAS_ELEGIVEL'] > 0) & (dias_df['DIAS_ELEGIVEL'] < dias_df['DIAS_UTEIS'])).sum()),
+            'sem_dias_elegiveis': int((dias_df['DIAS_ELEGIVEL'] == 0).sum())
+        }
+    })
+
+def salvar_resultado_vale_refeicao(db, resultado_df, competencia: str):
+    """
+    Persiste em calculo_vr_resultado o resultado do pushdown/cálculo em memória
+
+    Mantém a simulação de cenários disponível com VR_INCREMENTAL desligado.
+    """
+    try:
+        from ...utils.vr_incremental import CalculoIncremental
+        CalculoIncremental(db.engine, competencia).salvar_resultado(resultado_df)
+    except Exception as e:
+        st.session_state['agent_logs'].append({
+            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'agent': 'calculo_vale_refeicao',
+            'action': f'⚠️ Não foi possível gravar o resultado da competência: {str(e)}',
+            'details': {'erro': str(e)}
+        })
+
+def finalizar_calculo_vale_refeicao(resultado_df, estatisticas: dict, competencia: str = None) -> dict:
+    """Log final e resultado da tool de vale refeição"""
+    total_processados = len(resultado_df)
+    total_elegiveis = estatisticas['total_elegiveis']
+    total_excluidos = estatisticas['total_excluidos']
+    elegiveis_sp = estatisticas['elegiveis_sp']
+    elegiveis_outros = estatisticas['elegiveis_outros']
+    valor_total_geral = estatisticas['valor_total_geral']
+    valor_total_sp = estatisticas['valor_total_sp']
+    valor_total_outros = estatisticas['valor_total_outros']
+    
+    # Log final
+    st.session_state['agent_logs'].append({
+        'timestamp': datetime.now().strftime('%H:%M:%S'),
+        'agent': 'calculo_vale_refeicao',
+        'action': '✅ Cálculo de vale refeição concluído',
+        'details': {
+            'total_processados': total_processados,
+            'elegiveis_total': total_elegiveis,
+            'elegiveis_sp': f'{elegiveis_sp} (R$ 37,50/dia)',
+            'elegiveis_outros': f'{elegiveis_outros} (R$ 35,00/dia)',
+            'excluidos': total_excluidos,
+            'valor_total_geral': f'R$ {valor_total_geral:,.2f}',
+            'valor_sp': f'R$ {valor_total_sp:,.2f}',
+            'valor_outros': f'R$ {valor_total_outros:,.2f}',
+            'percentual_elegiveis': f'{estatisticas["percentual_elegiveis"]:.1f}%'
+        }
+    })
+    
+    return {
+        "action_type": "calculo_vale_refeicao",
+        "description": f"Cálculo de vale refeição concluído: {total_elegiveis} elegíveis de {estatisticas['total_colaboradores']} colaboradores",
+        "success": True,
+        "resultado_df": resultado_df,
+        "estatisticas": estatisticas,
+        "total_records": len(resultado_df),
+        "analysis_complete": True,  # MARCAR COMO COMPLETO - cálculo específico já foi feito
+        "findings": f"Processados {estatisticas['total_colaboradores']} colaboradores: {total_elegiveis} elegíveis, {total_excluidos} excluídos. Valor total: R$ {valor_total_geral:,.2f}",
+        "competencia": competencia or settings.competencia_vr,
+        "auto_export_excel": True  # Sinalizar para exportar automaticamente
+    }
+
+def registrar_execucao_vale_refeicao(db, data_tables: list, result: dict, configuracao: str = None) -> dict:
+    """
+    Grava o resultado da tool em calculo_vr_execucoes
+
+    Chave: configuração do agente, competência e versão dos dados de origem
+    (calculada no SQLite, com os feriados do calendário); resultados em lote
+    geram uma execução por competência.
+    """
+    if not result.get('success', False) or result.get('resultado_df') is None:
+        return result
+    try:
+        from ...utils.business_calendar import get_business_calendar
+        from ...utils.vr_calculator import VALOR_OUTROS, VALOR_SP
+        from ...utils.vr_execucoes import salvar_execucoes_competencias, versao_dados
+        from ...utils.vr_incremental import TABELAS_ORIGEM, VERSAO_CALCULO
+        
+        versao = versao_dados(
+            db.engine, [t for t in TABELAS_ORIGEM if t in data_tables],
+            [VERSAO_CALCULO, VALOR_SP, VALOR_OUTROS], calendario=get_business_calendar()
+        )
+        execucoes = salvar_execucoes_competencias(
+            db.engine, result['resultado_df'], configuracao or '', result.get('competencia') or settings.competencia_vr, versao
+        )
+        result['execucoes'] = execucoes
+        st.session_state['agent_logs'].append({
+            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'agent': 'calculo_vale_refeicao',
+            'action': f'💾 {len(execucoes)} execução(ões) gravada(s) para comparação mês a mês',
+            'details': {'configuracao': configuracao, 'versao_dados': versao, 'execucoes': execucoes}
+        })
+    except Exception as e:
+        st.session_state['agent_logs'].append({
+            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'agent': 'calculo_vale_refeicao',
+            'action': f'⚠️ Não foi possível gravar a execução: {str(e)}',
+            'details': {'erro': str(e)}
+        })
+    return result
+
+def calculo_vale_refeicao_lote(db, data_tables: list, competencia_inicio: str, competencia_fim: str, calendario) -> dict:
+    """
+    Cálculo de vale refeição em lote para um intervalo de competências
+
+    Tabelas de origem lidas uma vez; exclusões e valores por sindicato resolvidos
+    uma vez por colaborador e os dias de todos os meses calculados em uma única
+    passada. Grava o resultado longo (calculo_vr_lote) e os totais por mês
+    (calculo_vr_lote_totais).
+    """
+    from ...utils.vr_batch import calcular_lote, salvar_lote
+    from ...utils.vr_calculator import calcular_estatisticas
+    from ...utils.vr_incremental import TABELAS_ORIGEM
+    
+    inicio = datetime.now()
+    tabelas = {
+        t: pd.read_sql(f'SELECT * FROM "{t}"', db.engine)
+        for t in TABELAS_ORIGEM if t in data_tables
+    }
+    resultado_df, totais_df = calcular_lote(tabelas, competencia_inicio, competencia_fim, calendario)
+    salvar_lote(db.engine, resultado_df, totais_df)
+    
+    # Estatísticas do período: colaborador x competência
+    total_colaboradores = int(totais_df['TOTAL_COLABORADORES'].sum())
+    estatisticas = calcular_estatisticas(resultado_df, total_colaboradores)
+    
+    st.session_state['agent_logs'].append({
+        'timestamp': datetime.now().strftime('%H:%M:%S'),
+        'agent': 'calculo_vale_refeicao',
+        'action': f'🗓️ Cálculo em lote concluído: {len(totais_df)} competência(s) de {competencia_inicio} a {competencia_fim}',
+        'details': {
+            'linhas_resultado': len(resultado_df),
+            'por_competencia': {
+                linha['COMPETENCIA']: f"{linha['TOTAL_ELEGIVEIS']} elegíveis - R$ {linha['VALOR_TOTAL_GERAL']:,.2f}"
+                for linha in totais_df.to_dict('records')
+            },
+            'valor_total_periodo': f"R$ {estatisticas['valor_total_geral']:,.2f}",
+            'tempo_ms': round((datetime.now() - inicio).total_seconds() * 1000, 1)
+        }
+    })
+    
+    return {
+        "action_type": "calculo_vale_refeicao",
+        "description": f"Cálculo de vale refeição em lote concluído: {len(totais_df)} competência(s) de {competencia_inicio} a {competencia_fim}",
+        "success": True,
+        "resultado_df": resultado_df,
+        "totais_df": totais_df,
+        "estatisticas": estatisticas,
+        "competencia": f"{competencia_inicio} a {competencia_fim}",
+        "total_records": len(resultado_df),
+        "analysis_complete": True,
+        "findings": f"Calculadas {len(totais_df)} competências para {len(resultado_df) // max(len(totais_df), 1)} colaboradores. Valor total do período: R$ {estatisticas['valor_total_geral']:,.2f}",
+        "auto_export_excel": True
+    }
+
+def calculo_vale_refeicao_pushdown(db, data_tables: list, competencia: str, calendario):
+    """
+    Cálculo de vale refeição com pushdown para o SQLite
+
+    Uma única consulta une ativos e admissões, aplica as exclusões (anti-join) e
+    o valor por sindicato; apenas as linhas de resultado são lidas, em lotes.
+    Os dias (calendário e períodos de ausência) continuam no pandas.
+
+    Returns:
+        Tupla (resultado_df, estatisticas)
+    """
+    from ...utils.vr_calculator import TABELAS_EXCLUSAO, TABELAS_PRORRATEIO
+    from ...utils.vr_sql import calcular_vale_refeicao_sql
+    from ...utils.intervals import calcular_dias_colaboradores
+    
+    tabelas = ['ativos', 'admissao_abril', 'base_sindicato_x_valor'] + TABELAS_EXCLUSAO
+    colunas_tabelas = {t: db.get_table_columns(t) for t in tabelas if t in data_tables}
+    exclusoes = [t for t in TABELAS_EXCLUSAO if t in colunas_tabelas and t not in TABELAS_PRORRATEIO]
+    
+    # Períodos de férias/afastamentos/desligamentos (proporcional) ainda são lidos inteiros
+    tabelas_ausencia = {
+        t: pd.read_sql(f'SELECT * FROM "{t}"', db.engine)
+        for t in TABELAS_PRORRATEIO if t in colunas_tabelas
+    }
+    
+    def dias_elegiveis(colaboradores_df):
+        dias_df = calcular_dias_colaboradores(colaboradores_df, competencia, tabelas_ausencia, calendario)
+        log_dias_vale_refeicao(dias_df, competencia)
+        return dias_df['DIAS_ELEGIVEL'].to_numpy(), dias_df['MOTIVO'].to_numpy()
+    
+    inicio = datetime.now()
+    resultado_df, estatisticas, colaboradores_df = calcular_vale_refeicao_sql(
+        db.engine, colunas_tabelas, exclusoes, dias_uteis=dias_elegiveis
+    )
+    
+    st.session_state['agent_logs'].append({
+        'timestamp': datetime.now().strftime('%H:%M:%S'),
+        'agent': 'calculo_vale_refeicao',
+        'action': f'⚡ Pushdown SQL: {len(resultado_df)} colaboradores lidos já classificados',
+        'details': {
+            'ativos': estatisticas['total_colaboradores'],
+            'colunas_lidas': list(colaboradores_df.columns),
+            'exclusoes': resultado_df['MOTIVO_EXCLUSAO'][resultado_df['MOTIVO_EXCLUSAO'] != ''].value_counts().to_dict(),
+            'tabelas_proporcionais': list(tabelas_ausencia),
+            'tempo_ms': round((datetime.now() - inicio).total_seconds() * 1000, 1)
+        }
+    })
+    
+    return resultado_df, estatisticas
+
+def calculo_vale_refeicao_incremental(db, data_tables: list, competencia: str, calendario):
+    """
+    Cálculo de vale refeição incremental
+
+    Compara o hash das linhas das tabelas de origem por colaborador com o da
+    execução anterior (calculo_vr_dependencias) e recalcula apenas os
+    colaboradores afetados, corrigindo o resultado salvo (calculo_vr_resultado).
+
+    Returns:
+        Tupla (resultado_df, estatisticas)
+    """
+    from ...utils.vr_incremental import CalculoIncremental
+    
+    inicio = datetime.now()
+    calculo = CalculoIncremental(db.engine, competencia, calendario)
+    execucao = calculo.executar(calculo.carregar_tabelas(data_tables))
+    
+    acoes = {
+        'completo': '🔄 Cálculo completo (sem resultado salvo válido)',
+        'incremental': f"♻️ Cálculo incremental: {execucao['recalculados']} colaborador(es) recalculado(s)",
+        'sem_alteracoes': '♻️ Tabelas de origem sem alterações: resultado salvo reutilizado'
+    }
+    st.session_state['agent_logs'].append({
+        'timestamp': datetime.now().strftime('%H:%M:%S'),
+        'agent': 'calculo_vale_refeicao',
+        'action': acoes[execucao['modo']],
+        'details': {
+            'modo': execucao['modo'],
+            'recalculados': execucao['recalculados'],
+            'chaves_alteradas_por_tabela': execucao['mudancas'],
+            'tempo_ms': round((datetime.now() - inicio).total_seconds() * 1000, 1)
+        }
+    })
+    
+    return execucao['resultado_df'], execucao['estatisticas']
+
+def calculo_vale_refeicao_tool(db, data_tables: list, competencia_inicio: str = None,
+                               competencia_fim: str = None) -> dict:
     """
     Tool especializada para cálculo de vale refeição
     Implementa a lógica de negócio específica do RH brasileiro
+
+    Com competencia_fim (ou COMPETENCIA_VR_FIM) diferente da inicial, calcula
+    em lote todas as competências do intervalo. Para uma competência, a ordem
+    é: incremental (VR_INCREMENTAL, desligado por padrão), pushdown SQL
+    (VR_SQL_PUSHDOWN) e cálculo em memória. O incremental precisa do hash de
+    todas as linhas de origem, então lê as tabelas inteiras e, quando ligado,
+    o pushdown só roda se ele falhar.
     """
     try:
         import pandas as pd
         from datetime import datetime
+        from ...utils.vr_calculator import (
+            calcular_vale_refeicao, carregar_valores_sindicato,
+            TABELAS_EXCLUSAO, TABELAS_PRORRATEIO, VALOR_SP, VALOR_OUTROS
+        )
+        from ...utils.business_calendar import get_business_calendar
+        from ...utils.intervals import calcular_dias_colaboradores
+        
+        competencia = competencia_inicio or settings.competencia_vr
+        competencia_fim = competencia_fim or settings.competencia_vr_fim
+        calendario = get_business_calendar()
         
         # Log do início do cálculo
         st.session_state['agent_logs'].append({
@@ -2822,7 +3309,8 @@ def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
             'action': '🧮 Iniciando cálculo de vale refeição',
             'details': {
                 'tabelas_disponiveis': data_tables,
-                'dias_uteis': 22
+                'competencia': competencia,
+                'dias_uteis_nacional': calendario.dias_uteis(competencia)
             }
         })
         
@@ -2835,6 +3323,38 @@ def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
                 "success": False
             }
         
+        # Lote: intervalo de competências em uma única passada
+        if competencia_fim and competencia_fim != competencia:
+            return calculo_vale_refeicao_lote(db, data_tables, competencia, competencia_fim, calendario)
+        
+        # Incremental: reaproveita o resultado salvo e recalcula só os colaboradores afetados
+        # (tem precedência sobre o pushdown, pois já carregou as tabelas de origem)
+        if settings.vr_incremental:
+            try:
+                resultado_df, estatisticas = calculo_vale_refeicao_incremental(db, data_tables, competencia, calendario)
+                return finalizar_calculo_vale_refeicao(resultado_df, estatisticas, competencia)
+            except Exception as e:
+                st.session_state['agent_logs'].append({
+                    'timestamp': datetime.now().strftime('%H:%M:%S'),
+                    'agent': 'calculo_vale_refeicao',
+                    'action': f'⚠️ Cálculo incremental indisponível, recalculando tudo: {str(e)}',
+                    'details': {'erro': str(e)}
+                })
+        
+        # Pushdown: elegibilidade e valores resolvidos no SQLite, só o resultado vem para o pandas
+        if settings.vr_sql_pushdown:
+            try:
+                resultado_df, estatisticas = calculo_vale_refeicao_pushdown(db, data_tables, competencia, calendario)
+                salvar_resultado_vale_refeicao(db, resultado_df, competencia)
+                return finalizar_calculo_vale_refeicao(resultado_df, estatisticas, competencia)
+            except Exception as e:
+                st.session_state['agent_logs'].append({
+                    'timestamp': datetime.now().strftime('%H:%M:%S'),
+                    'agent': 'calculo_vale_refeicao',
+                    'action': f'⚠️ Pushdown SQL indisponível, usando cálculo em memória: {str(e)}',
+                    'details': {'erro': str(e)}
+                })
+        
         ativos_df = pd.read_sql('SELECT * FROM "ativos"', db.engine)
         total_ativos = len(ativos_df)
         
@@ -2891,14 +3411,29 @@ def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
         })
         
         # 2. BUSCAR TABELAS DE EXCLUSÃO
+        # Férias, afastamentos e desligamentos reduzem os dias (proporcional);
+        # as demais excluem o colaborador
         exclusoes = {}
-        tabelas_exclusao = ['ferias', 'afastamentos', 'aprendiz', 'exterior', 'desligados']
-        
-        for tabela in tabelas_exclusao:
+        tabelas_ausencia = {}
+        for tabela in TABELAS_EXCLUSAO:
             if tabela in data_tables:
                 try:
+                    if tabela in TABELAS_PRORRATEIO:
+                        tabelas_ausencia[tabela] = pd.read_sql(f'SELECT * FROM "{tabela}"', db.engine)
+                        st.session_state['agent_logs'].append({
+                            'timestamp': datetime.now().strftime('%H:%M:%S'),
+                            'agent': 'calculo_vale_refeicao',
+                            'action': f'📆 Períodos {tabela}: {len(tabelas_ausencia[tabela])} registros (proporcional)',
+                            'details': {
+                                'tabela': tabela,
+                                'total_registros': len(tabelas_ausencia[tabela]),
+                                'colunas': list(tabelas_ausencia[tabela].columns)
+                            }
+                        })
+                        continue
+                    
                     df_exclusao = pd.read_sql(f'SELECT MATRICULA FROM "{tabela}"', db.engine)
-                    exclusoes[tabela] = set(df_exclusao['MATRICULA'].astype(str))
+                    exclusoes[tabela] = pd.unique(df_exclusao['MATRICULA'].astype(str))
                     
                     st.session_state['agent_logs'].append({
                         'timestamp': datetime.now().strftime('%H:%M:%S'),
@@ -2915,8 +3450,9 @@ def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
                     })
         
         # 3. DEFINIR VALORES POR ESTADO (baseado no sindicato)
-        valor_sp = 37.50  # São Paulo - sindicatos com "SP" no nome
-        valor_outros = 35.00  # Outros estados
+        valor_sp = VALOR_SP  # São Paulo - sindicatos com "SP" no nome
+        valor_outros = VALOR_OUTROS  # Outros estados
+        valor_padrao = valor_outros
         valores_sindicato = {}  # Inicializar dicionário de valores por sindicato
         
         st.session_state['agent_logs'].append({
@@ -2942,30 +3478,10 @@ def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
                     'details': {'colunas': list(sindicato_df.columns), 'registros': len(sindicato_df)}
                 })
                 
-                # Tentar diferentes combinações de nomes de colunas
-                sindicato_col = None
-                valor_col = None
-                
-                # Buscar coluna de sindicato
-                for col in sindicato_df.columns:
-                    col_lower = col.lower()
-                    if any(term in col_lower for term in ['sindicato', 'sindic', 'categoria', 'tipo']):
-                        sindicato_col = col
-                        break
-                
-                # Buscar coluna de valor
-                for col in sindicato_df.columns:
-                    col_lower = col.lower()
-                    if any(term in col_lower for term in ['valor', 'preco', 'price', 'amount', 'vr']):
-                        valor_col = col
-                        break
+                # Detectar colunas de sindicato e valor; valores vazios não sobrescrevem o padrão
+                valores_sindicato, sindicato_col, valor_col = carregar_valores_sindicato(sindicato_df)
                 
                 if sindicato_col and valor_col:
-                    for _, row in sindicato_df.iterrows():
-                        sindicato_key = str(row[sindicato_col]).strip()
-                        valor = float(row[valor_col]) if pd.notna(row[valor_col]) else valor_padrao
-                        valores_sindicato[sindicato_key] = valor
-                    
                     st.session_state['agent_logs'].append({
                         'timestamp': datetime.now().strftime('%H:%M:%S'),
                         'agent': 'calculo_vale_refeicao',
@@ -3004,148 +3520,35 @@ def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
                 'details': {'valor_padrao': valor_padrao}
             })
         
-        # 4. LOOP PELOS COLABORADORES ATIVOS - LÓGICA PRINCIPAL
-        resultados = []
-        total_processados = 0
-        total_elegiveis = 0
-        total_excluidos = 0
-        valor_total_geral = 0
+        # 3.1. DIAS ELEGÍVEIS POR COLABORADOR
+        # Dias úteis da localidade (feriados nacionais, estaduais e municipais)
+        # no período ativo, descontadas férias e afastamentos
+        dias_df = calcular_dias_colaboradores(ativos_df, competencia, tabelas_ausencia, calendario)
+        
+        log_dias_vale_refeicao(dias_df, competencia)
         
+        # 4. CÁLCULO VETORIZADO - LÓGICA PRINCIPAL
         st.session_state['agent_logs'].append({
             'timestamp': datetime.now().strftime('%H:%M:%S'),
             'agent': 'calculo_vale_refeicao',
-            'action': '🔄 Iniciando loop de cálculo por colaborador',
+            'action': '🔄 Iniciando cálculo vetorizado dos colaboradores',
             'details': {'total_para_processar': total_final}
         })
         
-        for index, colaborador in ativos_df.iterrows():
-            total_processados += 1
-            
-            # Obter dados do colaborador
-            matricula = str(colaborador.get('MATRICULA', ''))
-            nome = str(colaborador.get('NOME', 'Nome não informado'))
-            sindicato = str(colaborador.get('SINDICATO', ''))
-            
-            # VERIFICAR EXCLUSÕES
-            motivo_exclusao = None
-            
-            # Verificar cada tipo de exclusão
-            for tipo_exclusao, matriculas_excluidas in exclusoes.items():
-                if matricula in matriculas_excluidas:
-                    motivo_exclusao = tipo_exclusao
-                    break
-            
-            if motivo_exclusao:
-                # COLABORADOR EXCLUÍDO
-                total_excluidos += 1
-                
-                # Determinar estado mesmo para excluídos (para informação)
-                sindicato_upper = sindicato.upper().strip()
-                if ' SP ' in sindicato_upper or sindicato_upper.startswith('SP ') or sindicato_upper.endswith(' SP') or 'ESTADO DE SP' in sindicato_upper:
-                    estado_info = 'SP'
-                else:
-                    estado_info = 'OUTROS'
-                
-                resultados.append({
-                    'MATRICULA': matricula,
-                    'NOME': nome,
-                    'SINDICATO': sindicato,
-                    'ESTADO': estado_info,
-                    'STATUS': 'EXCLUÍDO',
-                    'MOTIVO_EXCLUSAO': motivo_exclusao.upper(),
-                    'DIAS_ELEGIVEL': 0,
-                    'VALOR_DIARIO': 0.0,
-                    'VALOR_TOTAL_VR': 0.0
-                })
-            else:
-                # COLABORADOR ELEGÍVEL
-                total_elegiveis += 1
-                
-                # Determinar valor baseado no sindicato (verificar se contém "SP")
-                sindicato_upper = sindicato.upper().strip()
-                
-                if ' SP ' in sindicato_upper or sindicato_upper.startswith('SP ') or sindicato_upper.endswith(' SP') or 'ESTADO DE SP' in sindicato_upper:
-                    valor_diario = valor_sp  # R$ 37,50 para São Paulo
-                    estado_info = 'SP'
-                else:
-                    valor_diario = valor_outros  # R$ 35,00 para outros estados
-                    estado_info = 'OUTROS'
-                
-                # Tentar buscar valor específico do sindicato se disponível na tabela (sobrescreve o padrão)
-                if sindicato in valores_sindicato and valores_sindicato[sindicato] > 0:
-                    valor_diario = valores_sindicato[sindicato]
-                    estado_info += f' (Tabela: R$ {valor_diario})'
-                
-                # Calcular valor total (22 dias úteis)
-                dias_elegiveis = 22
-                valor_total_vr = valor_diario * dias_elegiveis
-                valor_total_geral += valor_total_vr
-                
-                resultados.append({
-                    'MATRICULA': matricula,
-                    'NOME': nome,
-                    'SINDICATO': sindicato,
-                    'ESTADO': estado_info,
-                    'STATUS': 'ELEGÍVEL',
-                    'MOTIVO_EXCLUSAO': '',
-                    'DIAS_ELEGIVEL': dias_elegiveis,
-                    'VALOR_DIARIO': valor_diario,
-                    'VALOR_TOTAL_VR': valor_total_vr
-                })
-        
-        # 5. GERAR DATAFRAME FINAL
-        resultado_df = pd.DataFrame(resultados)
-        
-        # 6. ESTATÍSTICAS FINAIS (incluindo por estado)
-        # Contar por estado
-        elegiveis_sp = len([r for r in resultados if r['STATUS'] == 'ELEGÍVEL' and r['ESTADO'] == 'SP'])
-        elegiveis_outros = len([r for r in resultados if r['STATUS'] == 'ELEGÍVEL' and r['ESTADO'] == 'OUTROS'])
-        valor_total_sp = sum([r['VALOR_TOTAL_VR'] for r in resultados if r['STATUS'] == 'ELEGÍVEL' and r['ESTADO'] == 'SP'])
-        valor_total_outros = sum([r['VALOR_TOTAL_VR'] for r in resultados if r['STATUS'] == 'ELEGÍVEL' and r['ESTADO'] == 'OUTROS'])
-        
-        estatisticas = {
-            'total_colaboradores': total_ativos,
-            'total_elegiveis': total_elegiveis,
-            'total_excluidos': total_excluidos,
-            'elegiveis_sp': elegiveis_sp,
-            'elegiveis_outros': elegiveis_outros,
-            'valor_total_geral': valor_total_geral,
-            'valor_total_sp': valor_total_sp,
-            'valor_total_outros': valor_total_outros,
-            'valor_medio_por_elegivel': valor_total_geral / total_elegiveis if total_elegiveis > 0 else 0,
-            'percentual_elegiveis': (total_elegiveis / total_ativos * 100) if total_ativos > 0 else 0,
-            'percentual_sp': (elegiveis_sp / total_elegiveis * 100) if total_elegiveis > 0 else 0
-        }
-        
-        # Log final
-        st.session_state['agent_logs'].append({
-            'timestamp': datetime.now().strftime('%H:%M:%S'),
-            'agent': 'calculo_vale_refeicao',
-            'action': '✅ Cálculo de vale refeição concluído',
-            'details': {
-                'total_processados': total_processados,
-                'elegiveis_total': total_elegiveis,
-                'elegiveis_sp': f'{elegiveis_sp} (R$ 37,50/dia)',
-                'elegiveis_outros': f'{elegiveis_outros} (R$ 35,00/dia)',
-                'excluidos': total_excluidos,
-                'valor_total_geral': f'R$ {valor_total_geral:,.2f}',
-                'valor_sp': f'R$ {valor_total_sp:,.2f}',
-                'valor_outros': f'R$ {valor_total_outros:,.2f}',
-                'percentual_elegiveis': f'{estatisticas["percentual_elegiveis"]:.1f}%'
-            }
-        })
+        # 5. GERAR DATAFRAME FINAL E 6. ESTATÍSTICAS (incluindo por estado)
+        resultado_df, estatisticas = calcular_vale_refeicao(
+            ativos_df,
+            exclusoes=exclusoes,
+            valores_sindicato=valores_sindicato,
+            dias_uteis=dias_df['DIAS_ELEGIVEL'].to_numpy(),
+            valor_sp=valor_sp,
+            valor_outros=valor_outros,
+            total_colaboradores=total_ativos,
+            motivos_dias=dias_df['MOTIVO'].to_numpy()
+        )
+        salvar_resultado_vale_refeicao(db, resultado_df, competencia)
         
-        return {
-            "action_type": "calculo_vale_refeicao",
-            "description": f"Cálculo de vale refeição concluído: {total_elegiveis} elegíveis de {total_ativos} colaboradores",
-            "success": True,
-            "resultado_df": resultado_df,
-            "estatisticas": estatisticas,
-            "total_records": len(resultado_df),
-            "analysis_complete": True,  # MARCAR COMO COMPLETO - cálculo específico já foi feito
-            "findings": f"Processados {total_ativos} colaboradores: {total_elegiveis} elegíveis, {total_excluidos} excluídos. Valor total: R$ {valor_total_geral:,.2f}",
-            "auto_export_excel": True  # Sinalizar para exportar automaticamente
-        }
+        return finalizar_calculo_vale_refeicao(resultado_df, estatisticas, competencia)
         
     except Exception as e:
         st.session_state['agent_logs'].append({
@@ -3163,12 +3566,35 @@ def calculo_vale_refeicao_tool(db, data_tables: list) -> dict:
             "analysis_complete": True
         }
 
+def datas_admissao(db, data_tables: list) -> pd.Series:
+    """Data de admissão (DD/MM/AAAA) por matrícula, de ativos e admissões"""
+    from ...utils.intervals import COLUNAS_ADMISSAO, encontrar_coluna, para_datas
+    
+    partes = []
+    for tabela in ('ativos', 'admissao_abril'):
+        if tabela not in data_tables:
+            continue
+        colunas = db.get_table_columns(tabela)
+        coluna = encontrar_coluna(pd.DataFrame(columns=colunas), COLUNAS_ADMISSAO)
+        if coluna is None or 'MATRICULA' not in colunas:
+            continue
+        df = pd.read_sql(f'SELECT "MATRICULA", "{coluna}" FROM "{tabela}"', db.engine)
+        datas = pd.Series(para_datas(df[coluna]), index=df['MATRICULA'].astype(str).to_numpy())
+        partes.append(datas.dt.strftime('%d/%m/%Y'))
+    
+    if not partes:
+        return pd.Series(dtype=object)
+    datas = pd.concat(partes)
+    return datas[~datas.index.duplicated()]
+
 def execute_excel_export_action(db, data_tables: list, context: dict, iteration: int) -> dict:
     """Executa ação de exportação Excel pelo agente autônomo"""
     
     try:
         # Importar ferramenta de Excel
         from ...utils.excel_generator import execute_excel_export_tool
+        from ...utils.business_calendar import parse_competencia
+        from ...utils.money import centavos, dividir, reais
         
         # Verificar se há resultados de cálculo de vale refeição no contexto
         export_data = {}
@@ -3225,37 +3651,46 @@ def execute_excel_export_action(db, data_tables: list, context: dict, iteration:
                     
                     export_data['ESTATISTICAS_VR'] = estatisticas_df
                     
+                    # Totais por competência (cálculo em lote)
+                    if finding.get('totais_df') is not None:
+                        export_data['TOTAIS_POR_COMPETENCIA'] = finding['totais_df']
+                    
                     # Adicionar aba no formato padrão solicitado
                     formato_padrao_df = pd.DataFrame()
                     
                     # Filtrar apenas colaboradores elegíveis para o formato padrão
-                    elegiveis_df = resultado_df[resultado_df['STATUS'] == 'ELEGÍVEL'].copy()
+                    elegiveis_df = resultado_df[resultado_df['STATUS'] == 'ELEGÍVEL']
                     
                     if not elegiveis_df.empty:
-                        # Criar DataFrame no formato padrão
-                        formato_padrao_data = []
+                        # Competência da linha (lote) ou do cálculo, no formato MM/AAAA
+                        if 'COMPETENCIA' in elegiveis_df.columns:
+                            competencias = elegiveis_df['COMPETENCIA'].astype(str)
+                        else:
+                            competencias = pd.Series(finding.get('competencia') or settings.competencia_vr, index=elegiveis_df.index)
+                        competencias = competencias.map({
+                            c: '{1:02d}/{0:04d}'.format(*parse_competencia(c)) for c in competencias.unique()
+                        })
                         
-                        for _, row in elegiveis_df.iterrows():
-                            valor_diario = row['VALOR_DIARIO']
-                            total_vr = row['VALOR_TOTAL_VR']
-                            
-                            # Calcular custo empresa e desconto profissional (80% empresa, 20% funcionário)
-                            custo_empresa = total_vr * 0.80  # 80% empresa
-                            desconto_profissional = total_vr * 0.20  # 20% funcionário
-                            
-                            formato_padrao_data.append({
-                                'Admissão': '01/05/2024',  # Data padrão - pode ser ajustada
-                                'Sindicato do Colaborador': row['SINDICATO'],
-                                'Competência': '05/2025',  # Competência padrão - pode ser ajustada
-                                'Dias': float(22.00),
-                                'VALOR DIÁRIO VR': float(valor_diario),
-                                'TOTAL': float(total_vr),
-                                'Custo empresa': float(custo_empresa),
-                                'Desconto profissional': float(desconto_profissional),
-                                'OBS GERAL': f"Matrícula: {row['MATRICULA']} - {row['NOME']} - Estado: {row['ESTADO']}"
-                            })
+                        # Custo empresa e desconto profissional em centavos: as duas partes
+                        # somam exatamente o total (20% funcionário por padrão)
+                        total_vr = centavos(elegiveis_df['VALOR_TOTAL_VR'])
+                        desconto_vr, custo_vr = dividir(total_vr, settings.desconto_funcionario_pct)
+                        matriculas = elegiveis_df['MATRICULA'].astype(str)
                         
-                        formato_padrao_df = pd.DataFrame(formato_padrao_data)
+                        formato_padrao_df = pd.DataFrame({
+                            'Admissão': matriculas.map(datas_admissao(db, data_tables)).fillna('').to_numpy(),
+                            'Sindicato do Colaborador': elegiveis_df['SINDICATO'].to_numpy(),
+                            'Competência': competencias.to_numpy(),
+                            'Dias': elegiveis_df['DIAS_ELEGIVEL'].astype(float).to_numpy(),
+                            'VALOR DIÁRIO VR': reais(centavos(elegiveis_df['VALOR_DIARIO'])),
+                            'TOTAL': reais(total_vr),
+                            'Custo empresa': reais(custo_vr),
+                            'Desconto profissional': reais(desconto_vr),
+                            'OBS GERAL': (
+                                'Matrícula: ' + matriculas + ' - ' + elegiveis_df['NOME'].astype(str)
+                                + ' - Estado: ' + elegiveis_df['ESTADO'].astype(str)
+                            ).to_numpy()
+                        })
                         export_data['FORMATO_PADRAO_VR'] = formato_padrao_df
                         
                         st.session_state['agent_logs'].append({
@@ -3264,8 +3699,8 @@ def execute_excel_export_action(db, data_tables: list, context: dict, iteration:
                             'action': f'📋 Aba formato padrão criada com {len(formato_padrao_df)} registros',
                             'details': {
                                 'registros_formato_padrao': len(formato_padrao_df),
-                                'custo_empresa_total': f"R$ {formato_padrao_df['Custo empresa'].sum():,.2f}",
-                                'desconto_total': f"R$ {formato_padrao_df['Desconto profissional'].sum():,.2f}"
+                                'custo_empresa_total': f"R$ {reais(custo_vr.sum()):,.2f}",
+                                'desconto_total': f"R$ {reais(desconto_vr.sum()):,.2f}"
                             }
                         })
                     
@@ -3419,8 +3854,8 @@ def execute_excel_export_action(db, data_tables: list, context: dict, iteration:
             "findings": f"Falha na exportação: {str(e)}"
         }
 
-def synthesize_final_results(llm, context: dict, config: dict) -> dict:
-    """Sintetiza os resultados finais da análise"""
+def synthesize_final_results(llm, context: dict, config: dict, ao_receber=None) -> dict:
+    """Sintetiza os resultados finais da análise (ao_receber: streaming da resposta)"""
     
     # Verificar se deve gerar Excel baseado nas ferramentas disponíveis
     should_generate_excel = "excel_export" in config.get('available_tools', [])
@@ -3497,7 +3932,9 @@ def synthesize_final_results(llm, context: dict, config: dict) -> dict:
             elif finding.get('description'):
                 findings_summary.append(f"- {finding['description']}")
     
-    findings_text = '\n'.join(findings_summary) if findings_summary else "Nenhum resultado específico encontrado"
+    # Descobertas limitadas a LLM_TOKENS_ACHADOS (recentes e sem erro primeiro)
+    from ...utils.token_budget import comprimir_achados
+    findings_text = comprimir_achados(findings_summary) if findings_summary else "Nenhum resultado específico encontrado"
     
     # Log de debug
     if 'agent_logs' in st.session_state:
@@ -3525,7 +3962,7 @@ def synthesize_final_results(llm, context: dict, config: dict) -> dict:
     """
     
     try:
-        response = llm.complete(synthesis_prompt)
+        response = completar(llm, synthesis_prompt, ao_receber=ao_receber)
         
         # Se deve gerar Excel, retornar indicação
         if should_generate_excel:
@@ -16,7 +16,11 @@ from ..components import (
 from ...agents.extraction_agent import ExtractionAgent
 from ...agents.log_utils import log_extraction_step
 from ...config.settings import settings
-from ...data.database import get_db_manager
+from ...data.database import get_db_manager, SYSTEM_TABLES
+from ...utils.data_validation import ValidationEngine
+from ...utils.sindicatos import SIMILAR, indice_sindicatos
+from ...utils.vr_calculator import carregar_valores_sindicato
+from ...utils.vr_incremental import TABELA_BASE, TABELA_VALORES
 
 def render():
     """Renderiza página de preparação de dados"""
@@ -131,6 +135,16 @@ def process_files():
             st.markdown(f"### 📄 {file_info['name']}")
             st.info(f"🔄 Iniciando processamento...")
             
+            # Parquet/Arrow: ingestão direta dos record batches para a tabela
+            if file_info.get('format') == 'columnar':
+                process_columnar_file(db, key, file_info, processed_data)
+                total_records_processed += processed_data.get(key, {}).get('processed_rows', 0)
+                total_records_metric.metric("📊 Total de Registros", f"{total_records_processed:,}")
+                
+                if idx < len(st.session_state['uploaded_files']) - 1:
+                    st.divider()
+                continue
+            
             # Adicionar logs simulados para demonstração
             log_extraction_step("📋 Preparando para processar arquivo", arquivo=file_info['name'])
             st.empty()  # Força atualização
@@ -138,7 +152,7 @@ def process_files():
             
             log_extraction_step("🔍 Analisando estrutura do arquivo", 
                               total_linhas=file_info['rows'], 
-                              total_colunas=len(file_info['data'].columns))
+                              total_colunas=file_info['columns'])
             st.empty()  # Força atualização
             time.sleep(0.3)
             
@@ -150,7 +164,7 @@ def process_files():
                 time.sleep(0.3)
                 
                 log_extraction_step("✅ Colunas identificadas", 
-                                  colunas=list(file_info['data'].columns)[:5] + ['...'])
+                                  colunas=file_info['column_names'][:5] + ['...'])
                 st.empty()  # Força atualização
                 time.sleep(0.3)
                 
@@ -159,12 +173,23 @@ def process_files():
                 time.sleep(0.3)
                 
                 # Processar dados com indicador de progresso
-                total_rows = len(file_info['data'])
+                total_rows = file_info['rows']
                 progress_text = st.empty()
                 progress_bar = st.progress(0)
                 
-                # Simular processamento linha por linha (em produção, processar em lotes)
-                df_processed = file_info['data'].copy()
+                # Materializar os dados do disco apenas agora (session state guarda só o handle),
+                # validando cada chunk à medida que é lido
+                validation_engine = ValidationEngine()
+                chunks = []
+                for chunk in file_info['handle'].iter_chunks():
+                    validation_engine.validate_chunk(chunk)
+                    chunks.append(chunk)
+                df_processed = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=file_info['column_names'])
+                del chunks
+                validation_report = validation_engine.report()
+                
+                # Contagem do upload é estimada (linhas/dimensão); usar a exata
+                total_rows = len(df_processed)
                 
                 # Mostrar progresso
                 for i in range(min(10, total_rows)):  # Simular processamento rápido
@@ -185,6 +210,11 @@ def process_files():
                                   registros_válidos=len(df_processed))
                 st.empty()  # Força atualização
                 
+                log_extraction_step("🔍 Validação concluída",
+                                  problemas=len(validation_report['issues']),
+                                  avisos=len(validation_report['warnings']))
+                render_validation_report(validation_report)
+                
                 # 💾 CRIAR TABELA DINÂMICA NO BANCO
                 log_extraction_step("💾 Criando tabela no banco de dados...")
                 st.empty()
@@ -239,7 +269,11 @@ def process_files():
                             nome_arquivo=file_info['name'],
                             status="concluido",
                             total_linhas=len(df_processed),
-                            linhas_processadas=registros_salvos
+                            linhas_processadas=registros_salvos,
+                            erros={
+                                'issues': validation_report['issues'],
+                                'warnings': validation_report['warnings']
+                            }
                         )
                         
                         # Log do agente no banco
@@ -262,6 +296,7 @@ def process_files():
                         log_extraction_step("✅ Tabela criada e dados salvos!", 
                                           tabela=table_name,
                                           registros=registros_salvos)
+                        indexar_sindicatos(db, table_name)
                     else:
                         raise Exception("Falha ao criar tabela")
                     
@@ -284,7 +319,7 @@ def process_files():
                 # Armazenar dados processados na sessão
                 processed_data[key] = {
                     'name': file_info['name'],
-                    'data': df_processed,
+                    'preview': df_processed.head(10),
                     'original_rows': file_info['rows'],
                     'processed_rows': len(df_processed),
                     'processing_time': datetime.now(),
@@ -348,8 +383,7 @@ def process_files():
             
             for table in tables:
                 # Pular tabelas do sistema
-                system_tables = ['importacoes', 'agent_logs', 'calculation_configs']
-                if table in system_tables:
+                if table in SYSTEM_TABLES:
                     continue
                 
                 # Obter informações da tabela
@@ -398,7 +432,7 @@ def process_files():
     metrics = [
         {'label': 'Arquivos Processados', 'value': len(processed_data)},
         {'label': 'Total de Registros', 'value': sum(d['processed_rows'] for d in processed_data.values())},
-        {'label': 'Tabelas Criadas', 'value': len([t for t in tables if t not in system_tables]) if 'tables' in locals() else 0},
+        {'label': 'Tabelas Criadas', 'value': len([t for t in tables if t not in SYSTEM_TABLES]) if 'tables' in locals() else 0},
         {'label': 'Registros no Banco', 'value': total_registros_banco}
     ]
     render_metrics_row(metrics)
@@ -412,6 +446,119 @@ def process_files():
         st.rerun()
     st.markdown("</div>", unsafe_allow_html=True)
 
+def render_validation_report(report):
+    """Exibe falhas por regra de validação"""
+    for issue in report['issues']:
+        st.warning(f"⚠️ {issue}")
+    
+    regras_com_falha = [
+        {
+            'Regra': nome,
+            'Severidade': resultado['severidade'],
+            'Falhas': resultado['falhas'],
+            'Linhas (amostra)': ', '.join(str(i) for i in resultado['amostra'])
+        }
+        for nome, resultado in report['regras'].items()
+        if resultado['aplicada'] and resultado['falhas']
+    ]
+    
+    if regras_com_falha:
+        with st.expander(f"🔍 Validação: {len(regras_com_falha)} regra(s) com falhas", expanded=False):
+            st.dataframe(pd.DataFrame(regras_com_falha), use_container_width=True, hide_index=True)
+    else:
+        st.caption("✅ Validação: nenhuma falha encontrada")
+
+def indexar_sindicatos(db, table_name):
+    """Monta o índice de sindicatos na ingestão da tabela de valores e mostra como os sindicatos da base resolvem"""
+    if db._clean_table_name(table_name) != TABELA_VALORES:
+        return
+    try:
+        valores, _, _ = carregar_valores_sindicato(db.get_table_data(TABELA_VALORES))
+        indice = indice_sindicatos(valores)
+        
+        resolucao = {}
+        if TABELA_BASE in db.list_tables() and 'SINDICATO' in db.get_table_columns(TABELA_BASE):
+            sindicatos = pd.read_sql(
+                f'SELECT DISTINCT "SINDICATO" FROM "{TABELA_BASE}"', db.engine
+            )['SINDICATO'].dropna().astype(str)
+            resolvidos = indice.resolver(sindicatos)
+            resolucao = resolvidos['CORRESPONDENCIA'].replace('', 'sem valor').value_counts().to_dict()
+            similares = resolvidos[resolvidos['CORRESPONDENCIA'] == SIMILAR]
+            if not similares.empty:
+                st.info(
+                    "🔎 Sindicatos associados por similaridade: "
+                    + "; ".join(f"{r.SINDICATO} → {r.CHAVE} ({r.SIMILARIDADE:.0%})" for r in similares.itertuples())
+                )
+        
+        log_extraction_step("🗂️ Índice de sindicatos montado",
+                          chaves=len(indice),
+                          resolucao=resolucao)
+    except Exception as e:
+        st.warning(f"⚠️ Não foi possível indexar os sindicatos: {str(e)}")
+
+def process_columnar_file(db, key, file_info, processed_data):
+    """Ingere arquivo Parquet/Arrow batch a batch, com a mesma validação e gravação dos demais formatos"""
+    table_name = file_info['name']
+    
+    try:
+        log_extraction_step("🏹 Ingestão colunar (Parquet/Arrow)", 
+                          tabela=table_name, 
+                          total_linhas=file_info['rows'])
+        
+        # Cada record batch (via pandas) é validado e gravado antes do próximo ser lido
+        validation_engine = ValidationEngine()
+        preview = []
+        
+        def chunks_validados():
+            for chunk in file_info['handle'].iter_chunks():
+                validation_engine.validate_chunk(chunk)
+                if not preview:
+                    preview.append(chunk.head(10))
+                yield chunk
+        
+        registros_salvos = db.save_chunks_to_table(
+            chunks_validados(),
+            table_name,
+            total_rows=file_info['rows'],
+            if_exists='replace'
+        )
+        validation_report = validation_engine.report()
+        
+        log_extraction_step("🔍 Validação concluída",
+                          problemas=len(validation_report['issues']),
+                          avisos=len(validation_report['warnings']))
+        render_validation_report(validation_report)
+        
+        db.log_importacao(
+            nome_arquivo=file_info['name'],
+            status="concluido",
+            total_linhas=validation_report['total_rows'],
+            linhas_processadas=registros_salvos,
+            erros={
+                'issues': validation_report['issues'],
+                'warnings': validation_report['warnings']
+            }
+        )
+        
+        processed_data[key] = {
+            'name': file_info['name'],
+            'preview': preview[0] if preview else None,
+            'original_rows': file_info['rows'],
+            'processed_rows': registros_salvos,
+            'processing_time': datetime.now(),
+            'saved_to_db': True
+        }
+        
+        log_extraction_step("✅ Tabela criada e dados salvos!", 
+                          tabela=table_name,
+                          registros=registros_salvos)
+        indexar_sindicatos(db, table_name)
+        st.success(f"✅ Processamento concluído! {registros_salvos} registros processados.")
+        
+    except Exception as e:
+        st.error(f"❌ Erro no processamento: {str(e)}")
+        log_extraction_step("❌ Erro ao criar tabela", erro=str(e))
+
 # Função unify_data removida - não é mais necessária
 # Agora cada arquivo cria sua própria tabela dinâmica
 # As correlações são feitas pelos agentes de IA conforme necessário
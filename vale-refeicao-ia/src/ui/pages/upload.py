@@ -15,6 +15,9 @@ from ..components import (
 )
 from ...config.settings import settings
 from ...utils.cloud_storage import storage_manager
+from ...utils.file_readers import (
+    list_members, member_display_names, skipped_members, is_compressed, is_columnar, DataFileHandle
+)
 
 def render():
     """Renderiza página de upload"""
@@ -76,10 +79,10 @@ def render():
     
     uploaded_files = st.file_uploader(
         "Faça upload dos seus arquivos de dados",
-        type=['csv', 'xlsx', 'xls'],
+        type=[ext.lstrip('.') for ext in settings.allowed_extensions_list],
         accept_multiple_files=True,
         key="data_files_upload",
-        help="Cada arquivo será processado e criará uma tabela dinâmica no banco de dados"
+        help="Cada arquivo será processado e criará uma tabela dinâmica no banco de dados. Arquivos .gz, .zst e .zip também são aceitos (cada arquivo dentro do .zip vira uma tabela), assim como Parquet e Arrow IPC"
     )
     
     if uploaded_files:
@@ -199,42 +202,65 @@ def process_uploaded_files(files):
                     add_log("🔍", f"Tipo de erro: {type(e).__name__}", "error")
                     continue
                 
-                # Ler arquivo para obter metadados
-                add_log("📊", f"Lendo dados para análise...")
-                
+                # Arquivos compactados (.gz/.zip/.zst) são lidos como stream;
+                # cada membro de um .zip vira uma tabela
                 try:
-                    if file.name.endswith('.csv'):
-                        # Ler CSV com tratamento especial para aspas
-                        df = pd.read_csv(file, quotechar='"', skipinitialspace=True)
-                        # Remover aspas dos nomes das colunas se houver
-                        df.columns = df.columns.str.strip('"').str.strip()
-                    else:
-                        df = pd.read_excel(file)
-                    
-                    add_log("✅", f"Dados lidos: {len(df)} linhas x {len(df.columns)} colunas")
-                    
+                    members = [None] if is_columnar(file.name) else list_members(saved_path)
                 except Exception as e:
-                    add_log("❌", f"Erro ao ler dados: {str(e)}", "error")
+                    add_log("❌", f"Erro ao abrir arquivo: {str(e)}", "error")
                     continue
                 
-                # Validações básicas
-                if df.empty:
-                    add_log("⚠️", f"Arquivo '{file.name}' está vazio", "warning")
+                ignorados = skipped_members(saved_path) if is_compressed(file.name) else []
+                if ignorados:
+                    add_log("⚠️", f"{len(ignorados)} arquivo(s) ignorado(s) no .zip (Parquet/Arrow devem ser "
+                            f"enviados fora do .zip): {', '.join(ignorados)}", "warning")
+                
+                if not members:
+                    add_log("⚠️", f"Arquivo '{file.name}' não contém arquivos de dados suportados", "warning")
                     continue
                 
-                # Armazenar no session state
-                file_key = f"file_{i}_{file.name}"
-                st.session_state['uploaded_files'][file_key] = {
-                    'name': file.name,
-                    'data': df,  # Mantém em memória para preview
-                    'file_path': saved_path,  # Caminho no storage
-                    'file_size_mb': round(file_size_mb, 2),
-                    'type': 'data',  # Todos são dados agora
-                    'uploaded_at': datetime.now(),
-                    'rows': len(df),
-                    'columns': len(df.columns),
-                    'index_column': None  # Coluna de indexação
-                }
+                if is_compressed(file.name):
+                    add_log("🗜️", f"Arquivo compactado com {len(members)} arquivo(s) de dados")
+                
+                display_names = member_display_names([m for m in members if m])
+                for member in members:
+                    member = member if is_compressed(file.name) else None
+                    member_name = display_names[member] if member else file.name
+                    
+                    # Ler esquema e preview; os dados completos ficam no disco
+                    # (Parquet/Arrow: apenas metadados, sem ler páginas de dados)
+                    add_log("📊", f"Lendo estrutura de {member_name} para análise...")
+                    
+                    try:
+                        handle = DataFileHandle(saved_path, member=member)
+                        add_log("✅", f"Estrutura lida: {handle.rows} linhas x {len(handle.columns)} colunas")
+                        
+                    except Exception as e:
+                        add_log("❌", f"Erro ao ler dados: {str(e)}", "error")
+                        continue
+                    
+                    # Validações básicas
+                    if handle.rows == 0:
+                        add_log("⚠️", f"Arquivo '{member_name}' está vazio", "warning")
+                        continue
+                    
+                    # Armazenar no session state (apenas a referência ao arquivo)
+                    # Membros de .zip identificados pelo caminho interno completo
+                    file_key = f"file_{i}_{file.name}" if len(members) == 1 else f"file_{i}_{file.name}_{member}"
+                    st.session_state['uploaded_files'][file_key] = {
+                        'name': member_name,
+                        'handle': handle,  # Caminho, esquema e preview; dados lidos sob demanda
+                        'file_path': saved_path,  # Caminho no storage
+                        'member': member,  # Membro dentro do arquivo compactado
+                        'format': 'columnar' if handle.columnar else 'tabular',
+                        'file_size_mb': round(file_size_mb, 2),
+                        'type': 'data',  # Todos são dados agora
+                        'uploaded_at': datetime.now(),
+                        'rows': handle.rows,
+                        'columns': len(handle.columns),
+                        'column_names': handle.columns,
+                        'index_column': None  # Coluna de indexação
+                    }
                 
                 add_log("🎉", f"**Arquivo processado com sucesso!**", "success")
                 
@@ -254,10 +280,15 @@ def process_uploaded_files(files):
         # Preview e configuração dos arquivos
         for file_key, file_info in st.session_state['uploaded_files'].items():
             if file_key.startswith('file_'):
-                storage_icon = "☁️" if file_info.get('file_path', '').startswith('gs://') else "💾"
+                storage_icon = "☁️" if str(file_info.get('file_path', '')).startswith('gs://') else "💾"
                 with st.expander(f"📊 {file_info['name']} - {file_info.get('file_size_mb', 0)}MB {storage_icon} ({file_info['rows']} linhas, {file_info['columns']} colunas)", expanded=False):
-                    # Preview dos dados
-                    st.dataframe(file_info['data'].head(), use_container_width=True)
+                    # Preview dos dados (Parquet/Arrow: esquema a partir dos metadados)
+                    handle = file_info['handle']
+                    if handle.columnar:
+                        st.caption("Esquema lido dos metadados do arquivo")
+                        st.dataframe(pd.DataFrame(handle.schema), use_container_width=True, hide_index=True)
+                    else:
+                        st.dataframe(handle.preview.head(), use_container_width=True)
                     
                     # Seleção de coluna de indexação
                     st.divider()
@@ -273,7 +304,7 @@ def process_uploaded_files(files):
                     
                     with col2:
                         if use_index:
-                            columns = list(file_info['data'].columns)
+                            columns = file_info['column_names']
                             index_col = st.selectbox(
                                 "Selecione a coluna de indexação:",
                                 options=[''] + columns,
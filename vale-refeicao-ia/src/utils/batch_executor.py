@@ -0,0 +1,223 @@
+"""
+Execução em lote de cálculos para várias empresas
+Cada job (prefixo das tabelas da empresa, configuração) roda em um processo do
+pool pelo caminho determinístico: regras estruturadas da configuração ou,
+sem regras, o cálculo padrão de vale refeição. Nenhuma chamada ao LLM.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from ..config.settings import settings
+from .business_calendar import get_business_calendar
+from .calculation_rules import PlanoCalculo
+from .money import somar
+from .vr_incremental import TABELA_ADMISSAO, TABELA_BASE, TABELAS_ORIGEM, calcular_colaboradores, unir_admissoes
+
+# Job = (prefixo das tabelas da empresa, configuração de cálculo)
+Job = Tuple[str, Dict[str, Any]]
+
+
+def _q(identificador: str) -> str:
+    """Identificador SQL entre aspas duplas"""
+    return '"' + str(identificador).replace('"', '""') + '"'
+
+
+def tabelas_da_empresa(tabelas: List[str], prefixo: str) -> Dict[str, str]:
+    """
+    Tabelas de uma empresa pelo prefixo
+
+    Returns:
+        Dict nome genérico (ex.: 'ativos') -> tabela no banco (ex.: 'empresa_a_ativos');
+        sem prefixo, as próprias tabelas
+    """
+    prefixo = (prefixo or '').rstrip('_')
+    if not prefixo:
+        return {t: t for t in tabelas}
+    inicio = prefixo + '_'
+    return {t[len(inicio):]: t for t in tabelas if t.startswith(inicio) and len(t) > len(inicio)}
+
+
+def prefixos_disponiveis(tabelas: List[str], tabela_base: str = 'ativos') -> List[str]:
+    """Prefixos de empresa detectados pelas tabelas '<prefixo>_<tabela_base>'"""
+    sufixo = '_' + tabela_base
+    return sorted(t[:-len(sufixo)] for t in tabelas if t.endswith(sufixo) and len(t) > len(sufixo))
+
+
+def _conectar_empresa(database_url: str, prefixo: str) -> Tuple[Any, Dict[str, List[str]]]:
+    """
+    Engine de conexão única com as tabelas da empresa visíveis pelo nome genérico
+
+    Views temporárias ('ativos' -> '<prefixo>_ativos') têm precedência sobre as
+    tabelas do banco na resolução de nomes do SQLite, então regras e motivos
+    de exclusão continuam usando os nomes genéricos.
+
+    Returns:
+        Tupla (engine, colunas por tabela genérica)
+    """
+    engine = create_engine(
+        database_url,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False} if "sqlite" in database_url else {}
+    )
+    with engine.begin() as conn:
+        todas = [r[0] for r in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"
+        ))]
+        mapa = tabelas_da_empresa(todas, prefixo)
+        colunas = {}
+        for generica, tabela in mapa.items():
+            if generica != tabela:
+                conn.execute(text(f"CREATE TEMP VIEW {_q(generica)} AS SELECT * FROM {_q(tabela)}"))
+            colunas[generica] = [r[1] for r in conn.execute(text(f"PRAGMA table_info({_q(tabela)})"))]
+    return engine, colunas
+
+
+def _calculo_padrao(engine, colunas: Dict[str, List[str]], competencia: str) -> Dict[str, Any]:
+    """Cálculo padrão de vale refeição (mesmo da ferramenta calculo_vale_refeicao)"""
+    if TABELA_BASE not in colunas:
+        raise ValueError(f"Tabela '{TABELA_BASE}' não encontrada")
+    tabelas = {t: pd.read_sql(f"SELECT * FROM {_q(t)}", engine) for t in TABELAS_ORIGEM if t in colunas}
+    colaboradores_df = unir_admissoes(tabelas[TABELA_BASE], tabelas.get(TABELA_ADMISSAO))
+    resultado_df, estatisticas = calcular_colaboradores(
+        colaboradores_df, tabelas, competencia, get_business_calendar(), len(tabelas[TABELA_BASE])
+    )
+    return {'resultado_df': resultado_df, 'estatisticas': estatisticas, 'modo': 'padrao'}
+
+
+def executar_job(database_url: str, prefixo: str, config: Dict[str, Any],
+                 competencia: Optional[str] = None, retornar_resultado: bool = False) -> Dict[str, Any]:
+    """
+    Executa um job (no processo do pool); erros são devolvidos no resultado
+
+    Returns:
+        Dict com prefixo, configuracao, sucesso, modo, registros, estatisticas,
+        tempo_ms, erro e (opcional) resultado_df
+    """
+    inicio = time.perf_counter()
+    resumo = {
+        'prefixo': prefixo,
+        'configuracao': config.get('name', ''),
+        'sucesso': False,
+        'modo': None,
+        'registros': 0,
+        'estatisticas': {},
+        'erro': None,
+        'pid': os.getpid()
+    }
+    engine = None
+    try:
+        engine, colunas = _conectar_empresa(database_url, prefixo)
+        if not colunas:
+            raise ValueError(f"Nenhuma tabela com o prefixo '{prefixo}'")
+
+        if config.get('rules'):
+            resultado = PlanoCalculo(config['rules'], colunas).executar(engine)
+        else:
+            resultado = _calculo_padrao(engine, colunas, competencia or settings.competencia_vr)
+
+        resumo.update(
+            sucesso=True,
+            modo=resultado['modo'],
+            registros=len(resultado['resultado_df']),
+            estatisticas=resultado['estatisticas']
+        )
+        if retornar_resultado:
+            resumo['resultado_df'] = resultado['resultado_df']
+    except Exception as e:
+        resumo['erro'] = str(e)
+    finally:
+        if engine is not None:
+            engine.dispose()
+
+    resumo['tempo_ms'] = (time.perf_counter() - inicio) * 1000
+    return resumo
+
+
+def executar_lote(jobs: List[Job], database_url: str,
+                  max_workers: Optional[int] = None,
+                  competencia: Optional[str] = None,
+                  retornar_resultados: bool = False) -> Dict[str, Any]:
+    """
+    Executa os jobs em paralelo em um pool de processos
+
+    Processos iniciados com 'spawn' (sem herdar threads e conexões do Streamlit);
+    cada um abre sua própria conexão com o banco.
+
+    Args:
+        jobs: Lista de (prefixo das tabelas da empresa, configuração)
+        database_url: URL do banco (a mesma do engine da aplicação)
+        max_workers: Processos do pool (padrão: BATCH_MAX_WORKERS ou nº de CPUs)
+        competencia: Competência do cálculo padrão (YYYY-MM)
+        retornar_resultados: Inclui o resultado_df de cada job (transferido entre processos)
+
+    Returns:
+        Dict com jobs (na ordem recebida), resumo_df consolidado, tempo_total_ms,
+        tempo_jobs_ms (soma dos jobs) e workers
+    """
+    inicio = time.perf_counter()
+    workers = max(1, min(len(jobs), max_workers or settings.batch_max_workers or os.cpu_count() or 1))
+    resultados: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futuros = {
+                pool.submit(executar_job, database_url, prefixo, config, competencia, retornar_resultados): i
+                for i, (prefixo, config) in enumerate(jobs)
+            }
+            for futuro in as_completed(futuros):
+                i = futuros[futuro]
+                try:
+                    resultados[i] = futuro.result()
+                except Exception as e:
+                    # Falha do processo (não do cálculo): registra no job
+                    prefixo, config = jobs[i]
+                    resultados[i] = {
+                        'prefixo': prefixo, 'configuracao': config.get('name', ''), 'sucesso': False,
+                        'modo': None, 'registros': 0, 'estatisticas': {}, 'erro': str(e), 'tempo_ms': 0.0
+                    }
+
+    return {
+        'jobs': resultados,
+        'resumo_df': resumo_lote(resultados),
+        'tempo_total_ms': (time.perf_counter() - inicio) * 1000,
+        'tempo_jobs_ms': sum(r['tempo_ms'] for r in resultados),
+        'workers': workers
+    }
+
+
+def resumo_lote(resultados: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Resumo consolidado: uma linha por job mais a linha de total"""
+    linhas = [{
+        'Empresa': r['prefixo'] or '(sem prefixo)',
+        'Configuração': r['configuracao'],
+        'Status': '✅ Concluído' if r['sucesso'] else f"❌ {r['erro']}",
+        'Modo': r['modo'] or '-',
+        'Registros': r['registros'],
+        'Elegíveis': r['estatisticas'].get('total_elegiveis', 0),
+        'Excluídos': r['estatisticas'].get('total_excluidos', 0),
+        'Valor Total (R$)': round(r['estatisticas'].get('valor_total_geral', 0.0), 2),
+        'Tempo (ms)': round(r['tempo_ms'], 1)
+    } for r in resultados]
+
+    resumo_df = pd.DataFrame(linhas, columns=[
+        'Empresa', 'Configuração', 'Status', 'Modo', 'Registros',
+        'Elegíveis', 'Excluídos', 'Valor Total (R$)', 'Tempo (ms)'
+    ])
+    if linhas:
+        total = pd.DataFrame([{
+            'Empresa': 'TOTAL', 'Configuração': '', 'Modo': '',
+            'Status': f"{sum(r['sucesso'] for r in resultados)}/{len(resultados)}",
+            **resumo_df[['Registros', 'Elegíveis', 'Excluídos']].sum().to_dict(),
+            'Valor Total (R$)': somar(resumo_df['Valor Total (R$)']),
+            'Tempo (ms)': round(resumo_df['Tempo (ms)'].sum(), 2)
+        }])
+        resumo_df = pd.concat([resumo_df, total[resumo_df.columns]], ignore_index=True)
+    return resumo_df
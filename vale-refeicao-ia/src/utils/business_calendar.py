@@ -0,0 +1,292 @@
+"""
+Calendário de dias úteis com feriados nacionais, estaduais e municipais
+Contagem via numpy.busday_count com cache por (competência, localidade):
+cada localidade distinta é calculada uma vez e expandida por código para
+os colaboradores
+"""
+
+import re
+import unicodedata
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from ..config.settings import settings
+
+# Localidade = (UF, município); None quando não identificado
+Localidade = Tuple[Optional[str], Optional[str]]
+
+# Colunas explícitas de localidade (prevalecem sobre o nome do sindicato)
+COLUNAS_UF = ['UF', 'ESTADO', 'UF_TRABALHO', 'ESTADO_TRABALHO']
+COLUNAS_MUNICIPIO = ['MUNICIPIO', 'CIDADE', 'MUNICIPIO_TRABALHO', 'CIDADE_TRABALHO']
+
+
+def _normalize(text: Any) -> str:
+    """Maiúsculas, sem acentos e com espaços simples"""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', re.sub(r'[^A-Z0-9 ]', ' ', text.upper())).strip()
+
+
+def pascoa(ano: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)"""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def parse_competencia(competencia: str) -> Tuple[int, int]:
+    """Converte 'YYYY-MM' (ou 'MM/YYYY') em (ano, mês)"""
+    competencia = str(competencia).strip()
+    if '/' in competencia:
+        mes, ano = competencia.split('/')
+    else:
+        ano, mes = competencia.split('-')[:2]
+    ano, mes = int(ano), int(mes)
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Competência inválida: {competencia}")
+    return ano, mes
+
+
+def intervalo_competencia(competencia: str) -> Tuple[np.datetime64, np.datetime64]:
+    """Primeiro dia do mês e primeiro dia do mês seguinte (intervalo semiaberto)"""
+    ano, mes = parse_competencia(competencia)
+    inicio = np.datetime64(f'{ano:04d}-{mes:02d}', 'M')
+    return inicio.astype('datetime64[D]'), (inicio + 1).astype('datetime64[D]')
+
+
+def competencias_entre(inicio: str, fim: str) -> List[str]:
+    """Competências (YYYY-MM) de inicio a fim, inclusive"""
+    primeiro = np.datetime64('{:04d}-{:02d}'.format(*parse_competencia(inicio)), 'M')
+    ultimo = np.datetime64('{:04d}-{:02d}'.format(*parse_competencia(fim)), 'M')
+    if ultimo < primeiro:
+        raise ValueError(f"Intervalo de competências inválido: {inicio} a {fim}")
+    return [str(mes) for mes in np.arange(primeiro, ultimo + 1)]
+
+
+class BusinessCalendar:
+    """
+    Dias úteis por competência e localidade
+
+    Uso:
+        calendario = get_business_calendar()
+        calendario.dias_uteis('2025-05', 'SP', 'SAO PAULO')
+        calendario.dias_uteis_por_localidade('2025-05', ufs, municipios)
+    """
+
+    def __init__(self, feriados_file: Optional[Path] = None,
+                 definicoes: Optional[Dict[str, Any]] = None):
+        if definicoes is None:
+            path = Path(feriados_file or settings.feriados_file)
+            with open(path, 'r', encoding='utf-8') as f:
+                definicoes = yaml.safe_load(f) or {}
+
+        self.nacionais = definicoes.get('nacionais') or {}
+        self.estaduais = {
+            uf.upper(): dados or {} for uf, dados in (definicoes.get('estaduais') or {}).items()
+        }
+        self.municipais = {
+            uf.upper(): {_normalize(nome): dados or {} for nome, dados in (municipios or {}).items()}
+            for uf, municipios in (definicoes.get('municipais') or {}).items()
+        }
+
+        # Padrões de identificação: sigla ou nome por extenso do estado
+        ufs = sorted(set(self.estaduais) | set(self.municipais))
+        nomes_estado = {_normalize(d['nome']): uf for uf, d in self.estaduais.items() if d.get('nome')}
+        self._uf_por_nome = nomes_estado
+        self._uf_pattern = re.compile(
+            r'\b(' + '|'.join(map(re.escape, ufs + sorted(nomes_estado, key=len, reverse=True))) + r')\b'
+        ) if ufs else None
+
+        self._feriados_cache: Dict[Tuple[int, Localidade], np.ndarray] = {}
+        self._calendario_cache: Dict[Tuple[int, Localidade], np.busdaycalendar] = {}
+        self._dias_cache: Dict[Tuple[str, Localidade], int] = {}
+
+    def limpar_cache(self):
+        """Descarta feriados e contagens já calculados"""
+        self._feriados_cache.clear()
+        self._calendario_cache.clear()
+        self._dias_cache.clear()
+
+    # ---- Feriados ----
+
+    def _datas(self, ano: int, definicao: Dict[str, Any]) -> List[np.datetime64]:
+        """Datas fixas (MM-DD) e móveis (deslocamento da Páscoa) de uma definição"""
+        datas = [np.datetime64(f'{ano:04d}-{mm_dd}') for mm_dd in (definicao.get('fixos') or {})]
+        moveis = definicao.get('moveis') or {}
+        if moveis:
+            base = pascoa(ano)
+            datas.extend(np.datetime64(base + timedelta(days=int(d))) for d in moveis.values())
+        return datas
+
+    def _localidade(self, uf: Optional[str], municipio: Optional[str]) -> Localidade:
+        """Reduz a localidade ao nível que possui feriados próprios (chave de cache)"""
+        uf = _normalize(uf) if uf is not None and not pd.isna(uf) else ''
+        uf = self._uf_por_nome.get(uf, uf)
+        if uf not in self.estaduais and uf not in self.municipais:
+            return (None, None)
+        municipio = _normalize(municipio) if municipio is not None and not pd.isna(municipio) else ''
+        if municipio not in self.municipais.get(uf, {}):
+            municipio = None
+        return (uf, municipio)
+
+    def feriados(self, ano: int, uf: Optional[str] = None,
+                 municipio: Optional[str] = None) -> np.ndarray:
+        """Feriados do ano para a localidade (datetime64[D], ordenados e únicos)"""
+        localidade = self._localidade(uf, municipio)
+        chave = (ano, localidade)
+        if chave not in self._feriados_cache:
+            uf_key, municipio_key = localidade
+            datas = self._datas(ano, self.nacionais)
+            if uf_key:
+                datas += self._datas(ano, self.estaduais.get(uf_key, {}))
+            if municipio_key:
+                datas += self._datas(ano, self.municipais[uf_key][municipio_key])
+            self._feriados_cache[chave] = np.unique(np.array(datas, dtype='datetime64[D]'))
+        return self._feriados_cache[chave]
+
+    def busdaycalendar(self, ano: int, uf: Optional[str] = None,
+                       municipio: Optional[str] = None) -> np.busdaycalendar:
+        """np.busdaycalendar (segunda a sexta, sem feriados) para uso em np.busday_count"""
+        localidade = self._localidade(uf, municipio)
+        chave = (ano, localidade)
+        if chave not in self._calendario_cache:
+            self._calendario_cache[chave] = np.busdaycalendar(
+                weekmask='1111100', holidays=self.feriados(ano, *localidade)
+            )
+        return self._calendario_cache[chave]
+
+    # ---- Dias úteis ----
+
+    def dias_uteis(self, competencia: str, uf: Optional[str] = None,
+                   municipio: Optional[str] = None) -> int:
+        """Dias úteis da competência (YYYY-MM) para a localidade, com cache"""
+        localidade = self._localidade(uf, municipio)
+        chave = (competencia, localidade)
+        if chave not in self._dias_cache:
+            ano, _ = parse_competencia(competencia)
+            inicio, fim = intervalo_competencia(competencia)
+            self._dias_cache[chave] = int(np.busday_count(
+                inicio, fim, busdaycal=self.busdaycalendar(ano, *localidade)
+            ))
+        return self._dias_cache[chave]
+
+    def codigos_localidade(self, ufs: Iterable,
+                           municipios: Optional[Iterable] = None) -> Tuple[np.ndarray, List[Localidade]]:
+        """
+        Agrupa linhas por localidade distinta
+
+        Returns:
+            Tupla (código da localidade por linha, localidades distintas)
+        """
+        codes_uf, ufs_unicas = pd.factorize(np.asarray(ufs, dtype=object))
+        if municipios is None:
+            codes_mun, municipios_unicos = np.zeros(len(codes_uf), dtype=np.int64), np.array([None])
+        else:
+            codes_mun, municipios_unicos = pd.factorize(np.asarray(municipios, dtype=object))
+
+        # Código combinado (UF, município); -1 (nulo) vira a última posição de cada eixo
+        n_mun = len(municipios_unicos) + 1
+        ufs_unicas = np.append(np.asarray(ufs_unicas, dtype=object), None)
+        municipios_unicos = np.append(np.asarray(municipios_unicos, dtype=object), None)
+        combinado = np.where(codes_uf < 0, len(ufs_unicas) - 1, codes_uf) * n_mun \
+            + np.where(codes_mun < 0, n_mun - 1, codes_mun)
+
+        chaves, codes = np.unique(combinado, return_inverse=True)
+        localidades = [
+            self._localidade(ufs_unicas[chave // n_mun], municipios_unicos[chave % n_mun])
+            for chave in chaves
+        ]
+        return codes.reshape(-1), localidades
+
+    def dias_uteis_por_localidade(self, competencia: str,
+                                  ufs: Iterable, municipios: Optional[Iterable] = None) -> np.ndarray:
+        """
+        Dias úteis por linha, calculados uma vez por localidade distinta
+
+        Args:
+            competencia: Mês de referência (YYYY-MM)
+            ufs: UF de cada colaborador (None/NaN = apenas feriados nacionais)
+            municipios: Município de cada colaborador (opcional)
+
+        Returns:
+            Array de inteiros alinhado com as linhas de entrada
+        """
+        codes, localidades = self.codigos_localidade(ufs, municipios)
+        dias = np.array([self.dias_uteis(competencia, *local) for local in localidades], dtype=np.int64)
+        return dias[codes]
+
+    # ---- Localidade ----
+
+    def localidade_sindicato(self, sindicato: Any) -> Localidade:
+        """Identifica UF e município a partir do nome do sindicato"""
+        texto = _normalize(sindicato)
+        if not texto or self._uf_pattern is None:
+            return (None, None)
+
+        match = self._uf_pattern.search(texto)
+        if not match:
+            return (None, None)
+        uf = self._uf_por_nome.get(match.group(1), match.group(1))
+
+        municipio = next(
+            (nome for nome in sorted(self.municipais.get(uf, {}), key=len, reverse=True)
+             if re.search(r'\b' + re.escape(nome) + r'\b', texto)),
+            None
+        )
+        return (uf, municipio)
+
+    def localidades(self, df: pd.DataFrame, coluna_sindicato: str = 'SINDICATO') -> pd.DataFrame:
+        """
+        UF e município de cada colaborador
+
+        Usa colunas explícitas (UF/ESTADO, MUNICIPIO/CIDADE) quando existirem;
+        caso contrário, infere pelo sindicato, uma vez por sindicato distinto.
+
+        Returns:
+            DataFrame com colunas UF e MUNICIPIO, alinhado com df
+        """
+        colunas = {_normalize(c).replace(' ', '_'): c for c in df.columns}
+        col_uf = next((colunas[c] for c in COLUNAS_UF if c in colunas), None)
+        col_mun = next((colunas[c] for c in COLUNAS_MUNICIPIO if c in colunas), None)
+
+        if col_uf is not None:
+            ufs = df[col_uf].to_numpy(dtype=object)
+            municipios = df[col_mun].to_numpy(dtype=object) if col_mun is not None else [None] * len(df)
+        elif coluna_sindicato in df.columns:
+            codes, sindicatos = pd.factorize(df[coluna_sindicato].astype(str))
+            unicos = [self.localidade_sindicato(s) for s in sindicatos]
+            ufs = np.array([u for u, _ in unicos] or [None], dtype=object)[codes]
+            municipios = np.array([m for _, m in unicos] or [None], dtype=object)[codes]
+        else:
+            ufs, municipios = [None] * len(df), [None] * len(df)
+
+        return pd.DataFrame({'UF': ufs, 'MUNICIPIO': municipios}, index=df.index)
+
+    def dias_uteis_colaboradores(self, df: pd.DataFrame, competencia: str,
+                                 coluna_sindicato: str = 'SINDICATO') -> np.ndarray:
+        """Dias úteis da competência para cada colaborador conforme sua localidade"""
+        locais = self.localidades(df, coluna_sindicato)
+        return self.dias_uteis_por_localidade(competencia, locais['UF'], locais['MUNICIPIO'])
+
+
+_business_calendar: Optional[BusinessCalendar] = None
+
+
+def get_business_calendar() -> BusinessCalendar:
+    """Retorna a instância compartilhada do calendário"""
+    global _business_calendar
+    if _business_calendar is None:
+        _business_calendar = BusinessCalendar()
+    return _business_calendar
@@ -0,0 +1,567 @@
+"""
+Regras de cálculo declarativas para configurações de cálculo
+As regras (JSON) são compiladas uma única vez em um plano vetorizado (pandas)
+ou em uma instrução SQL, e executadas sem chamadas ao LLM
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from ..config.settings import settings
+from .money import CENTAVOS_POR_REAL, PONTOS_BASE, centavos, percentual, pontos_base, reais, somar
+from .vr_calculator import COLUNAS_RESULTADO, calcular_estatisticas
+
+OPERADORES = ['==', '!=', '>', '>=', '<', '<=', 'in', 'not_in',
+              'contains', 'not_contains', 'is_null', 'not_null']
+FONTES_DIAS = ['fixo', 'coluna', 'calendario']
+
+COLUNAS_RESULTADO_REGRAS = COLUNAS_RESULTADO + ['DESCONTO_FUNCIONARIO', 'CUSTO_EMPRESA']
+
+# Regras próximas da ferramenta calculo_vale_refeicao (ponto de partida para edição).
+# Não são equivalentes: SP é reconhecido só pelos trechos "SP -" / "ESTADO DE SP"
+# (a ferramenta usa a sigla SP como palavra ou "SAO PAULO") e a tabela de valores
+# exige o nome exato do sindicato (a ferramenta aceita nome contido ou similar)
+EXEMPLO_REGRAS = {
+    "versao": 1,
+    "tabela_base": "ativos",
+    "incluir": ["admissao_abril"],
+    "chave": "MATRICULA",
+    "exclusoes": ["aprendiz", "exterior"],
+    "filtros": [],
+    "valor_diario": {
+        "padrao": 35.00,
+        "rotulo_padrao": "OUTROS",
+        "regras": [
+            {"coluna": "SINDICATO", "op": "contains", "valor": "SP -", "valor_diario": 37.50, "rotulo": "SP"},
+            {"coluna": "SINDICATO", "op": "contains", "valor": "ESTADO DE SP", "valor_diario": 37.50, "rotulo": "SP"}
+        ],
+        "tabela": {"nome": "base_sindicato_x_valor", "coluna_chave": "SINDICATO",
+                   "coluna_valor": "VALOR", "coluna_base": "SINDICATO"}
+    },
+    "dias": {"fonte": "calendario", "ausencias": ["ferias", "afastamentos", "desligados"]},
+    "desconto": {"funcionario_pct": 0.20},
+    "limites": {}
+}
+
+DOCUMENTACAO_REGRAS = """
+Formato (JSON):
+- tabela_base: tabela de colaboradores; incluir: tabelas adicionais (mesma chave, sem duplicar)
+- chave: coluna identificadora (padrão MATRICULA)
+- exclusoes: tabelas cujas chaves são excluídas (o nome da tabela vira o motivo)
+- filtros: [{"coluna", "op", "valor", "nome"}] - quem não atende é excluído
+  op: ==, !=, >, >=, <, <=, in, not_in, contains, not_contains, is_null, not_null
+- valor_diario: {"padrao", "rotulo_padrao", "regras": [{"coluna", "op", "valor", "valor_diario", "rotulo"}],
+                 "tabela": {"nome", "coluna_chave", "coluna_valor", "coluna_base"}}
+  a primeira regra atendida define o valor; a tabela (se houver valor > 0) sobrescreve
+- dias: {"fonte": "fixo", "valor": 22} | {"fonte": "coluna", "coluna": "DIAS"} |
+        {"fonte": "calendario", "competencia": "YYYY-MM", "ausencias": ["ferias", ...]}
+- desconto: {"funcionario_pct": 0.20, "maximo": null}
+- limites: {"valor_minimo": null, "valor_maximo": null}
+"""
+
+
+def validar_regras(regras: Any) -> List[str]:
+    """Valida a estrutura das regras e retorna a lista de erros (vazia se válidas)"""
+    if not isinstance(regras, dict):
+        return ["As regras devem ser um objeto JSON"]
+
+    erros = []
+    if not regras.get('tabela_base'):
+        erros.append("'tabela_base' é obrigatório")
+    for campo in ('incluir', 'exclusoes', 'filtros'):
+        if not isinstance(regras.get(campo, []), list):
+            erros.append(f"'{campo}' deve ser uma lista")
+
+    def validar_condicao(cond, onde):
+        if not isinstance(cond, dict) or not cond.get('coluna'):
+            erros.append(f"{onde}: 'coluna' é obrigatório")
+        elif cond.get('op', '==') not in OPERADORES:
+            erros.append(f"{onde}: operador '{cond.get('op')}' não suportado")
+        elif cond.get('op', '==') in ('in', 'not_in') and not isinstance(cond.get('valor'), list):
+            erros.append(f"{onde}: '{cond['op']}' requer uma lista em 'valor'")
+
+    for i, filtro in enumerate(regras.get('filtros') or []):
+        validar_condicao(filtro, f"filtros[{i}]")
+
+    valor = regras.get('valor_diario') or {}
+    if not isinstance(valor, dict):
+        erros.append("'valor_diario' deve ser um objeto")
+    else:
+        if not isinstance(valor.get('padrao', 0), (int, float)):
+            erros.append("'valor_diario.padrao' deve ser numérico")
+        for i, regra in enumerate(valor.get('regras') or []):
+            validar_condicao(regra, f"valor_diario.regras[{i}]")
+            if not isinstance(regra.get('valor_diario'), (int, float)):
+                erros.append(f"valor_diario.regras[{i}]: 'valor_diario' deve ser numérico")
+        tabela = valor.get('tabela')
+        if tabela and not all(tabela.get(k) for k in ('nome', 'coluna_chave', 'coluna_valor', 'coluna_base')):
+            erros.append("'valor_diario.tabela' requer nome, coluna_chave, coluna_valor e coluna_base")
+
+    dias = regras.get('dias') or {'fonte': 'fixo'}
+    if dias.get('fonte', 'fixo') not in FONTES_DIAS:
+        erros.append(f"'dias.fonte' deve ser um de {FONTES_DIAS}")
+    elif dias.get('fonte') == 'coluna' and not dias.get('coluna'):
+        erros.append("'dias.coluna' é obrigatório para fonte 'coluna'")
+
+    pct = (regras.get('desconto') or {}).get('funcionario_pct', 0)
+    if not isinstance(pct, (int, float)) or not 0 <= pct <= 1:
+        erros.append("'desconto.funcionario_pct' deve estar entre 0 e 1")
+
+    return erros
+
+
+def carregar_regras(texto: str) -> Dict[str, Any]:
+    """Lê regras em JSON (aceita bloco markdown) e valida; ValueError se inválidas"""
+    texto = (texto or '').strip()
+    if texto.startswith('```'):
+        texto = texto.strip('`')
+        texto = texto[texto.find('{'):]
+    try:
+        regras = json.loads(texto)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido: {e}")
+
+    erros = validar_regras(regras)
+    if erros:
+        raise ValueError("; ".join(erros))
+    return regras
+
+
+def _q(identificador: str) -> str:
+    """Identificador SQL entre aspas duplas"""
+    return '"' + str(identificador).replace('"', '""') + '"'
+
+
+def _literal(valor: Any) -> str:
+    """Literal SQL seguro para números e textos"""
+    if isinstance(valor, bool):
+        return '1' if valor else '0'
+    if isinstance(valor, (int, float)):
+        return repr(float(valor))
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def _numerico(valor: Any) -> bool:
+    valores = valor if isinstance(valor, list) else [valor]
+    return bool(valores) and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in valores)
+
+
+class PlanoCalculo:
+    """
+    Plano compilado a partir das regras
+
+    Resolve tabelas e colunas uma vez; `sql` contém a instrução única quando
+    todas as regras são expressáveis em SQL (dias por calendário exigem o
+    plano vetorizado).
+    """
+
+    def __init__(self, regras: Dict[str, Any], colunas_tabelas: Dict[str, List[str]]):
+        erros = validar_regras(regras)
+        if erros:
+            raise ValueError("; ".join(erros))
+
+        self.regras = regras
+        self.colunas_tabelas = colunas_tabelas
+        self.base = self._tabela(regras['tabela_base'])
+        self.incluir = [self._tabela(t) for t in regras.get('incluir') or [] if t in colunas_tabelas]
+        self.exclusoes = [self._tabela(t) for t in regras.get('exclusoes') or [] if t in colunas_tabelas]
+        self.chave = self._coluna(self.base, regras.get('chave') or 'MATRICULA')
+        self.filtros = regras.get('filtros') or []
+        self.valor = regras.get('valor_diario') or {}
+        self.dias = regras.get('dias') or {'fonte': 'fixo'}
+        self.desconto = regras.get('desconto') or {}
+        self.limites = regras.get('limites') or {}
+
+        tabela_valor = self.valor.get('tabela')
+        self.tabela_valor = tabela_valor if tabela_valor and tabela_valor['nome'] in colunas_tabelas else None
+
+        # Colunas da base usadas pelo plano (resolvidas sem diferenciar maiúsculas)
+        referenciadas = [f['coluna'] for f in self.filtros] + [r['coluna'] for r in self.valor.get('regras') or []]
+        if self.tabela_valor:
+            referenciadas.append(self.tabela_valor['coluna_base'])
+        if self.dias.get('fonte') == 'coluna':
+            referenciadas.append(self.dias['coluna'])
+        self.colunas = {c: self._coluna(self.base, c) for c in referenciadas}
+
+        opcionais = [c for c in ('NOME', 'SINDICATO') if self._coluna(self.base, c, obrigatoria=False)]
+        self.colunas.update({c: self._coluna(self.base, c) for c in opcionais})
+
+        # Dias por calendário: admissão, desligamento e localidade sempre carregados,
+        # com o nome da primeira tabela que os tiver (as demais são lidas com alias)
+        self.colunas_calendario: Dict[str, List[str]] = {}
+        if self.dias.get('fonte') == 'calendario':
+            from .business_calendar import COLUNAS_MUNICIPIO, COLUNAS_UF
+            from .intervals import COLUNAS_ADMISSAO, COLUNAS_DEMISSAO
+
+            for candidatos in (COLUNAS_ADMISSAO, COLUNAS_DEMISSAO, COLUNAS_UF, COLUNAS_MUNICIPIO):
+                encontradas = (self._coluna_calendario(t, candidatos) for t in [self.base] + self.incluir)
+                real = next((c for c in encontradas if c), None)
+                if real is not None and real not in self.colunas.values():
+                    self.colunas[real] = real
+                    self.colunas_calendario[real] = candidatos
+
+        self.sql = self._compilar_sql() if self.dias.get('fonte', 'fixo') != 'calendario' else None
+
+    # ---- Resolução de nomes ----
+
+    def _tabela(self, nome: str) -> str:
+        if nome not in self.colunas_tabelas:
+            raise ValueError(f"Tabela '{nome}' não encontrada")
+        return nome
+
+    def _coluna(self, tabela: str, nome: str, obrigatoria: bool = True) -> Optional[str]:
+        colunas = self.colunas_tabelas.get(tabela, [])
+        encontrada = next((c for c in colunas if c.upper() == str(nome).upper()), None)
+        if encontrada is None and obrigatoria:
+            raise ValueError(f"Coluna '{nome}' não encontrada em '{tabela}'")
+        return encontrada
+
+    def _coluna_calendario(self, tabela: str, candidatos: List[str]) -> Optional[str]:
+        from .intervals import encontrar_coluna
+        return encontrar_coluna(pd.DataFrame(columns=self.colunas_tabelas.get(tabela, [])), candidatos)
+
+    # ---- Compilação SQL ----
+
+    def _sql_condicao(self, cond: Dict[str, Any]) -> str:
+        col = 'b.' + _q(self.colunas[cond['coluna']])
+        op, valor = cond.get('op', '=='), cond.get('valor')
+        texto = f"TRIM(CAST({col} AS TEXT))"
+
+        if op == 'is_null':
+            return f"({col} IS NULL OR {texto} = '')"
+        if op == 'not_null':
+            return f"({col} IS NOT NULL AND {texto} <> '')"
+        if op in ('contains', 'not_contains'):
+            expr = f"INSTR(UPPER(CAST({col} AS TEXT)), UPPER({_literal(valor)})) > 0"
+            return expr if op == 'contains' else f"NOT ({expr})"
+
+        alvo = f"CAST({col} AS REAL)" if _numerico(valor) else texto
+        if op in ('in', 'not_in'):
+            lista = ', '.join(_literal(v) for v in valor)
+            return f"{alvo} {'IN' if op == 'in' else 'NOT IN'} ({lista})"
+        return f"{alvo} {'=' if op == '==' else ('<>' if op == '!=' else op)} {_literal(valor)}"
+
+    def _compilar_sql(self) -> str:
+        """Uma única instrução SELECT com o resultado no formato COLUNAS_RESULTADO_REGRAS"""
+        colunas = [self.chave] + sorted({c for c in self.colunas.values() if c != self.chave})
+
+        def select_tabela(tabela):
+            partes = []
+            for col in colunas:
+                real = self._coluna(tabela, col, obrigatoria=False)
+                partes.append(f"{_q(real)} AS {_q(col)}" if real else f"NULL AS {_q(col)}")
+            return f"SELECT {', '.join(partes)} FROM {_q(tabela)}"
+
+        uniao = [select_tabela(self.base)]
+        vistas = [self.base]
+        for tabela in self.incluir:
+            chave_inc = self._coluna(tabela, self.chave)
+            anteriores = ' UNION '.join(
+                f"SELECT CAST({_q(self._coluna(t, self.chave))} AS TEXT) FROM {_q(t)} "
+                f"WHERE {_q(self._coluna(t, self.chave))} IS NOT NULL" for t in vistas
+            )
+            uniao.append(f"{select_tabela(tabela)} WHERE CAST({_q(chave_inc)} AS TEXT) NOT IN ({anteriores})")
+            vistas.append(tabela)
+
+        chave_b = f"CAST(b.{_q(self.chave)} AS TEXT)"
+        motivos = []
+        for tabela in self.exclusoes:
+            chave_exc = self._coluna(tabela, self.chave)
+            motivos.append(
+                f"WHEN {chave_b} IN (SELECT CAST({_q(chave_exc)} AS TEXT) FROM {_q(tabela)}) "
+                f"THEN {_literal(tabela.upper())}"
+            )
+        for i, filtro in enumerate(self.filtros):
+            motivos.append(
+                f"WHEN NOT COALESCE(({self._sql_condicao(filtro)}), 0) "
+                f"THEN {_literal('FILTRO_' + str(filtro.get('nome') or i + 1).upper())}"
+            )
+        motivo_sql = f"CASE {' '.join(motivos)} ELSE '' END" if motivos else "''"
+
+        regras_valor = self.valor.get('regras') or []
+        padrao = float(self.valor.get('padrao', settings.valor_dia_util))
+        rotulo_padrao = self.valor.get('rotulo_padrao', 'OUTROS')
+        if regras_valor:
+            valor_sql = "CASE " + ' '.join(
+                f"WHEN COALESCE(({self._sql_condicao(r)}), 0) THEN {_literal(r['valor_diario'])}" for r in regras_valor
+            ) + f" ELSE {_literal(padrao)} END"
+            rotulo_sql = "CASE " + ' '.join(
+                f"WHEN COALESCE(({self._sql_condicao(r)}), 0) THEN {_literal(r.get('rotulo', rotulo_padrao))}"
+                for r in regras_valor
+            ) + f" ELSE {_literal(rotulo_padrao)} END"
+        else:
+            valor_sql, rotulo_sql = _literal(padrao), _literal(rotulo_padrao)
+
+        # Tabela de valores: primeiro valor > 0 por chave, via LEFT JOIN
+        juncao_valor = ''
+        if self.tabela_valor:
+            t = self.tabela_valor
+            chave_v = f"TRIM(CAST({_q(self._coluna(t['nome'], t['coluna_chave']))} AS TEXT))"
+            valor_v = f"CAST({_q(self._coluna(t['nome'], t['coluna_valor']))} AS REAL)"
+            juncao_valor = (
+                f"LEFT JOIN (SELECT chave, valor FROM (SELECT {chave_v} AS chave, {valor_v} AS valor, "
+                f"ROW_NUMBER() OVER (PARTITION BY {chave_v} ORDER BY rowid) AS ordem "
+                f"FROM {_q(t['nome'])} WHERE {valor_v} > 0) WHERE ordem = 1) vt "
+                f"ON vt.chave = TRIM(CAST(b.{_q(self.colunas[t['coluna_base']])} AS TEXT))"
+            )
+            valor_sql = f"COALESCE(vt.valor, {valor_sql})"
+
+        if self.dias.get('fonte') == 'coluna':
+            dias_sql = f"COALESCE(CAST(b.{_q(self.colunas[self.dias['coluna']])} AS REAL), 0)"
+        else:
+            dias_sql = _literal(self.dias.get('valor', settings.dias_uteis_mes_padrao))
+
+        # Valores em centavos inteiros (mesma aritmética de utils.money)
+        total = "c.DIAS_ELEGIVEL * c.VALOR_DIARIO"
+        if self.limites.get('valor_minimo') is not None:
+            minimo = _literal(self.limites['valor_minimo'])
+            total = f"CASE WHEN ({total}) > 0 AND ({total}) < {minimo} THEN {minimo} ELSE {total} END"
+        if self.limites.get('valor_maximo') is not None:
+            total = f"MIN({total}, {_literal(self.limites['valor_maximo'])})"
+        total = f"CAST(ROUND(({total}) * {CENTAVOS_POR_REAL}) AS INTEGER)"
+
+        pontos = int(pontos_base(float(self.desconto.get('funcionario_pct', 0))))
+        desconto = f"((t.TOTAL_CENTAVOS * {pontos} + {PONTOS_BASE // 2}) / {PONTOS_BASE})"
+        if self.desconto.get('maximo') is not None:
+            desconto = f"MIN({desconto}, {int(centavos(float(self.desconto['maximo'])))})"
+
+        nome = f"COALESCE(CAST(b.{_q(self.colunas['NOME'])} AS TEXT), 'Nome não informado')" \
+            if 'NOME' in self.colunas else "'Nome não informado'"
+        sindicato = f"COALESCE(CAST(b.{_q(self.colunas['SINDICATO'])} AS TEXT), '')" \
+            if 'SINDICATO' in self.colunas else "''"
+
+        # Materializa a classificação para não reavaliar os CASE/subconsultas
+        # em cada CTE seguinte (suportado a partir do SQLite 3.35)
+        materializar = 'MATERIALIZED ' if sqlite3.sqlite_version_info >= (3, 35) else ''
+
+        return f"""
+WITH base AS (
+    {' UNION ALL '.join(uniao)}
+),
+classificado AS {materializar}(
+    SELECT {chave_b} AS MATRICULA, {nome} AS NOME, {sindicato} AS SINDICATO,
+           {motivo_sql} AS MOTIVO_EXCLUSAO, {rotulo_sql} AS ESTADO,
+           {valor_sql} AS VALOR_REGRA, {dias_sql} AS DIAS_REGRA
+    FROM base b {juncao_valor}
+),
+calculado AS (
+    SELECT MATRICULA, NOME, SINDICATO, ESTADO, MOTIVO_EXCLUSAO,
+           CASE WHEN MOTIVO_EXCLUSAO = '' THEN DIAS_REGRA ELSE 0 END AS DIAS_ELEGIVEL,
+           CASE WHEN MOTIVO_EXCLUSAO = '' THEN VALOR_REGRA ELSE 0.0 END AS VALOR_DIARIO
+    FROM classificado
+),
+totalizado AS (
+    SELECT c.*, {total} AS TOTAL_CENTAVOS FROM calculado c
+),
+descontado AS (
+    SELECT t.*, {desconto} AS DESCONTO_CENTAVOS FROM totalizado t
+)
+SELECT d.MATRICULA, d.NOME, d.SINDICATO, d.ESTADO,
+       CASE WHEN d.MOTIVO_EXCLUSAO = '' THEN 'ELEGÍVEL' ELSE 'EXCLUÍDO' END AS STATUS,
+       d.MOTIVO_EXCLUSAO, d.DIAS_ELEGIVEL, d.VALOR_DIARIO,
+       d.TOTAL_CENTAVOS / {CENTAVOS_POR_REAL}.0 AS VALOR_TOTAL_VR,
+       d.DESCONTO_CENTAVOS / {CENTAVOS_POR_REAL}.0 AS DESCONTO_FUNCIONARIO,
+       (d.TOTAL_CENTAVOS - d.DESCONTO_CENTAVOS) / {CENTAVOS_POR_REAL}.0 AS CUSTO_EMPRESA
+FROM descontado d
+""".strip()
+
+    # ---- Plano vetorizado ----
+
+    def _mascara(self, df: pd.DataFrame, cond: Dict[str, Any]) -> np.ndarray:
+        valores = df[self.colunas[cond['coluna']]]
+        op, valor = cond.get('op', '=='), cond.get('valor')
+        texto = valores.astype(str).str.strip()
+        vazio = valores.isna() | (texto == '')
+
+        if op == 'is_null':
+            return vazio.to_numpy()
+        if op == 'not_null':
+            return (~vazio).to_numpy()
+        if op in ('contains', 'not_contains'):
+            contem = valores.astype(str).str.upper().str.contains(str(valor).upper(), regex=False) & valores.notna()
+            return (contem if op == 'contains' else ~contem & valores.notna()).to_numpy()
+
+        alvo = pd.to_numeric(valores, errors='coerce') if _numerico(valor) else texto.where(valores.notna())
+        comparacoes: Dict[str, Callable] = {
+            '==': lambda: alvo == valor, '!=': lambda: (alvo != valor) & alvo.notna(),
+            '>': lambda: alvo > valor, '>=': lambda: alvo >= valor,
+            '<': lambda: alvo < valor, '<=': lambda: alvo <= valor,
+            'in': lambda: alvo.isin(valor), 'not_in': lambda: ~alvo.isin(valor) & alvo.notna(),
+        }
+        return comparacoes[op]().fillna(False).to_numpy(dtype=bool)
+
+    def _carregar_base(self, engine) -> pd.DataFrame:
+        """Tabela base mais as incluídas (apenas chaves novas), só com as colunas usadas"""
+        colunas = [self.chave] + sorted({c for c in self.colunas.values() if c != self.chave})
+
+        def ler(tabela):
+            existentes = [
+                (self._coluna(tabela, c, obrigatoria=False)
+                 or (self._coluna_calendario(tabela, self.colunas_calendario[c]) if c in self.colunas_calendario else None), c)
+                for c in colunas
+            ]
+            select = ', '.join(f"{_q(real)} AS {_q(c)}" for real, c in existentes if real)
+            df = pd.read_sql(f"SELECT {select} FROM {_q(tabela)}", engine)
+            return df.reindex(columns=colunas)
+
+        partes = [ler(self.base)]
+        vistas = set(partes[0][self.chave].astype(str))
+        for tabela in self.incluir:
+            df = ler(tabela)
+            novas = ~df[self.chave].astype(str).isin(vistas)
+            partes.append(df[novas])
+            vistas.update(df.loc[novas, self.chave].astype(str))
+        return pd.concat(partes, ignore_index=True)
+
+    def _executar_vetorizado(self, engine) -> pd.DataFrame:
+        df = self._carregar_base(engine)
+        n = len(df)
+        matriculas = df[self.chave].astype(str)
+
+        # Exclusões (anti-join) e filtros: o primeiro motivo prevalece
+        motivo = np.full(n, '', dtype=object)
+        for tabela in self.exclusoes:
+            chave_exc = self._coluna(tabela, self.chave)
+            excluidas = pd.read_sql(f"SELECT {_q(chave_exc)} FROM {_q(tabela)}", engine).iloc[:, 0].astype(str)
+            motivo[(motivo == '') & matriculas.isin(excluidas.unique()).to_numpy()] = tabela.upper()
+        for i, filtro in enumerate(self.filtros):
+            falha = ~self._mascara(df, filtro) & (motivo == '')
+            motivo[falha] = 'FILTRO_' + str(filtro.get('nome') or i + 1).upper()
+
+        # Valor diário: primeira regra atendida, tabela de valores sobrescreve
+        regras_valor = self.valor.get('regras') or []
+        padrao = float(self.valor.get('padrao', settings.valor_dia_util))
+        rotulo_padrao = self.valor.get('rotulo_padrao', 'OUTROS')
+        mascaras = [self._mascara(df, r) for r in regras_valor]
+        valor_diario = np.select(mascaras, [float(r['valor_diario']) for r in regras_valor], padrao) \
+            if mascaras else np.full(n, padrao)
+        estado = np.select(mascaras, [r.get('rotulo', rotulo_padrao) for r in regras_valor], rotulo_padrao) \
+            if mascaras else np.full(n, rotulo_padrao, dtype=object)
+
+        if self.tabela_valor:
+            t = self.tabela_valor
+            chave_v, valor_v = self._coluna(t['nome'], t['coluna_chave']), self._coluna(t['nome'], t['coluna_valor'])
+            tabela = pd.read_sql(f"SELECT {_q(chave_v)}, {_q(valor_v)} FROM {_q(t['nome'])}", engine)
+            tabela = pd.DataFrame({
+                'chave': tabela[chave_v].astype(str).str.strip(),
+                'valor': pd.to_numeric(tabela[valor_v], errors='coerce')
+            })
+            tabela = tabela[tabela['valor'] > 0].drop_duplicates('chave')
+            lookup = df[self.colunas[t['coluna_base']]].astype(str).str.strip().map(
+                dict(zip(tabela['chave'], tabela['valor']))
+            ).to_numpy(dtype=float, na_value=np.nan)
+            valor_diario = np.where(np.isnan(lookup), valor_diario, lookup)
+
+        # Dias
+        fonte = self.dias.get('fonte', 'fixo')
+        if fonte == 'coluna':
+            dias = pd.to_numeric(df[self.colunas[self.dias['coluna']]], errors='coerce').fillna(0).to_numpy()
+        elif fonte == 'calendario':
+            from .intervals import calcular_dias_colaboradores
+
+            ausencias = {
+                t: pd.read_sql(f"SELECT * FROM {_q(t)}", engine)
+                for t in self.dias.get('ausencias') or [] if t in self.colunas_tabelas
+            }
+            calculo = calcular_dias_colaboradores(
+                df.rename(columns={self.chave: 'MATRICULA'}),
+                self.dias.get('competencia') or settings.competencia_vr,
+                ausencias
+            )
+            dias = calculo['DIAS_ELEGIVEL'].to_numpy()
+            sem_dias = (motivo == '') & (dias <= 0)
+            motivo[sem_dias] = calculo['MOTIVO'].replace('', 'SEM_DIAS_UTEIS').to_numpy()[sem_dias]
+        else:
+            dias = np.full(n, self.dias.get('valor', settings.dias_uteis_mes_padrao))
+
+        elegivel = motivo == ''
+        dias = np.where(elegivel, dias, 0)
+        valor_diario = np.where(elegivel, valor_diario, 0.0)
+
+        total = dias * valor_diario
+        if self.limites.get('valor_minimo') is not None:
+            minimo = float(self.limites['valor_minimo'])
+            total = np.where((total > 0) & (total < minimo), minimo, total)
+        if self.limites.get('valor_maximo') is not None:
+            total = np.minimum(total, float(self.limites['valor_maximo']))
+        total = centavos(total)
+
+        desconto = percentual(total, float(self.desconto.get('funcionario_pct', 0)))
+        if self.desconto.get('maximo') is not None:
+            desconto = np.minimum(desconto, centavos(float(self.desconto['maximo'])))
+
+        def opcional(nome, padrao):
+            if nome not in self.colunas:
+                return pd.Series([padrao] * n)
+            return df[self.colunas[nome]].fillna(padrao).astype(str)
+
+        return pd.DataFrame({
+            'MATRICULA': matriculas,
+            'NOME': opcional('NOME', 'Nome não informado'),
+            'SINDICATO': opcional('SINDICATO', ''),
+            'ESTADO': estado,
+            'STATUS': np.where(elegivel, 'ELEGÍVEL', 'EXCLUÍDO'),
+            'MOTIVO_EXCLUSAO': motivo,
+            'DIAS_ELEGIVEL': dias,
+            'VALOR_DIARIO': valor_diario,
+            'VALOR_TOTAL_VR': reais(total),
+            'DESCONTO_FUNCIONARIO': reais(desconto),
+            'CUSTO_EMPRESA': reais(total - desconto)
+        }, columns=COLUNAS_RESULTADO_REGRAS)
+
+    # ---- Execução ----
+
+    def executar(self, engine, usar_sql: bool = True) -> Dict[str, Any]:
+        """
+        Executa o plano
+
+        Args:
+            engine: Engine SQLAlchemy do banco
+            usar_sql: Usa a instrução SQL quando disponível
+
+        Returns:
+            Dict com resultado_df, estatisticas, modo ('sql' ou 'vetorizado') e tempo_ms
+        """
+        inicio = time.perf_counter()
+        if usar_sql and self.sql:
+            with engine.connect() as conn:
+                resultado_df = pd.read_sql(text(self.sql), conn)
+            modo = 'sql'
+        else:
+            resultado_df = self._executar_vetorizado(engine)
+            modo = 'vetorizado'
+
+        estatisticas = calcular_estatisticas(resultado_df, len(resultado_df))
+        elegiveis = resultado_df['STATUS'] == 'ELEGÍVEL'
+        estatisticas['desconto_total'] = somar(resultado_df.loc[elegiveis, 'DESCONTO_FUNCIONARIO'])
+        estatisticas['custo_empresa_total'] = somar(resultado_df.loc[elegiveis, 'CUSTO_EMPRESA'])
+
+        return {
+            'resultado_df': resultado_df,
+            'estatisticas': estatisticas,
+            'modo': modo,
+            'tempo_ms': (time.perf_counter() - inicio) * 1000
+        }
+
+
+@lru_cache(maxsize=32)
+def _plano(assinatura: str, definicao: str) -> PlanoCalculo:
+    """Plano compilado por hash de (regras, esquema das tabelas); os 32 mais recentes"""
+    regras, colunas_tabelas = json.loads(definicao)
+    return PlanoCalculo(regras, colunas_tabelas)
+
+
+def compilar_regras(regras: Dict[str, Any], db) -> PlanoCalculo:
+    """Compila (ou reutiliza) o plano das regras para o esquema atual do banco"""
+    colunas_tabelas = {tabela: db.get_table_columns(tabela) for tabela in db.list_tables()}
+
+    definicao = json.dumps([regras, colunas_tabelas], sort_keys=True, default=str)
+    return _plano(hashlib.sha256(definicao.encode('utf-8')).hexdigest(), definicao)
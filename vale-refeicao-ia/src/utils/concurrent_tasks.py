@@ -0,0 +1,58 @@
+"""
+Tarefas concorrentes dentro de uma execução do Streamlit
+Chamadas ao LLM e leituras do banco independentes rodam em threads que
+herdam o contexto da sessão (st.session_state, logs dos agentes); os
+resultados são consumidos na ordem em que foram pedidos
+"""
+
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from ..config.settings import settings
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:  # fora do Streamlit
+    add_script_run_ctx = get_script_run_ctx = None
+
+# Pool compartilhado do processo (tarefas curtas, limitadas por I/O)
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=max(2, settings.llm_max_concurrency * 2),
+                thread_name_prefix='agente'
+            )
+        return _pool
+
+
+def iniciar(funcao: Callable, *args, **kwargs) -> Future:
+    """
+    Inicia a função em segundo plano com o contexto da sessão atual
+    (e uma cópia das variáveis de contexto, ex.: medição de tokens)
+
+    Returns:
+        Future; .result() devolve o retorno ou relança a exceção da função
+    """
+    contexto = get_script_run_ctx() if get_script_run_ctx else None
+    variaveis = contextvars.copy_context()
+
+    def executar():
+        if contexto is not None:
+            add_script_run_ctx(threading.current_thread(), contexto)
+        return funcao(*args, **kwargs)
+
+    return _executor().submit(variaveis.run, executar)
+
+
+def mapear(funcao: Callable[[Any], Any], itens: List[Any]) -> List[Any]:
+    """funcao(item) para cada item, em paralelo, com os resultados na ordem dos itens"""
+    futuros = [iniciar(funcao, item) for item in itens]
+    return [futuro.result() for futuro in futuros]
@@ -0,0 +1,286 @@
+"""
+Motor de validação de dados baseado em regras declarativas
+As regras são compiladas em operações vetorizadas por coluna e podem ser
+aplicadas chunk a chunk durante a ingestão (sem laço por linha em Python)
+"""
+
+import re
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Regras padrão para planilhas de funcionários
+# Tipos suportados: required, not_null, cpf, date_range, unique
+DEFAULT_VALIDATION_RULES = [
+    {'nome': 'matricula_presente', 'tipo': 'required', 'colunas': ['MATRICULA'],
+     'severidade': 'issue', 'descricao': 'Coluna MATRICULA não encontrada'},
+    {'nome': 'matricula_preenchida', 'tipo': 'not_null', 'coluna': 'MATRICULA',
+     'severidade': 'issue', 'descricao': 'registros sem MATRICULA'},
+    {'nome': 'matricula_unica', 'tipo': 'unique', 'colunas': ['MATRICULA'],
+     'severidade': 'issue', 'descricao': 'registros com MATRICULA duplicada'},
+    {'nome': 'nome_preenchido', 'tipo': 'not_null', 'coluna': 'NOME',
+     'severidade': 'warning', 'descricao': 'registros sem NOME'},
+    {'nome': 'cpf_preenchido', 'tipo': 'not_null', 'coluna': 'CPF',
+     'severidade': 'warning', 'descricao': 'registros sem CPF'},
+    {'nome': 'cpf_valido', 'tipo': 'cpf', 'coluna': 'CPF',
+     'severidade': 'warning', 'descricao': 'registros com CPF inválido (dígito verificador)'},
+    {'nome': 'cargo_preenchido', 'tipo': 'not_null', 'coluna': 'CARGO',
+     'severidade': 'warning', 'descricao': 'registros sem CARGO'},
+    {'nome': 'departamento_preenchido', 'tipo': 'not_null', 'coluna': 'DEPARTAMENTO',
+     'severidade': 'warning', 'descricao': 'registros sem DEPARTAMENTO'},
+    {'nome': 'salario_preenchido', 'tipo': 'not_null', 'coluna': 'SALARIO',
+     'severidade': 'warning', 'descricao': 'registros sem SALARIO'},
+    {'nome': 'admissao_no_intervalo', 'tipo': 'date_range', 'coluna': 'DATA_ADMISSAO',
+     'min': '1950-01-01', 'max': 'hoje',
+     'severidade': 'warning', 'descricao': 'registros com DATA_ADMISSAO inválida ou fora do intervalo'},
+]
+
+# Pesos dos dígitos verificadores do CPF
+_CPF_PESOS_D1 = np.arange(10, 1, -1)
+_CPF_PESOS_D2 = np.arange(11, 1, -1)
+
+
+def _normalize(name: Any) -> str:
+    """Normaliza nome de coluna para comparação (sem acentos/pontuação, maiúsculo)"""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^A-Z0-9]', '', name.upper())
+
+
+def cpf_invalid_mask(series: pd.Series) -> np.ndarray:
+    """
+    Verifica dígitos verificadores de CPF de forma vetorizada
+
+    Valores nulos ou vazios não são considerados inválidos (use uma regra not_null).
+
+    Returns:
+        Array booleano, True onde o CPF é inválido
+    """
+    # Colunas numéricas (ex.: CSV com CPF em branco vira float) são formatadas
+    # sem casa decimal para que 52998224725.0 não ganhe um dígito a mais
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        texto = series.round().astype('Int64').astype('string').fillna('')
+    else:
+        # Objeto com floats misturados (ex.: Excel): '52998224725.0' perde o '.0'
+        texto = series.astype(str).str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+    digits = texto.str.replace(r'\D', '', regex=True)
+    present = (series.notna() & (digits.str.len() > 0)).to_numpy()
+    # CPF numérico perde zeros à esquerda
+    digits = digits.str.zfill(11)
+    well_formed = present & (digits.str.len() == 11).to_numpy()
+
+    invalid = present & ~well_formed
+    if not well_formed.any():
+        return invalid
+
+    # Matriz (n, 11) de dígitos a partir dos bytes ASCII
+    joined = ''.join(digits[well_formed].tolist()).encode('ascii')
+    matrix = np.frombuffer(joined, dtype=np.uint8).reshape(-1, 11).astype(np.int64) - 48
+
+    d1 = (matrix[:, :9] @ _CPF_PESOS_D1) * 10 % 11 % 10
+    d2 = (matrix[:, :10] @ _CPF_PESOS_D2) * 10 % 11 % 10
+    repeated = (matrix == matrix[:, :1]).all(axis=1)
+
+    checksum_ok = (d1 == matrix[:, 9]) & (d2 == matrix[:, 10]) & ~repeated
+    invalid[np.flatnonzero(well_formed)[~checksum_ok]] = True
+    return invalid
+
+
+class ValidationEngine:
+    """
+    Compila regras declarativas em verificações vetorizadas
+
+    Uso:
+        engine = ValidationEngine()
+        for chunk in chunks:
+            engine.validate_chunk(chunk)
+        report = engine.report()
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, sample_size: int = 10):
+        self.rules = rules if rules is not None else DEFAULT_VALIDATION_RULES
+        self.sample_size = sample_size
+        self.reset()
+
+    def reset(self):
+        """Limpa contadores para uma nova validação"""
+        self.total_rows = 0
+        self.valid_rows = 0
+        self._compiled: Optional[List[Dict[str, Any]]] = None
+        self._results = {
+            rule['nome']: {
+                'tipo': rule['tipo'],
+                'severidade': rule.get('severidade', 'warning'),
+                'descricao': rule.get('descricao', rule['nome']),
+                'aplicada': False,
+                'falhas': 0,
+                'amostra': []
+            }
+            for rule in self.rules
+        }
+        # Chaves já vistas para regras unique (entre chunks)
+        self._seen_keys: Dict[str, set] = {}
+
+    def _resolve_column(self, columns: List[Any], name: str) -> Optional[Any]:
+        """Encontra a coluna do DataFrame correspondente ao nome da regra"""
+        target = _normalize(name)
+        for col in columns:
+            if _normalize(col) == target:
+                return col
+        return None
+
+    def _compile(self, columns: List[Any]):
+        """Compila as regras para as colunas presentes no primeiro chunk"""
+        compiled = []
+        for rule in self.rules:
+            tipo = rule['tipo']
+            result = self._results[rule['nome']]
+
+            if tipo == 'required':
+                missing = [c for c in rule['colunas'] if self._resolve_column(columns, c) is None]
+                result['aplicada'] = True
+                result['falhas'] = len(missing)
+                result['colunas_ausentes'] = missing
+                continue
+
+            if tipo == 'unique':
+                key_cols = [self._resolve_column(columns, c) for c in rule['colunas']]
+                if any(c is None for c in key_cols):
+                    continue
+                self._seen_keys[rule['nome']] = set()
+                check = self._unique_check(rule['nome'], key_cols)
+            else:
+                col = self._resolve_column(columns, rule['coluna'])
+                if col is None:
+                    continue
+                check = self._column_check(tipo, col, rule)
+
+            result['aplicada'] = True
+            compiled.append({'nome': rule['nome'], 'check': check})
+
+        self._compiled = compiled
+
+    def _column_check(self, tipo: str, col: Any, rule: Dict[str, Any]) -> Callable[[pd.DataFrame], np.ndarray]:
+        """Cria verificação vetorizada para uma coluna"""
+        if tipo == 'not_null':
+            def check(df):
+                values = df[col]
+                blank = values.astype(str).str.strip().isin(['', 'nan', 'None', 'NaT'])
+                return (values.isna() | blank).to_numpy()
+            return check
+
+        if tipo == 'cpf':
+            return lambda df: cpf_invalid_mask(df[col])
+
+        if tipo == 'date_range':
+            min_date = pd.Timestamp(rule['min']) if rule.get('min') else None
+            max_raw = rule.get('max')
+            max_date = pd.Timestamp.today().normalize() if max_raw == 'hoje' else (
+                pd.Timestamp(max_raw) if max_raw else None
+            )
+
+            def check(df):
+                values = df[col]
+                dates = pd.to_datetime(values, errors='coerce', dayfirst=True)
+                invalid = values.notna() & dates.isna()
+                if min_date is not None:
+                    invalid |= dates < min_date
+                if max_date is not None:
+                    invalid |= dates > max_date
+                return invalid.to_numpy()
+            return check
+
+        raise ValueError(f"Tipo de regra não suportado: {tipo}")
+
+    def _unique_check(self, rule_name: str, key_cols: List[Any]) -> Callable[[pd.DataFrame], np.ndarray]:
+        """Cria verificação de chave duplicada, inclusive entre chunks"""
+        def check(df):
+            keys = df[key_cols[0]].astype(str)
+            for col in key_cols[1:]:
+                keys = keys + '|' + df[col].astype(str)
+            present = df[key_cols].notna().all(axis=1)
+            seen = self._seen_keys[rule_name]
+            duplicated = (keys.duplicated(keep='first') | keys.isin(seen)) & present
+            seen.update(keys[present].unique())
+            return duplicated.to_numpy()
+        return check
+
+    def validate_chunk(self, df: pd.DataFrame, offset: Optional[int] = None):
+        """
+        Aplica as regras compiladas a um chunk
+
+        Args:
+            df: Chunk de dados
+            offset: Posição da primeira linha do chunk no arquivo (padrão: linhas já vistas)
+        """
+        if self._compiled is None:
+            self._compile(list(df.columns))
+
+        offset = self.total_rows if offset is None else offset
+        issue_rows = np.zeros(len(df), dtype=bool)
+
+        for item in self._compiled:
+            failed = item['check'](df)
+            count = int(failed.sum())
+            if not count:
+                continue
+
+            result = self._results[item['nome']]
+            if result['severidade'] == 'issue':
+                issue_rows |= failed
+            result['falhas'] += count
+            remaining = self.sample_size - len(result['amostra'])
+            if remaining > 0:
+                positions = np.flatnonzero(failed)[:remaining]
+                result['amostra'].extend((positions + offset).tolist())
+
+        self.total_rows += len(df)
+        self.valid_rows += int((~issue_rows).sum())
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Relatório consolidado no formato usado pelo ExtractionAgent
+
+        Returns:
+            Dict com total_rows, valid_rows, issues, warnings e regras
+            (falhas por regra e amostra de índices de linhas)
+        """
+        issues, warnings = [], []
+
+        for nome, result in self._results.items():
+            if not result['aplicada'] or not result['falhas']:
+                continue
+
+            if result['tipo'] == 'required':
+                message = result['descricao']
+            else:
+                message = f"{result['falhas']} {result['descricao']}"
+
+            if result['severidade'] == 'issue':
+                issues.append(message)
+            else:
+                warnings.append(message)
+
+        required_missing = any(
+            r['tipo'] == 'required' and r['falhas'] and r['severidade'] == 'issue'
+            for r in self._results.values()
+        )
+
+        return {
+            'total_rows': self.total_rows,
+            'valid_rows': 0 if required_missing else self.valid_rows,
+            'issues': issues,
+            'warnings': warnings,
+            'errors': len(issues),
+            'regras': self._results
+        }
+
+
+def validate_dataframe(df: pd.DataFrame, rules: Optional[List[Dict[str, Any]]] = None,
+                       chunksize: int = 100000) -> Dict[str, Any]:
+    """Valida um DataFrame inteiro, em fatias, e retorna o relatório"""
+    engine = ValidationEngine(rules)
+    for start in range(0, max(len(df), 1), chunksize):
+        engine.validate_chunk(df.iloc[start:start + chunksize], offset=start)
+    return engine.report()
@@ -10,6 +10,8 @@ import streamlit as st
 import json
 import numpy as np
 
+from .money import somar
+
 class ExcelGenerator:
     """Classe para geração de planilhas Excel pelos agentes"""
     
@@ -85,7 +87,7 @@ class ExcelGenerator:
             # Tratamento especial para FORMATO_PADRAO_VR
             if sheet_name == 'FORMATO_PADRAO_VR' and 'TOTAL' in df.columns:
                 # Calcular soma total da coluna TOTAL
-                soma_total = df['TOTAL'].sum()
+                soma_total = somar(df['TOTAL'])
                 
                 # Escrever dados originais sem cabeçalhos (a formatação vai adicionar tudo)
                 df.to_excel(writer, sheet_name=clean_name, index=False, header=False, startrow=3)
@@ -0,0 +1,402 @@
+"""
+Leitura de arquivos de dados compactados, arquivados e colunares
+Descompacta gzip/zip/zstd como stream, sem carregar o arquivo inteiro em memória,
+e lê Parquet/Arrow IPC diretamente em record batches
+"""
+
+import gzip
+import io
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, BinaryIO
+
+import pandas as pd
+
+# Extensões de dados suportadas (dentro ou fora de arquivos compactados)
+DATA_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+# Formatos colunares (lidos via pyarrow, sem passar por pandas)
+COLUMNAR_EXTENSIONS = ('.parquet', '.arrow', '.feather', '.ipc')
+
+# Extensões de compactação -> identificador
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.zip': 'zip',
+    '.zst': 'zstd',
+}
+
+# Linhas por chunk na leitura de CSV
+DEFAULT_CHUNKSIZE = 50000
+
+
+def split_compression(name: str) -> Tuple[str, Optional[str]]:
+    """
+    Separa a extensão de compactação do nome do arquivo
+
+    Exemplo: 'ativos.csv.gz' -> ('ativos.csv', 'gzip')
+    """
+    suffix = Path(name).suffix.lower()
+    if suffix in COMPRESSION_EXTENSIONS:
+        return name[:-len(suffix)], COMPRESSION_EXTENSIONS[suffix]
+    return name, None
+
+
+def is_compressed(name: str) -> bool:
+    """Verifica se o arquivo é compactado/arquivado"""
+    return split_compression(name)[1] is not None
+
+
+def list_members(file_path: Path) -> List[str]:
+    """
+    Lista os membros de dados de um arquivo
+
+    Para .zip retorna os arquivos de dados internos; para os demais formatos
+    retorna um único membro com o nome sem a extensão de compactação.
+    """
+    file_path = Path(file_path)
+    base_name, compression = split_compression(file_path.name)
+
+    if compression != 'zip':
+        return [base_name]
+
+    return [name for name in _zip_files(file_path) if Path(name).suffix.lower() in DATA_EXTENSIONS]
+
+
+def skipped_members(file_path: Path) -> List[str]:
+    """
+    Membros de um .zip que não são lidos
+
+    Inclui Parquet/Arrow, que precisam de acesso aleatório ao arquivo e devem
+    ser enviados fora do .zip.
+    """
+    file_path = Path(file_path)
+    if split_compression(file_path.name)[1] != 'zip':
+        return []
+    return [name for name in _zip_files(file_path) if Path(name).suffix.lower() not in DATA_EXTENSIONS]
+
+
+def _zip_files(file_path: Path) -> List[str]:
+    """Arquivos de um .zip, sem diretórios e metadados do macOS/ocultos"""
+    with zipfile.ZipFile(file_path) as zf:
+        return [
+            info.filename for info in zf.infolist()
+            if not (info.is_dir() or info.filename.startswith('__MACOSX/') or Path(info.filename).name.startswith('.'))
+        ]
+
+
+def member_display_name(member: str) -> str:
+    """Nome do membro sem diretórios internos do arquivo"""
+    return Path(member).name
+
+
+def member_display_names(members: List[str]) -> Dict[str, str]:
+    """
+    Nome de exibição de cada membro
+
+    Usa o nome sem diretórios; membros com o mesmo nome em pastas diferentes
+    mantêm o caminho interno completo para não se sobrescreverem.
+    """
+    names = [member_display_name(member) for member in members]
+    return {
+        member: member if names.count(name) > 1 else name
+        for member, name in zip(members, names)
+    }
+
+
+@contextmanager
+def open_member_stream(file_path: Path, member: Optional[str] = None) -> Iterator[BinaryIO]:
+    """
+    Abre um stream binário descompactado para o arquivo (ou membro do .zip)
+
+    Args:
+        file_path: Caminho do arquivo no disco
+        member: Nome do membro interno (obrigatório para .zip com vários arquivos)
+    """
+    file_path = Path(file_path)
+    _, compression = split_compression(file_path.name)
+
+    if compression == 'gzip':
+        with gzip.open(file_path, 'rb') as stream:
+            yield stream
+
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError(
+                "Suporte a arquivos .zst requer o pacote 'zstandard' (pip install zstandard)"
+            )
+        with open(file_path, 'rb') as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as stream:
+                yield stream
+
+    elif compression == 'zip':
+        with zipfile.ZipFile(file_path) as zf:
+            if member is None:
+                members = list_members(file_path)
+                if len(members) != 1:
+                    raise ValueError(
+                        f"Arquivo '{file_path.name}' contém {len(members)} arquivos de dados; informe o membro"
+                    )
+                member = members[0]
+            with zf.open(member) as stream:
+                yield stream
+
+    else:
+        with open(file_path, 'rb') as stream:
+            yield stream
+
+
+def _member_extension(file_path: Path, member: Optional[str]) -> str:
+    """Extensão de dados efetiva do arquivo ou membro"""
+    name = member if member else split_compression(Path(file_path).name)[0]
+    return Path(name).suffix.lower()
+
+
+def _clean_csv_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Remove aspas e espaços dos nomes das colunas"""
+    df.columns = df.columns.str.strip('"').str.strip()
+    return df
+
+
+def iter_dataframe_chunks(file_path: Path, member: Optional[str] = None,
+                          chunksize: int = DEFAULT_CHUNKSIZE, **read_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Lê o arquivo (compactado ou não) em chunks de DataFrame
+
+    CSV é descompactado e parseado como stream. Planilhas Excel precisam de
+    acesso aleatório, então o membro é descompactado para um buffer e lido
+    de uma vez (um único chunk).
+
+    Args:
+        file_path: Caminho do arquivo no disco
+        member: Membro interno do .zip
+        chunksize: Linhas por chunk para CSV
+        **read_kwargs: Argumentos extras para pd.read_csv
+    """
+    extension = _member_extension(file_path, member)
+
+    if extension not in DATA_EXTENSIONS:
+        raise ValueError(f"Formato não suportado: {extension or Path(file_path).suffix}")
+
+    with open_member_stream(file_path, member) as stream:
+        if extension == '.csv':
+            csv_kwargs = {'quotechar': '"', 'skipinitialspace': True}
+            csv_kwargs.update(read_kwargs)
+            for chunk in pd.read_csv(stream, chunksize=chunksize, **csv_kwargs):
+                yield _clean_csv_columns(chunk)
+        else:
+            if is_compressed(Path(file_path).name):
+                stream = io.BytesIO(stream.read())
+            yield pd.read_excel(stream)
+
+
+def read_dataframe(file_path: Path, member: Optional[str] = None, **read_kwargs) -> pd.DataFrame:
+    """Lê o arquivo (ou membro) inteiro em um único DataFrame"""
+    chunks = list(iter_dataframe_chunks(file_path, member, **read_kwargs))
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_preview(file_path: Path, member: Optional[str] = None,
+                 nrows: int = 100, **read_kwargs) -> pd.DataFrame:
+    """Lê apenas as primeiras linhas do arquivo (ou membro) para preview"""
+    extension = _member_extension(file_path, member)
+
+    if extension not in DATA_EXTENSIONS:
+        raise ValueError(f"Formato não suportado: {extension or Path(file_path).suffix}")
+
+    with open_member_stream(file_path, member) as stream:
+        if extension == '.csv':
+            csv_kwargs = {'quotechar': '"', 'skipinitialspace': True}
+            csv_kwargs.update(read_kwargs)
+            return _clean_csv_columns(pd.read_csv(stream, nrows=nrows, **csv_kwargs))
+
+        if is_compressed(Path(file_path).name):
+            stream = io.BytesIO(stream.read())
+        return pd.read_excel(stream, nrows=nrows)
+
+
+def count_rows(file_path: Path, member: Optional[str] = None) -> int:
+    """
+    Conta linhas de dados sem parsear o arquivo
+
+    CSV: contagem de quebras de linha em blocos binários (descontando o cabeçalho).
+    Campos entre aspas com quebra de linha interna tornam o valor aproximado;
+    a contagem exata é feita no processamento.
+    Excel: dimensão da planilha lida dos metadados do workbook (openpyxl read-only).
+    """
+    extension = _member_extension(file_path, member)
+
+    with open_member_stream(file_path, member) as stream:
+        if extension == '.csv':
+            lines = 0
+            last_block = b''
+            while True:
+                block = stream.read(1024 * 1024)
+                if not block:
+                    break
+                lines += block.count(b'\n')
+                last_block = block
+            # Última linha sem quebra de linha final
+            if last_block and not last_block.endswith(b'\n'):
+                lines += 1
+            return max(lines - 1, 0)
+
+        if extension == '.xlsx':
+            from openpyxl import load_workbook
+
+            if is_compressed(Path(file_path).name):
+                stream = io.BytesIO(stream.read())
+            workbook = load_workbook(stream, read_only=True)
+            try:
+                worksheet = workbook.worksheets[0]
+                max_row = worksheet.max_row
+                if max_row is None:
+                    # Planilha sem dimensão gravada: contar linhas sem montar DataFrame
+                    max_row = sum(1 for _ in worksheet.iter_rows(values_only=True))
+                return max(max_row - 1, 0)
+            finally:
+                workbook.close()
+
+    # .xls (formato binário antigo): sem metadados de dimensão acessíveis
+    return sum(len(chunk) for chunk in iter_dataframe_chunks(file_path, member))
+
+
+def is_columnar(name: str) -> bool:
+    """Verifica se o arquivo é Parquet ou Arrow IPC"""
+    return Path(name).suffix.lower() in COLUMNAR_EXTENSIONS
+
+
+def _import_pyarrow():
+    """Importa pyarrow com mensagem clara se não estiver instalado"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError(
+            "Suporte a Parquet/Arrow requer o pacote 'pyarrow' (pip install pyarrow)"
+        )
+    return pyarrow
+
+
+def read_columnar_metadata(file_path: Path) -> Dict[str, Any]:
+    """
+    Lê esquema e contagem de linhas de um arquivo Parquet/Arrow
+
+    Usa apenas o footer/metadados do arquivo; nenhuma página de dados é lida.
+
+    Returns:
+        Dict com 'columns' (lista de {'coluna', 'tipo'}), 'rows' e 'row_groups'
+    """
+    pa = _import_pyarrow()
+    file_path = Path(file_path)
+
+    if file_path.suffix.lower() == '.parquet':
+        parquet_file = pa.parquet.ParquetFile(file_path)
+        schema = parquet_file.schema_arrow
+        rows = parquet_file.metadata.num_rows
+        row_groups = parquet_file.metadata.num_row_groups
+    else:
+        # Arrow IPC: memory map não copia os buffers; o tamanho de cada batch
+        # vem dos metadados da mensagem
+        with pa.memory_map(str(file_path), 'r') as source:
+            reader = pa.ipc.open_file(source)
+            schema = reader.schema
+            row_groups = reader.num_record_batches
+            rows = sum(reader.get_batch(i).num_rows for i in range(row_groups))
+
+    return {
+        'columns': [{'coluna': field.name, 'tipo': str(field.type)} for field in schema],
+        'rows': rows,
+        'row_groups': row_groups,
+    }
+
+
+def iter_record_batches(file_path: Path, batch_size: int = DEFAULT_CHUNKSIZE) -> Iterator[Any]:
+    """Itera record batches (pyarrow.RecordBatch) de um arquivo Parquet/Arrow"""
+    pa = _import_pyarrow()
+    file_path = Path(file_path)
+
+    if file_path.suffix.lower() == '.parquet':
+        parquet_file = pa.parquet.ParquetFile(file_path)
+        yield from parquet_file.iter_batches(batch_size=batch_size)
+    else:
+        with pa.memory_map(str(file_path), 'r') as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+
+# Linhas mantidas em memória para preview de arquivos enviados
+DEFAULT_PREVIEW_ROWS = 100
+
+
+class DataFileHandle:
+    """
+    Referência leve a um arquivo de dados salvo em disco
+
+    Guardada no st.session_state no lugar do DataFrame completo: mantém apenas
+    caminho, esquema e um preview das primeiras linhas. Os dados completos são
+    lidos do disco sob demanda com load() ou iter_chunks().
+    """
+
+    def __init__(self, file_path: Path, member: Optional[str] = None,
+                 preview_rows: int = DEFAULT_PREVIEW_ROWS):
+        self.file_path = Path(file_path)
+        self.member = member
+        self.preview_rows = preview_rows
+        self.columnar = is_columnar(self.file_path.name)
+
+        self.preview: Optional[pd.DataFrame] = None
+        self.schema: List[Dict[str, str]] = []
+        self.rows = 0
+        self.row_groups = None
+
+        self._inspect()
+
+    @property
+    def columns(self) -> List[str]:
+        """Nomes das colunas do arquivo"""
+        return [col['coluna'] for col in self.schema]
+
+    def _inspect(self):
+        """Lê esquema, preview e contagem de linhas sem parsear o arquivo inteiro"""
+        if self.columnar:
+            # Parquet/Arrow: tudo vem dos metadados, sem ler páginas de dados
+            metadata = read_columnar_metadata(self.file_path)
+            self.schema = metadata['columns']
+            self.rows = metadata['rows']
+            self.row_groups = metadata['row_groups']
+            return
+
+        # Apenas as primeiras linhas são parseadas; o parse completo fica
+        # para o processamento (load/iter_chunks)
+        self.preview = read_preview(self.file_path, self.member, nrows=self.preview_rows)
+        self.schema = [
+            {'coluna': str(col), 'tipo': str(dtype)}
+            for col, dtype in self.preview.dtypes.items()
+        ]
+        self.rows = count_rows(self.file_path, self.member)
+
+    def iter_chunks(self, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+        """Itera os dados completos em chunks, lidos do disco"""
+        if self.columnar:
+            for batch in iter_record_batches(self.file_path, batch_size=chunksize):
+                yield batch.to_pandas()
+        else:
+            yield from iter_dataframe_chunks(self.file_path, self.member, chunksize=chunksize)
+
+    def load(self) -> pd.DataFrame:
+        """Materializa o arquivo completo em um DataFrame (apenas quando necessário)"""
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return pd.DataFrame(columns=self.columns)
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
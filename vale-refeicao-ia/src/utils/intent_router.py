@@ -0,0 +1,550 @@
+"""
+Roteador de intenções das perguntas sobre os dados
+Perguntas frequentes (contagens, médias, medianas, somas por grupo, top-N e
+listagens com filtro) são reconhecidas por padrões compilados, as colunas e a
+tabela são preenchidas a partir do catálogo do esquema e o SQL sai de um
+template, sem chamar o LLM. Qualquer ambiguidade devolve None (LLM decide)
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Limite de linhas das consultas que listam registros
+LIMITE_LINHAS = 1000
+
+TIPOS_NUMERICOS = ('INT', 'REAL', 'FLOA', 'DOUB', 'NUM', 'DEC')
+
+# Palavras sem valor para identificar colunas e tabelas
+PALAVRAS_IGNORADAS = {
+    'a', 'o', 'as', 'os', 'de', 'do', 'da', 'dos', 'das', 'e', 'em', 'no', 'na', 'nos', 'nas',
+    'um', 'uma', 'qual', 'quais', 'quanto', 'quantos', 'quantas', 'que', 'sao', 'tem', 'ha',
+    'existem', 'temos', 'possui', 'valor', 'valores', 'total', 'geral', 'tabela', 'registros',
+    'registro', 'linhas', 'dados', 'todos', 'todas', 'cada', 'para', 'com', 'pelo', 'pela',
+    'quem', 'me', 'diga', 'informe', 'mostre', 'calcule', 'encontre', 'atual', 'atualmente'
+}
+
+# Entidades que, sozinhas, se referem às linhas da tabela
+ENTIDADES = {
+    'colaborador', 'colaboradores', 'funcionario', 'funcionarios', 'empregado', 'empregados',
+    'pessoa', 'pessoas', 'registro', 'registros', 'linha', 'linhas', 'matricula', 'matriculas'
+}
+
+# Pedidos que o template não cobre (vão para o LLM)
+_COMPLEXO = re.compile(
+    r'\b(grafico|plot|scatter|dispersao|histograma|visualiza\w*|correlac\w*|distribuic\w*|tendencia\w*|'
+    r'outlier\w*|padr(?:ao|oes)|compar\w*|desvio|variancia|percentual|porcentagem|proporc\w*|evoluc\w*|'
+    r'explique|por que|porque|insight\w*|excel|planilha|junte|relacion\w*|distint\w*|diferentes|unic[oa]s)\b'
+)
+
+# Negações e exclusões mudam o conjunto de linhas: sempre LLM
+_NEGACAO = re.compile(r'\b(?:nao|nem|sem|nunca|exceto|excluindo|salvo|fora)\b')
+
+# Palavras da própria intenção (agregação, ordenação, listagem), já usadas pelo template
+VOCABULARIO_INTENCAO = {
+    'mediana', 'media', 'medio', 'soma', 'somatorio', 'maximo', 'maxima', 'maior', 'maiores',
+    'minimo', 'minima', 'menor', 'menores', 'quantidade', 'numero', 'contagem', 'contar', 'conte',
+    'top', 'primeiros', 'primeiras', 'mais', 'alto', 'alta', 'altos', 'altas', 'baixo', 'baixa',
+    'baixos', 'baixas', 'liste', 'listar', 'lista', 'mostrar', 'exiba', 'exibir', 'traga',
+    'onde', 'cujo', 'cuja', 'cujos', 'cujas', 'possuem', 'tenham', 'agrupado', 'agrupada',
+    'agrupados', 'agrupadas', 'por'
+}
+
+_AGREGACOES = {
+    'mediana': re.compile(r'\bmediana\b'),
+    'media': re.compile(r'\b(?:media|valor medio|medio)\b'),
+    'soma': re.compile(r'\b(?:soma|somatorio|total)\b'),
+    'maximo': re.compile(r'\b(?:maximo|maxima|maior)\b'),
+    'minimo': re.compile(r'\b(?:minimo|minima|menor)\b'),
+    'contagem': re.compile(r'\b(?:quantos|quantas|quantidade|numero|contagem|contar|conte)\b'),
+}
+
+_TOP_N = [
+    re.compile(r'\b(?:top|primeir[oa]s)\s*(?P<n>\d{1,4})\b(?:\s+\w+){0,3}?\s+(?:com|de|por)\s+(?:o |a |os |as )?'
+               r'(?P<ordem>maior(?:es)?|menor(?:es)?|mais alt[oa]s?|mais baix[oa]s?)\s+(?P<coluna>[a-z0-9_ ]+)'),
+    re.compile(r'\b(?P<n>\d{1,4})\s+(?:\w+\s+){0,3}?(?:com|de)\s+(?:o |a |os |as )?'
+               r'(?P<ordem>maior(?:es)?|menor(?:es)?|mais alt[oa]s?|mais baix[oa]s?)\s+(?P<coluna>[a-z0-9_ ]+)'),
+    re.compile(r'\b(?P<n>\d{1,4})\s+(?P<ordem>maiores|menores)\s+(?P<coluna>[a-z0-9_ ]+)'),
+    re.compile(r'\btop\s*(?P<n>\d{1,4})\s+(?:de |por |em )?(?P<coluna>[a-z0-9_ ]+)'),
+]
+
+_LISTAR = re.compile(r'^\s*(?:liste|listar|lista|mostre|mostrar|exiba|exibir|traga|quais sao|quais|quem sao|quem)\b')
+
+_GRUPO = re.compile(r'\b(?:agrupad[oa]s? por|por|para cada|em cada)\s+(?:o |a |os |as )?(?P<grupo>[a-z0-9_ ]+?)\s*$')
+
+_OPERADORES = [
+    (r'>=|maior ou igual a', '>='),
+    (r'<=|menor ou igual a', '<='),
+    (r'!=|<>|diferente de', '!='),
+    (r'>|maior que|maior do que|acima de|superior a|mais de', '>'),
+    (r'<|menor que|menor do que|abaixo de|inferior a|menos de', '<'),
+    (r'contem|contendo|contenha|parecido com', 'LIKE'),
+    (r'=|igual a|e igual a|e|seja|sendo', '='),
+]
+_FILTRO = re.compile(
+    r'\b(?:onde|cujo|cuja|cujos|cujas|em que|com|que tem|que tenham|que possuem|que possui|tem|possuem)\s+'
+    r'(?:o |a |os |as )?(?P<coluna>[a-z0-9_]+(?: [a-z0-9_]+){0,2}?)\s+'
+    r'(?P<op>' + '|'.join(p for p, _ in _OPERADORES) + r')\s+'
+    r'(?P<valor>.+?)\s*[?.!]*\s*$'
+)
+_OPERADOR_SQL = [(re.compile(r'^(?:' + p + r')$'), sql) for p, sql in _OPERADORES]
+
+# Valor de filtro com outra condição ("analista e salário > 5000", "analista ou gerente"): LLM
+_VALOR_COMPOSTO = re.compile(
+    r'\b(?:e|ou)\b|[<>=]|\b(?:maior|menor|acima|abaixo|superior|inferior|igual|diferente|entre)\b'
+)
+
+# Números: 1.000 / 1.000,50 (milhar com ponto), 2,5 (decimal com vírgula), 2.5 / 3000.50 (decimal com ponto)
+_NUMERO_MILHAR = re.compile(r'^\d{1,3}(?:\.\d{3})+(?:,\d+)?$')
+_NUMERO_VIRGULA = re.compile(r'^\d+(?:,\d+)?$')
+_NUMERO_PONTO = re.compile(r'^\d+(?:\.\d{1,2})?$')
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas sem acentos, com o mesmo comprimento do texto original"""
+    return ''.join((unicodedata.normalize('NFKD', c)[:1] or c).lower()[:1] for c in texto)
+
+
+def _termos(texto: str) -> List[str]:
+    """Palavras relevantes (sem acento, sem palavras vazias; CamelCase e _ separam)"""
+    texto = re.sub(r'([a-z])([A-Z])', r'\1 \2', texto)
+    return [t for t in re.split(r'[^a-z0-9]+', normalizar(texto)) if t and t not in PALAVRAS_IGNORADAS]
+
+
+def _casa(termo: str, parte: str) -> bool:
+    """Mesmo termo, ou prefixo comum de 4+ letras (salario ~ salarios)"""
+    if termo == parte:
+        return True
+    return min(len(termo), len(parte)) >= 4 and (termo.startswith(parte) or parte.startswith(termo))
+
+
+def _literal(valor: Any) -> str:
+    """Literal SQL (números como números, textos entre aspas simples escapadas)"""
+    if isinstance(valor, (int, float)):
+        return repr(valor)
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def _identificador(nome: str) -> str:
+    return '"' + nome.replace('"', '""') + '"'
+
+
+@dataclass(frozen=True)
+class Coluna:
+    """Coluna do catálogo"""
+    tabela: str
+    nome: str
+    numerica: bool
+    termos: Tuple[str, ...]
+
+
+@dataclass
+class Rota:
+    """Pergunta reconhecida: intenção, tabela alvo e SQL do template"""
+    intencao: str
+    tabela: str
+    sql: str
+    descricao: str
+    slots: Dict[str, Any] = field(default_factory=dict)
+
+
+class CatalogoEsquema:
+    """
+    Tabelas e colunas disponíveis, indexadas pelos termos dos nomes
+
+    Args:
+        tabelas_info: {tabela: db.get_table_info(tabela)} ou lista das saídas
+    """
+
+    def __init__(self, tabelas_info):
+        infos = tabelas_info.values() if isinstance(tabelas_info, dict) else tabelas_info
+        self.tabelas: Dict[str, Tuple[str, ...]] = {}
+        self.colunas: List[Coluna] = []
+        for info in infos:
+            if not info:
+                continue
+            tabela = info['table_name']
+            self.tabelas[tabela] = tuple(_termos(tabela))
+            for col in info['columns']:
+                tipo = str(col.get('type') or '').upper()
+                self.colunas.append(Coluna(
+                    tabela, col['name'], any(t in tipo for t in TIPOS_NUMERICOS), tuple(_termos(col['name']))
+                ))
+
+    def pontos_tabela(self, termos: List[str], tabela: str) -> int:
+        """Termos da pergunta presentes no nome da tabela"""
+        return sum(any(_casa(t, p) for p in self.tabelas.get(tabela, ())) for t in termos)
+
+    def coluna(self, frase: str, tabela: Optional[str] = None, numerica: bool = False) -> List[Coluna]:
+        """
+        Colunas mais parecidas com a frase (empates em tabelas diferentes são
+        devolvidos juntos; a tabela desempata depois)
+        """
+        termos = _termos(frase)
+        # Termos que citam tabelas ("dos ativos") não identificam a coluna
+        termos = [t for t in termos if not any(self.pontos_tabela([t], tb) for tb in self.tabelas)] or termos
+        if not termos:
+            return []
+        melhores, melhor = [], (0, 0.0)
+        for col in self.colunas:
+            if (tabela and col.tabela != tabela) or (numerica and not col.numerica) or not col.termos:
+                continue
+            casados = sum(any(_casa(t, p) for p in col.termos) for t in termos)
+            if not casados:
+                continue
+            cobertura = sum(any(_casa(t, p) for t in termos) for p in col.termos) / len(col.termos)
+            pontos = (casados, cobertura)
+            if pontos > melhor:
+                melhores, melhor = [col], pontos
+            elif pontos == melhor:
+                melhores.append(col)
+        return melhores
+
+    def escolher_tabela(self, termos: List[str], candidatas: List[str]) -> Optional[str]:
+        """Única tabela candidata, ou a única citada na pergunta (None = ambíguo)"""
+        candidatas = list(dict.fromkeys(candidatas))
+        if len(candidatas) == 1:
+            return candidatas[0]
+        pontos = {t: self.pontos_tabela(termos, t) for t in candidatas}
+        maior = max(pontos.values(), default=0)
+        escolhidas = [t for t, p in pontos.items() if p == maior]
+        return escolhidas[0] if maior > 0 and len(escolhidas) == 1 else None
+
+
+def _operador(texto: str) -> Optional[str]:
+    for padrao, sql in _OPERADOR_SQL:
+        if padrao.match(texto):
+            return sql
+    return None
+
+
+def _valor(texto: str, numerico: bool) -> Any:
+    """Valor do filtro: número quando a coluna é numérica e o texto é número"""
+    texto = texto.strip().strip('"\'“”‘’').strip()
+    if numerico:
+        numero = re.sub(r'^-', '', texto.replace('r$', '').replace('R$', '').strip())
+        sinal = -1 if texto.strip().startswith('-') else 1
+        if _NUMERO_MILHAR.match(numero) or _NUMERO_VIRGULA.match(numero):
+            numero = numero.replace('.', '').replace(',', '.')
+        elif not _NUMERO_PONTO.match(numero):
+            # Grafia ambígua ou não numérica (1,000.50, "5 mil"): sem valor, vai para o LLM
+            return None
+        valor = sinal * float(numero)
+        return int(valor) if valor.is_integer() else valor
+    return texto
+
+
+def _filtro(catalogo: CatalogoEsquema, original: str, normal: str) -> Tuple[Optional[dict], str]:
+    """
+    Cláusula "onde/com/cujo <coluna> <operador> <valor>" da pergunta
+
+    Returns:
+        (filtro, texto normalizado sem a cláusula); filtro None se não houver
+        ({'erro': True} se houver mas não puder ser resolvido)
+    """
+    achado = _FILTRO.search(normal)
+    if not achado:
+        return None, normal
+    colunas = catalogo.coluna(achado.group('coluna'))
+    op = _operador(achado.group('op'))
+    if not colunas or op is None:
+        return {'erro': True}, normal
+    # "e" só é operador quando escrito "é" (senão é a conjunção)
+    if achado.group('op') == 'e' and original[achado.start('op')] != 'é':
+        return {'erro': True}, normal
+    # Condição composta no valor: o template só aplica um filtro
+    if _VALOR_COMPOSTO.search(achado.group('valor')):
+        return {'erro': True}, normal
+    # Valor com a grafia original (mesmas posições do texto normalizado)
+    valor_texto = original[achado.start('valor'):achado.end('valor')]
+    filtro = {'colunas': colunas, 'op': op, 'op_texto': achado.group('op'), 'valor_texto': valor_texto}
+    return filtro, normal[:achado.start()].rstrip()
+
+
+def _where(filtro: Optional[dict], coluna: Optional[Coluna]) -> Optional[str]:
+    """Condição SQL do filtro já resolvido para a tabela"""
+    if not filtro:
+        return ''
+    valor = _valor(filtro['valor_texto'], coluna.numerica and filtro['op'] != 'LIKE')
+    if valor is None or valor == '':
+        return None
+    nome = _identificador(coluna.nome)
+    if filtro['op'] == 'LIKE':
+        return f"{nome} LIKE {_literal('%' + str(valor) + '%')}"
+    if isinstance(valor, str):
+        return f"{nome} {filtro['op']} {_literal(valor)} COLLATE NOCASE"
+    return f"{nome} {filtro['op']} {_literal(valor)}"
+
+
+def _resolver(catalogo: CatalogoEsquema, termos: List[str], grupos: List[List[Coluna]]) -> Optional[Tuple[str, List[Coluna]]]:
+    """
+    Tabela que contém uma coluna de cada grupo de candidatas
+
+    Returns:
+        (tabela, colunas na ordem dos grupos) ou None se ambíguo
+    """
+    candidatas = [t for t in catalogo.tabelas if all(any(c.tabela == t for c in g) for g in grupos)]
+    tabela = catalogo.escolher_tabela(termos, candidatas) if candidatas else None
+    if tabela is None:
+        return None
+    escolhidas = []
+    for grupo in grupos:
+        da_tabela = [c for c in grupo if c.tabela == tabela]
+        if len(da_tabela) != 1:
+            return None
+        escolhidas.append(da_tabela[0])
+    return tabela, escolhidas
+
+
+def _limpar_frase(frase: str) -> str:
+    """Remove preposições do início da frase do slot"""
+    return re.sub(r'^(?:\s*\b(?:de|do|da|dos|das|o|a|os|as|em|no|na|nos|nas)\b)+', '', frase).strip()
+
+
+def rotear(pergunta: str, tabelas_info) -> Optional[Rota]:
+    """
+    Reconhece a intenção da pergunta e monta o SQL
+
+    Args:
+        pergunta: Pergunta do usuário
+        tabelas_info: {tabela: db.get_table_info(tabela)} das tabelas consultáveis
+
+    Returns:
+        Rota com o SQL, ou None quando a pergunta deve ir para o LLM
+    """
+    if not pergunta or not pergunta.strip():
+        return None
+    catalogo = tabelas_info if isinstance(tabelas_info, CatalogoEsquema) else CatalogoEsquema(tabelas_info)
+    if not catalogo.tabelas:
+        return None
+
+    original = pergunta.strip().rstrip('?.! ')
+    normal = normalizar(original)
+    if _COMPLEXO.search(normal) or _NEGACAO.search(normal) or len(_termos(normal)) > 12:
+        return None
+    termos = _termos(normal)
+
+    rota, filtro = _rotear(catalogo, original, normal, termos)
+    if rota is None or not _cobre(catalogo, rota, termos, filtro):
+        return None
+    return rota
+
+
+def _cobre(catalogo: CatalogoEsquema, rota: Rota, termos: List[str], filtro: Optional[dict]) -> bool:
+    """
+    Todo termo da pergunta foi usado por algum slot (tabela escolhida, colunas,
+    valor do filtro, N) ou pela própria intenção; sobra = pergunta não entendida
+    por inteiro ("desligados em maio", "funcionários de férias")
+    """
+    usados = list(catalogo.tabelas.get(rota.tabela, ()))
+    for slot in ('coluna', 'grupo', 'filtro'):
+        nome = rota.slots.get(slot)
+        if nome:
+            usados.extend(_termos(nome))
+    if filtro:
+        usados.extend(_termos(filtro['op_texto']) + _termos(normalizar(filtro['valor_texto'])))
+    if rota.slots.get('n') is not None:
+        usados.append(str(rota.slots['n']))
+    return all(
+        t in ENTIDADES or t in VOCABULARIO_INTENCAO or any(_casa(t, u) for u in usados)
+        for t in termos
+    )
+
+
+def _rotear(catalogo: CatalogoEsquema, original: str, normal: str,
+            termos: List[str]) -> Tuple[Optional[Rota], Optional[dict]]:
+    """Slots e template da pergunta já normalizada; (rota, filtro) ou (None, None)"""
+
+    # "... por <grupo>" no final; o filtro e a agregação ficam no restante
+    grupo_frase = None
+    resto = normal
+    achado_grupo = _GRUPO.search(resto)
+    if achado_grupo:
+        grupo_frase = achado_grupo.group('grupo')
+        resto = resto[:achado_grupo.start()].rstrip()
+
+    filtro, resto = _filtro(catalogo, original[:len(resto)], resto)
+    if filtro and filtro.get('erro'):
+        return None, None
+
+    # Top-N: "os 5 funcionários com maior salário", "10 maiores salários"
+    for padrao in _TOP_N:
+        achado = padrao.search(resto)
+        if achado:
+            if grupo_frase:
+                return None, None
+            return _top_n(catalogo, termos, int(achado.group('n')), achado.groupdict().get('ordem') or 'maior',
+                          achado.group('coluna'), filtro), filtro
+
+    achados = {nome: padrao.search(resto) for nome, padrao in _AGREGACOES.items()}
+    agregacoes = [nome for nome, achado in achados.items() if achado]
+    # "quantidade total de X": contagem
+    if 'soma' in agregacoes and 'contagem' in agregacoes:
+        agregacoes.remove('soma')
+    if len(agregacoes) > 1:
+        return None, None
+
+    if agregacoes:
+        # Antes da agregação só cabem a entidade e o nome da tabela
+        # ("qual cargo tem a maior média" pede outra coisa)
+        antes = _termos(resto[:achados[agregacoes[0]].start()])
+        if any(t not in ENTIDADES and not any(catalogo.pontos_tabela([t], tb) for tb in catalogo.tabelas) for t in antes):
+            return None, None
+        if agregacoes[0] in ('maximo', 'minimo') and not grupo_frase and (
+                normal.startswith('quem') or set(antes) & ENTIDADES):
+            # "quem tem o maior salário": o registro, não só o valor
+            frase = _limpar_frase(resto[achados[agregacoes[0]].end():])
+            ordem = 'maior' if agregacoes[0] == 'maximo' else 'menor'
+            return _top_n(catalogo, termos, 1, ordem, frase, filtro), filtro
+        return _agregacao(catalogo, termos, agregacoes[0], resto, grupo_frase, filtro), filtro
+    if filtro and _LISTAR.search(normal) and not grupo_frase:
+        return _listagem(catalogo, termos, filtro), filtro
+    return None, None
+
+
+def _tabela_da_entidade(catalogo: CatalogoEsquema, termos: List[str]) -> Optional[str]:
+    """Tabela citada pelo nome, ou a única tabela do catálogo"""
+    return catalogo.escolher_tabela(termos, list(catalogo.tabelas))
+
+
+def _colunas_com_filtro(catalogo, termos, grupos, filtro):
+    """Resolve tabela e colunas incluindo a coluna do filtro"""
+    grupos = grupos + ([filtro['colunas']] if filtro else [])
+    if not grupos:
+        tabela = _tabela_da_entidade(catalogo, termos)
+        return (tabela, [], None) if tabela else None
+    resolvido = _resolver(catalogo, termos, grupos)
+    if resolvido is None:
+        return None
+    tabela, colunas = resolvido
+    coluna_filtro = colunas.pop() if filtro else None
+    return tabela, colunas, coluna_filtro
+
+
+def _montar_where(condicoes: List[str]) -> str:
+    condicoes = [c for c in condicoes if c]
+    return f" WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+
+def _agregacao(catalogo, termos, agregacao, frase, grupo_frase, filtro) -> Optional[Rota]:
+    """Contagem, média, mediana, soma, máximo e mínimo (opcionalmente por grupo)"""
+    padrao = _AGREGACOES[agregacao]
+    achado = padrao.search(frase)
+    frase_coluna = _limpar_frase(frase[achado.end():]) if achado else ''
+
+    grupos = []
+    alvo = None
+    if agregacao == 'soma':
+        alvo = catalogo.coluna(frase_coluna, numerica=True)
+        if not alvo:
+            # "total de colaboradores" sem coluna numérica: contagem
+            if not frase_coluna or set(_termos(frase_coluna)) & ENTIDADES or _tabela_da_entidade(catalogo, _termos(frase_coluna)):
+                agregacao, alvo = 'contagem', None
+            else:
+                return None
+    elif agregacao != 'contagem':
+        alvo = catalogo.coluna(frase_coluna, numerica=True)
+        if not alvo:
+            return None
+    if alvo:
+        grupos.append(alvo)
+    if grupo_frase:
+        grupo = catalogo.coluna(grupo_frase)
+        if not grupo:
+            return None
+        grupos.append(grupo)
+
+    resolvido = _colunas_com_filtro(catalogo, termos, grupos, filtro)
+    if resolvido is None:
+        return None
+    tabela, colunas, coluna_filtro = resolvido
+    coluna = colunas.pop(0) if alvo else None
+    coluna_grupo = colunas.pop(0) if grupo_frase else None
+    where = _where(filtro, coluna_filtro)
+    if where is None:
+        return None
+
+    t = _identificador(tabela)
+    if agregacao == 'mediana':
+        if coluna_grupo:
+            return None
+        c = _identificador(coluna.nome)
+        base = f"FROM {t}" + _montar_where([f"{c} IS NOT NULL", where])
+        alias = _identificador(f"mediana_{coluna.nome.lower()}")
+        sql = (
+            f"SELECT AVG(valor) AS {alias} FROM (SELECT {c} AS valor {base} ORDER BY {c} "
+            f"LIMIT 2 - (SELECT COUNT(*) {base}) % 2 OFFSET (SELECT (COUNT(*) - 1) / 2 {base}))"
+        )
+        descricao = f"Mediana de {coluna.nome} em {tabela}"
+    else:
+        funcao, prefixo, nome = {
+            'contagem': ('COUNT(*)', 'total', 'Contagem de registros'),
+            'media': ('AVG({c})', 'media', 'Média de {c}'),
+            'soma': ('SUM({c})', 'soma', 'Soma de {c}'),
+            'maximo': ('MAX({c})', 'maximo', 'Máximo de {c}'),
+            'minimo': ('MIN({c})', 'minimo', 'Mínimo de {c}'),
+        }[agregacao]
+        expressao = funcao.format(c=_identificador(coluna.nome)) if coluna else funcao
+        alias = _identificador(f"{prefixo}_{coluna.nome.lower()}" if coluna else prefixo)
+        descricao = nome.format(c=coluna.nome if coluna else '') + f" em {tabela}"
+        if coluna_grupo:
+            g = _identificador(coluna_grupo.nome)
+            direcao = 'ASC' if agregacao == 'minimo' else 'DESC'
+            sql = (f"SELECT {g}, {expressao} AS {alias} FROM {t}{_montar_where([where])} "
+                   f"GROUP BY {g} ORDER BY {alias} {direcao} LIMIT {LIMITE_LINHAS}")
+            descricao += f" por {coluna_grupo.nome}"
+        else:
+            sql = f"SELECT {expressao} AS {alias} FROM {t}{_montar_where([where])}"
+    if filtro:
+        descricao += f" ({coluna_filtro.nome} {filtro['op']} {filtro['valor_texto'].strip()})"
+
+    return Rota(
+        intencao=f"{agregacao}_por_grupo" if coluna_grupo else agregacao,
+        tabela=tabela, sql=sql, descricao=descricao,
+        slots={'coluna': coluna.nome if coluna else None, 'grupo': coluna_grupo.nome if coluna_grupo else None,
+               'filtro': coluna_filtro.nome if coluna_filtro else None}
+    )
+
+
+def _top_n(catalogo, termos, n, ordem, frase, filtro) -> Optional[Rota]:
+    """Os N registros com maior (ou menor) valor da coluna"""
+    frase = re.split(r'\b(?:onde|por|em|de|da|do|dos|das)\b', frase)[0]
+    alvo = catalogo.coluna(frase)
+    if not alvo or n <= 0:
+        return None
+    resolvido = _colunas_com_filtro(catalogo, termos, [alvo], filtro)
+    if resolvido is None:
+        return None
+    tabela, (coluna,), coluna_filtro = resolvido
+    where = _where(filtro, coluna_filtro)
+    if where is None:
+        return None
+
+    direcao = 'ASC' if ordem.startswith(('menor', 'mais baix')) else 'DESC'
+    c = _identificador(coluna.nome)
+    sql = (f"SELECT * FROM {_identificador(tabela)}{_montar_where([f'{c} IS NOT NULL', where])} "
+           f"ORDER BY {c} {direcao} LIMIT {min(n, LIMITE_LINHAS)}")
+    extremo = 'menor' if direcao == 'ASC' else 'maior'
+    return Rota(
+        intencao='top_n', tabela=tabela, sql=sql,
+        descricao=f"{n} registros com {extremo} {coluna.nome} em {tabela}",
+        slots={'n': n, 'coluna': coluna.nome, 'ordem': direcao, 'filtro': coluna_filtro.nome if coluna_filtro else None}
+    )
+
+
+def _listagem(catalogo, termos, filtro) -> Optional[Rota]:
+    """Registros que atendem ao filtro"""
+    resolvido = _colunas_com_filtro(catalogo, termos, [], filtro)
+    if resolvido is None:
+        return None
+    tabela, _, coluna_filtro = resolvido
+    where = _where(filtro, coluna_filtro)
+    if not where:
+        return None
+    return Rota(
+        intencao='listagem', tabela=tabela,
+        sql=f"SELECT * FROM {_identificador(tabela)} WHERE {where} LIMIT {LIMITE_LINHAS}",
+        descricao=f"Registros de {tabela} com {coluna_filtro.nome} {filtro['op']} {filtro['valor_texto'].strip()}",
+        slots={'filtro': coluna_filtro.nome, 'operador': filtro['op']}
+    )
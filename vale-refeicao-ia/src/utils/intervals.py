@@ -0,0 +1,365 @@
+"""
+Motor de intervalos para dias elegíveis proporcionais
+Intersecta o período ativo de cada colaborador na competência (admissão e
+desligamento) com seus períodos de férias e afastamento e conta os dias
+úteis restantes com numpy.busday_count, para toda a população de uma vez
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import settings
+from .business_calendar import BusinessCalendar, get_business_calendar, intervalo_competencia, parse_competencia
+
+# Nomes de coluna aceitos (comparados sem acento, em maiúsculas, com '_')
+COLUNAS_INICIO = ['DATA_INICIO', 'INICIO', 'DATA_INICIO_FERIAS', 'INICIO_FERIAS',
+                  'DATA_INICIO_AFASTAMENTO', 'INICIO_AFASTAMENTO', 'DATA_AFASTAMENTO']
+COLUNAS_FIM = ['DATA_FIM', 'FIM', 'DATA_FIM_FERIAS', 'FIM_FERIAS', 'DATA_FIM_AFASTAMENTO', 'FIM_AFASTAMENTO']
+COLUNAS_RETORNO = ['DATA_RETORNO', 'RETORNO', 'DATA_TERMINO_AFASTAMENTO']
+COLUNAS_DIAS = ['DIAS_DE_FERIAS', 'DIAS_FERIAS', 'DIAS_DE_AFASTAMENTO', 'DIAS_AFASTAMENTO', 'DIAS']
+COLUNAS_ADMISSAO = ['DATA_ADMISSAO', 'DATA_DE_ADMISSAO', 'ADMISSAO']
+COLUNAS_DEMISSAO = ['DATA_DEMISSAO', 'DATA_DE_DEMISSAO', 'DEMISSAO', 'DATA_DESLIGAMENTO', 'DESLIGAMENTO']
+
+# INICIO e FIM inclusivos (último dia de ausência)
+COLUNAS_AUSENCIA = ['MATRICULA', 'INICIO', 'FIM', 'DIAS', 'MOTIVO']
+
+# Motivos quando o colaborador não tem período ativo na competência
+MOTIVO_ADMISSAO_POSTERIOR = 'ADMISSAO_POSTERIOR'
+MOTIVO_DESLIGADO = 'DESLIGADOS'
+
+
+def _normalize_col(name: Any) -> str:
+    """Normaliza nome de coluna: sem acentos, maiúsculo, separado por '_'"""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^A-Z0-9]+', '_', name.upper()).strip('_')
+
+
+def encontrar_coluna(df: pd.DataFrame, candidatos: List[str]) -> Optional[str]:
+    """Primeira coluna do DataFrame que corresponde a um dos candidatos (em ordem)"""
+    colunas = {_normalize_col(c): c for c in df.columns}
+    return next((colunas[c] for c in candidatos if c in colunas), None)
+
+
+def para_datas(values: Any, n: Optional[int] = None) -> np.ndarray:
+    """Converte valores para datetime64[D] (NaT quando ausente ou inválido)"""
+    if values is None:
+        return np.full(n or 0, np.datetime64('NaT'), dtype='datetime64[D]')
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[D]')
+
+    series = pd.Series(np.asarray(values, dtype=object))
+    datas = pd.to_datetime(series, errors='coerce', format='mixed', dayfirst=True)
+    return datas.to_numpy(dtype='datetime64[D]')
+
+
+def _min_datas(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Mínimo elemento a elemento ignorando NaT"""
+    return np.where(np.isnat(a), b, np.where(np.isnat(b), a, np.minimum(a, b)))
+
+
+def ausencias_da_tabela(df: pd.DataFrame, motivo: str) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Extrai períodos de ausência e datas de desligamento de uma tabela de exclusão
+
+    Linhas com data de desligamento encerram o período ativo; as demais viram
+    ausências com INICIO/FIM (datas), DIAS (quantidade a partir do início do
+    período ativo) ou, sem nenhuma das duas informações, o mês inteiro.
+
+    Returns:
+        Tupla (ausências com COLUNAS_AUSENCIA, desligamento por matrícula)
+    """
+    matricula_col = encontrar_coluna(df, ['MATRICULA'])
+    if matricula_col is None or df.empty:
+        return pd.DataFrame(columns=COLUNAS_AUSENCIA), pd.Series(dtype='datetime64[ns]')
+
+    matriculas = df[matricula_col].astype(str).to_numpy()
+    n = len(df)
+
+    def datas(candidatos):
+        col = encontrar_coluna(df, candidatos)
+        return para_datas(df[col]) if col is not None else para_datas(None, n)
+
+    demissao = datas(COLUNAS_DEMISSAO)
+    desligado = ~np.isnat(demissao)
+    demissoes = pd.Series(demissao[desligado], index=matriculas[desligado]).groupby(level=0).min()
+
+    dias_col = encontrar_coluna(df, COLUNAS_DIAS)
+    dias = pd.to_numeric(df[dias_col], errors='coerce').to_numpy(dtype=float) if dias_col is not None \
+        else np.full(n, np.nan)
+
+    # Data de retorno é o primeiro dia trabalhado após a ausência
+    fim = datas(COLUNAS_FIM)
+    fim = np.where(np.isnat(fim), datas(COLUNAS_RETORNO) - 1, fim)
+
+    ausencias = pd.DataFrame({
+        'MATRICULA': matriculas,
+        'INICIO': datas(COLUNAS_INICIO),
+        'FIM': fim,
+        'DIAS': dias,
+        'MOTIVO': motivo.upper()
+    })[~desligado]
+    return ausencias.reset_index(drop=True), demissoes
+
+
+def _contar_dias_uteis(inicio: np.ndarray, fim: np.ndarray, grupos: np.ndarray,
+                       calendarios: List[np.busdaycalendar]) -> np.ndarray:
+    """busday_count vetorizado, uma chamada por calendário de localidade"""
+    dias = np.zeros(len(inicio), dtype=np.int64)
+    for codigo, calendario in enumerate(calendarios):
+        mask = grupos == codigo
+        if mask.any():
+            dias[mask] = np.busday_count(inicio[mask], fim[mask], busdaycal=calendario)
+    return dias
+
+
+def _unir_intervalos(pos: np.ndarray, inicio: np.ndarray,
+                     fim: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Une intervalos sobrepostos do mesmo colaborador (evita descontar o mesmo dia duas vezes)
+
+    Returns:
+        Tupla (posição do colaborador, início, fim) dos blocos unidos
+    """
+    ordem = np.lexsort((inicio, pos))
+    pos, inicio, fim = pos[ordem], inicio[ordem].astype(np.int64), fim[ordem].astype(np.int64)
+
+    # Maior fim acumulado dentro de cada colaborador
+    fim_acumulado = pd.Series(fim).groupby(pos).cummax().to_numpy()
+    novo_bloco = np.ones(len(pos), dtype=bool)
+    novo_bloco[1:] = (pos[1:] != pos[:-1]) | (inicio[1:] > fim_acumulado[:-1])
+
+    starts = np.flatnonzero(novo_bloco)
+    return (
+        pos[starts],
+        inicio[starts].astype('datetime64[D]'),
+        np.maximum.reduceat(fim, starts).astype('datetime64[D]')
+    )
+
+
+def calcular_dias_elegiveis_meses(competencias: Iterable[str],
+                                  matriculas: Iterable,
+                                  admissao: Optional[Iterable] = None,
+                                  demissao: Optional[Iterable] = None,
+                                  ausencias: Optional[pd.DataFrame] = None,
+                                  ufs: Optional[Iterable] = None,
+                                  municipios: Optional[Iterable] = None,
+                                  calendario: Optional[BusinessCalendar] = None,
+                                  competencia_referencia: Optional[str] = None) -> pd.DataFrame:
+    """
+    Calcula dias úteis elegíveis de cada colaborador em várias competências
+
+    Mesmas regras de calcular_dias_elegiveis, avaliadas de uma vez sobre a grade
+    colaborador x competência; datas, localidades e ausências são preparadas
+    uma única vez e os calendários são compartilhados entre os meses.
+
+    Ausências sem data de início (só DIAS ou mês inteiro) não indicam o mês a
+    que se referem: valem apenas para a competência de referência (padrão: a
+    única competência ou COMPETENCIA_VR) e são ignoradas nas demais.
+
+    Returns:
+        DataFrame com um bloco de linhas por competência (na ordem recebida), cada
+        bloco alinhado com as matrículas: COMPETENCIA, MATRICULA, DIAS_UTEIS,
+        DIAS_ATIVOS, DIAS_AUSENCIA, DIAS_ELEGIVEL e MOTIVO
+    """
+    calendario = calendario or get_business_calendar()
+    competencias = [str(c) for c in competencias]
+    m = len(competencias)
+
+    matriculas = pd.Series(np.asarray(matriculas, dtype=object)).astype(str)
+    n = len(matriculas)
+
+    # Calendário por (ano, localidade); cada intervalo fica dentro de um único mês
+    grupos, localidades = calendario.codigos_localidade(
+        ufs if ufs is not None else [None] * n, municipios
+    )
+    anos, ano_mes = np.unique([parse_competencia(c)[0] for c in competencias], return_inverse=True)
+    calendarios = [calendario.busdaycalendar(int(ano), *local) for ano in anos for local in localidades]
+    limites = [intervalo_competencia(c) for c in competencias]
+    mes_inicio = np.array([inicio for inicio, _ in limites], dtype='datetime64[D]')
+    mes_fim = np.array([fim for _, fim in limites], dtype='datetime64[D]')
+
+    # Grade achatada: linha i = colaborador i % n na competência i // n
+    colaborador = np.tile(np.arange(n), m)
+    mes = np.repeat(np.arange(m), n)
+    grupos_grade = ano_mes.reshape(-1)[mes] * len(localidades) + grupos[colaborador]
+    inicio_mes, fim_mes = mes_inicio[mes], mes_fim[mes]
+
+    # Período ativo [inicio, fim) dentro de cada competência
+    adm = para_datas(admissao, n)[colaborador]
+    dem = para_datas(demissao, n)[colaborador]
+    inicio = np.where(adm > inicio_mes, adm, inicio_mes)
+    fim = np.where(dem + 1 < fim_mes, dem + 1, fim_mes)
+    fim = np.maximum(fim, inicio)
+
+    # Mês cheio: uma contagem por (competência, localidade), expandida por código
+    dias_localidade = np.array(
+        [[calendario.dias_uteis(c, *local) for local in localidades] for c in competencias], dtype=np.int64
+    ).reshape(m, len(localidades))
+    dias_mes = dias_localidade[mes, grupos[colaborador]]
+    dias_ativos = _contar_dias_uteis(inicio, fim, grupos_grade, calendarios)
+    dias_ausencia = np.zeros(n * m, dtype=np.int64)
+
+    motivo = np.full(n * m, '', dtype=object)
+    motivo[adm >= fim_mes] = MOTIVO_ADMISSAO_POSTERIOR
+    motivo[dem < fim_mes] = MOTIVO_DESLIGADO
+
+    if ausencias is not None and not ausencias.empty:
+        # Posição do colaborador de cada ausência (primeira ocorrência da matrícula)
+        codes, unicas = pd.factorize(matriculas)
+        primeira = np.empty(len(unicas), dtype=np.int64)
+        primeira[codes[::-1]] = np.arange(n)[::-1]
+        idx = pd.Index(unicas).get_indexer(ausencias['MATRICULA'].astype(str).to_numpy())
+        encontrada = idx >= 0
+        aus = ausencias[encontrada]
+        k = len(aus)
+
+        # Cada ausência replicada por competência, na posição do colaborador na grade;
+        # as sem início ficam só na competência de referência
+        referencia = competencia_referencia or (competencias[0] if m == 1 else settings.competencia_vr)
+        mes_aus = np.repeat(np.arange(m), k)
+        a_ini = np.tile(para_datas(aus['INICIO'].to_numpy()), m)
+        manter = ~np.isnat(a_ini) | (np.asarray(competencias, dtype=object)[mes_aus] == str(referencia))
+
+        pos = (mes_aus * n + np.tile(primeira[idx[encontrada]], m))[manter]
+        a_ini = a_ini[manter]
+        a_fim = np.tile(para_datas(aus['FIM'].to_numpy()), m)[manter]
+        a_dias = np.tile(pd.to_numeric(aus['DIAS'], errors='coerce').to_numpy(dtype=float), m)[manter]
+
+        # Datas faltantes: início do período ativo; fim por quantidade de dias ou fim do período
+        a_ini = np.where(np.isnat(a_ini), inicio[pos], a_ini)
+        por_dias = (a_ini + np.nan_to_num(a_dias).astype(np.int64)).astype('datetime64[D]')
+        a_fim = np.where(~np.isnat(a_fim), a_fim + 1, np.where(np.isnan(a_dias), fim[pos], por_dias))
+
+        # Recorte no período ativo
+        a_ini = np.maximum(a_ini, inicio[pos])
+        a_fim = np.minimum(a_fim, fim[pos])
+        valida = a_fim > a_ini
+
+        if valida.any():
+            # Motivo informado: o primeiro na ordem das tabelas de ausência
+            motivos = aus['MOTIVO'].astype(str).to_numpy()
+            prioridade = pd.Index(pd.unique(motivos))
+            rank = np.tile(prioridade.get_indexer(motivos), m)[manter][valida]
+            melhor = np.full(n * m, len(prioridade), dtype=np.int64)
+            np.minimum.at(melhor, pos[valida], rank)
+            tem_ausencia = (melhor < len(prioridade)) & (motivo == '')
+            motivo[tem_ausencia] = prioridade.to_numpy()[melhor[tem_ausencia]]
+
+            b_pos, b_ini, b_fim = _unir_intervalos(pos[valida], a_ini[valida], a_fim[valida])
+            contagem = _contar_dias_uteis(b_ini, b_fim, grupos_grade[b_pos], calendarios)
+            dias_ausencia = np.bincount(b_pos, weights=contagem, minlength=n * m).astype(np.int64)
+
+    return pd.DataFrame({
+        'COMPETENCIA': np.repeat(np.asarray(competencias, dtype=object), n),
+        'MATRICULA': np.tile(matriculas.to_numpy(), m),
+        'DIAS_UTEIS': dias_mes,
+        'DIAS_ATIVOS': dias_ativos,
+        'DIAS_AUSENCIA': dias_ausencia,
+        'DIAS_ELEGIVEL': np.maximum(dias_ativos - dias_ausencia, 0),
+        'MOTIVO': motivo
+    })
+
+
+def calcular_dias_elegiveis(competencia: str,
+                            matriculas: Iterable,
+                            admissao: Optional[Iterable] = None,
+                            demissao: Optional[Iterable] = None,
+                            ausencias: Optional[pd.DataFrame] = None,
+                            ufs: Optional[Iterable] = None,
+                            municipios: Optional[Iterable] = None,
+                            calendario: Optional[BusinessCalendar] = None) -> pd.DataFrame:
+    """
+    Calcula dias úteis elegíveis de cada colaborador na competência
+
+    Período ativo = [max(início do mês, admissão), min(fim do mês, desligamento)];
+    dias elegíveis = dias úteis do período ativo - dias úteis em ausência.
+
+    Args:
+        competencia: Mês de referência (YYYY-MM)
+        matriculas: Matrícula de cada colaborador
+        admissao: Data de admissão por colaborador (opcional)
+        demissao: Data de desligamento (último dia trabalhado) por colaborador (opcional)
+        ausencias: Períodos com COLUNAS_AUSENCIA (ver ausencias_da_tabela)
+        ufs, municipios: Localidade de cada colaborador para os feriados
+        calendario: Calendário de dias úteis (padrão: instância compartilhada)
+
+    Returns:
+        DataFrame alinhado com as matrículas: DIAS_UTEIS (mês cheio), DIAS_ATIVOS,
+        DIAS_AUSENCIA, DIAS_ELEGIVEL e MOTIVO (origem da redução, se houver)
+    """
+    return calcular_dias_elegiveis_meses(
+        [competencia], matriculas, admissao, demissao, ausencias, ufs, municipios, calendario
+    ).drop(columns='COMPETENCIA')
+
+
+def _entradas_colaboradores(df: pd.DataFrame, tabelas_ausencia: Optional[Dict[str, pd.DataFrame]],
+                            calendario: BusinessCalendar) -> Dict[str, Any]:
+    """Matrículas, datas, ausências e localidade de um DataFrame de colaboradores"""
+    n = len(df)
+
+    matricula_col = encontrar_coluna(df, ['MATRICULA'])
+    matriculas = df[matricula_col].astype(str) if matricula_col is not None \
+        else pd.Series(np.arange(n).astype(str))
+
+    admissao_col = encontrar_coluna(df, COLUNAS_ADMISSAO)
+    demissao_col = encontrar_coluna(df, COLUNAS_DEMISSAO)
+    demissao = para_datas(df[demissao_col] if demissao_col is not None else None, n)
+
+    ausencias = []
+    for tabela, tabela_df in (tabelas_ausencia or {}).items():
+        periodos, demissoes = ausencias_da_tabela(tabela_df, tabela)
+        ausencias.append(periodos)
+        if len(demissoes):
+            demissao = _min_datas(demissao, para_datas(matriculas.map(demissoes).to_numpy()))
+
+    locais = calendario.localidades(df)
+    return {
+        'matriculas': matriculas,
+        'admissao': df[admissao_col] if admissao_col is not None else None,
+        'demissao': demissao,
+        'ausencias': pd.concat(ausencias, ignore_index=True) if ausencias else None,
+        'ufs': locais['UF'],
+        'municipios': locais['MUNICIPIO'],
+        'calendario': calendario
+    }
+
+
+def calcular_dias_colaboradores(df: pd.DataFrame, competencia: str,
+                                tabelas_ausencia: Optional[Dict[str, pd.DataFrame]] = None,
+                                calendario: Optional[BusinessCalendar] = None) -> pd.DataFrame:
+    """
+    Dias elegíveis para um DataFrame de colaboradores
+
+    Usa as colunas de admissão/desligamento do próprio DataFrame, a localidade
+    (UF/município ou sindicato) e as tabelas de ausência (nome -> DataFrame).
+
+    Returns:
+        Resultado de calcular_dias_elegiveis mais UF e MUNICIPIO, com o índice de df
+    """
+    entradas = _entradas_colaboradores(df, tabelas_ausencia, calendario or get_business_calendar())
+    resultado = calcular_dias_elegiveis(competencia, **entradas)
+    resultado.index = df.index
+    return resultado.assign(UF=entradas['ufs'].to_numpy(), MUNICIPIO=entradas['municipios'].to_numpy())
+
+
+def calcular_dias_colaboradores_meses(df: pd.DataFrame, competencias: Iterable[str],
+                                      tabelas_ausencia: Optional[Dict[str, pd.DataFrame]] = None,
+                                      calendario: Optional[BusinessCalendar] = None) -> pd.DataFrame:
+    """
+    Dias elegíveis para um DataFrame de colaboradores em várias competências
+
+    Returns:
+        Resultado de calcular_dias_elegiveis_meses mais UF e MUNICIPIO (um bloco
+        de len(df) linhas por competência)
+    """
+    competencias = list(competencias)
+    entradas = _entradas_colaboradores(df, tabelas_ausencia, calendario or get_business_calendar())
+    resultado = calcular_dias_elegiveis_meses(competencias, **entradas)
+    return resultado.assign(
+        UF=np.tile(entradas['ufs'].to_numpy(), len(competencias)),
+        MUNICIPIO=np.tile(entradas['municipios'].to_numpy(), len(competencias))
+    )
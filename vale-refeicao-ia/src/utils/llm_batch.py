@@ -0,0 +1,96 @@
+"""
+Chamadas ao LLM em lote
+Vários prompts executados em paralelo (threads) sob um limite de requisições
+por minuto, com extração da resposta JSON
+"""
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Optional
+
+from ..config.settings import settings
+from .llm_cache import completar
+
+
+class RateLimiter:
+    """Limita requisições por minuto (intervalo mínimo entre inícios, thread-safe)"""
+
+    def __init__(self, requisicoes_por_minuto: int):
+        self.intervalo = 60.0 / requisicoes_por_minuto if requisicoes_por_minuto > 0 else 0.0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        """Bloqueia até a próxima requisição ser permitida"""
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+# Limite compartilhado por todas as chamadas em lote do processo
+_limiter = RateLimiter(settings.llm_requests_per_minute)
+
+
+def em_lotes(itens: List[Any], tamanho: int) -> List[List[Any]]:
+    """Divide a lista em lotes de até `tamanho` itens"""
+    tamanho = max(1, tamanho)
+    return [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
+
+def completar_em_paralelo(llm, prompts: Iterable[str],
+                          max_concorrencia: Optional[int] = None,
+                          limiter: Optional[RateLimiter] = None) -> List[Optional[str]]:
+    """
+    Executa llm.complete para cada prompt em paralelo
+
+    Args:
+        llm: LLM do LlamaIndex
+        prompts: Prompts a enviar
+        max_concorrencia: Requisições simultâneas (padrão: LLM_MAX_CONCURRENCY)
+        limiter: Limite de requisições por minuto (padrão: compartilhado do processo)
+
+    Returns:
+        Texto da resposta de cada prompt, na mesma ordem (None em caso de erro)
+    """
+    prompts = list(prompts)
+    limiter = limiter or _limiter
+
+    def _uma(prompt: str) -> Optional[str]:
+        limiter.aguardar()
+        try:
+            return completar(llm, prompt).text
+        except Exception:
+            return None
+
+    if len(prompts) <= 1:
+        return [_uma(p) for p in prompts]
+
+    workers = min(len(prompts), max_concorrencia or settings.llm_max_concurrency)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(_uma, prompts))
+
+
+def extrair_json(texto: Optional[str]) -> Any:
+    """JSON da resposta (aceita bloco markdown ou texto ao redor); None se inválido"""
+    if not texto:
+        return None
+    texto = re.sub(r'^```(?:json)?|```$', '', texto.strip(), flags=re.MULTILINE).strip()
+    try:
+        return json.loads(texto)
+    except json.JSONDecodeError:
+        pass
+
+    # Primeiro objeto ou lista completa dentro do texto
+    inicio = min((i for i in (texto.find('['), texto.find('{')) if i >= 0), default=-1)
+    if inicio < 0:
+        return None
+    try:
+        return json.JSONDecoder().raw_decode(texto[inicio:])[0]
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,258 @@
+"""
+Cache persistente de respostas do LLM
+Respostas gravadas em SQLite com chave (modelo, temperatura, hash do prompt),
+validade (TTL) e limite de tamanho com descarte das menos usadas; contadores
+de acertos e faltas compartilhados pelo processo; toda chamada registra os
+tokens consumidos (ou poupados, quando servida do cache)
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from ..config.settings import settings
+from .llm_registry import chamada, parametros_llm
+from .token_budget import contar_tokens, registrar_uso, uso_informado
+
+
+@dataclass
+class RespostaCache:
+    """Resposta servida do cache ou montada do streaming (mesmo atributo .text do CompletionResponse)"""
+    text: str
+    cache: bool = True
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def chave_cache(modelo: str, temperatura: Optional[float], prompt: str) -> str:
+    """Hash (sha256) do modelo, temperatura e prompt exato"""
+    h = hashlib.sha256()
+    h.update(f"{modelo}\x00{temperatura!r}\x00".encode('utf-8'))
+    h.update(prompt.encode('utf-8'))
+    return h.hexdigest()
+
+
+class CacheLLM:
+    """
+    Respostas do LLM em SQLite
+
+    Entradas vencidas (TTL) não são servidas e saem na próxima gravação; ao
+    passar do tamanho máximo, as entradas acessadas há mais tempo são descartadas.
+    """
+
+    def __init__(self, caminho: Path, ttl_horas: float, max_mb: float):
+        self.caminho = Path(caminho)
+        self.ttl = ttl_horas * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._pronto = False
+        self.contadores = {'acertos': 0, 'faltas': 0, 'gravacoes': 0, 'descartes': 0}
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """Conexão com commit ao final (tabela criada na primeira vez)"""
+        if not self._pronto:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        if not self._pronto:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    CHAVE TEXT PRIMARY KEY,
+                    MODELO TEXT,
+                    TEMPERATURA REAL,
+                    RESPOSTA TEXT NOT NULL,
+                    TAMANHO INTEGER NOT NULL,
+                    CRIADO_EM REAL NOT NULL,
+                    ACESSADO_EM REAL NOT NULL,
+                    ACERTOS INTEGER DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (ACESSADO_EM)")
+            self._pronto = True
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _contar(self, contador: str, quantidade: int = 1):
+        with self._lock:
+            self.contadores[contador] += quantidade
+
+    def obter(self, chave: str, contar: bool = True) -> Optional[str]:
+        """Resposta gravada e ainda válida (None = falta)"""
+        agora = time.time()
+        with self._lock, self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT RESPOSTA, CRIADO_EM FROM respostas WHERE CHAVE = ?", (chave,)
+            ).fetchone()
+            if linha and (self.ttl <= 0 or agora - linha[1] <= self.ttl):
+                conn.execute(
+                    "UPDATE respostas SET ACESSADO_EM = ?, ACERTOS = ACERTOS + 1 WHERE CHAVE = ?",
+                    (agora, chave)
+                )
+                if contar:
+                    self.contadores['acertos'] += 1
+                return linha[0]
+        if contar:
+            self._contar('faltas')
+        return None
+
+    def converter_falta(self):
+        """Falta que foi atendida pela gravação de outra thread passa a contar como acerto"""
+        with self._lock:
+            self.contadores['faltas'] -= 1
+            self.contadores['acertos'] += 1
+
+    def gravar(self, chave: str, modelo: str, temperatura: Optional[float], resposta: str):
+        """Grava a resposta e aplica TTL e limite de tamanho"""
+        agora = time.time()
+        tamanho = len(resposta.encode('utf-8'))
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO respostas "
+                "(CHAVE, MODELO, TEMPERATURA, RESPOSTA, TAMANHO, CRIADO_EM, ACESSADO_EM) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chave, modelo, temperatura, resposta, tamanho, agora, agora)
+            )
+            descartes = 0
+            if self.ttl > 0:
+                descartes += conn.execute("DELETE FROM respostas WHERE CRIADO_EM < ?", (agora - self.ttl,)).rowcount
+
+            # Acima do limite: descarta as acessadas há mais tempo até caber
+            total = conn.execute("SELECT COALESCE(SUM(TAMANHO), 0) FROM respostas").fetchone()[0]
+            if self.max_bytes > 0 and total > self.max_bytes:
+                descartes += conn.execute("""
+                    DELETE FROM respostas WHERE CHAVE IN (
+                        SELECT CHAVE FROM (
+                            SELECT CHAVE, SUM(TAMANHO) OVER (ORDER BY ACESSADO_EM, CHAVE) - TAMANHO AS ANTES
+                            FROM respostas WHERE CHAVE != ?
+                        ) WHERE ANTES < ?
+                    )
+                """, (chave, total - self.max_bytes)).rowcount
+            self.contadores['gravacoes'] += 1
+            self.contadores['descartes'] += descartes
+
+    def limpar(self):
+        """Remove todas as respostas gravadas"""
+        with self._lock, self._conectar() as conn:
+            conn.execute("DELETE FROM respostas")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores do processo e ocupação do cache"""
+        with self._lock, self._conectar() as conn:
+            entradas, tamanho = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(TAMANHO), 0) FROM respostas"
+            ).fetchone()
+            contadores = dict(self.contadores)
+        consultas = contadores['acertos'] + contadores['faltas']
+        return {
+            **contadores,
+            'taxa_acerto': contadores['acertos'] / consultas if consultas else 0.0,
+            'entradas': entradas,
+            'tamanho_mb': tamanho / (1024 * 1024)
+        }
+
+
+# Cache compartilhado por todas as chamadas ao LLM do processo
+cache_llm = CacheLLM(settings.llm_cache_path, settings.llm_cache_ttl_horas, settings.llm_cache_max_mb)
+
+# Uma chamada por chave em andamento: threads com o mesmo prompt esperam a primeira
+_em_andamento: Dict[str, threading.Lock] = {}
+_em_andamento_lock = threading.Lock()
+
+
+def _obter(cache: CacheLLM, chave: str, contar: bool = True) -> Optional[str]:
+    """cache.obter tolerante a falhas do SQLite (erro = falta)"""
+    try:
+        return cache.obter(chave, contar)
+    except sqlite3.Error:
+        return None
+
+
+def _registrar_tokens(modelo: str, prompt: str, resposta, cache: bool = False):
+    """Tokens da chamada: os informados pela API ou contados com tiktoken"""
+    uso = uso_informado(resposta)
+    if uso is None:
+        uso = contar_tokens(prompt, modelo), contar_tokens(getattr(resposta, 'text', None) or '', modelo)
+    registrar_uso(modelo, *uso, cache=cache)
+
+
+def _servir(modelo: str, prompt: str, texto: str, ao_receber: Optional[Callable[[str], None]]) -> RespostaCache:
+    """Resposta do cache (repassada ao streaming e contada como tokens poupados)"""
+    if ao_receber is not None:
+        ao_receber(texto)
+    resposta = RespostaCache(texto)
+    _registrar_tokens(modelo, prompt, resposta, cache=True)
+    return resposta
+
+
+def _gerar(llm, prompt: str, ao_receber: Optional[Callable[[str], None]]):
+    """llm.complete, ou stream_complete repassando o texto acumulado a cada trecho"""
+    with chamada(llm):
+        if ao_receber is None or not hasattr(llm, 'stream_complete'):
+            resposta = llm.complete(prompt)
+            if ao_receber is not None:
+                ao_receber(getattr(resposta, 'text', None) or '')
+        else:
+            texto = ''
+            for trecho in llm.stream_complete(prompt):
+                delta = getattr(trecho, 'delta', None)
+                texto = texto + delta if delta is not None else (getattr(trecho, 'text', None) or texto)
+                ao_receber(texto)
+            resposta = RespostaCache(texto, cache=False)
+    _registrar_tokens(parametros_llm(llm)[0], prompt, resposta)
+    return resposta
+
+
+def completar(llm, prompt: str, cache: Optional[CacheLLM] = None,
+              ao_receber: Optional[Callable[[str], None]] = None):
+    """
+    llm.complete com cache persistente
+
+    Args:
+        llm: LLM do LlamaIndex
+        prompt: Prompt exato (qualquer diferença é outra entrada)
+        cache: Cache a usar (padrão: compartilhado do processo)
+        ao_receber: Com streaming: chamada com o texto acumulado a cada trecho
+            recebido (resposta do cache: uma única chamada com o texto completo)
+
+    Returns:
+        Resposta do LLM ou RespostaCache (ambas com .text)
+    """
+    if not settings.llm_cache_enabled:
+        return _gerar(llm, prompt, ao_receber)
+
+    cache = cache or cache_llm
+    modelo, temperatura = parametros_llm(llm)
+    chave = chave_cache(modelo, temperatura, prompt)
+    texto = _obter(cache, chave)
+    if texto is not None:
+        return _servir(modelo, prompt, texto, ao_receber)
+
+    with _em_andamento_lock:
+        lock = _em_andamento.setdefault(chave, threading.Lock())
+    with lock:
+        # Outra thread pode ter gravado enquanto esta esperava
+        texto = _obter(cache, chave, contar=False)
+        if texto is not None:
+            cache.converter_falta()
+            return _servir(modelo, prompt, texto, ao_receber)
+        try:
+            resposta = _gerar(llm, prompt, ao_receber)
+            texto = getattr(resposta, 'text', None)
+            if texto:
+                try:
+                    cache.gravar(chave, modelo, temperatura, texto)
+                except sqlite3.Error:
+                    pass
+            return resposta
+        finally:
+            with _em_andamento_lock:
+                _em_andamento.pop(chave, None)
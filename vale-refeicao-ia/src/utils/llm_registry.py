@@ -0,0 +1,183 @@
+"""
+Registro de clientes LLM do processo
+Uma instância OpenAI por (modelo, temperatura, opções), todas sobre o mesmo
+httpx.Client com conexões keep-alive; limite de chamadas simultâneas por
+modelo e latência de cada chamada
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config.settings import settings
+
+# Latências guardadas por modelo (janela para média e percentis)
+JANELA_LATENCIAS = 500
+
+_lock = threading.Lock()
+_http_client = None
+_llms: Dict[tuple, Any] = {}
+_embeddings: Dict[str, Any] = {}
+_semaforos: Dict[str, threading.BoundedSemaphore] = {}
+_metricas: Dict[str, Dict[str, Any]] = {}
+
+
+def parametros_llm(llm) -> tuple:
+    """(modelo, temperatura) do LLM do LlamaIndex"""
+    modelo = getattr(llm, 'model', None)
+    if modelo is None:
+        modelo = getattr(getattr(llm, 'metadata', None), 'model_name', None)
+    temperatura = getattr(llm, 'temperature', None)
+    return str(modelo or type(llm).__name__), float(temperatura) if temperatura is not None else None
+
+
+def http_client():
+    """httpx.Client compartilhado (pool de conexões keep-alive com a API)"""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            import httpx
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_connections,
+                    keepalive_expiry=settings.llm_keepalive_segundos
+                ),
+                timeout=settings.llm_request_timeout
+            )
+        return _http_client
+
+
+def obter_llm(modelo: Optional[str] = None, temperatura: Optional[float] = None, **opcoes):
+    """
+    LLM OpenAI do registro (criado na primeira vez, reaproveitado depois)
+
+    Args:
+        modelo: Modelo (padrão: OPENAI_MODEL)
+        temperatura: Temperatura (padrão: AGENT_TEMPERATURE)
+        **opcoes: Demais argumentos do OpenAI do LlamaIndex (ex.: max_retries)
+    """
+    modelo = modelo or settings.openai_model
+    temperatura = settings.agent_temperature if temperatura is None else float(temperatura)
+    chave = (modelo, temperatura, tuple(sorted(opcoes.items())))
+    with _lock:
+        if chave in _llms:
+            return _llms[chave]
+
+    from llama_index.llms.openai import OpenAI
+    llm = OpenAI(
+        api_key=settings.openai_api_key,
+        model=modelo,
+        temperature=temperatura,
+        http_client=http_client(),
+        **opcoes
+    )
+    with _lock:
+        return _llms.setdefault(chave, llm)
+
+
+def obter_embedding(modelo: Optional[str] = None):
+    """Embedding OpenAI do registro, sobre o mesmo pool de conexões"""
+    chave = modelo or ''
+    with _lock:
+        if chave in _embeddings:
+            return _embeddings[chave]
+
+    from llama_index.embeddings.openai import OpenAIEmbedding
+    opcoes = {'model': modelo} if modelo else {}
+    embedding = OpenAIEmbedding(api_key=settings.openai_api_key, http_client=http_client(), **opcoes)
+    with _lock:
+        return _embeddings.setdefault(chave, embedding)
+
+
+def _semaforo(modelo: str) -> Optional[threading.BoundedSemaphore]:
+    """Limite de chamadas simultâneas do modelo (None = sem limite)"""
+    if settings.llm_concorrencia_por_modelo <= 0:
+        return None
+    with _lock:
+        if modelo not in _semaforos:
+            _semaforos[modelo] = threading.BoundedSemaphore(settings.llm_concorrencia_por_modelo)
+        return _semaforos[modelo]
+
+
+def _metricas_modelo(modelo: str) -> Dict[str, Any]:
+    """Acumuladores do modelo (chamar com _lock)"""
+    if modelo not in _metricas:
+        _metricas[modelo] = {
+            'chamadas': 0, 'erros': 0, 'em_andamento': 0, 'espera_total': 0.0,
+            'latencias': deque(maxlen=JANELA_LATENCIAS)
+        }
+    return _metricas[modelo]
+
+
+@contextmanager
+def chamada(llm) -> Iterator[None]:
+    """
+    Envolve uma chamada ao LLM: espera a vaga do modelo e mede a latência
+
+    Exemplo:
+        with chamada(llm):
+            resposta = llm.complete(prompt)
+    """
+    modelo = parametros_llm(llm)[0]
+    semaforo = _semaforo(modelo)
+    inicio = time.perf_counter()
+    if semaforo:
+        semaforo.acquire()
+    liberado = time.perf_counter()
+    with _lock:
+        metricas = _metricas_modelo(modelo)
+        metricas['em_andamento'] += 1
+        metricas['espera_total'] += liberado - inicio
+    erro = False
+    try:
+        yield
+    except Exception:
+        erro = True
+        raise
+    finally:
+        latencia = time.perf_counter() - liberado
+        if semaforo:
+            semaforo.release()
+        with _lock:
+            metricas['em_andamento'] -= 1
+            metricas['chamadas'] += 1
+            metricas['erros'] += int(erro)
+            metricas['latencias'].append(latencia)
+
+
+def _percentil_ms(latencias: List[float], p: float) -> float:
+    """Percentil (latências já ordenadas, em segundos) em ms"""
+    if not latencias:
+        return 0.0
+    return latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000
+
+
+def instancias_llm() -> int:
+    """LLMs distintos criados pelo registro"""
+    with _lock:
+        return len(_llms)
+
+
+def metricas_llm() -> List[Dict[str, Any]]:
+    """Latência (ms) e volume de chamadas por modelo"""
+    with _lock:
+        copias = {m: {**v, 'latencias': list(v['latencias'])} for m, v in _metricas.items()}
+
+    linhas = []
+    for modelo, m in sorted(copias.items()):
+        latencias = sorted(m['latencias'])
+        linhas.append({
+            'modelo': modelo,
+            'chamadas': m['chamadas'],
+            'erros': m['erros'],
+            'em_andamento': m['em_andamento'],
+            'latencia_media_ms': sum(latencias) / len(latencias) * 1000 if latencias else 0.0,
+            'latencia_p50_ms': _percentil_ms(latencias, 0.50),
+            'latencia_p95_ms': _percentil_ms(latencias, 0.95),
+            'latencia_max_ms': latencias[-1] * 1000 if latencias else 0.0,
+            'espera_media_ms': m['espera_total'] / max(m['chamadas'] + m['em_andamento'], 1) * 1000
+        })
+    return linhas
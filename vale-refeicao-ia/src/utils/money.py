@@ -0,0 +1,82 @@
+"""
+Aritmética monetária em centavos inteiros
+Valores em reais são convertidos uma vez para int64 (centavos); produtos,
+percentuais e somas são feitos sobre inteiros, então totais e divisões
+empresa / funcionário fecham ao centavo sem Decimal por linha
+"""
+
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+CENTAVOS_POR_REAL = 100
+
+# Percentuais em pontos-base (0,01%): 0.20 -> 2000
+PONTOS_BASE = 10000
+
+Valores = Union[float, int, np.ndarray, pd.Series]
+
+
+def _arredondar(valores: np.ndarray) -> np.ndarray:
+    """Arredondamento comercial (meio para longe do zero) para int64"""
+    valores = np.asarray(valores, dtype=float)
+    return (np.sign(valores) * np.floor(np.abs(valores) + 0.5)).astype(np.int64)
+
+
+def centavos(valores: Valores) -> np.ndarray:
+    """Reais -> centavos (int64); nulos viram 0"""
+    valores = np.nan_to_num(np.asarray(valores, dtype=float))
+    return _arredondar(valores * CENTAVOS_POR_REAL)
+
+
+def reais(valores_centavos: Valores) -> np.ndarray:
+    """Centavos -> reais (float64, exatamente o valor em centavos mais próximo)"""
+    return np.asarray(valores_centavos, dtype=np.int64) / CENTAVOS_POR_REAL
+
+
+def multiplicar(valores_centavos: Valores, fator: Valores) -> np.ndarray:
+    """Centavos x quantidade (ex.: valor diário x dias), arredondado ao centavo"""
+    valores_centavos = np.asarray(valores_centavos, dtype=np.int64)
+    fator = np.asarray(fator)
+    if np.issubdtype(fator.dtype, np.integer):
+        return valores_centavos * fator
+    fator = np.nan_to_num(fator.astype(float))
+    inteiro = fator == np.round(fator)
+    if inteiro.all():
+        return valores_centavos * fator.astype(np.int64)
+    return _arredondar(valores_centavos * fator)
+
+
+def pontos_base(pct: Valores) -> np.ndarray:
+    """Percentual (fração) em pontos-base inteiros: 0.20 -> 2000"""
+    return _arredondar(np.asarray(pct, dtype=float) * PONTOS_BASE)
+
+
+def percentual(valores_centavos: Valores, pct: Valores) -> np.ndarray:
+    """
+    Parcela percentual em centavos (ex.: desconto de 20%), arredondada ao centavo
+
+    O percentual é convertido para pontos-base e o produto é feito em inteiros.
+    """
+    valores_centavos = np.asarray(valores_centavos, dtype=np.int64)
+    produto = valores_centavos * pontos_base(pct)
+    metade = PONTOS_BASE // 2
+    return np.sign(produto) * ((np.abs(produto) + metade) // PONTOS_BASE)
+
+
+def dividir(valores_centavos: Valores, pct: Valores) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Divide cada valor em (parcela do percentual, restante)
+
+    As duas partes somam exatamente o valor original (ex.: desconto do
+    funcionário e custo da empresa).
+    """
+    valores_centavos = np.asarray(valores_centavos, dtype=np.int64)
+    parcela = percentual(valores_centavos, pct)
+    return parcela, valores_centavos - parcela
+
+
+def somar(valores: Valores) -> float:
+    """Soma exata de valores em reais (via centavos)"""
+    return int(centavos(valores).sum()) / CENTAVOS_POR_REAL
@@ -17,6 +17,8 @@ from datetime import datetime
 import json
 import re
 
+from .llm_cache import completar
+
 
 class SafePythonExecutor:
     """Executor seguro de código Python com sandbox limitado"""
@@ -399,22 +401,17 @@ def generate_eda_code_with_llm(question: str, table_info: Dict[str, List[str]],
     """
     Gera código Python usando LLM (GPT-4 ou superior)
     """
-    # Se não passou LLM, criar um
+    # Se não passou LLM, usar o do registro do processo
     if llm is None:
-        from llama_index.llms.openai import OpenAI
-        from ..config.settings import Settings
-        settings = Settings()
+        from ..config.settings import settings
+        from .llm_registry import obter_llm
         
         # Usar o modelo mais recente disponível
         model = settings.openai_model
         if "gpt-4" not in model:
             model = "gpt-4-turbo-preview"  # Forçar GPT-4
         
-        llm = OpenAI(
-            api_key=settings.openai_api_key,
-            model=model,
-            temperature=0.3
-        )
+        llm = obter_llm(modelo=model, temperatura=0.3)
     
     # Preparar informações das tabelas
     table_name = list(table_info.keys())[0] if table_info else 'df'
@@ -509,7 +506,7 @@ Gere APENAS o código Python, sem explicações adicionais.
 """
     
     try:
-        response = llm.complete(prompt)
+        response = completar(llm, prompt)
         code = response.text.strip()
         
         # Remover marcadores de código se existirem
@@ -0,0 +1,188 @@
+"""
+Índice de sindicatos para a tabela de valores
+Nomes normalizados (sem acentos, pontuação e abreviações) e trigramas das
+chaves de base_sindicato_x_valor, montados uma vez por conteúdo da tabela;
+cada sindicato distinto é resolvido para valor e estado em uma passada
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import settings
+
+# Abreviações frequentes nos nomes de sindicatos (por palavra, já normalizada)
+ABREVIACOES = {
+    'SIND': 'SINDICATO', 'SINDIC': 'SINDICATO',
+    'TRAB': 'TRABALHADORES', 'TRABS': 'TRABALHADORES',
+    'EMPR': 'EMPRESAS', 'EMPRS': 'EMPRESAS',
+    'PROC': 'PROCESSAMENTO', 'PROCESS': 'PROCESSAMENTO',
+    'PROF': 'PROFISSIONAIS', 'PROFS': 'PROFISSIONAIS',
+    'EST': 'ESTADO', 'REG': 'REGIAO', 'METROP': 'METROPOLITANA'
+}
+
+# Sindicatos de São Paulo: sigla como palavra ou nome do estado
+MARCADORES_SP = ['SP', 'SAO PAULO']
+
+# Tipo de correspondência com a tabela de valores
+EXATO, CONTIDO, SIMILAR = 'exato', 'contido', 'similar'
+
+# Estados por sigla e por nome (normalizados); 'PARA' fica de fora por ser preposição
+UFS = ['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+       'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO']
+NOMES_ESTADOS = {
+    'ACRE': 'AC', 'ALAGOAS': 'AL', 'AMAZONAS': 'AM', 'AMAPA': 'AP', 'BAHIA': 'BA', 'CEARA': 'CE',
+    'DISTRITO FEDERAL': 'DF', 'ESPIRITO SANTO': 'ES', 'GOIAS': 'GO', 'MARANHAO': 'MA',
+    'MINAS GERAIS': 'MG', 'MATO GROSSO DO SUL': 'MS', 'MATO GROSSO': 'MT', 'PARAIBA': 'PB',
+    'PERNAMBUCO': 'PE', 'PIAUI': 'PI', 'PARANA': 'PR', 'RIO DE JANEIRO': 'RJ',
+    'RIO GRANDE DO NORTE': 'RN', 'RONDONIA': 'RO', 'RORAIMA': 'RR', 'RIO GRANDE DO SUL': 'RS',
+    'SANTA CATARINA': 'SC', 'SERGIPE': 'SE', 'SAO PAULO': 'SP', 'TOCANTINS': 'TO'
+}
+
+_NAO_ALFANUMERICO = re.compile(r'[^A-Z0-9]+')
+
+
+def normalizar_sindicato(nome) -> str:
+    """'Sind. Trab. São Paulo - SP' -> 'SINDICATO TRABALHADORES SAO PAULO SP'"""
+    if nome is None or (isinstance(nome, float) and np.isnan(nome)):
+        return ''
+    texto = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii').upper()
+    return ' '.join(ABREVIACOES.get(p, p) for p in _NAO_ALFANUMERICO.sub(' ', texto).split())
+
+
+def trigramas(chave: str) -> List[str]:
+    """Trigramas distintos da chave normalizada (com bordas)"""
+    texto = f"  {chave} "
+    return sorted({texto[i:i + 3] for i in range(len(texto) - 2)})
+
+
+def _contem(nome: str, termo: str) -> bool:
+    """Termo como sequência de palavras inteiras dentro do nome normalizado"""
+    return bool(termo) and f" {termo} " in f" {nome} "
+
+
+def estados(nome: str) -> frozenset:
+    """UFs citadas no nome normalizado (sigla como palavra ou nome do estado)"""
+    texto = f" {nome} "
+    encontrados = set()
+    # Nomes mais longos primeiro: 'MATO GROSSO DO SUL' antes de 'MATO GROSSO'
+    for estado in sorted(NOMES_ESTADOS, key=len, reverse=True):
+        if f" {estado} " in texto:
+            encontrados.add(NOMES_ESTADOS[estado])
+            texto = texto.replace(f" {estado} ", ' ')
+    encontrados.update(p for p in texto.split() if p in UFS)
+    return frozenset(encontrados)
+
+
+def eh_sp(nomes: Iterable) -> np.ndarray:
+    """É sindicato de SP (sigla como palavra ou 'SAO PAULO'), avaliado uma vez por nome distinto"""
+    codes, unicos = pd.factorize(pd.Series(list(nomes), dtype=object), use_na_sentinel=False)
+    sp = np.array([
+        any(_contem(normalizar_sindicato(n), m) for m in MARCADORES_SP) for n in unicos
+    ], dtype=bool)
+    return sp[codes] if len(codes) else np.zeros(0, dtype=bool)
+
+
+class IndiceSindicatos:
+    """
+    Chaves da tabela de valores indexadas por nome normalizado e por trigrama
+
+    Ordem de resolução de um sindicato: chave normalizada idêntica, chave
+    contida no nome (palavras inteiras; a mais longa vence) e, por fim, a maior
+    similaridade de Jaccard entre trigramas acima do limiar. Na similaridade só
+    concorrem chaves com os mesmos estados (sigla ou nome) do sindicato, para
+    que nomes parecidos de UFs diferentes não troquem de valor.
+    """
+
+    def __init__(self, valores_sindicato: Dict[str, float], similaridade_minima: Optional[float] = None):
+        self.limiar = settings.sindicato_similaridade_minima if similaridade_minima is None else similaridade_minima
+        self.chaves = list(valores_sindicato)
+        self.valores = np.array([float(v) for v in valores_sindicato.values()], dtype=float)
+        self.normalizadas = [normalizar_sindicato(c) for c in self.chaves]
+        self.estados = [estados(n) for n in self.normalizadas]
+        # UFs do sindicato -> chaves de outros estados (fora da similaridade)
+        self._outros_estados: Dict[frozenset, np.ndarray] = {}
+
+        # Chave normalizada -> posição (a última prevalece, como no dict de origem)
+        self.exatas = {n: i for i, n in enumerate(self.normalizadas) if n}
+        # Candidatas a "contida no nome": mais longas primeiro
+        self.por_tamanho = sorted(self.exatas.values(), key=lambda i: -len(self.normalizadas[i]))
+
+        # Índice invertido trigrama -> posições das chaves
+        self.tamanhos = np.zeros(len(self.chaves), dtype=np.int64)
+        postings: Dict[str, List[int]] = {}
+        for i, n in enumerate(self.normalizadas):
+            if not n:
+                continue
+            grams = trigramas(n)
+            self.tamanhos[i] = len(grams)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self.trigramas = {g: np.array(p, dtype=np.int64) for g, p in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.chaves)
+
+    def _resolver_um(self, normalizado: str):
+        """(posição da chave ou -1, tipo de correspondência, similaridade)"""
+        if not normalizado or not self.chaves:
+            return -1, '', 0.0
+        if normalizado in self.exatas:
+            return self.exatas[normalizado], EXATO, 1.0
+        for i in self.por_tamanho:
+            if _contem(normalizado, self.normalizadas[i]):
+                return i, CONTIDO, 1.0
+
+        grams = [g for g in trigramas(normalizado) if g in self.trigramas]
+        if not grams:
+            return -1, '', 0.0
+        comuns = np.bincount(np.concatenate([self.trigramas[g] for g in grams]), minlength=len(self.chaves))
+        jaccard = comuns / np.maximum(len(trigramas(normalizado)) + self.tamanhos - comuns, 1)
+        ufs = estados(normalizado)
+        if ufs not in self._outros_estados:
+            self._outros_estados[ufs] = np.array([e != ufs for e in self.estados], dtype=bool)
+        jaccard[self._outros_estados[ufs]] = 0.0
+        melhor = int(np.argmax(jaccard))
+        if jaccard[melhor] >= self.limiar:
+            return melhor, SIMILAR, float(jaccard[melhor])
+        return -1, '', float(jaccard[melhor])
+
+    def resolver(self, sindicatos: Iterable) -> pd.DataFrame:
+        """
+        Resolve sindicatos distintos (a entrada já deve ser deduplicada)
+
+        Returns:
+            DataFrame alinhado à entrada com CHAVE (chave da tabela ou None),
+            VALOR (NaN sem correspondência), CORRESPONDENCIA, SIMILARIDADE e SP
+        """
+        sindicatos = list(sindicatos)
+        normalizados = [normalizar_sindicato(s) for s in sindicatos]
+        resolvidos = [self._resolver_um(n) for n in normalizados]
+        posicoes = np.array([r[0] for r in resolvidos], dtype=np.int64)
+        encontrado = posicoes >= 0
+        return pd.DataFrame({
+            'SINDICATO': sindicatos,
+            'CHAVE': [self.chaves[p] if p >= 0 else None for p in posicoes],
+            'VALOR': np.where(encontrado, self.valores[np.maximum(posicoes, 0)] if len(self.chaves) else np.nan, np.nan),
+            'CORRESPONDENCIA': [r[1] for r in resolvidos],
+            'SIMILARIDADE': [r[2] for r in resolvidos],
+            'SP': [any(_contem(n, m) for m in MARCADORES_SP) for n in normalizados]
+        })
+
+
+# Índices por conteúdo da tabela de valores (montados uma vez por versão da tabela)
+_indices: Dict[tuple, IndiceSindicatos] = {}
+
+
+def indice_sindicatos(valores_sindicato: Optional[Dict[str, float]]) -> IndiceSindicatos:
+    """Índice da tabela de valores, reaproveitado enquanto o conteúdo e o limiar não mudarem"""
+    valores_sindicato = valores_sindicato or {}
+    chave = (tuple(valores_sindicato.items()), settings.sindicato_similaridade_minima)
+    if chave not in _indices:
+        if len(_indices) >= 16:
+            _indices.clear()
+        _indices[chave] = IndiceSindicatos(valores_sindicato)
+    return _indices[chave]
@@ -0,0 +1,353 @@
+"""
+Orçamento de tokens dos prompts
+Contagem com tiktoken (estimativa por caracteres se indisponível), uso por
+modelo e por execução, e compressão de esquema, amostras e descobertas
+anteriores para caber no orçamento configurado
+"""
+
+import contextvars
+import json
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from ..config.settings import settings
+
+# Sem tiktoken: ~4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+
+# Palavras da pergunta ignoradas no ranqueamento de tabelas e colunas
+PALAVRAS_IGNORADAS = {
+    'qual', 'quais', 'quanto', 'quantos', 'quantas', 'como', 'para', 'por', 'com', 'sem',
+    'dos', 'das', 'que', 'uma', 'um', 'the', 'todos', 'todas', 'cada', 'entre', 'maior',
+    'menor', 'total', 'media', 'lista', 'listar', 'mostre', 'mostrar', 'tabela', 'dados'
+}
+
+
+@lru_cache(maxsize=None)
+def _codificador(modelo: str):
+    """Codificação do tiktoken para o modelo (None = tiktoken indisponível)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return None
+
+
+def contar_tokens(texto: str, modelo: Optional[str] = None) -> int:
+    """Tokens do texto no modelo (padrão: OPENAI_MODEL)"""
+    if not texto:
+        return 0
+    codificador = _codificador(modelo or settings.openai_model)
+    if codificador is None:
+        return max(1, len(texto) // CARACTERES_POR_TOKEN)
+    return len(codificador.encode(texto, disallowed_special=()))
+
+
+def truncar(texto: str, orcamento: int, modelo: Optional[str] = None) -> str:
+    """Texto cortado para caber em `orcamento` tokens (0 = sem limite)"""
+    if orcamento <= 0 or contar_tokens(texto, modelo) <= orcamento:
+        return texto
+    codificador = _codificador(modelo or settings.openai_model)
+    if codificador is None:
+        return texto[:max(orcamento - 1, 0) * CARACTERES_POR_TOKEN] + '…'
+    tokens = codificador.encode(texto, disallowed_special=())
+    return codificador.decode(tokens[:max(orcamento - 1, 0)]) + '…'
+
+
+# ==================== USO ====================
+
+@dataclass
+class UsoTokens:
+    """Tokens consumidos (prompt e resposta) e poupados pelo cache"""
+    prompt: int = 0
+    resposta: int = 0
+    cache: int = 0
+    chamadas: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.prompt + self.resposta
+
+
+_lock = threading.Lock()
+_uso_modelos: Dict[str, UsoTokens] = {}
+_medidores: contextvars.ContextVar[Tuple[UsoTokens, ...]] = contextvars.ContextVar('medidores_tokens', default=())
+
+
+def uso_informado(resposta) -> Optional[Tuple[int, int]]:
+    """(prompt, resposta) informados pela API na resposta do LlamaIndex, se houver"""
+    extras = getattr(resposta, 'additional_kwargs', None) or {}
+    if 'prompt_tokens' in extras and 'completion_tokens' in extras:
+        return int(extras['prompt_tokens']), int(extras['completion_tokens'])
+    bruto = getattr(resposta, 'raw', None)
+    usage = bruto.get('usage') if isinstance(bruto, dict) else getattr(bruto, 'usage', None)
+    if usage is not None and not isinstance(usage, dict):
+        usage = {'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+                 'completion_tokens': getattr(usage, 'completion_tokens', None)}
+    prompt = (usage or {}).get('prompt_tokens')
+    completion = (usage or {}).get('completion_tokens')
+    if prompt is None or completion is None:
+        return None
+    return int(prompt), int(completion)
+
+
+def registrar_uso(modelo: str, prompt: int, resposta: int, cache: bool = False):
+    """
+    Soma uma chamada ao uso do modelo e às medições em andamento
+
+    Args:
+        modelo: Modelo chamado
+        prompt: Tokens do prompt
+        resposta: Tokens da resposta
+        cache: Resposta servida do cache (tokens contam como poupados)
+    """
+    with _lock:
+        for uso in (_uso_modelos.setdefault(modelo, UsoTokens()), *_medidores.get()):
+            uso.chamadas += 1
+            if cache:
+                uso.cache += prompt + resposta
+            else:
+                uso.prompt += prompt
+                uso.resposta += resposta
+
+
+@contextmanager
+def medir_tokens() -> Iterator[UsoTokens]:
+    """
+    Mede os tokens das chamadas feitas dentro do bloco (inclusive em
+    tarefas iniciadas por concurrent_tasks, que herdam o contexto)
+
+    Exemplo:
+        with medir_tokens() as uso:
+            executar_analise()
+        uso.total
+    """
+    uso = UsoTokens()
+    token = _medidores.set(_medidores.get() + (uso,))
+    try:
+        yield uso
+    finally:
+        _medidores.reset(token)
+
+
+def uso_tokens() -> List[Dict[str, Any]]:
+    """Tokens consumidos e poupados por modelo desde o início do processo"""
+    with _lock:
+        return [
+            {
+                'modelo': modelo,
+                'tokens_prompt': uso.prompt,
+                'tokens_resposta': uso.resposta,
+                'tokens_poupados_cache': uso.cache,
+                'tokens_por_chamada': uso.total / max(uso.chamadas, 1)
+            }
+            for modelo, uso in sorted(_uso_modelos.items())
+        ]
+
+
+# ==================== COMPRESSÃO ====================
+
+def _termos(texto: str) -> set:
+    """Palavras normalizadas (sem acento, minúsculas) com 3+ letras"""
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii').lower()
+    return {t for t in re.split(r'[^a-z0-9]+', texto) if len(t) >= 3 and t not in PALAVRAS_IGNORADAS}
+
+
+def _relevancia(nome: str, termos: set) -> int:
+    """Termos da pergunta presentes no nome (prefixos comuns de 4+ letras contam)"""
+    pontos = 0
+    for parte in _termos(nome):
+        for termo in termos:
+            if parte == termo or (min(len(parte), len(termo)) >= 4 and (parte.startswith(termo) or termo.startswith(parte))):
+                pontos += 1
+                break
+    return pontos
+
+
+def comprimir_esquema(tabelas_info: List[Dict[str, Any]], pergunta: str = '',
+                      orcamento: Optional[int] = None, modelo: Optional[str] = None) -> str:
+    """
+    Contexto do esquema para o LLM dentro do orçamento de tokens
+
+    Tabelas e colunas são ordenadas pela relação com a pergunta; primeiro entram
+    o cabeçalho, as chaves e as colunas citadas de cada tabela, depois as demais
+    colunas até o orçamento. O que não couber é resumido em contagens.
+
+    Args:
+        tabelas_info: Saídas de db.get_table_info
+        pergunta: Pergunta do usuário (ranqueamento)
+        orcamento: Tokens disponíveis (padrão: LLM_TOKENS_ESQUEMA; 0 = sem limite)
+        modelo: Modelo da contagem (padrão: OPENAI_MODEL)
+
+    Returns:
+        Texto no formato "Tabela: / Registros: / Colunas:"
+    """
+    orcamento = settings.llm_tokens_esquema if orcamento is None else orcamento
+    termos = _termos(pergunta)
+    contexto = "Esquema do banco de dados SQLite:\n\n"
+
+    tabelas = []
+    for posicao, info in enumerate(tabelas_info):
+        if not info:
+            continue
+        colunas = []
+        for col in info['columns']:
+            pk_indicator = " (PRIMARY KEY)" if col['primary_key'] else ""
+            null_indicator = " NOT NULL" if col['not_null'] else ""
+            pontos = _relevancia(col['name'], termos)
+            colunas.append((col['primary_key'], pontos, f"  - {col['name']}: {col['type']}{pk_indicator}{null_indicator}\n"))
+        pontos_tabela = 2 * _relevancia(info['table_name'], termos) + sum(c[1] for c in colunas)
+        tabelas.append({
+            'posicao': posicao,
+            'pontos': pontos_tabela,
+            'cabecalho': f"Tabela: {info['table_name']}\nRegistros: {info['total_rows']}\nColunas:\n",
+            'colunas': colunas,
+            'incluida': False,
+            'incluidas': []
+        })
+
+    if orcamento <= 0:
+        for tabela in tabelas:
+            contexto += tabela['cabecalho'] + ''.join(c[2] for c in tabela['colunas']) + "\n"
+        return contexto
+
+    tabelas.sort(key=lambda t: (-t['pontos'], t['posicao']))
+    # Reserva fixa para a linha de tabelas omitidas; a linha de colunas
+    # omitidas entra no custo de cada tabela incluída
+    restante = orcamento - contar_tokens(contexto, modelo) - 12
+    custo_linha_omitidas = contar_tokens("  - ... (+999 colunas omitidas)\n", modelo)
+
+    # 1ª passada: cabeçalho, chaves e colunas citadas, na ordem de relevância
+    omitidas = []
+    for tabela in tabelas:
+        custo = contar_tokens(tabela['cabecalho'], modelo) + 1 + custo_linha_omitidas
+        if custo > restante:
+            omitidas.append(tabela)
+            continue
+        restante -= custo
+        tabela['incluida'] = True
+        for indice, (chave, pontos, linha) in enumerate(tabela['colunas']):
+            if chave or pontos:
+                custo = contar_tokens(linha, modelo)
+                if custo <= restante:
+                    restante -= custo
+                    tabela['incluidas'].append(indice)
+
+    # 2ª passada: demais colunas das tabelas incluídas
+    for tabela in tabelas:
+        if not tabela['incluida']:
+            continue
+        for indice, (_, _, linha) in enumerate(tabela['colunas']):
+            if indice in tabela['incluidas']:
+                continue
+            custo = contar_tokens(linha, modelo)
+            if custo > restante:
+                break
+            restante -= custo
+            tabela['incluidas'].append(indice)
+
+    for tabela in tabelas:
+        if not tabela['incluida']:
+            continue
+        contexto += tabela['cabecalho']
+        contexto += ''.join(tabela['colunas'][i][2] for i in sorted(tabela['incluidas']))
+        faltando = len(tabela['colunas']) - len(tabela['incluidas'])
+        if faltando:
+            contexto += f"  - ... (+{faltando} colunas omitidas)\n"
+        contexto += "\n"
+
+    if omitidas:
+        nomes = ', '.join(t['cabecalho'].split('\n')[0].replace('Tabela: ', '') for t in omitidas)
+        contexto += truncar(f"Outras tabelas (esquema omitido): {nomes}\n", 12 + max(restante, 0), modelo)
+
+    return contexto
+
+
+def comprimir_amostra(df: pd.DataFrame, orcamento: Optional[int] = None, linhas: int = 5,
+                      modelo: Optional[str] = None) -> Dict[str, Dict[Any, Any]]:
+    """
+    Amostra df.head(linhas).to_dict() dentro do orçamento de tokens
+
+    Mantém todas as colunas; reduz o número de linhas e depois o tamanho dos
+    textos até caber.
+
+    Args:
+        df: DataFrame de origem
+        orcamento: Tokens disponíveis (padrão: LLM_TOKENS_AMOSTRA; 0 = sem limite)
+        linhas: Linhas máximas da amostra
+        modelo: Modelo da contagem (padrão: OPENAI_MODEL)
+    """
+    orcamento = settings.llm_tokens_amostra if orcamento is None else orcamento
+    amostra = df.head(linhas)
+    if orcamento <= 0:
+        return amostra.to_dict()
+
+    def custo(dados) -> int:
+        return contar_tokens(json.dumps(dados, ensure_ascii=False, default=str), modelo)
+
+    for limite_texto in (80, 30, 12):
+        cortada = amostra.apply(
+            lambda s: s.map(lambda v: v[:limite_texto] if isinstance(v, str) else v)
+            if s.dtype == object else s
+        )
+        for n in range(len(cortada), 0, -1):
+            dados = cortada.head(n).to_dict()
+            if custo(dados) <= orcamento:
+                return dados
+    return cortada.head(1).to_dict()
+
+
+def comprimir_achados(linhas: List[str], orcamento: Optional[int] = None,
+                      modelo: Optional[str] = None) -> str:
+    """
+    Resumo das descobertas anteriores dentro do orçamento de tokens
+
+    Entram primeiro as descobertas mais recentes e as que não são erros; a
+    ordem original é mantida no texto final.
+
+    Args:
+        linhas: Uma linha por descoberta/resultado, em ordem cronológica
+        orcamento: Tokens disponíveis (padrão: LLM_TOKENS_ACHADOS; 0 = sem limite)
+        modelo: Modelo da contagem (padrão: OPENAI_MODEL)
+    """
+    orcamento = settings.llm_tokens_achados if orcamento is None else orcamento
+    if orcamento <= 0:
+        return '\n'.join(linhas)
+
+    def erro(linha: str) -> bool:
+        return 'erro' in linha.lower() or 'falha' in linha.lower()
+
+    prioridade = sorted(range(len(linhas)), key=lambda i: (erro(linhas[i]), -i))
+    # Nenhuma linha isolada ocupa mais que metade do orçamento
+    teto_linha = max(orcamento // 2, 1)
+    restante = orcamento - 12
+    escolhidas = {}
+    for i in prioridade:
+        linha = truncar(linhas[i], teto_linha, modelo)
+        custo = contar_tokens(linha, modelo) + 1
+        if custo > restante:
+            continue
+        restante -= custo
+        escolhidas[i] = linha
+
+    texto = '\n'.join(escolhidas[i] for i in sorted(escolhidas))
+    omitidas = len(linhas) - len(escolhidas)
+    if omitidas:
+        texto += f"\n- ... ({omitidas} resultado(s) omitido(s) por limite de contexto)"
+    return texto
@@ -0,0 +1,158 @@
+"""
+Cálculo de vale refeição em lote para um intervalo de competências
+Colaboradores, exclusões e valores por sindicato são resolvidos uma única vez;
+os dias elegíveis de todos os meses saem de uma só passada sobre a grade
+colaborador x competência, e o resultado é gravado em formato longo
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .business_calendar import BusinessCalendar, competencias_entre, get_business_calendar
+from .intervals import calcular_dias_colaboradores_meses
+from .money import centavos, reais
+from .vr_calculator import (
+    COLUNAS_RESULTADO, VALOR_OUTROS, VALOR_SP,
+    colunas_colaboradores, mapear_sindicatos, montar_resultado, motivos_exclusao
+)
+from .vr_incremental import TABELA_ADMISSAO, TABELA_BASE, regras_tabelas, unir_admissoes
+
+TABELA_LOTE = 'calculo_vr_lote'
+TABELA_LOTE_TOTAIS = 'calculo_vr_lote_totais'
+
+COLUNAS_LOTE = ['COMPETENCIA'] + COLUNAS_RESULTADO
+COLUNAS_TOTAIS = [
+    'COMPETENCIA', 'TOTAL_COLABORADORES', 'TOTAL_ELEGIVEIS', 'TOTAL_EXCLUIDOS',
+    'ELEGIVEIS_SP', 'ELEGIVEIS_OUTROS', 'DIAS_ELEGIVEIS',
+    'VALOR_TOTAL_GERAL', 'VALOR_TOTAL_SP', 'VALOR_TOTAL_OUTROS'
+]
+
+
+def calcular_vale_refeicao_meses(colaboradores_df: pd.DataFrame,
+                                 competencias: Iterable[str],
+                                 exclusoes: Optional[Dict[str, Iterable]] = None,
+                                 valores_sindicato: Optional[Dict[str, float]] = None,
+                                 tabelas_ausencia: Optional[Dict[str, pd.DataFrame]] = None,
+                                 calendario: Optional[BusinessCalendar] = None,
+                                 valor_sp: float = VALOR_SP,
+                                 valor_outros: float = VALOR_OUTROS,
+                                 total_colaboradores: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Calcula vale refeição de todos os colaboradores em várias competências
+
+    Cada competência produz o mesmo resultado de calcular_vale_refeicao com os
+    dias de calcular_dias_colaboradores naquele mês.
+
+    Args:
+        colaboradores_df: Colaboradores (ativos + admissões)
+        competencias: Meses de referência (YYYY-MM)
+        exclusoes: Dict tabela -> matrículas excluídas (ordem define o motivo)
+        valores_sindicato: Dict sindicato -> valor diário da tabela de sindicatos
+        tabelas_ausencia: Dict nome -> DataFrame de férias/afastamentos/desligados
+        total_colaboradores: Total por competência nos totais (padrão: len(colaboradores_df))
+
+    Returns:
+        Tupla (resultado longo com COLUNAS_LOTE, totais por competência com COLUNAS_TOTAIS)
+    """
+    competencias = list(competencias)
+    m = len(competencias)
+
+    # Regras que não dependem do mês: uma vez por colaborador / sindicato distinto
+    matriculas, nomes, sindicatos = colunas_colaboradores(colaboradores_df)
+    motivo = motivos_exclusao(matriculas, exclusoes)
+    codes, sp_unicos, estados_unicos, valores_unicos = mapear_sindicatos(
+        sindicatos, valores_sindicato, valor_sp, valor_outros
+    )
+
+    dias_df = calcular_dias_colaboradores_meses(colaboradores_df, competencias, tabelas_ausencia, calendario)
+
+    def repetir(valores) -> np.ndarray:
+        return np.tile(np.asarray(valores, dtype=object), m)
+
+    resultado_df, _ = montar_resultado(
+        pd.Series(repetir(matriculas)), pd.Series(repetir(nomes)), pd.Series(repetir(sindicatos)),
+        repetir(motivo),
+        estado=repetir(estados_unicos[codes]),
+        estado_base=repetir(np.where(sp_unicos[codes], 'SP', 'OUTROS')),
+        valor_diario=np.tile(valores_unicos[codes], m),
+        dias_uteis=dias_df['DIAS_ELEGIVEL'].to_numpy(),
+        motivos_dias=dias_df['MOTIVO'].to_numpy()
+    )
+    resultado_df.insert(0, 'COMPETENCIA', dias_df['COMPETENCIA'].to_numpy())
+
+    total = total_colaboradores if total_colaboradores is not None else len(colaboradores_df)
+    return resultado_df, totais_por_competencia(resultado_df, total)
+
+
+def totais_por_competencia(resultado_df: pd.DataFrame, total_colaboradores: int) -> pd.DataFrame:
+    """Totais de cada competência (mesmas regras de calcular_estatisticas) em um único groupby"""
+    elegivel = resultado_df['STATUS'] == 'ELEGÍVEL'
+    sp = elegivel & (resultado_df['ESTADO'] == 'SP')
+    outros = elegivel & (resultado_df['ESTADO'] == 'OUTROS')
+    valor = pd.Series(centavos(resultado_df['VALOR_TOTAL_VR']), index=resultado_df.index).where(elegivel, 0)
+
+    totais = pd.DataFrame({
+        'COMPETENCIA': resultado_df['COMPETENCIA'],
+        'TOTAL_ELEGIVEIS': elegivel.astype(np.int64),
+        'TOTAL_EXCLUIDOS': (~elegivel).astype(np.int64),
+        'ELEGIVEIS_SP': sp.astype(np.int64),
+        'ELEGIVEIS_OUTROS': outros.astype(np.int64),
+        'DIAS_ELEGIVEIS': resultado_df['DIAS_ELEGIVEL'].astype(np.int64),
+        'VALOR_TOTAL_GERAL': valor,
+        'VALOR_TOTAL_SP': valor.where(sp, 0),
+        'VALOR_TOTAL_OUTROS': valor.where(outros, 0)
+    }).groupby('COMPETENCIA', sort=False).sum().reset_index()
+
+    for coluna in ('VALOR_TOTAL_GERAL', 'VALOR_TOTAL_SP', 'VALOR_TOTAL_OUTROS'):
+        totais[coluna] = reais(totais[coluna])
+
+    totais.insert(1, 'TOTAL_COLABORADORES', total_colaboradores)
+    return totais[COLUNAS_TOTAIS]
+
+
+def calcular_lote(tabelas: Dict[str, pd.DataFrame], competencia_inicio: str, competencia_fim: str,
+                  calendario: Optional[BusinessCalendar] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Cálculo em lote a partir das tabelas de origem já carregadas
+
+    Args:
+        tabelas: Tabelas de origem (nome -> DataFrame); 'ativos' é obrigatória
+        competencia_inicio, competencia_fim: Intervalo de competências (inclusive)
+
+    Returns:
+        Tupla (resultado longo, totais por competência)
+    """
+    competencias = competencias_entre(competencia_inicio, competencia_fim)
+    ativos_df = tabelas[TABELA_BASE]
+    colaboradores_df = unir_admissoes(ativos_df, tabelas.get(TABELA_ADMISSAO))
+    exclusoes, ausencias, valores_sindicato = regras_tabelas(tabelas)
+
+    return calcular_vale_refeicao_meses(
+        colaboradores_df, competencias,
+        exclusoes=exclusoes,
+        valores_sindicato=valores_sindicato,
+        tabelas_ausencia=ausencias,
+        calendario=calendario or get_business_calendar(),
+        total_colaboradores=len(ativos_df)
+    )
+
+
+def salvar_lote(engine, resultado_df: pd.DataFrame, totais_df: pd.DataFrame):
+    """Substitui no banco o resultado e os totais das competências calculadas"""
+    competencias: List[str] = totais_df['COMPETENCIA'].tolist()
+    gerado_em = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    with engine.begin() as conn:
+        for tabela in (TABELA_LOTE, TABELA_LOTE_TOTAIS):
+            conn.execute(
+                text(f"DELETE FROM {tabela} WHERE COMPETENCIA = :c"),
+                [{'c': c} for c in competencias]
+            )
+        resultado_df[COLUNAS_LOTE].to_sql(TABELA_LOTE, conn, if_exists='append', index=False, chunksize=50000)
+        totais_df[COLUNAS_TOTAIS].assign(GERADO_EM=gerado_em).to_sql(
+            TABELA_LOTE_TOTAIS, conn, if_exists='append', index=False
+        )
@@ -0,0 +1,249 @@
+"""
+Cálculo vetorizado de vale refeição
+Regras de elegibilidade e valores aplicadas com joins e máscaras do pandas,
+sem laço por colaborador
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .money import centavos, multiplicar, reais
+from .sindicatos import eh_sp, indice_sindicatos
+
+# Valores diários padrão por estado (derivado do sindicato)
+VALOR_SP = 37.50
+VALOR_OUTROS = 35.00
+
+# Dias úteis padrão do mês de competência
+DIAS_UTEIS_PADRAO = 22
+
+# Tabelas de exclusão, em ordem de prioridade do motivo
+TABELAS_EXCLUSAO = ['ferias', 'afastamentos', 'aprendiz', 'exterior', 'desligados']
+
+# Tabelas cujos períodos reduzem os dias elegíveis (proporcional) em vez de excluir
+TABELAS_PRORRATEIO = ['ferias', 'afastamentos', 'desligados']
+
+COLUNAS_RESULTADO = [
+    'MATRICULA', 'NOME', 'SINDICATO', 'ESTADO', 'STATUS',
+    'MOTIVO_EXCLUSAO', 'DIAS_ELEGIVEL', 'VALOR_DIARIO', 'VALOR_TOTAL_VR'
+]
+
+
+def sindicato_eh_sp(sindicatos: pd.Series) -> pd.Series:
+    """Identifica sindicatos de São Paulo pelo nome normalizado (sigla SP como palavra ou 'SAO PAULO')"""
+    return pd.Series(eh_sp(sindicatos), index=sindicatos.index)
+
+
+def mapear_sindicatos(sindicatos: pd.Series, valores_sindicato: Optional[Dict[str, float]] = None,
+                      valor_sp: float = VALOR_SP,
+                      valor_outros: float = VALOR_OUTROS) -> Tuple[np.ndarray, ...]:
+    """
+    Calcula estado e valor diário uma única vez por sindicato distinto
+
+    Os sindicatos distintos são resolvidos pelo índice da tabela de valores
+    (nome normalizado, chave contida ou trigramas); as linhas só carregam o código.
+
+    Returns:
+        Tupla (códigos por linha, é SP, ESTADO e VALOR_DIARIO por sindicato distinto)
+    """
+    codes, uniques = pd.factorize(sindicatos, sort=False)
+    resolvidos = indice_sindicatos(valores_sindicato).resolver(uniques)
+
+    is_sp = resolvidos['SP'].to_numpy(dtype=bool)
+    estados = np.where(is_sp, 'SP', 'OUTROS').astype(object)
+    valores = np.where(is_sp, valor_sp, valor_outros).astype(float)
+
+    # Valor específico da tabela base_sindicato_x_valor sobrescreve o padrão
+    if valores_sindicato:
+        tabela = resolvidos['VALOR'].to_numpy(dtype=float)
+        override = ~np.isnan(tabela) & (np.nan_to_num(tabela) > 0)
+        valores = np.where(override, tabela, valores)
+        estados = np.where(
+            override,
+            estados + ' (Tabela: R$ ' + pd.Series(tabela).astype(str).to_numpy() + ')',
+            estados
+        )
+
+    return codes, is_sp, estados, valores
+
+
+def calcular_vale_refeicao(colaboradores_df: pd.DataFrame,
+                           exclusoes: Optional[Dict[str, Iterable]] = None,
+                           valores_sindicato: Optional[Dict[str, float]] = None,
+                           dias_uteis: Union[int, np.ndarray, pd.Series] = DIAS_UTEIS_PADRAO,
+                           valor_sp: float = VALOR_SP,
+                           valor_outros: float = VALOR_OUTROS,
+                           total_colaboradores: Optional[int] = None,
+                           motivos_dias: Optional[Iterable] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Calcula vale refeição para todos os colaboradores de uma vez
+
+    Args:
+        colaboradores_df: Colaboradores (ativos + admissões) com MATRICULA, NOME, SINDICATO
+        exclusoes: Dict tabela -> matrículas excluídas (ordem define o motivo)
+        valores_sindicato: Dict sindicato -> valor diário da tabela de sindicatos
+        dias_uteis: Dias úteis do mês (único ou um valor por colaborador)
+        valor_sp: Valor diário para sindicatos de SP
+        valor_outros: Valor diário para os demais
+        total_colaboradores: Total usado nas estatísticas (padrão: len(colaboradores_df))
+        motivos_dias: Motivo por colaborador quando os dias elegíveis chegam a zero
+            (ex.: FERIAS no mês inteiro); esses colaboradores passam a EXCLUÍDO
+
+    Returns:
+        Tupla (DataFrame de resultado, estatísticas)
+    """
+    matriculas, nomes, sindicatos = colunas_colaboradores(colaboradores_df)
+    motivo = motivos_exclusao(matriculas, exclusoes)
+
+    # Estado e valor por sindicato distinto, expandidos por código
+    codes, sp_unicos, estados_unicos, valores_unicos = mapear_sindicatos(
+        sindicatos, valores_sindicato, valor_sp, valor_outros
+    )
+
+    return montar_resultado(
+        matriculas, nomes, sindicatos, motivo,
+        estado=estados_unicos[codes],
+        estado_base=np.where(sp_unicos[codes], 'SP', 'OUTROS'),
+        valor_diario=valores_unicos[codes],
+        dias_uteis=dias_uteis,
+        motivos_dias=motivos_dias,
+        total_colaboradores=total_colaboradores
+    )
+
+
+def motivos_exclusao(matriculas: pd.Series, exclusoes: Optional[Dict[str, Iterable]] = None) -> pd.Series:
+    """Anti-join com as tabelas de exclusão: o primeiro motivo encontrado prevalece"""
+    motivo = pd.Series([''] * len(matriculas), dtype=object)
+    for tabela, matriculas_excluidas in (exclusoes or {}).items():
+        if isinstance(matriculas_excluidas, (set, frozenset)):
+            matriculas_excluidas = list(matriculas_excluidas)
+        excluidas = pd.Index(matriculas_excluidas).astype(str).unique()
+        hit = matriculas.isin(excluidas) & (motivo == '')
+        motivo = motivo.mask(hit, tabela.upper())
+    return motivo
+
+
+def colunas_colaboradores(colaboradores_df: pd.DataFrame) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """MATRICULA, NOME e SINDICATO como texto (com padrões quando a coluna não existe)"""
+    n = len(colaboradores_df)
+
+    def coluna(nome: str, padrao: str) -> pd.Series:
+        if nome in colaboradores_df.columns:
+            return colaboradores_df[nome].fillna(padrao).astype(str).reset_index(drop=True)
+        return pd.Series([padrao] * n, dtype=object)
+
+    return coluna('MATRICULA', ''), coluna('NOME', 'Nome não informado'), coluna('SINDICATO', '')
+
+
+def montar_resultado(matriculas: pd.Series, nomes: pd.Series, sindicatos: pd.Series,
+                     motivo: pd.Series, estado: np.ndarray, estado_base: np.ndarray,
+                     valor_diario: np.ndarray,
+                     dias_uteis: Union[int, np.ndarray, pd.Series] = DIAS_UTEIS_PADRAO,
+                     motivos_dias: Optional[Iterable] = None,
+                     total_colaboradores: Optional[int] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Aplica dias elegíveis e exclusões e monta o resultado no formato COLUNAS_RESULTADO
+
+    Args:
+        motivo: Motivo de exclusão por colaborador ('' = sem exclusão)
+        estado: ESTADO dos elegíveis (pode incluir o valor da tabela de sindicatos)
+        estado_base: ESTADO informativo dos excluídos ('SP' ou 'OUTROS')
+        valor_diario: Valor diário dos elegíveis
+
+    Returns:
+        Tupla (DataFrame de resultado, estatísticas)
+    """
+    n = len(matriculas)
+    motivo = pd.Series(np.asarray(motivo, dtype=object))
+
+    # Sem dias elegíveis na competência (ausência no mês inteiro, admissão posterior...)
+    dias_uteis = np.broadcast_to(np.asarray(dias_uteis), (n,))
+    if motivos_dias is not None:
+        sem_dias = (motivo == '').to_numpy() & (dias_uteis <= 0)
+        motivos_dias = pd.Series(np.asarray(motivos_dias, dtype=object)).replace('', 'SEM_DIAS_UTEIS')
+        motivo = motivo.mask(sem_dias, motivos_dias)
+    excluido = (motivo != '').to_numpy()
+
+    # Excluídos: estado informativo sem o valor da tabela, valores zerados
+    estado = np.where(excluido, estado_base, estado)
+    valor_diario = np.where(excluido, 0, centavos(valor_diario))
+    dias = np.where(excluido, 0, dias_uteis)
+
+    resultado_df = pd.DataFrame({
+        'MATRICULA': matriculas,
+        'NOME': nomes,
+        'SINDICATO': sindicatos,
+        'ESTADO': estado,
+        'STATUS': np.where(excluido, 'EXCLUÍDO', 'ELEGÍVEL'),
+        'MOTIVO_EXCLUSAO': motivo,
+        'DIAS_ELEGIVEL': dias,
+        'VALOR_DIARIO': reais(valor_diario),
+        'VALOR_TOTAL_VR': reais(multiplicar(valor_diario, dias))
+    }, columns=COLUNAS_RESULTADO)
+
+    estatisticas = calcular_estatisticas(
+        resultado_df, total_colaboradores if total_colaboradores is not None else n
+    )
+    return resultado_df, estatisticas
+
+
+def calcular_estatisticas(resultado_df: pd.DataFrame, total_colaboradores: int) -> Dict:
+    """Estatísticas consolidadas do cálculo via groupby (somas em centavos)"""
+    elegiveis = resultado_df[resultado_df['STATUS'] == 'ELEGÍVEL']
+    total_elegiveis = len(elegiveis)
+    total_excluidos = len(resultado_df) - total_elegiveis
+
+    valores = pd.Series(centavos(elegiveis['VALOR_TOTAL_VR']), index=elegiveis.index)
+    por_estado = valores.groupby(elegiveis['ESTADO']).agg(['count', 'sum'])
+    elegiveis_sp = int(por_estado['count'].get('SP', 0))
+    elegiveis_outros = int(por_estado['count'].get('OUTROS', 0))
+    valor_total_geral = float(reais(valores.sum()))
+
+    return {
+        'total_colaboradores': total_colaboradores,
+        'total_elegiveis': total_elegiveis,
+        'total_excluidos': total_excluidos,
+        'elegiveis_sp': elegiveis_sp,
+        'elegiveis_outros': elegiveis_outros,
+        'valor_total_geral': valor_total_geral,
+        'valor_total_sp': float(reais(por_estado['sum'].get('SP', 0))),
+        'valor_total_outros': float(reais(por_estado['sum'].get('OUTROS', 0))),
+        'valor_medio_por_elegivel': valor_total_geral / total_elegiveis if total_elegiveis > 0 else 0,
+        'percentual_elegiveis': (total_elegiveis / total_colaboradores * 100) if total_colaboradores > 0 else 0,
+        'percentual_sp': (elegiveis_sp / total_elegiveis * 100) if total_elegiveis > 0 else 0
+    }
+
+
+def colunas_valor_sindicato(colunas: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Colunas de sindicato e de valor da tabela base_sindicato_x_valor (pelo nome)"""
+    sindicato_col = next(
+        (col for col in colunas
+         if any(term in col.lower() for term in ['sindicato', 'sindic', 'categoria', 'tipo'])),
+        None
+    )
+    valor_col = next(
+        (col for col in colunas
+         if any(term in col.lower() for term in ['valor', 'preco', 'price', 'amount', 'vr'])),
+        None
+    )
+    return sindicato_col, valor_col
+
+
+def carregar_valores_sindicato(sindicato_df: pd.DataFrame) -> Tuple[Dict[str, float], Optional[str], Optional[str]]:
+    """
+    Extrai o mapa sindicato -> valor diário da tabela base_sindicato_x_valor
+
+    Returns:
+        Tupla (valores por sindicato, coluna de sindicato, coluna de valor)
+    """
+    sindicato_col, valor_col = colunas_valor_sindicato(list(sindicato_df.columns))
+
+    if not (sindicato_col and valor_col):
+        return {}, sindicato_col, valor_col
+
+    valores = pd.to_numeric(sindicato_df[valor_col], errors='coerce')
+    chaves = sindicato_df[sindicato_col].astype(str).str.strip()
+    validos = valores.notna()
+    return dict(zip(chaves[validos], valores[validos].astype(float))), sindicato_col, valor_col
@@ -0,0 +1,284 @@
+"""
+Execuções persistidas do cálculo de vale refeição
+Cada execução é gravada como Parquet compacto (textos como dicionário, valores
+em centavos) com a chave (configuração, competência, versão dos dados); duas
+execuções são comparadas por MATRICULA em um único merge vetorizado
+"""
+
+import hashlib
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .money import CENTAVOS_POR_REAL, centavos, reais
+from .vr_calculator import COLUNAS_RESULTADO
+
+TABELA_EXECUCOES = 'calculo_vr_execucoes'
+
+# Colunas de metadados da importação (não mudam a versão dos dados)
+COLUNAS_METADADOS = ['created_at', 'updated_at']
+
+COLUNAS_TEXTO = ['SINDICATO', 'ESTADO', 'STATUS', 'MOTIVO_EXCLUSAO']
+COLUNAS_VALOR = ['VALOR_DIARIO', 'VALOR_TOTAL_VR']
+
+# Colunas comparadas entre execuções
+COLUNAS_COMPARADAS = ['SINDICATO', 'ESTADO', 'STATUS', 'MOTIVO_EXCLUSAO', 'DIAS_ELEGIVEL', 'VALOR_DIARIO', 'VALOR_TOTAL_VR']
+
+
+def _q(identificador: str) -> str:
+    """Identificador SQL entre aspas duplas"""
+    return '"' + str(identificador).replace('"', '""') + '"'
+
+
+class _SomaHashes:
+    """Agregado SQLite: soma (módulo 2^64) do hash de cada linha, independente da ordem"""
+
+    def __init__(self):
+        self.soma = 0
+
+    def step(self, *valores):
+        digest = hashlib.blake2b(repr(valores).encode('utf-8'), digest_size=8).digest()
+        self.soma = (self.soma + int.from_bytes(digest, 'little')) % 2 ** 64
+
+    def finalize(self) -> str:
+        # Texto: a soma não cabe em INTEGER com sinal do SQLite
+        return str(self.soma)
+
+
+def versao_dados(engine, tabelas: Iterable[str], parametros: Optional[list] = None,
+                 calendario=None) -> str:
+    """
+    Versão dos dados de origem: hash do esquema e das linhas de cada tabela
+
+    Calculada no SQLite (contagem e soma dos hashes das linhas em um agregado),
+    sem carregar as tabelas no pandas. A soma independe da ordem; colunas de
+    metadados da importação são ignoradas, então reimportar o mesmo conteúdo
+    mantém a versão.
+
+    Args:
+        parametros: Parâmetros do cálculo que também distinguem a versão (ex.: VERSAO_CALCULO)
+        calendario: BusinessCalendar cujos feriados entram na versão
+    """
+    parametros = list(parametros or [])
+    if calendario is not None:
+        parametros.append([calendario.nacionais, calendario.estaduais, calendario.municipais])
+    h = hashlib.sha256(json.dumps(parametros, sort_keys=True, default=str).encode('utf-8'))
+    with engine.connect() as conn:
+        conn.connection.driver_connection.create_aggregate('vr_soma_hashes', -1, _SomaHashes)
+        for tabela in sorted(tabelas):
+            colunas = [
+                linha[1] for linha in conn.execute(text(f"PRAGMA table_info({_q(tabela)})"))
+                if linha[1] not in COLUNAS_METADADOS
+            ]
+            linhas, soma = conn.execute(text(
+                f"SELECT COUNT(*), vr_soma_hashes({', '.join(_q(c) for c in colunas)}) FROM {_q(tabela)}"
+            )).one() if colunas else (0, None)
+            h.update(json.dumps([tabela, [str(c) for c in colunas], linhas, soma or '0']).encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def serializar_resultado(resultado_df: pd.DataFrame) -> bytes:
+    """Resultado em Parquet (zstd): textos repetidos como categoria, valores em centavos (int64)"""
+    df = resultado_df[COLUNAS_RESULTADO].copy()
+    df['MATRICULA'] = df['MATRICULA'].astype(str)
+    df['NOME'] = df['NOME'].astype(str)
+    for coluna in COLUNAS_TEXTO:
+        df[coluna] = df[coluna].fillna('').astype(str).astype('category')
+    df['DIAS_ELEGIVEL'] = pd.to_numeric(df['DIAS_ELEGIVEL'], errors='coerce').fillna(0).astype(np.int32)
+    for coluna in COLUNAS_VALOR:
+        df[coluna] = centavos(df[coluna])
+
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, compression='zstd')
+    return buffer.getvalue()
+
+
+def desserializar_resultado(dados: bytes) -> pd.DataFrame:
+    """Resultado gravado por serializar_resultado (valores de volta em reais)"""
+    df = pd.read_parquet(io.BytesIO(dados))
+    for coluna in COLUNAS_TEXTO:
+        df[coluna] = df[coluna].astype(str)
+    df['DIAS_ELEGIVEL'] = df['DIAS_ELEGIVEL'].astype(np.int64)
+    for coluna in COLUNAS_VALOR:
+        df[coluna] = reais(df[coluna])
+    return df[COLUNAS_RESULTADO]
+
+
+def salvar_execucao(engine, resultado_df: pd.DataFrame, configuracao: str,
+                    competencia: str, versao: str) -> int:
+    """
+    Grava a execução (substitui a de mesma configuração, competência e versão)
+
+    Returns:
+        ID da execução
+    """
+    elegiveis = resultado_df['STATUS'] == 'ELEGÍVEL'
+    registro = {
+        'configuracao': configuracao or '',
+        'competencia': competencia,
+        'versao': versao,
+        'gerado_em': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'registros': len(resultado_df),
+        'elegiveis': int(elegiveis.sum()),
+        'valor_total': float(reais(centavos(resultado_df.loc[elegiveis, 'VALOR_TOTAL_VR']).sum())),
+        'resultado': serializar_resultado(resultado_df)
+    }
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"DELETE FROM {TABELA_EXECUCOES} "
+            "WHERE CONFIGURACAO = :configuracao AND COMPETENCIA = :competencia AND VERSAO_DADOS = :versao"
+        ), registro)
+        conn.execute(text(
+            f"INSERT INTO {TABELA_EXECUCOES} "
+            "(CONFIGURACAO, COMPETENCIA, VERSAO_DADOS, GERADO_EM, REGISTROS, ELEGIVEIS, VALOR_TOTAL, RESULTADO) "
+            "VALUES (:configuracao, :competencia, :versao, :gerado_em, :registros, :elegiveis, :valor_total, :resultado)"
+        ), registro)
+        return int(conn.execute(text("SELECT last_insert_rowid()")).scalar())
+
+
+def salvar_execucoes_competencias(engine, resultado_df: pd.DataFrame, configuracao: str,
+                                  competencia: str, versao: str) -> Dict[str, int]:
+    """
+    Grava uma execução por competência (resultado em lote tem a coluna COMPETENCIA)
+
+    Returns:
+        Dict competência -> ID da execução
+    """
+    if 'COMPETENCIA' not in resultado_df.columns:
+        return {competencia: salvar_execucao(engine, resultado_df, configuracao, competencia, versao)}
+    return {
+        c: salvar_execucao(engine, grupo, configuracao, c, versao)
+        for c, grupo in resultado_df.groupby('COMPETENCIA', sort=True)
+    }
+
+
+def listar_execucoes(engine, configuracao: Optional[str] = None) -> pd.DataFrame:
+    """Execuções gravadas (sem o resultado), da mais recente para a mais antiga"""
+    filtro, params = '', {}
+    if configuracao is not None:
+        filtro, params = 'WHERE CONFIGURACAO = :configuracao', {'configuracao': configuracao}
+    return pd.read_sql(text(
+        "SELECT ID, CONFIGURACAO, COMPETENCIA, VERSAO_DADOS, GERADO_EM, REGISTROS, ELEGIVEIS, VALOR_TOTAL "
+        f"FROM {TABELA_EXECUCOES} {filtro} ORDER BY COMPETENCIA DESC, GERADO_EM DESC, ID DESC"
+    ), engine, params=params)
+
+
+def carregar_execucao(engine, execucao_id: int) -> pd.DataFrame:
+    """Resultado de uma execução gravada"""
+    with engine.connect() as conn:
+        dados = conn.execute(
+            text(f"SELECT RESULTADO FROM {TABELA_EXECUCOES} WHERE ID = :id"), {'id': int(execucao_id)}
+        ).scalar()
+    if dados is None:
+        raise ValueError(f"Execução {execucao_id} não encontrada")
+    return desserializar_resultado(dados)
+
+
+def _colunas(resultado_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Colunas comparadas como arrays (textos sem nulos, dias inteiros, valores em centavos)"""
+    colunas = {'NOME': resultado_df['NOME'].to_numpy(dtype=object)}
+    for coluna in COLUNAS_TEXTO:
+        colunas[coluna] = resultado_df[coluna].fillna('').astype(str).to_numpy(dtype=object)
+    colunas['DIAS_ELEGIVEL'] = pd.to_numeric(resultado_df['DIAS_ELEGIVEL'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+    for coluna in COLUNAS_VALOR:
+        colunas[coluna] = centavos(resultado_df[coluna])
+    return colunas
+
+
+def _tomar(valores: np.ndarray, posicoes: np.ndarray, presente: np.ndarray, ausente) -> np.ndarray:
+    """valores[posicoes], com o valor ausente onde a matrícula não está na execução"""
+    tomados = valores[np.maximum(posicoes, 0)] if len(valores) else np.zeros(len(posicoes), dtype=valores.dtype)
+    if ausente is None:
+        return tomados
+    tomados = tomados.astype(object if valores.dtype == object else float)
+    tomados[~presente] = ausente
+    return tomados
+
+
+def comparar_execucoes(anterior_df: pd.DataFrame, atual_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Compara duas execuções por MATRICULA
+
+    As matrículas das duas execuções são fatoradas juntas uma vez; as colunas
+    são alinhadas por posição e as diferenças saem de uma máscara por coluna.
+
+    Returns:
+        Dict com entraram, sairam e alterados (DataFrames com colunas _ANTERIOR,
+        _ATUAL, DELTA_DIAS, DELTA_VALOR e CAMPOS_ALTERADOS) e resumo
+    """
+    n_anterior = len(anterior_df)
+    codigos, matriculas = pd.factorize(np.concatenate([
+        anterior_df['MATRICULA'].astype(str).to_numpy(dtype=object),
+        atual_df['MATRICULA'].astype(str).to_numpy(dtype=object)
+    ]))
+
+    # Posição de cada matrícula em cada execução (-1 = ausente; repetida: vale a última)
+    pos_antes = np.full(len(matriculas), -1, dtype=np.int64)
+    pos_antes[codigos[:n_anterior]] = np.arange(n_anterior)
+    pos_depois = np.full(len(matriculas), -1, dtype=np.int64)
+    pos_depois[codigos[n_anterior:]] = np.arange(len(atual_df))
+    estava, esta = pos_antes >= 0, pos_depois >= 0
+    ambos, entrou, saiu = estava & esta, esta & ~estava, estava & ~esta
+
+    antes, depois = _colunas(anterior_df), _colunas(atual_df)
+    mudou = np.column_stack([
+        _tomar(antes[c], pos_antes, estava, None) != _tomar(depois[c], pos_depois, esta, None)
+        for c in COLUNAS_COMPARADAS
+    ])
+    alterado = ambos & mudou.any(axis=1)
+
+    # Ausente (entrou / saiu) conta como zero nas diferenças
+    valor_antes = np.where(estava, _tomar(antes['VALOR_TOTAL_VR'], pos_antes, estava, None), 0)
+    valor_depois = np.where(esta, _tomar(depois['VALOR_TOTAL_VR'], pos_depois, esta, None), 0)
+    delta = valor_depois - valor_antes
+    dias_antes = np.where(estava, _tomar(antes['DIAS_ELEGIVEL'], pos_antes, estava, None), 0)
+    dias_depois = np.where(esta, _tomar(depois['DIAS_ELEGIVEL'], pos_depois, esta, None), 0)
+
+    # Quadro só com as linhas que entram em alguma saída
+    linhas = np.flatnonzero(entrou | saiu | alterado)
+    pos_a, pos_d, ea, ed = pos_antes[linhas], pos_depois[linhas], estava[linhas], esta[linhas]
+    quadro = pd.DataFrame({
+        'MATRICULA': matriculas[linhas],
+        'NOME': np.where(ed, _tomar(depois['NOME'], pos_d, ed, None), _tomar(antes['NOME'], pos_a, ea, None))
+    })
+    for coluna in COLUNAS_COMPARADAS:
+        for sufixo, lado, posicoes, presente in (('_ANTERIOR', antes, pos_a, ea), ('_ATUAL', depois, pos_d, ed)):
+            valores = _tomar(lado[coluna], posicoes, presente, np.nan)
+            quadro[coluna + sufixo] = valores / CENTAVOS_POR_REAL if coluna in COLUNAS_VALOR else valores
+    quadro['DELTA_DIAS'] = dias_depois[linhas] - dias_antes[linhas]
+    quadro['DELTA_VALOR'] = reais(delta[linhas])
+
+    nomes = np.array(COLUNAS_COMPARADAS, dtype=object)
+    quadro['CAMPOS_ALTERADOS'] = [
+        ', '.join(nomes[m]) if a else '' for m, a in zip(mudou[linhas], alterado[linhas])
+    ]
+
+    status_antes = _tomar(antes['STATUS'], pos_antes, estava, None)
+    status_depois = _tomar(depois['STATUS'], pos_depois, esta, None)
+    resumo = {
+        'colaboradores_anterior': int(estava.sum()),
+        'colaboradores_atual': int(esta.sum()),
+        'entraram': int(entrou.sum()),
+        'sairam': int(saiu.sum()),
+        'alterados': int(alterado.sum()),
+        'passaram_a_elegiveis': int((ambos & (status_antes != 'ELEGÍVEL') & (status_depois == 'ELEGÍVEL')).sum()),
+        'deixaram_de_ser_elegiveis': int((ambos & (status_antes == 'ELEGÍVEL') & (status_depois != 'ELEGÍVEL')).sum()),
+        'valor_total_anterior': float(reais(valor_antes.sum())),
+        'valor_total_atual': float(reais(valor_depois.sum())),
+        'delta_total': float(reais(delta.sum())),
+        'delta_entraram': float(reais(delta[entrou].sum())),
+        'delta_sairam': float(reais(delta[saiu].sum())),
+        'delta_alterados': float(reais(delta[ambos].sum()))
+    }
+    origem = np.select([entrou[linhas], saiu[linhas]], ['entrou', 'saiu'], 'alterado')
+    return {
+        'entraram': quadro[origem == 'entrou'].reset_index(drop=True),
+        'sairam': quadro[origem == 'saiu'].reset_index(drop=True),
+        'alterados': quadro[origem == 'alterado'].reset_index(drop=True),
+        'resumo': resumo
+    }
@@ -0,0 +1,342 @@
+"""
+Recálculo incremental do vale refeição
+O resultado por colaborador é persistido junto com o hash das linhas de cada
+tabela de origem que o afetam; em uma nova execução apenas os colaboradores
+cujas dependências mudaram são recalculados e o resultado salvo é corrigido
+"""
+
+import hashlib
+import json
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from ..config.settings import settings
+from .business_calendar import BusinessCalendar, get_business_calendar
+from .intervals import calcular_dias_colaboradores, encontrar_coluna
+from .sindicatos import indice_sindicatos
+from .vr_calculator import (
+    COLUNAS_RESULTADO, TABELAS_EXCLUSAO, TABELAS_PRORRATEIO, VALOR_OUTROS, VALOR_SP,
+    calcular_estatisticas, calcular_vale_refeicao, carregar_valores_sindicato, colunas_valor_sindicato
+)
+
+# Incrementar quando a lógica de cálculo mudar (invalida resultados salvos)
+VERSAO_CALCULO = 2
+
+TABELA_BASE = 'ativos'
+TABELA_ADMISSAO = 'admissao_abril'
+TABELA_VALORES = 'base_sindicato_x_valor'
+TABELAS_ORIGEM = [TABELA_BASE, TABELA_ADMISSAO, TABELA_VALORES] + TABELAS_EXCLUSAO
+
+TABELA_RESULTADO = 'calculo_vr_resultado'
+TABELA_DEPENDENCIAS = 'calculo_vr_dependencias'
+PARAMETROS = '__parametros__'
+COLUNAS = '__colunas__'
+
+
+def _hash_texto(valor: str) -> int:
+    """Hash estável (int64 com sinal, compatível com INTEGER do SQLite)"""
+    return int.from_bytes(hashlib.sha256(valor.encode('utf-8')).digest()[:8], 'little', signed=True)
+
+
+def chave_tabela(tabela: str, df: pd.DataFrame) -> Optional[str]:
+    """Coluna que liga as linhas da tabela aos colaboradores (MATRICULA ou sindicato)"""
+    if tabela == TABELA_VALORES:
+        return colunas_valor_sindicato(list(df.columns))[0]
+    return encontrar_coluna(df, ['MATRICULA'])
+
+
+def chaves_normalizadas(tabela: str, valores: pd.Series) -> pd.Series:
+    """Chaves como texto (sindicatos sem espaços nas pontas, como na tabela de valores)"""
+    chaves = valores.astype(str)
+    return chaves.str.strip() if tabela == TABELA_VALORES else chaves
+
+
+def assinaturas(tabela: str, df: pd.DataFrame) -> pd.Series:
+    """
+    Hash das linhas de uma tabela por chave
+
+    A soma (módulo 2^64) dos hashes das linhas independe da ordem; uma linha
+    extra com CHAVE='__colunas__' registra o esquema da tabela.
+
+    Returns:
+        Series chave -> hash (int64)
+    """
+    colunas = pd.Series({COLUNAS: _hash_texto(json.dumps([str(c) for c in df.columns]))}, dtype='int64')
+    coluna_chave = chave_tabela(tabela, df)
+    if coluna_chave is None or df.empty:
+        # Sem chave: a tabela inteira é uma única dependência
+        total = pd.util.hash_pandas_object(df, index=False).to_numpy().sum(dtype=np.uint64) if len(df) else 0
+        return pd.concat([colunas, pd.Series({'*': np.uint64(total).view(np.int64)}, dtype='int64')])
+
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    codigos, chaves = pd.factorize(chaves_normalizadas(tabela, df[coluna_chave]))
+    soma = np.zeros(len(chaves), dtype=np.uint64)
+    np.add.at(soma, codigos, hashes)
+    return pd.concat([colunas, pd.Series(soma.view(np.int64), index=pd.Index(chaves, dtype=object))])
+
+
+def hash_parametros(competencia: str, calendario: BusinessCalendar) -> int:
+    """Hash dos parâmetros que afetam todos os colaboradores"""
+    feriados = [calendario.nacionais, calendario.estaduais, calendario.municipais]
+    return _hash_texto(json.dumps(
+        [VERSAO_CALCULO, competencia, VALOR_SP, VALOR_OUTROS, feriados],
+        sort_keys=True, default=str
+    ))
+
+
+def unir_admissoes(ativos_df: pd.DataFrame, admissao_df: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """Ativos mais as admissões cujas matrículas ainda não estão em ativos"""
+    if admissao_df is None or admissao_df.empty or 'MATRICULA' not in admissao_df.columns:
+        return ativos_df
+    admissao_df = admissao_df.assign(MATRICULA=admissao_df['MATRICULA'].astype(str))
+    novos = ~admissao_df['MATRICULA'].isin(set(ativos_df['MATRICULA'].astype(str)))
+    if not novos.any():
+        return ativos_df
+    return pd.concat([ativos_df, admissao_df[novos]], ignore_index=True)
+
+
+def regras_tabelas(tabelas: Dict[str, pd.DataFrame]) -> Tuple[Dict, Dict, Dict]:
+    """
+    Separa as tabelas de origem carregadas nas entradas do cálculo
+
+    Returns:
+        Tupla (matrículas excluídas por tabela, tabelas de ausência, valores por sindicato)
+    """
+    exclusoes = {
+        t: pd.unique(tabelas[t]['MATRICULA'].astype(str))
+        for t in TABELAS_EXCLUSAO
+        if t in tabelas and t not in TABELAS_PRORRATEIO and 'MATRICULA' in tabelas[t].columns
+    }
+    ausencias = {t: tabelas[t] for t in TABELAS_PRORRATEIO if t in tabelas}
+    valores_sindicato = carregar_valores_sindicato(tabelas[TABELA_VALORES])[0] if TABELA_VALORES in tabelas else {}
+    return exclusoes, ausencias, valores_sindicato
+
+
+def calcular_colaboradores(colaboradores_df: pd.DataFrame, tabelas: Dict[str, pd.DataFrame],
+                           competencia: str, calendario: BusinessCalendar,
+                           total_colaboradores: Optional[int] = None) -> Tuple[pd.DataFrame, Dict]:
+    """Mesmo cálculo da ferramenta calculo_vale_refeicao a partir das tabelas já carregadas"""
+    exclusoes, ausencias, valores_sindicato = regras_tabelas(tabelas)
+
+    dias_df = calcular_dias_colaboradores(colaboradores_df, competencia, ausencias, calendario)
+    return calcular_vale_refeicao(
+        colaboradores_df,
+        exclusoes=exclusoes,
+        valores_sindicato=valores_sindicato,
+        dias_uteis=dias_df['DIAS_ELEGIVEL'].to_numpy(),
+        total_colaboradores=total_colaboradores,
+        motivos_dias=dias_df['MOTIVO'].to_numpy()
+    )
+
+
+def _filtrar(tabela: str, df: pd.DataFrame, chaves: Set[str]) -> pd.DataFrame:
+    coluna_chave = chave_tabela(tabela, df)
+    if coluna_chave is None or tabela == TABELA_VALORES:
+        return df
+    return df[chaves_normalizadas(tabela, df[coluna_chave]).isin(chaves)]
+
+
+def _ordenar(resultado_df: pd.DataFrame, ordem: pd.Series) -> pd.DataFrame:
+    """Reordena o resultado pela ordem dos colaboradores na base (estável para duplicados)"""
+    posicoes = pd.Series(np.arange(len(ordem)), index=ordem.to_numpy()).groupby(level=0).first()
+    chave = resultado_df['MATRICULA'].map(posicoes).fillna(len(ordem)).to_numpy()
+    return resultado_df.iloc[np.argsort(chave, kind='stable')].reset_index(drop=True)
+
+
+class CalculoIncremental:
+    """
+    Cálculo de VR com resultado persistido por competência
+
+    Compara o hash das linhas de cada tabela de origem por colaborador (ou
+    sindicato, para a tabela de valores) com o da execução anterior e
+    recalcula apenas os colaboradores afetados.
+    """
+
+    def __init__(self, engine, competencia: Optional[str] = None,
+                 calendario: Optional[BusinessCalendar] = None):
+        self.engine = engine
+        self.competencia = competencia or settings.competencia_vr
+        self.calendario = calendario or get_business_calendar()
+
+    # ---- Estado salvo ----
+
+    def _dependencias_salvas(self) -> pd.DataFrame:
+        sql = f"SELECT TABELA, CHAVE, HASH FROM {TABELA_DEPENDENCIAS} WHERE COMPETENCIA = :competencia"
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(sql), conn, params={'competencia': self.competencia})
+
+    def _resultado_salvo(self) -> pd.DataFrame:
+        sql = f"SELECT {', '.join(COLUNAS_RESULTADO)} FROM {TABELA_RESULTADO} WHERE COMPETENCIA = :competencia"
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(sql), conn, params={'competencia': self.competencia})
+
+    def limpar(self):
+        """Remove resultado e dependências salvos da competência (força recálculo completo)"""
+        with self.engine.begin() as conn:
+            for tabela in (TABELA_RESULTADO, TABELA_DEPENDENCIAS):
+                conn.execute(text(f"DELETE FROM {tabela} WHERE COMPETENCIA = :c"), {'c': self.competencia})
+
+    def salvar_resultado(self, resultado_df: pd.DataFrame):
+        """
+        Grava um resultado calculado fora do incremental (pushdown ou em memória)
+
+        Substitui o resultado da competência e remove as dependências, de modo
+        que o próximo cálculo incremental seja completo.
+        """
+        self.limpar()
+        with self.engine.begin() as conn:
+            resultado_df[COLUNAS_RESULTADO].assign(COMPETENCIA=self.competencia).to_sql(
+                TABELA_RESULTADO, conn, if_exists='append', index=False
+            )
+
+    # ---- Detecção de mudanças ----
+
+    def _chaves_alteradas(self, tabela: str, novas: pd.Series, salvas: pd.Series) -> Optional[Set[str]]:
+        """Chaves cujo hash mudou; None quando a mudança afeta todos (esquema ou tabela sem chave)"""
+        if novas.get(COLUNAS) != salvas.get(COLUNAS) or '*' in novas.index or '*' in salvas.index:
+            return set() if novas.sort_index().equals(salvas.sort_index()) else None
+        novas, salvas = novas.drop(COLUNAS, errors='ignore'), salvas.drop(COLUNAS, errors='ignore')
+        alinhadas = pd.concat([novas.rename('nova'), salvas.rename('salva')], axis=1)
+        return set(alinhadas.index[alinhadas['nova'].ne(alinhadas['salva'])])
+
+    def _afetados(self, tabelas: Dict[str, pd.DataFrame], colaboradores_df: pd.DataFrame,
+                  novas: Dict[str, pd.Series], salvas: pd.DataFrame) -> Tuple[Optional[Set[str]], Dict[str, int]]:
+        """
+        Matrículas afetadas pelas mudanças nas tabelas de origem
+
+        Returns:
+            Tupla (matrículas afetadas ou None para recálculo completo, mudanças por tabela)
+        """
+        parametros = salvas[salvas['TABELA'] == PARAMETROS]['HASH']
+        if parametros.empty or int(parametros.iloc[0]) != hash_parametros(self.competencia, self.calendario):
+            return None, {PARAMETROS: 1}
+
+        por_tabela = {t: g.set_index('CHAVE')['HASH'] for t, g in salvas.groupby('TABELA') if t != PARAMETROS}
+        afetados: Set[str] = set()
+        mudancas = {}
+        for tabela in set(novas) | set(por_tabela):
+            nova = novas.get(tabela, pd.Series(dtype='int64'))
+            salva = por_tabela.get(tabela, pd.Series(dtype='int64'))
+            alteradas = self._chaves_alteradas(tabela, nova, salva)
+            if alteradas is None:
+                return None, {tabela: len(nova)}
+            if not alteradas:
+                continue
+            mudancas[tabela] = len(alteradas)
+            if tabela == TABELA_VALORES and 'SINDICATO' in colaboradores_df.columns:
+                # Sindicatos resolvidos (índice) para uma chave alterada; chave removida ou
+                # sem valor válido: a resolução anterior não é conhecida, recálculo completo
+                valores = carregar_valores_sindicato(tabelas[TABELA_VALORES])[0] if TABELA_VALORES in tabelas else {}
+                indice = indice_sindicatos(valores)
+                if not alteradas <= set(indice.chaves):
+                    return None, {tabela: len(alteradas)}
+                codigos, sindicatos = pd.factorize(colaboradores_df['SINDICATO'].fillna('').astype(str))
+                atingidos = indice.resolver(sindicatos)['CHAVE'].isin(alteradas).to_numpy()
+                afetados.update(colaboradores_df.loc[atingidos[codigos], 'MATRICULA'].astype(str))
+            else:
+                afetados.update(alteradas)
+        return afetados, mudancas
+
+    # ---- Persistência ----
+
+    def _salvar(self, resultado_df: pd.DataFrame, novas: Dict[str, pd.Series],
+                afetados: Optional[Set[str]], tabelas_alteradas: Iterable[str]):
+        """Grava o resultado (inteiro ou só os afetados) e as dependências das tabelas alteradas"""
+        parametros = {PARAMETROS: pd.Series({'': hash_parametros(self.competencia, self.calendario)})}
+        if afetados is None:
+            linhas, dependencias = resultado_df, {**novas, **parametros}
+        else:
+            linhas = resultado_df[resultado_df['MATRICULA'].isin(afetados)]
+            dependencias = {t: novas.get(t, pd.Series(dtype='int64')) for t in tabelas_alteradas}
+
+        with self.engine.begin() as conn:
+            params = {'c': self.competencia}
+            if afetados is None:
+                conn.execute(text(f"DELETE FROM {TABELA_RESULTADO} WHERE COMPETENCIA = :c"), params)
+                conn.execute(text(f"DELETE FROM {TABELA_DEPENDENCIAS} WHERE COMPETENCIA = :c"), params)
+            else:
+                if afetados:
+                    conn.execute(
+                        text(f"DELETE FROM {TABELA_RESULTADO} WHERE COMPETENCIA = :c AND MATRICULA = :m"),
+                        [{'c': self.competencia, 'm': m} for m in afetados]
+                    )
+                for tabela in dependencias:
+                    conn.execute(
+                        text(f"DELETE FROM {TABELA_DEPENDENCIAS} WHERE COMPETENCIA = :c AND TABELA = :t"),
+                        {'c': self.competencia, 't': tabela}
+                    )
+
+            linhas.assign(COMPETENCIA=self.competencia).to_sql(
+                TABELA_RESULTADO, conn, if_exists='append', index=False
+            )
+            registros = [
+                pd.DataFrame({'COMPETENCIA': self.competencia, 'TABELA': tabela,
+                              'CHAVE': serie.index.astype(str), 'HASH': serie.to_numpy(dtype='int64')})
+                for tabela, serie in dependencias.items() if len(serie)
+            ]
+            if registros:
+                pd.concat(registros, ignore_index=True).to_sql(
+                    TABELA_DEPENDENCIAS, conn, if_exists='append', index=False
+                )
+
+    # ---- Execução ----
+
+    def carregar_tabelas(self, data_tables: Iterable[str]) -> Dict[str, pd.DataFrame]:
+        """Lê as tabelas de origem existentes"""
+        return {
+            t: pd.read_sql(f'SELECT * FROM "{t}"', self.engine)
+            for t in TABELAS_ORIGEM if t in data_tables
+        }
+
+    def executar(self, tabelas: Dict[str, pd.DataFrame], forcar_completo: bool = False) -> Dict:
+        """
+        Executa o cálculo reaproveitando o resultado salvo
+
+        Args:
+            tabelas: Tabelas de origem (nome -> DataFrame); 'ativos' é obrigatória
+            forcar_completo: Ignora o resultado salvo
+
+        Returns:
+            Dict com resultado_df, estatisticas, modo ('completo', 'incremental' ou
+            'sem_alteracoes'), recalculados e mudancas por tabela
+        """
+        ativos_df = tabelas[TABELA_BASE]
+        colaboradores_df = unir_admissoes(ativos_df, tabelas.get(TABELA_ADMISSAO))
+        novas = {t: assinaturas(t, df) for t, df in tabelas.items()}
+
+        salvas = self._dependencias_salvas() if not forcar_completo else pd.DataFrame(columns=['TABELA', 'CHAVE', 'HASH'])
+        afetados, mudancas = self._afetados(tabelas, colaboradores_df, novas, salvas)
+
+        if afetados is None:
+            resultado_df, _ = calcular_colaboradores(colaboradores_df, tabelas, self.competencia, self.calendario)
+            self._salvar(resultado_df, novas, None, novas)
+            modo, recalculados = 'completo', len(resultado_df)
+
+        elif not afetados:
+            resultado_df = _ordenar(self._resultado_salvo(), colaboradores_df['MATRICULA'].astype(str))
+            modo, recalculados = 'sem_alteracoes', 0
+
+        else:
+            matriculas = colaboradores_df['MATRICULA'].astype(str)
+            subconjunto = colaboradores_df[matriculas.isin(afetados).to_numpy()]
+            parciais = {t: _filtrar(t, df, afetados) for t, df in tabelas.items()}
+            novos_df, _ = calcular_colaboradores(subconjunto, parciais, self.competencia, self.calendario)
+
+            salvo_df = self._resultado_salvo()
+            resultado_df = pd.concat(
+                [salvo_df[~salvo_df['MATRICULA'].isin(afetados)], novos_df], ignore_index=True
+            )
+            resultado_df = _ordenar(resultado_df, matriculas)
+            self._salvar(novos_df, novas, afetados, mudancas)
+            modo, recalculados = 'incremental', len(novos_df)
+
+        return {
+            'resultado_df': resultado_df,
+            'estatisticas': calcular_estatisticas(resultado_df, len(ativos_df)),
+            'modo': modo,
+            'recalculados': recalculados,
+            'mudancas': mudancas
+        }
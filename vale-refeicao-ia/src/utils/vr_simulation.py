@@ -0,0 +1,217 @@
+"""
+Simulação de cenários de custo do vale refeição
+Grades de parâmetros (valores diários, desconto, tetos e valores por sindicato)
+avaliadas de uma vez por broadcasting: colaboradores elegíveis com o mesmo
+sindicato e os mesmos dias têm o mesmo resultado em qualquer cenário, então a
+matriz cenário x grupo é ponderada pela quantidade de colaboradores do grupo
+"""
+
+import itertools
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from ..config.settings import settings
+from .money import centavos, multiplicar, percentual, reais
+from .vr_batch import TABELA_LOTE
+from .vr_calculator import COLUNAS_RESULTADO, VALOR_OUTROS, VALOR_SP, sindicato_eh_sp
+from .vr_incremental import TABELA_RESULTADO
+
+# Parâmetros de um cenário (ausentes = valor atual)
+PARAMETROS_CENARIO = [
+    'valor_sp', 'valor_outros', 'desconto_funcionario_pct',
+    'desconto_maximo', 'valor_minimo', 'valor_maximo', 'valores_sindicato'
+]
+
+# Nomes alternativos aceitos nas grades (alias -> parâmetros que ele define)
+ALIASES_PARAMETROS = {'valor_dia_util': ('valor_sp', 'valor_outros')}
+
+COLUNAS_CUSTO = ['ELEGIVEIS', 'VALOR_TOTAL_VR', 'DESCONTO_FUNCIONARIO', 'CUSTO_EMPRESA']
+
+
+def preparar_base(resultado_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Reduz o resultado de um cálculo de VR aos grupos (sindicato, dias) dos elegíveis
+
+    O valor da tabela de sindicatos é recuperado das linhas com ESTADO
+    '... (Tabela: R$ x)'; os demais sindicatos seguem a regra SP / outros.
+
+    Returns:
+        Dict com sindicatos distintos, é SP e valor de tabela por sindicato, e
+        sindicato, dias e quantidade de colaboradores por grupo
+    """
+    elegiveis = resultado_df[resultado_df['STATUS'] == 'ELEGÍVEL']
+    sindicatos_col = elegiveis['SINDICATO'].fillna('').astype(str)
+    codes, sindicatos = pd.factorize(sindicatos_col)
+    sindicatos = pd.Series(sindicatos, dtype=object)
+
+    tabela = np.full(len(sindicatos), np.nan)
+    da_tabela = elegiveis['ESTADO'].astype(str).str.contains('(Tabela', regex=False).to_numpy()
+    if da_tabela.any():
+        valores = pd.Series(elegiveis['VALOR_DIARIO'].to_numpy(dtype=float)[da_tabela]).groupby(codes[da_tabela]).last()
+        tabela[valores.index.to_numpy()] = valores.to_numpy()
+
+    grupos = pd.DataFrame({
+        'sindicato': codes,
+        'dias': elegiveis['DIAS_ELEGIVEL'].to_numpy(dtype=float)
+    }).value_counts(sort=False).reset_index()
+
+    return {
+        'sindicatos': sindicatos,
+        'sindicato_sp': sindicato_eh_sp(sindicatos).to_numpy(),
+        'valor_tabela': tabela,
+        'grupo_sindicato': grupos['sindicato'].to_numpy(),
+        'grupo_dias': grupos['dias'].to_numpy(dtype=float),
+        'grupo_colaboradores': grupos['count'].to_numpy(dtype=np.int64),
+        'elegiveis': len(elegiveis)
+    }
+
+
+def competencias_salvas(engine) -> List[str]:
+    """Competências com resultado gravado (cálculo incremental ou em lote)"""
+    competencias = set()
+    with engine.connect() as conn:
+        for tabela in (TABELA_RESULTADO, TABELA_LOTE):
+            try:
+                competencias.update(r[0] for r in conn.execute(text(f"SELECT DISTINCT COMPETENCIA FROM {tabela}")))
+            except Exception:
+                continue
+    return sorted(competencias, reverse=True)
+
+
+def carregar_base(engine, competencia: str) -> Dict[str, Any]:
+    """Base de simulação a partir do resultado gravado da competência"""
+    for tabela in (TABELA_RESULTADO, TABELA_LOTE):
+        resultado_df = pd.read_sql(
+            text(f"SELECT {', '.join(COLUNAS_RESULTADO)} FROM {tabela} WHERE COMPETENCIA = :c"),
+            engine, params={'c': competencia}
+        )
+        if not resultado_df.empty:
+            return preparar_base(resultado_df)
+    raise ValueError(f"Nenhum resultado gravado para a competência {competencia}")
+
+
+def grade_cenarios(**grades: Iterable) -> List[Dict[str, Any]]:
+    """
+    Produto cartesiano das grades de parâmetros
+
+    Exemplo:
+        grade_cenarios(valor_sp=[37.5, 40], desconto_funcionario_pct=[0.2, 0.15])
+        -> 4 cenários
+    """
+    nomes = [ALIASES_PARAMETROS.get(nome, (nome,)) for nome in grades]
+    invalidos = [nome for alvos in nomes for nome in alvos if nome not in PARAMETROS_CENARIO]
+    if invalidos:
+        raise ValueError(f"Parâmetros desconhecidos: {', '.join(invalidos)}")
+    valores = [list(v) if isinstance(v, (list, tuple, np.ndarray, pd.Series)) else [v] for v in grades.values()]
+    return [
+        {nome: valor for alvos, valor in zip(nomes, combinacao) for nome in alvos}
+        for combinacao in itertools.product(*valores)
+    ]
+
+
+def _valor_cenario(cenario: Dict[str, Any], nome: str) -> Any:
+    """Valor de um parâmetro no cenário, pelo nome ou por um alias (None = ausente)"""
+    valor = cenario.get(nome)
+    if valor is None:
+        valor = next((cenario[a] for a, alvos in ALIASES_PARAMETROS.items()
+                      if nome in alvos and cenario.get(a) is not None), None)
+    return valor
+
+
+def _parametro(cenarios: List[Dict[str, Any]], nome: str, padrao: float) -> np.ndarray:
+    """Vetor (cenários,) de um parâmetro; None/ausente = padrão"""
+    valores = [_valor_cenario(cenario, nome) for cenario in cenarios]
+    return np.asarray([padrao if valor is None else float(valor) for valor in valores], dtype=float)
+
+
+def _definido(cenarios: List[Dict[str, Any]], nome: str) -> np.ndarray:
+    """Vetor (cenários,) booleano: o cenário define o parâmetro"""
+    return np.asarray([_valor_cenario(cenario, nome) is not None for cenario in cenarios], dtype=bool)
+
+
+def _limite(valores: np.ndarray) -> np.ndarray:
+    """Teto em centavos (sem teto = maior int64)"""
+    return np.where(np.isinf(valores), np.iinfo(np.int64).max, centavos(np.where(np.isinf(valores), 0, valores)))
+
+
+def _matrizes(base: Dict[str, Any], cenarios: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Valor total, desconto e custo (centavos) por cenário x grupo (colaborador representativo)"""
+    valor_sp = _parametro(cenarios, 'valor_sp', VALOR_SP)
+    valor_outros = _parametro(cenarios, 'valor_outros', VALOR_OUTROS)
+    pct = _parametro(cenarios, 'desconto_funcionario_pct', settings.desconto_funcionario_pct)
+    desconto_maximo = _parametro(cenarios, 'desconto_maximo', np.inf)
+    valor_minimo = _parametro(cenarios, 'valor_minimo', 0.0)
+    valor_maximo = _parametro(cenarios, 'valor_maximo', np.inf)
+
+    # Valor diário por cenário x sindicato, do menos ao mais específico: SP / outros
+    # padrão, tabela (> 0), valor_sp / valor_outros definidos no cenário (valem para
+    # todos os sindicatos do grupo, inclusive os da tabela) e valores_sindicato
+    sindicato_sp = base['sindicato_sp']
+    valor_diario = np.where(sindicato_sp, valor_sp[:, None], valor_outros[:, None])
+    tabela = base['valor_tabela']
+    definido = np.where(sindicato_sp, _definido(cenarios, 'valor_sp')[:, None],
+                        _definido(cenarios, 'valor_outros')[:, None])
+    valor_diario = np.where((np.nan_to_num(tabela) > 0) & ~definido, tabela, valor_diario)
+
+    indice = pd.Index(base['sindicatos'].str.strip())
+    for i, cenario in enumerate(cenarios):
+        for sindicato, valor in (cenario.get('valores_sindicato') or {}).items():
+            posicoes = np.flatnonzero(indice == str(sindicato).strip())
+            valor_diario[i, posicoes] = float(valor)
+
+    # Broadcasting cenário x grupo, em centavos inteiros
+    total = multiplicar(centavos(valor_diario)[:, base['grupo_sindicato']], base['grupo_dias'][None, :])
+    minimo = centavos(valor_minimo)[:, None]
+    total = np.where((total > 0) & (total < minimo), minimo, total)
+    total = np.minimum(total, _limite(valor_maximo)[:, None])
+    desconto = np.minimum(percentual(total, pct[:, None]), _limite(desconto_maximo)[:, None])
+    return {'total': total, 'desconto': desconto, 'custo': total - desconto}
+
+
+def simular_cenarios(base: Dict[str, Any], cenarios: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Custo de cada cenário
+
+    Args:
+        base: Resultado de preparar_base
+        cenarios: Lista de dicts com PARAMETROS_CENARIO (ver grade_cenarios)
+
+    Returns:
+        Matriz de custos: uma linha por cenário com os parâmetros e COLUNAS_CUSTO
+    """
+    matrizes = _matrizes(base, cenarios)
+    pesos = base['grupo_colaboradores']
+
+    custos = pd.DataFrame({
+        'ELEGIVEIS': base['elegiveis'],
+        'VALOR_TOTAL_VR': reais(matrizes['total'] @ pesos),
+        'DESCONTO_FUNCIONARIO': reais(matrizes['desconto'] @ pesos),
+        'CUSTO_EMPRESA': reais(matrizes['custo'] @ pesos)
+    }, index=pd.RangeIndex(len(cenarios), name='CENARIO'))
+
+    parametros = pd.DataFrame(cenarios, index=custos.index)
+    if 'valores_sindicato' in parametros.columns:
+        parametros['valores_sindicato'] = parametros['valores_sindicato'].map(
+            lambda v: '; '.join(f"{k}={valor}" for k, valor in v.items()) if isinstance(v, dict) else ''
+        )
+    return pd.concat([parametros, custos], axis=1)
+
+
+def custo_por_sindicato(base: Dict[str, Any], cenarios: List[Dict[str, Any]],
+                        metrica: str = 'custo') -> pd.DataFrame:
+    """
+    Matriz cenário x sindicato de uma métrica ('total', 'desconto' ou 'custo')
+
+    Returns:
+        DataFrame com uma linha por cenário e uma coluna por sindicato
+    """
+    matriz = _matrizes(base, cenarios)[metrica] * base['grupo_colaboradores'][None, :]
+    n_sindicatos = len(base['sindicatos'])
+    por_sindicato = np.zeros((len(cenarios), n_sindicatos), dtype=np.int64)
+    for codigo in range(n_sindicatos):
+        por_sindicato[:, codigo] = matriz[:, base['grupo_sindicato'] == codigo].sum(axis=1)
+    return pd.DataFrame(reais(por_sindicato), columns=base['sindicatos'].to_numpy(),
+                        index=pd.RangeIndex(len(cenarios), name='CENARIO'))
@@ -0,0 +1,226 @@
+"""
+Cálculo de vale refeição com pushdown para o SQLite
+União ativos + admissões, anti-joins com as tabelas de exclusão e junção com
+a dimensão de sindicatos (resolvida pelo índice de sindicatos) em uma única
+consulta; apenas as linhas de resultado (com as colunas usadas) são
+transferidas para o Python, em lotes
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .business_calendar import COLUNAS_MUNICIPIO, COLUNAS_UF
+from .intervals import COLUNAS_ADMISSAO, COLUNAS_DEMISSAO, encontrar_coluna
+from .vr_calculator import (
+    DIAS_UTEIS_PADRAO, VALOR_OUTROS, VALOR_SP,
+    carregar_valores_sindicato, colunas_colaboradores, mapear_sindicatos, montar_resultado
+)
+
+# Linhas por lote lido do cursor
+LOTE_LINHAS = 50000
+
+# Colunas técnicas adicionadas pela consulta
+COLUNAS_PUSHDOWN = ['_MOTIVO', '_ESTADO', '_ESTADO_BASE', '_VALOR_DIARIO']
+
+
+def _q(identificador: str) -> str:
+    """Identificador SQL entre aspas duplas"""
+    return '"' + str(identificador).replace('"', '""') + '"'
+
+
+def _texto(expr: str) -> str:
+    return f"CAST({expr} AS TEXT)"
+
+
+def _literal(valor: str) -> str:
+    """Texto como literal SQL"""
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def colunas_usadas(colunas: List[str]) -> List[str]:
+    """Colunas da tabela base necessárias ao cálculo (identificação, localidade e datas)"""
+    vazio = pd.DataFrame(columns=colunas)
+    usadas = [c for c in ('MATRICULA', 'NOME', 'SINDICATO') if c in colunas]
+    for candidatos in (COLUNAS_ADMISSAO, COLUNAS_DEMISSAO, COLUNAS_UF, COLUNAS_MUNICIPIO):
+        coluna = encontrar_coluna(vazio, candidatos)
+        if coluna is not None and coluna not in usadas:
+            usadas.append(coluna)
+    return usadas
+
+
+def montar_sql_vale_refeicao(colunas_tabelas: Dict[str, List[str]],
+                             exclusoes: List[str],
+                             tabela_base: str = 'ativos',
+                             tabela_admissao: Optional[str] = 'admissao_abril',
+                             sindicatos: Optional[pd.DataFrame] = None,
+                             valor_outros: float = VALOR_OUTROS) -> Tuple[str, List[str]]:
+    """
+    Monta a consulta única do cálculo
+
+    Args:
+        colunas_tabelas: Dict tabela -> colunas (apenas tabelas existentes)
+        exclusoes: Tabelas de exclusão, em ordem de prioridade do motivo
+        sindicatos: Dimensão de sindicatos (ver dimensao_sindicatos)
+
+    Returns:
+        Tupla (SQL, colunas da base selecionadas)
+    """
+    colunas_base = colunas_tabelas[tabela_base]
+    if 'MATRICULA' not in colunas_base:
+        raise ValueError(f"Tabela '{tabela_base}' sem coluna MATRICULA")
+
+    # Admissões entram com as colunas de mesmo nome (como no pd.concat do cálculo em memória)
+    colunas_adm = colunas_tabelas.get(tabela_admissao) if tabela_admissao else None
+    colunas_adm = colunas_adm if colunas_adm and 'MATRICULA' in colunas_adm else None
+    usadas = colunas_usadas(colunas_base + [c for c in colunas_adm or [] if c not in colunas_base])
+    chave = _texto('b."MATRICULA"')
+
+    def selecionar(tabela, colunas):
+        partes = [_q(c) if c in colunas else f"NULL AS {_q(c)}" for c in usadas]
+        return f"SELECT {', '.join(partes)} FROM {_q(tabela)}"
+
+    # União com as admissões que ainda não estão na base (anti-join)
+    uniao = selecionar(tabela_base, colunas_base)
+    if colunas_adm:
+        uniao += (
+            f"\n    UNION ALL\n    {selecionar(tabela_admissao, colunas_adm)}"
+            f"\n    WHERE {_texto('MATRICULA')} NOT IN "
+            f"(SELECT {_texto('MATRICULA')} FROM {_q(tabela_base)} WHERE MATRICULA IS NOT NULL)"
+        )
+
+    # Exclusões: LEFT JOIN com as matrículas distintas de cada tabela
+    juncoes, motivos = [], []
+    for i, tabela in enumerate(t for t in exclusoes if 'MATRICULA' in colunas_tabelas.get(t, [])):
+        alias = f"x{i}"
+        juncoes.append(
+            f"LEFT JOIN (SELECT DISTINCT {_texto('MATRICULA')} AS m FROM {_q(tabela)}) {alias} "
+            f"ON {alias}.m = {chave}"
+        )
+        motivos.append(f"WHEN {alias}.m IS NOT NULL THEN '{tabela.upper()}'")
+    motivo_sql = f"CASE {' '.join(motivos)} ELSE '' END" if motivos else "''"
+
+    # Estado e valor por sindicato distinto, resolvidos no Python (dimensao_sindicatos)
+    dimensao, estado_sql, estado_base_sql = '', "'OUTROS'", "'OUTROS'"
+    valor_sql = repr(float(valor_outros))
+    if 'SINDICATO' in usadas and sindicatos is not None and len(sindicatos):
+        linhas = ',\n    '.join(
+            f"({_literal(c)}, {_literal(eb)}, {_literal(e)}, {float(v)!r})"
+            for c, eb, e, v in sindicatos[['chave', 'estado_base', 'estado', 'valor']].itertuples(index=False)
+        )
+        dimensao = f""",
+sindicatos(chave, estado_base, estado, valor) AS (
+    VALUES {linhas}
+)"""
+        juncoes.append(f"LEFT JOIN sindicatos si ON si.chave = {_texto('b.' + _q('SINDICATO'))}")
+        estado_sql = "COALESCE(si.estado, 'OUTROS')"
+        estado_base_sql = "COALESCE(si.estado_base, 'OUTROS')"
+        valor_sql = f"COALESCE(si.valor, {float(valor_outros)!r})"
+
+    sql = f"""
+WITH base AS (
+    {uniao}
+){dimensao}
+SELECT {', '.join('b.' + _q(c) for c in usadas)},
+       {motivo_sql} AS "_MOTIVO",
+       {estado_sql} AS "_ESTADO",
+       {estado_base_sql} AS "_ESTADO_BASE",
+       {valor_sql} AS "_VALOR_DIARIO"
+FROM base b
+{chr(10).join(juncoes)}
+""".strip()
+    return sql, usadas
+
+
+def dimensao_sindicatos(engine, colunas_tabelas: Dict[str, List[str]],
+                        tabela_base: str = 'ativos',
+                        tabela_admissao: Optional[str] = 'admissao_abril',
+                        tabela_valores: Optional[str] = 'base_sindicato_x_valor',
+                        valor_sp: float = VALOR_SP,
+                        valor_outros: float = VALOR_OUTROS) -> Optional[pd.DataFrame]:
+    """
+    Estado e valor de cada sindicato distinto da base (mesma resolução de mapear_sindicatos)
+
+    Returns:
+        DataFrame com chave, estado_base, estado e valor; None sem coluna SINDICATO
+    """
+    origens = [t for t in (tabela_base, tabela_admissao) if t and 'SINDICATO' in colunas_tabelas.get(t, [])]
+    if not origens:
+        return None
+    distintos = ' UNION '.join(
+        f'SELECT DISTINCT {_texto(_q("SINDICATO"))} FROM {_q(t)} WHERE "SINDICATO" IS NOT NULL' for t in origens
+    )
+    with engine.connect() as conn:
+        chaves = pd.Series([r[0] for r in conn.execute(text(distintos))], dtype=object)
+        valores_sindicato = {}
+        if tabela_valores and tabela_valores in colunas_tabelas:
+            valores_sindicato = carregar_valores_sindicato(pd.read_sql(text(f"SELECT * FROM {_q(tabela_valores)}"), conn))[0]
+
+    _, is_sp, estados, valores = mapear_sindicatos(chaves, valores_sindicato, valor_sp, valor_outros)
+    return pd.DataFrame({
+        'chave': chaves,
+        'estado_base': np.where(is_sp, 'SP', 'OUTROS'),
+        'estado': estados,
+        'valor': valores
+    })
+
+
+def iterar_resultado(engine, sql: str, lote: int = LOTE_LINHAS) -> Iterator[pd.DataFrame]:
+    """Lê o resultado da consulta em lotes, sem materializar as tabelas de origem"""
+    with engine.connect() as conn:
+        for chunk in pd.read_sql(text(sql), conn, chunksize=lote):
+            yield chunk
+
+
+def calcular_vale_refeicao_sql(engine, colunas_tabelas: Dict[str, List[str]],
+                               exclusoes: List[str],
+                               dias_uteis: Optional[Callable] = None,
+                               valor_sp: float = VALOR_SP,
+                               valor_outros: float = VALOR_OUTROS,
+                               tabela_base: str = 'ativos',
+                               tabela_admissao: Optional[str] = 'admissao_abril',
+                               tabela_valores: Optional[str] = 'base_sindicato_x_valor',
+                               lote: int = LOTE_LINHAS) -> Tuple[pd.DataFrame, Dict, pd.DataFrame]:
+    """
+    Cálculo de vale refeição com elegibilidade e valores resolvidos no banco
+
+    Args:
+        engine: Engine SQLAlchemy (SQLite)
+        colunas_tabelas: Dict tabela -> colunas das tabelas existentes
+        exclusoes: Tabelas de exclusão, em ordem de prioridade do motivo
+        dias_uteis: Função (colaboradores_df) -> (dias por colaborador, motivos);
+            padrão: DIAS_UTEIS_PADRAO para todos
+        lote: Linhas por lote lido do banco
+
+    Returns:
+        Tupla (resultado no formato COLUNAS_RESULTADO, estatísticas, colaboradores lidos)
+    """
+    sindicatos = dimensao_sindicatos(
+        engine, colunas_tabelas, tabela_base, tabela_admissao, tabela_valores, valor_sp, valor_outros
+    )
+    sql, usadas = montar_sql_vale_refeicao(
+        colunas_tabelas, exclusoes, tabela_base, tabela_admissao, sindicatos, valor_outros
+    )
+    lotes = list(iterar_resultado(engine, sql, lote))
+    colaboradores_df = pd.concat(lotes, ignore_index=True) if lotes \
+        else pd.DataFrame(columns=usadas + COLUNAS_PUSHDOWN)
+
+    with engine.connect() as conn:
+        total_base = conn.execute(text(f"SELECT COUNT(*) FROM {_q(tabela_base)}")).scalar()
+
+    dias, motivos_dias = dias_uteis(colaboradores_df) if dias_uteis is not None else (DIAS_UTEIS_PADRAO, None)
+
+    matriculas, nomes, sindicatos = colunas_colaboradores(colaboradores_df)
+    resultado_df, estatisticas = montar_resultado(
+        matriculas, nomes, sindicatos,
+        motivo=colaboradores_df['_MOTIVO'].fillna('').to_numpy(dtype=object),
+        estado=colaboradores_df['_ESTADO'].to_numpy(dtype=object),
+        estado_base=colaboradores_df['_ESTADO_BASE'].to_numpy(dtype=object),
+        valor_diario=colaboradores_df['_VALOR_DIARIO'].to_numpy(dtype=float),
+        dias_uteis=dias,
+        motivos_dias=motivos_dias,
+        total_colaboradores=total_base
+    )
+    return resultado_df, estatisticas, colaboradores_df.drop(columns=COLUNAS_PUSHDOWN)
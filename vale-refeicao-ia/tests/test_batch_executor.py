@@ -0,0 +1,71 @@
+"""Testes da execução em lote por empresa"""
+
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from src.utils.batch_executor import (
+    executar_job, executar_lote, prefixos_disponiveis, resumo_lote, tabelas_da_empresa
+)
+
+REGRAS = {
+    'tabela_base': 'ativos',
+    'exclusoes': ['aprendiz'],
+    'valor_diario': {'padrao': 30.0},
+    'dias': {'fonte': 'fixo', 'valor': 20},
+}
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'lote.db'}"
+    engine = create_engine(url)
+    for prefixo, matriculas in (('empresa_a', [1, 2, 3]), ('empresa_b', [10, 11])):
+        pd.DataFrame({
+            'MATRICULA': matriculas,
+            'NOME': [f'Colaborador {m}' for m in matriculas],
+            'SINDICATO': ['SINDPD SP - SIND.TRAB.EM PROC DADOS'] * len(matriculas),
+        }).to_sql(f'{prefixo}_ativos', engine, index=False)
+        pd.DataFrame({'MATRICULA': matriculas[:1]}).to_sql(f'{prefixo}_aprendiz', engine, index=False)
+    engine.dispose()
+    return url
+
+
+def test_tabelas_e_prefixos():
+    """Nomes genéricos por prefixo de empresa"""
+    tabelas = ['empresa_a_ativos', 'empresa_a_ferias', 'empresa_b_ativos', 'ativos']
+    assert prefixos_disponiveis(tabelas) == ['empresa_a', 'empresa_b']
+    assert tabelas_da_empresa(tabelas, 'empresa_a_') == {'ativos': 'empresa_a_ativos', 'ferias': 'empresa_a_ferias'}
+    assert tabelas_da_empresa(tabelas, '') == {t: t for t in tabelas}
+
+
+def test_lote_em_processos_spawn(database_url):
+    """Jobs rodam em outros processos, na ordem recebida, com o mesmo resultado do job local"""
+    jobs = [('empresa_a', {'name': 'regras', 'rules': REGRAS}),
+            ('empresa_b', {'name': 'regras', 'rules': REGRAS}),
+            ('empresa_x', {'name': 'regras', 'rules': REGRAS})]
+
+    lote = executar_lote(jobs, database_url, max_workers=2)
+
+    a, b, x = lote['jobs']
+    assert lote['workers'] == 2
+    assert [r['prefixo'] for r in lote['jobs']] == ['empresa_a', 'empresa_b', 'empresa_x']
+    assert a['sucesso'] and b['sucesso'] and not x['sucesso']
+    assert "empresa_x" in x['erro']
+    assert {a['pid'], b['pid']}.isdisjoint({os.getpid()})
+
+    local = executar_job(database_url, 'empresa_a', {'name': 'regras', 'rules': REGRAS})
+    assert a['estatisticas'] == local['estatisticas']
+    assert (a['estatisticas']['total_elegiveis'], a['estatisticas']['valor_total_geral']) == (2, 1200.0)
+    assert (b['estatisticas']['total_elegiveis'], b['estatisticas']['valor_total_geral']) == (1, 600.0)
+
+    total = lote['resumo_df'].iloc[-1]
+    assert (total['Empresa'], total['Status'], total['Valor Total (R$)']) == ('TOTAL', '2/3', 1800.0)
+
+
+def test_resumo_sem_jobs():
+    """Lote vazio não gera linha de total"""
+    assert resumo_lote([]).empty
+    assert executar_lote([], 'sqlite://')['jobs'] == []
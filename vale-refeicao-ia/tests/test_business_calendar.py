@@ -0,0 +1,75 @@
+"""Testes do calendário de dias úteis"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.business_calendar import (
+    BusinessCalendar, competencias_entre, intervalo_competencia, parse_competencia, pascoa
+)
+
+DEFINICOES = {
+    'nacionais': {'fixos': {'01-01': 'Confraternização', '04-21': 'Tiradentes'},
+                  'moveis': {'Sexta-feira Santa': -2}},
+    'estaduais': {'SP': {'nome': 'SAO PAULO', 'fixos': {'07-09': 'Revolução Constitucionalista'}},
+                  'RJ': {'nome': 'RIO DE JANEIRO', 'fixos': {'04-23': 'São Jorge'}}},
+    'municipais': {'RJ': {'RIO DE JANEIRO': {'fixos': {'01-20': 'São Sebastião'},
+                                             'moveis': {'Corpus Christi': 60}}}},
+}
+
+
+@pytest.fixture
+def calendario():
+    return BusinessCalendar(definicoes=DEFINICOES)
+
+
+def test_pascoa_e_competencias():
+    """Páscoa por ano e conversões de competência"""
+    assert [pascoa(a) for a in (2024, 2025, 2026)] == [date(2024, 3, 31), date(2025, 4, 20), date(2026, 4, 5)]
+    assert parse_competencia('05/2025') == parse_competencia('2025-05') == (2025, 5)
+    assert intervalo_competencia('2025-12') == (np.datetime64('2025-12-01'), np.datetime64('2026-01-01'))
+    assert competencias_entre('2024-11', '2025-02') == ['2024-11', '2024-12', '2025-01', '2025-02']
+    with pytest.raises(ValueError):
+        parse_competencia('2025-13')
+    with pytest.raises(ValueError):
+        competencias_entre('2025-03', '2025-01')
+
+
+def test_feriados_nacionais_estaduais_e_municipais(calendario):
+    """Cada nível de feriado reduz apenas os dias úteis da sua localidade"""
+    # Abril/2025: 22 dias de semana, Sexta-feira Santa (18) e Tiradentes (21); São Jorge (23) no RJ
+    assert calendario.dias_uteis('2025-04') == 20
+    assert calendario.dias_uteis('2025-04', 'RJ') == 19
+    # Janeiro/2025: 23 dias de semana, 01/01 nacional e 20/01 só na capital fluminense
+    assert calendario.dias_uteis('2025-01', 'RJ') == 22
+    assert calendario.dias_uteis('2025-01', 'RJ', 'Rio de Janeiro') == 21
+    # Julho/2025: 09/07 só em SP; UF por extenso também é reconhecida
+    assert calendario.dias_uteis('2025-07', 'SP') == calendario.dias_uteis('2025-07', 'São Paulo') == 22
+    assert calendario.dias_uteis('2025-07', 'MG') == 23
+
+
+def test_dias_uteis_por_localidade_usa_cache_por_localidade(calendario):
+    """Linhas com a mesma localidade (ou sem feriados próprios) compartilham a contagem"""
+    ufs = ['RJ', 'RJ', 'SP', None, np.nan, 'MG', 'RJ']
+    municipios = ['RIO DE JANEIRO', 'NITEROI', None, None, None, 'BELO HORIZONTE', 'Rio de Janeiro']
+    dias = calendario.dias_uteis_por_localidade('2025-06', ufs, municipios)
+
+    # Junho/2025: 21 dias de semana; Corpus Christi (19) só na capital fluminense
+    assert dias.tolist() == [20, 21, 21, 21, 21, 21, 20]
+    assert set(calendario._dias_cache) == {('2025-06', ('RJ', 'RIO DE JANEIRO')), ('2025-06', ('RJ', None)),
+                                           ('2025-06', ('SP', None)), ('2025-06', (None, None))}
+
+
+def test_localidade_pelo_sindicato_ou_colunas(calendario):
+    """Colunas UF/MUNICIPIO prevalecem; sem elas, a localidade vem do sindicato"""
+    assert calendario.localidade_sindicato('SINDPD RJ - RIO DE JANEIRO') == ('RJ', 'RIO DE JANEIRO')
+    assert calendario.localidade_sindicato('SINDICATO DOS TRAB. DE SAO PAULO') == ('SP', None)
+    assert calendario.localidade_sindicato('SITEPD PR') == (None, None)
+
+    por_sindicato = calendario.localidades(pd.DataFrame({'SINDICATO': ['SINDPD RJ - RIO DE JANEIRO', None]}))
+    assert por_sindicato['UF'].tolist() == ['RJ', None]
+
+    por_coluna = calendario.localidades(pd.DataFrame({'Estado': ['SP'], 'Cidade': ['X'], 'SINDICATO': ['RJ']}))
+    assert por_coluna[['UF', 'MUNICIPIO']].values.tolist() == [['SP', 'X']]
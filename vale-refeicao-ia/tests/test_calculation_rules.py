@@ -0,0 +1,112 @@
+"""Testes do motor de regras declarativas"""
+
+import copy
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from src.utils import calculation_rules
+from src.utils.calculation_rules import EXEMPLO_REGRAS, PlanoCalculo, compilar_regras
+
+
+class _Banco:
+    """Expõe o esquema de um engine como o DatabaseManager"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def list_tables(self):
+        return pd.read_sql("SELECT name FROM sqlite_master WHERE type = 'table'", self.engine)['name'].tolist()
+
+    def get_table_columns(self, tabela):
+        return pd.read_sql(f"PRAGMA table_info('{tabela}')", self.engine)['name'].tolist()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    pd.DataFrame({
+        'MATRICULA': [1, 2, 3, 4, 5],
+        'NOME': ['Ana', 'Bia', 'Caio', 'Davi', 'Eva'],
+        'SINDICATO': ['SINDPD SP - X', 'SINDPD RJ', 'SINDPD SP - X', 'SITEPD PR', 'SINDPD RJ'],
+        'CARGO': ['ANALISTA', 'DIRETOR', 'ANALISTA', 'ANALISTA', 'ESTAGIARIO'],
+    }).to_sql('ativos', engine, index=False)
+    pd.DataFrame({'MATRICULA': [6], 'NOME': ['Fabi'], 'SINDICATO': ['SITEPD PR'], 'CARGO': ['ANALISTA']}).to_sql(
+        'admissao_abril', engine, index=False
+    )
+    pd.DataFrame({'MATRICULA': [3]}).to_sql('aprendiz', engine, index=False)
+    pd.DataFrame({'SINDICATO': ['SITEPD PR'], 'VALOR': [40.5]}).to_sql(
+        'base_sindicato_x_valor', engine, index=False
+    )
+    return engine
+
+
+def _regras():
+    regras = copy.deepcopy(EXEMPLO_REGRAS)
+    regras['filtros'] = [{'nome': 'diretor', 'coluna': 'cargo', 'op': '!=', 'valor': 'DIRETOR'}]
+    regras['valor_diario']['tabela'] = {
+        'nome': 'base_sindicato_x_valor', 'coluna_base': 'SINDICATO',
+        'coluna_chave': 'SINDICATO', 'coluna_valor': 'VALOR'
+    }
+    regras['dias'] = {'fonte': 'fixo', 'valor': 20}
+    return regras
+
+
+def test_sql_e_vetorizado_produzem_o_mesmo_resultado(engine):
+    """A instrução SQL e o plano pandas devolvem as mesmas linhas"""
+    plano = compilar_regras(_regras(), _Banco(engine))
+    sql = plano.executar(engine, usar_sql=True)
+    vetorizado = plano.executar(engine, usar_sql=False)
+
+    assert (sql['modo'], vetorizado['modo']) == ('sql', 'vetorizado')
+    ordenar = lambda df: df.assign(MATRICULA=df['MATRICULA'].astype(str)).sort_values('MATRICULA').reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        ordenar(sql['resultado_df']), ordenar(vetorizado['resultado_df']), check_dtype=False
+    )
+    assert sql['estatisticas']['valor_total_geral'] == vetorizado['estatisticas']['valor_total_geral']
+
+
+def test_exclusoes_filtros_e_tabela_de_valores(engine):
+    """Anti-join, filtro e valor da tabela de sindicatos, com a tabela incluída"""
+    resultado = compilar_regras(_regras(), _Banco(engine)).executar(engine, usar_sql=False)['resultado_df']
+    por_matricula = resultado.set_index(resultado['MATRICULA'].astype(str))
+
+    assert por_matricula.loc['3', 'MOTIVO_EXCLUSAO'] == 'APRENDIZ'
+    assert por_matricula.loc['2', 'MOTIVO_EXCLUSAO'] == 'FILTRO_DIRETOR'
+    assert por_matricula.loc['4', 'VALOR_DIARIO'] == 40.5
+    assert por_matricula.loc['6', 'VALOR_TOTAL_VR'] == 810.0
+    assert por_matricula.loc['1', 'STATUS'] == 'ELEGÍVEL'
+
+
+def test_dias_por_calendario_usam_admissao_e_desligamento(engine):
+    """Colunas de data não referenciadas nas regras ainda chegam ao calendário"""
+    pd.DataFrame({
+        'MATRICULA': [1, 2, 3],
+        'NOME': ['Ana', 'Bia', 'Caio'],
+        'SINDICATO': ['SINDPD SP', 'SINDPD SP', 'SINDPD SP'],
+        'UF': ['SP', 'SP', 'SP'],
+        'Data de Admissão': [None, '2025-05-15', None],
+        'DATA_DEMISSAO': [None, None, '2025-05-09'],
+    }).to_sql('colaboradores', engine, index=False)
+    regras = {
+        'tabela_base': 'colaboradores',
+        'dias': {'fonte': 'calendario', 'competencia': '2025-05'},
+        'valor_diario': {'padrao': 10.0},
+    }
+
+    plano = compilar_regras(regras, _Banco(engine))
+    assert plano.sql is None
+    resultado = plano.executar(engine)['resultado_df']
+    dias = dict(zip(resultado['MATRICULA'].astype(str), resultado['DIAS_ELEGIVEL']))
+
+    assert 0 < dias['2'] < dias['1']
+    assert 0 < dias['3'] < dias['2']
+
+
+def test_cache_de_planos_e_limitado(engine):
+    """Mesmas regras e esquema reutilizam o plano; o cache tem tamanho máximo"""
+    banco = _Banco(engine)
+    assert compilar_regras(_regras(), banco) is compilar_regras(_regras(), banco)
+    assert isinstance(compilar_regras(_regras(), banco), PlanoCalculo)
+    assert calculation_rules._plano.cache_info().maxsize is not None
@@ -0,0 +1,20 @@
+"""Testes da validação de CPF"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.data_validation import cpf_invalid_mask
+
+
+def test_cpf_em_coluna_float_com_vazio():
+    """CSV com CPF em branco chega como float; o CPF válido não pode ser marcado inválido"""
+    mascara = cpf_invalid_mask(pd.Series([52998224725.0, np.nan, 12345678900.0]))
+
+    assert mascara.tolist() == [False, False, True]
+
+
+def test_cpf_texto_formatado_e_inteiro_sem_zero_a_esquerda():
+    """1234567890 é o CPF 012.345.678-90 sem o zero à esquerda"""
+    mascara = cpf_invalid_mask(pd.Series(['529.982.247-25', 1234567890, '111.111.111-11', None], dtype=object))
+
+    assert mascara.tolist() == [False, False, True, False]
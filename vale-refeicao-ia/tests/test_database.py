@@ -0,0 +1,49 @@
+"""Testes da gravação de tabelas dinâmicas"""
+
+import pandas as pd
+import pytest
+
+from src.config.settings import settings
+from src.data.database import DatabaseManager
+from src.utils.file_readers import DataFileHandle
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'database_url', f"sqlite:///{tmp_path / 'teste.db'}")
+    monkeypatch.setattr(settings, 'debug', False)
+    return DatabaseManager()
+
+
+def _dados(db, tabela):
+    esquema = pd.read_sql(f"PRAGMA table_info('{tabela}')", db.engine)[['name', 'type']]
+    dados = pd.read_sql(f'SELECT * FROM "{tabela}"', db.engine).drop(columns=['created_at', 'updated_at'])
+    return esquema, dados
+
+
+def test_parquet_em_lotes_gera_a_mesma_tabela_que_o_dataframe(db, tmp_path):
+    """Arquivo colunar gravado batch a batch resulta na tabela do DataFrame inteiro"""
+    df = pd.DataFrame({
+        'Matrícula': [1, 2, 3, 4, 5],
+        'Nome do colaborador': ['Ana', 'Bia', None, 'Davi', 'Eva'],
+        'Data Admissão': pd.to_datetime(['2025-01-02', None, '2025-03-04', '2025-04-05', '2025-05-06']),
+        'Salário': [1000.5, 2000.0, 3000.25, None, 5000.0],
+    })
+    caminho = tmp_path / 'ativos.parquet'
+    df.to_parquet(caminho, index=False, row_group_size=2)
+    handle = DataFileHandle(caminho)
+
+    assert db.save_dataframe_to_table(handle.load(), 'inteiro') == 5
+    assert db.save_chunks_to_table(handle.iter_chunks(chunksize=2), 'lotes', total_rows=handle.rows) == 5
+
+    esquema_inteiro, dados_inteiro = _dados(db, 'inteiro')
+    esquema_lotes, dados_lotes = _dados(db, 'lotes')
+    pd.testing.assert_frame_equal(esquema_inteiro, esquema_lotes)
+    pd.testing.assert_frame_equal(dados_inteiro, dados_lotes)
+    assert list(dados_lotes.columns) == ['MATR_CULA', 'NOME_DO_COLABORADOR', 'DATA_ADMISS_O', 'SAL_RIO']
+
+
+def test_chunks_vazios_nao_criam_tabela(db):
+    """Sem chunks nada é gravado"""
+    assert db.save_chunks_to_table(iter([]), 'vazia') == 0
+    assert 'vazia' not in db.list_tables()
@@ -0,0 +1,16 @@
+"""Testes da exportação Excel"""
+
+import openpyxl
+import pandas as pd
+
+from src.utils.excel_generator import ExcelGenerator
+
+
+def test_total_formato_padrao_fecha_ao_centavo():
+    """A linha de total do FORMATO_PADRAO_VR é a soma exata dos valores em centavos"""
+    formato_padrao = pd.DataFrame({'Sindicato do Colaborador': ['A'] * 3000, 'TOTAL': [33.33] * 3000})
+
+    buffer = ExcelGenerator().create_excel_from_data({'FORMATO_PADRAO_VR': formato_padrao})
+
+    aba = openpyxl.load_workbook(buffer)['FORMATO_PADRAO_VR']
+    assert aba.cell(row=1, column=2).value == 99990.0
@@ -0,0 +1,33 @@
+"""Testes da leitura de arquivos compactados"""
+
+import zipfile
+
+from src.utils.file_readers import list_members, member_display_names, skipped_members
+
+
+def _zip(tmp_path):
+    caminho = tmp_path / 'dados.zip'
+    with zipfile.ZipFile(caminho, 'w') as zf:
+        zf.writestr('2024/ativos.csv', 'MATRICULA\n1\n')
+        zf.writestr('2025/ativos.csv', 'MATRICULA\n2\n')
+        zf.writestr('ferias.xlsx', b'')
+        zf.writestr('desligados.parquet', b'')
+        zf.writestr('__MACOSX/._ativos.csv', b'')
+        zf.writestr('.DS_Store', b'')
+    return caminho
+
+
+def test_membros_com_mesmo_nome_em_pastas_diferentes(tmp_path):
+    membros = list_members(_zip(tmp_path))
+
+    assert membros == ['2024/ativos.csv', '2025/ativos.csv', 'ferias.xlsx']
+    assert member_display_names(membros) == {
+        '2024/ativos.csv': '2024/ativos.csv',
+        '2025/ativos.csv': '2025/ativos.csv',
+        'ferias.xlsx': 'ferias.xlsx'
+    }
+
+
+def test_membros_colunares_sao_reportados(tmp_path):
+    assert skipped_members(_zip(tmp_path)) == ['desligados.parquet']
+    assert skipped_members(tmp_path / 'ativos.csv.gz') == []
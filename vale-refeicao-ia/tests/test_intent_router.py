@@ -0,0 +1,87 @@
+"""Testes do roteador de intenções"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.utils.intent_router import rotear
+
+
+def _tabela(nome, colunas):
+    return {
+        'table_name': nome,
+        'total_rows': 0,
+        'columns': [{'name': c, 'type': t, 'not_null': False, 'primary_key': False} for c, t in colunas]
+    }
+
+
+TABELAS = {
+    'ativos': _tabela('ativos', [('MATRICULA', 'INTEGER'), ('NOME', 'TEXT'), ('CARGO', 'TEXT'),
+                                 ('SALARIO_BASE', 'REAL'), ('SINDICATO', 'TEXT')]),
+    'ferias': _tabela('ferias', [('MATRICULA', 'INTEGER'), ('DIAS_FERIAS', 'INTEGER')]),
+    'desligados': _tabela('desligados', [('MATRICULA', 'INTEGER'), ('DATA_DEMISSAO', 'TEXT'),
+                                         ('COMUNICADO_DESLIGAMENTO', 'TEXT')]),
+    'base_sindicato_x_valor': _tabela('base_sindicato_x_valor', [('ESTADO', 'TEXT'), ('VALOR', 'REAL')]),
+}
+
+
+@pytest.mark.parametrize('pergunta', [
+    'Quantos funcionários não estão de férias?',
+    'Quantos colaboradores foram desligados em maio?',
+    'Quantos funcionários no sindicato SINDPD SP?',
+    'média de salário dos funcionários de férias',
+    'Qual cargo tem a maior média salarial?',
+    'Faça um gráfico de salário por cargo',
+    'média e mediana do salário',
+    'Quantos colaboradores temos?',
+    'média de salário por mês',
+    'Liste os funcionários com cargo igual a analista e salário maior que 5000',
+    'Liste os colaboradores onde cargo é analista ou gerente',
+    'Quantos funcionários têm salário acima de 1,000.50?',
+    'Quantos funcionários têm salário acima de 5 mil?',
+])
+def test_perguntas_nao_cobertas_vao_para_o_llm(pergunta):
+    assert rotear(pergunta, TABELAS) is None
+
+
+@pytest.mark.parametrize('pergunta, sql', [
+    ('Qual a média de salário dos ativos?', 'SELECT AVG("SALARIO_BASE") AS "media_salario_base" FROM "ativos"'),
+    ('Quantos registros na tabela ferias?', 'SELECT COUNT(*) AS "total" FROM "ferias"'),
+    ('Quantos funcionários temos por cargo?',
+     'SELECT "CARGO", COUNT(*) AS "total" FROM "ativos" GROUP BY "CARGO" ORDER BY "total" DESC LIMIT 1000'),
+    ('Quantos funcionários têm salário acima de 3000 por sindicato?',
+     'SELECT "SINDICATO", COUNT(*) AS "total" FROM "ativos" WHERE "SALARIO_BASE" > 3000 '
+     'GROUP BY "SINDICATO" ORDER BY "total" DESC LIMIT 1000'),
+    ('Quem são os 5 funcionários com maior salário?',
+     'SELECT * FROM "ativos" WHERE "SALARIO_BASE" IS NOT NULL ORDER BY "SALARIO_BASE" DESC LIMIT 5'),
+    ('Quantos funcionários têm salário acima de 1.000?',
+     'SELECT COUNT(*) AS "total" FROM "ativos" WHERE "SALARIO_BASE" > 1000'),
+    ('Quantos funcionários têm salário acima de 2.500?',
+     'SELECT COUNT(*) AS "total" FROM "ativos" WHERE "SALARIO_BASE" > 2500'),
+    ('Quantos funcionários têm salário acima de R$ 2.500,50?',
+     'SELECT COUNT(*) AS "total" FROM "ativos" WHERE "SALARIO_BASE" > 2500.5'),
+    ('Qual o menor salário por cargo?',
+     'SELECT "CARGO", MIN("SALARIO_BASE") AS "minimo_salario_base" FROM "ativos" '
+     'GROUP BY "CARGO" ORDER BY "minimo_salario_base" ASC LIMIT 1000'),
+    ('Qual o maior salário por cargo?',
+     'SELECT "CARGO", MAX("SALARIO_BASE") AS "maximo_salario_base" FROM "ativos" '
+     'GROUP BY "CARGO" ORDER BY "maximo_salario_base" DESC LIMIT 1000'),
+    ('Liste os colaboradores onde cargo é analista',
+     'SELECT * FROM "ativos" WHERE "CARGO" = \'analista\' COLLATE NOCASE LIMIT 1000'),
+])
+def test_perguntas_frequentes_usam_template(pergunta, sql):
+    rota = rotear(pergunta, TABELAS)
+    assert rota is not None
+    assert rota.sql == sql
+
+
+def test_mediana_confere_com_pandas():
+    conn = sqlite3.connect(':memory:')
+    df = pd.DataFrame({'MATRICULA': range(7), 'SALARIO_BASE': [3000.0, 1000.0, None, 5000.0, 2000.0, 4000.0, 6000.0]})
+    df.to_sql('ativos', conn, index=False)
+    tabelas = {'ativos': _tabela('ativos', [('MATRICULA', 'INTEGER'), ('SALARIO_BASE', 'REAL')])}
+
+    rota = rotear('Qual a mediana do salário?', tabelas)
+
+    assert conn.execute(rota.sql).fetchone()[0] == df['SALARIO_BASE'].median()
@@ -0,0 +1,66 @@
+"""Testes do motor de intervalos de dias elegíveis"""
+
+import numpy as np
+import pandas as pd
+
+from src.config.settings import settings
+from src.utils.business_calendar import BusinessCalendar
+from src.utils.intervals import calcular_dias_elegiveis, calcular_dias_elegiveis_meses
+
+COMPETENCIAS = ['2025-04', '2025-05', '2025-06']
+
+
+def _calendario():
+    return BusinessCalendar(definicoes={})
+
+
+def _ausencias(linhas):
+    return pd.DataFrame(linhas, columns=['MATRICULA', 'INICIO', 'FIM', 'DIAS', 'MOTIVO'])
+
+
+def test_ausencia_sem_datas_so_na_competencia_de_referencia(monkeypatch):
+    """10 dias de férias sem datas e afastamento sem datas não se repetem em todos os meses"""
+    monkeypatch.setattr(settings, 'competencia_vr', '2025-05')
+    ausencias = _ausencias([
+        ['1', None, None, 10, 'FERIAS'],
+        ['2', None, None, np.nan, 'AFASTAMENTOS'],
+    ])
+
+    dias = calcular_dias_elegiveis_meses(COMPETENCIAS, ['1', '2', '3'], ausencias=ausencias,
+                                         calendario=_calendario())
+
+    elegivel = dias.pivot(index='MATRICULA', columns='COMPETENCIA', values='DIAS_ELEGIVEL')
+    cheio = dias[dias['MATRICULA'] == '3'].set_index('COMPETENCIA')['DIAS_UTEIS']
+    assert elegivel.loc['3'].tolist() == cheio.tolist()
+    assert elegivel.loc['1', '2025-04'] == cheio['2025-04']
+    assert elegivel.loc['1', '2025-05'] < cheio['2025-05']
+    assert elegivel.loc['1', '2025-06'] == cheio['2025-06']
+    assert elegivel.loc['2'].tolist() == [cheio['2025-04'], 0, cheio['2025-06']]
+
+
+def test_ausencia_com_datas_recortada_em_cada_mes():
+    """Férias de 28/04 a 09/05 descontam os dias úteis de cada mês"""
+    ausencias = _ausencias([['1', '2025-04-28', '2025-05-09', np.nan, 'FERIAS']])
+
+    dias = calcular_dias_elegiveis_meses(COMPETENCIAS, ['1'], ausencias=ausencias, calendario=_calendario())
+
+    assert dias['DIAS_AUSENCIA'].tolist() == [3, 7, 0]
+    assert dias['MOTIVO'].tolist() == ['FERIAS', 'FERIAS', '']
+
+
+def test_competencia_unica_mantem_ausencia_sem_datas(monkeypatch):
+    monkeypatch.setattr(settings, 'competencia_vr', '2025-05')
+    ausencias = _ausencias([['1', None, None, np.nan, 'AFASTAMENTOS']])
+
+    dias = calcular_dias_elegiveis('2025-06', ['1'], ausencias=ausencias, calendario=_calendario())
+
+    assert dias['DIAS_ELEGIVEL'].tolist() == [0]
+
+
+def test_admissao_e_desligamento_no_meio_do_mes():
+    dias = calcular_dias_elegiveis('2025-05', ['1', '2'], admissao=['2025-05-19', None],
+                                   demissao=[None, '2025-05-09'], calendario=_calendario())
+
+    assert dias['DIAS_UTEIS'].tolist() == [22, 22]
+    assert dias['DIAS_ATIVOS'].tolist() == [10, 7]
+    assert dias['MOTIVO'].tolist() == ['', 'DESLIGADOS']
@@ -0,0 +1,39 @@
+"""Testes das chamadas ao LLM em lote"""
+
+import threading
+
+from src.config.settings import settings
+from src.utils.llm_batch import RateLimiter, completar_em_paralelo
+
+
+class LLMFalso:
+    """LLM mínimo: registra os prompts recebidos e ecoa a resposta"""
+    model = 'modelo-teste'
+    temperature = 0.0
+
+    def __init__(self):
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def complete(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+        return type('Resposta', (), {'text': f'resposta {prompt}'})()
+
+
+def test_completar_em_paralelo_chama_o_llm(monkeypatch):
+    monkeypatch.setattr(settings, 'llm_cache_enabled', False)
+    llm = LLMFalso()
+
+    respostas = completar_em_paralelo(llm, ['a', 'b', 'c'], max_concorrencia=2, limiter=RateLimiter(0))
+
+    assert respostas == ['resposta a', 'resposta b', 'resposta c']
+    assert sorted(llm.prompts) == ['a', 'b', 'c']
+
+
+def test_completar_em_paralelo_prompt_unico(monkeypatch):
+    monkeypatch.setattr(settings, 'llm_cache_enabled', False)
+    llm = LLMFalso()
+
+    assert completar_em_paralelo(llm, ['x'], limiter=RateLimiter(0)) == ['resposta x']
+    assert llm.prompts == ['x']
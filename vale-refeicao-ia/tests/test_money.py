@@ -0,0 +1,38 @@
+"""Testes da aritmética monetária em centavos"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.money import centavos, dividir, multiplicar, percentual, pontos_base, reais, somar
+
+
+def test_centavos_arredonda_meio_para_longe_do_zero():
+    """0,125 vira 13 centavos (e não 12 como no arredondamento bancário); nulos viram 0"""
+    assert centavos([0.125, -0.125, 37.5, 0.005, np.nan]).tolist() == [13, -13, 3750, 1, 0]
+    assert centavos(pd.Series([1.1, 2.2])).dtype == np.int64
+    assert reais(centavos(33.333)).tolist() == 33.33
+
+
+def test_multiplicar_por_dias():
+    """Quantidades inteiras são exatas; frações são arredondadas ao centavo"""
+    assert multiplicar([3750, 3550], [22, 0]).tolist() == [82500, 0]
+    assert multiplicar(3333, 1.5).tolist() == 5000
+    assert multiplicar(3750, np.array([21.0, np.nan])).tolist() == [78750, 0]
+
+
+def test_percentual_e_divisao_fecham_ao_centavo():
+    """Parcela do percentual mais restante somam exatamente o valor"""
+    valores = np.array([1001, 5, 82500, 1])
+    assert pontos_base(0.2) == 2000
+    assert percentual(valores, 0.2).tolist() == [200, 1, 16500, 0]
+    assert percentual(5, 0.5) == 3
+
+    parcela, restante = dividir(valores, 0.2)
+    assert (parcela + restante).tolist() == valores.tolist()
+
+
+def test_somar_sem_erro_de_ponto_flutuante():
+    """Soma via centavos: dez vezes 0,10 é exatamente 1,00"""
+    assert sum([0.1] * 10) != 1.0
+    assert somar([0.1] * 10) == 1.0
+    assert somar(pd.Series([825.0, 781.1, np.nan])) == 1606.1
@@ -0,0 +1,52 @@
+"""Testes do índice de sindicatos"""
+
+from src.utils.sindicatos import CONTIDO, EXATO, SIMILAR, IndiceSindicatos, eh_sp, estados, normalizar_sindicato
+
+VALORES = {
+    'SINDPD SP - SIND.TRAB.EM PROC DADOS E EMPR.EMPRESAS PROC DADOS ESTADO DE SP.': 37.5,
+    'SINDPD RJ - SINDICATO PROFISSIONAIS DE PROC DADOS DO RIO DE JANEIRO': 35.0,
+    'SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS DE PROC DE DADOS DE CURITIBA E REGIAO METROPOLITANA': 35.0,
+    'SINDPPD RS - SINDICATO DOS TRAB. EM PROC. DE DADOS RIO GRANDE DO SUL': 35.0,
+}
+
+
+def test_normalizacao_expande_abreviacoes():
+    assert normalizar_sindicato('Sind. Trab. São Paulo - SP') == 'SINDICATO TRABALHADORES SAO PAULO SP'
+    assert normalizar_sindicato(None) == ''
+
+
+def test_estados_por_sigla_e_nome():
+    assert estados('SINDICATO RIO GRANDE DO SUL') == {'RS'}
+    assert estados('SINDPD ES ESPIRITO SANTO') == {'ES'}
+    assert estados('SINDICATO TRABALHADORES PROCESSAMENTO DADOS') == frozenset()
+
+
+def test_eh_sp():
+    assert eh_sp(['SINDPD SP - X', 'Sind. de São Paulo', 'ESPECIAL RJ', None]).tolist() == [True, True, False, False]
+
+
+def test_resolucao_exata_contida_e_similar():
+    indice = IndiceSindicatos(VALORES, similaridade_minima=0.6)
+    chaves = list(VALORES)
+
+    resolvidos = indice.resolver([
+        chaves[0],
+        'SINDPD RJ - SINDICATO PROFISSIONAIS DE PROC DADOS DO RIO DE JANEIRO - FILIAL',
+        'SINDPPD RS - SINDICATO DOS TRAB. EM PROC. DE DADOS DO RIO GRANDE DO SUL',
+        'SINDICATO DOS MOTORISTAS',
+    ])
+
+    assert resolvidos['CORRESPONDENCIA'].tolist() == [EXATO, CONTIDO, SIMILAR, '']
+    assert resolvidos['CHAVE'].tolist()[:3] == chaves[:2] + [chaves[3]]
+    assert resolvidos['VALOR'].tolist()[:3] == [37.5, 35.0, 35.0]
+    assert resolvidos['SP'].tolist() == [True, False, False, False]
+
+
+def test_similar_nao_atravessa_estados():
+    """Sindicato do ES parecido com a chave do RJ (similaridade 0,61) não recebe o valor do RJ"""
+    indice = IndiceSindicatos(VALORES, similaridade_minima=0.6)
+
+    resolvido = indice.resolver(['SINDPD ES - SINDICATO PROFISSIONAIS DE PROC DADOS DO ESPIRITO SANTO']).iloc[0]
+
+    assert resolvido['CHAVE'] is None
+    assert resolvido['CORRESPONDENCIA'] == ''
@@ -0,0 +1,33 @@
+"""Testes do orçamento de tokens"""
+
+from src.utils.token_budget import comprimir_esquema, contar_tokens
+
+
+def _info(nome, colunas):
+    return {
+        'table_name': nome,
+        'total_rows': 10,
+        'columns': [{'name': c, 'type': 'TEXT', 'not_null': False, 'primary_key': i == 0}
+                    for i, c in enumerate(colunas)]
+    }
+
+
+def test_esquema_com_muitas_tabelas_mantem_a_tabela_citada():
+    """Com ~170 tabelas no orçamento padrão a tabela da pergunta continua no contexto"""
+    tabelas = [_info(f'tabela_{i:03d}', ['ID', 'NOME', 'VALOR', 'DATA_REFERENCIA']) for i in range(170)]
+    tabelas.insert(120, _info('ferias', ['MATRICULA', 'DIAS_FERIAS', 'INICIO']))
+
+    contexto = comprimir_esquema(tabelas, 'Quantos dias de férias por matrícula?', orcamento=2000)
+
+    assert contexto.index('Tabela: ferias') < contexto.index('Outras tabelas')
+    assert '  - DIAS_FERIAS: TEXT' in contexto
+    assert contar_tokens(contexto) <= 2000
+
+
+def test_esquema_pequeno_cabe_inteiro():
+    tabelas = [_info('ativos', ['MATRICULA', 'NOME']), _info('ferias', ['MATRICULA', 'DIAS_FERIAS'])]
+
+    contexto = comprimir_esquema(tabelas, 'férias', orcamento=2000)
+
+    assert 'omitid' not in contexto
+    assert contexto.index('Tabela: ferias') < contexto.index('Tabela: ativos')
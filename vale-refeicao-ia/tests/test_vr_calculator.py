@@ -0,0 +1,74 @@
+"""Testes do cálculo vetorizado de vale refeição"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.vr_calculator import (
+    calcular_vale_refeicao, carregar_valores_sindicato, mapear_sindicatos, motivos_exclusao
+)
+
+SP = 'SINDPD SP - SIND.TRAB.EM PROC DADOS'
+RJ = 'SINDPD RJ - SINDICATO PROFISSIONAIS'
+PR = 'SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS'
+
+
+def _colaboradores():
+    return pd.DataFrame({
+        'MATRICULA': [1, 2, 3, 4, 5],
+        'NOME': ['Ana', None, 'Caio', 'Davi', 'Eva'],
+        'SINDICATO': [SP, RJ, PR, SP, None],
+    })
+
+
+def test_estado_e_valor_por_sindicato():
+    """SP pelo nome; valor da tabela de sindicatos sobrescreve o padrão"""
+    codes, is_sp, estados, valores = mapear_sindicatos(pd.Series([SP, PR, SP, RJ]), {PR: 33.33})
+    assert codes.tolist() == [0, 1, 0, 2]
+    assert is_sp.tolist() == [True, False, False]
+    assert estados.tolist() == ['SP', 'OUTROS (Tabela: R$ 33.33)', 'OUTROS']
+    assert valores.tolist() == [37.5, 33.33, 35.0]
+
+
+def test_exclusoes_prioridade_do_motivo():
+    """O primeiro motivo (na ordem das tabelas) prevalece"""
+    motivo = motivos_exclusao(pd.Series(['1', '2', '3']), {'ferias': [2], 'aprendiz': {'2', '3'}})
+    assert motivo.tolist() == ['', 'FERIAS', 'APRENDIZ']
+
+
+def test_calculo_em_centavos():
+    """Totais por colaborador e estatísticas fecham ao centavo"""
+    resultado, estatisticas = calcular_vale_refeicao(
+        _colaboradores(),
+        exclusoes={'aprendiz': ['4']},
+        valores_sindicato={PR: 33.333},
+        dias_uteis=np.array([21, 22, 3, 22, 0]),
+        motivos_dias=['', '', '', '', 'FERIAS'],
+        total_colaboradores=6
+    )
+    linhas = resultado.set_index('MATRICULA')
+
+    assert linhas['VALOR_TOTAL_VR'].tolist() == [787.5, 770.0, 99.99, 0.0, 0.0]
+    assert linhas.loc['3', 'VALOR_DIARIO'] == 33.33
+    assert linhas.loc['2', 'NOME'] == 'Nome não informado'
+    assert linhas.loc['4', ['STATUS', 'MOTIVO_EXCLUSAO', 'ESTADO']].tolist() == ['EXCLUÍDO', 'APRENDIZ', 'SP']
+    assert linhas.loc['5', 'MOTIVO_EXCLUSAO'] == 'FERIAS'
+
+    assert estatisticas['total_colaboradores'] == 6
+    assert (estatisticas['total_elegiveis'], estatisticas['total_excluidos']) == (3, 2)
+    assert estatisticas['valor_total_geral'] == 1657.49
+    assert (estatisticas['valor_total_sp'], estatisticas['valor_total_outros']) == (787.5, 770.0)
+
+
+def test_sem_dias_uteis_exclui_com_motivo_padrao():
+    """Zero dias sem motivo informado vira SEM_DIAS_UTEIS"""
+    resultado, _ = calcular_vale_refeicao(_colaboradores().head(2), dias_uteis=np.array([0, 22]),
+                                          motivos_dias=['', ''])
+    assert resultado['MOTIVO_EXCLUSAO'].tolist() == ['SEM_DIAS_UTEIS', '']
+
+
+def test_valores_da_tabela_de_sindicatos():
+    """Colunas detectadas pelo nome; valores inválidos ignorados"""
+    tabela = pd.DataFrame({'Sindicato ': [f' {SP} ', RJ, PR], 'Valor VR': ['37.5', 'n/d', 35]})
+    valores, col_sindicato, col_valor = carregar_valores_sindicato(tabela)
+    assert (col_sindicato, col_valor) == ('Sindicato ', 'Valor VR')
+    assert valores == {SP: 37.5, PR: 35.0}
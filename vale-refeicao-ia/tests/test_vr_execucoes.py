@@ -0,0 +1,95 @@
+"""Testes das execuções persistidas do cálculo de VR"""
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.utils.business_calendar import BusinessCalendar
+from src.utils.vr_execucoes import (
+    carregar_execucao, comparar_execucoes, listar_execucoes, salvar_execucao, versao_dados
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE calculo_vr_execucoes (
+                ID INTEGER PRIMARY KEY AUTOINCREMENT, CONFIGURACAO TEXT NOT NULL, COMPETENCIA TEXT NOT NULL,
+                VERSAO_DADOS TEXT NOT NULL, GERADO_EM TEXT, REGISTROS INTEGER, ELEGIVEIS INTEGER,
+                VALOR_TOTAL REAL, RESULTADO BLOB, UNIQUE (CONFIGURACAO, COMPETENCIA, VERSAO_DADOS)
+            )"""))
+    return engine
+
+
+def _ativos(engine, linhas, created_at='2025-05-01'):
+    pd.DataFrame(linhas, columns=['MATRICULA', 'NOME', 'SINDICATO']).assign(created_at=created_at).to_sql(
+        'ativos', engine, if_exists='replace', index=False
+    )
+
+
+def _resultado(linhas):
+    return pd.DataFrame(linhas, columns=[
+        'MATRICULA', 'NOME', 'SINDICATO', 'ESTADO', 'STATUS', 'MOTIVO_EXCLUSAO',
+        'DIAS_ELEGIVEL', 'VALOR_DIARIO', 'VALOR_TOTAL_VR'
+    ])
+
+
+def test_versao_independe_da_ordem_e_dos_metadados(engine):
+    _ativos(engine, [[1, 'A', 'SP'], [2, 'B', 'RJ']])
+    versao = versao_dados(engine, ['ativos'], [1])
+
+    _ativos(engine, [[2, 'B', 'RJ'], [1, 'A', 'SP']], created_at='2025-06-01')
+    assert versao_dados(engine, ['ativos'], [1]) == versao
+
+    _ativos(engine, [[2, 'B', 'RJ'], [1, 'A', 'MG']])
+    assert versao_dados(engine, ['ativos'], [1]) != versao
+    assert versao_dados(engine, ['ativos'], [2]) != versao_dados(engine, ['ativos'], [1])
+
+
+def test_versao_muda_com_os_feriados(engine):
+    _ativos(engine, [[1, 'A', 'SP']])
+    sem_feriados = BusinessCalendar(definicoes={})
+    com_feriado = BusinessCalendar(definicoes={'nacionais': {'Tiradentes': '04-21'}})
+
+    assert versao_dados(engine, ['ativos'], calendario=sem_feriados) == \
+        versao_dados(engine, ['ativos'], calendario=BusinessCalendar(definicoes={}))
+    assert versao_dados(engine, ['ativos'], calendario=sem_feriados) != \
+        versao_dados(engine, ['ativos'], calendario=com_feriado)
+
+
+def test_salvar_carregar_e_comparar_execucoes(engine):
+    anterior = _resultado([
+        ['1', 'A', 'SP', 'SP', 'ELEGÍVEL', '', 22, 37.5, 825.0],
+        ['2', 'B', 'RJ', 'OUTROS', 'ELEGÍVEL', '', 22, 35.0, 770.0],
+        ['3', 'C', 'RJ', 'OUTROS', 'EXCLUÍDO', 'FERIAS', 0, 35.0, 0.0],
+    ])
+    atual = _resultado([
+        ['1', 'A', 'SP', 'SP', 'ELEGÍVEL', '', 20, 37.5, 750.0],
+        ['3', 'C', 'RJ', 'OUTROS', 'ELEGÍVEL', '', 22, 35.0, 770.0],
+        ['4', 'D', 'PR', 'OUTROS', 'ELEGÍVEL', '', 10, 35.1, 351.0],
+    ])
+
+    id_anterior = salvar_execucao(engine, anterior, 'padrao', '2025-05', 'v1')
+    id_atual = salvar_execucao(engine, atual, 'padrao', '2025-05', 'v2')
+    # Mesma chave substitui a execução
+    id_atual = salvar_execucao(engine, atual, 'padrao', '2025-05', 'v2')
+
+    execucoes = listar_execucoes(engine, 'padrao')
+    assert sorted(execucoes['VERSAO_DADOS']) == ['v1', 'v2']
+    assert execucoes.set_index('VERSAO_DADOS').loc['v1', 'VALOR_TOTAL'] == 1595.0
+
+    carregada = carregar_execucao(engine, id_atual)
+    assert carregada['VALOR_TOTAL_VR'].tolist() == [750.0, 770.0, 351.0]
+    assert carregada['DIAS_ELEGIVEL'].tolist() == [20, 22, 10]
+
+    diff = comparar_execucoes(carregar_execucao(engine, id_anterior), carregada)
+    assert diff['entraram']['MATRICULA'].tolist() == ['4']
+    assert diff['sairam']['MATRICULA'].tolist() == ['2']
+    assert diff['alterados']['MATRICULA'].tolist() == ['1', '3']
+    assert diff['alterados']['DELTA_VALOR'].tolist() == [-75.0, 770.0]
+    resumo = diff['resumo']
+    assert resumo['passaram_a_elegiveis'] == 1
+    assert resumo['delta_total'] == pytest.approx(1871.0 - 1595.0)
+    assert resumo['delta_total'] == resumo['delta_entraram'] + resumo['delta_sairam'] + resumo['delta_alterados']
@@ -0,0 +1,92 @@
+"""Testes do recálculo incremental do vale refeição"""
+
+import pandas as pd
+import pytest
+
+from src.config.settings import settings
+from src.data.database import DatabaseManager
+from src.utils.business_calendar import BusinessCalendar
+from src.utils.vr_incremental import CalculoIncremental
+
+COMPETENCIA = '2025-05'
+SP = 'SINDPD SP - SIND.TRAB.EM PROC DADOS'
+PR = 'SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS'
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'database_url', f"sqlite:///{tmp_path / 'teste.db'}")
+    monkeypatch.setattr(settings, 'debug', False)
+    return DatabaseManager().engine
+
+
+@pytest.fixture
+def tabelas():
+    return {
+        'ativos': pd.DataFrame({
+            'MATRICULA': ['1', '2', '3', '4'],
+            'NOME': ['Ana', 'Bia', 'Caio', 'Davi'],
+            'SINDICATO': [SP, PR, PR, SP],
+        }),
+        'ferias': pd.DataFrame({'MATRICULA': ['2'], 'INICIO': ['2025-05-05'], 'FIM': ['2025-05-09']}),
+        'base_sindicato_x_valor': pd.DataFrame({'SINDICATO': [PR], 'VALOR': [35.5]}),
+    }
+
+
+def _calculo(engine):
+    return CalculoIncremental(engine, COMPETENCIA, BusinessCalendar(definicoes={}))
+
+
+def _completo(engine, tabelas):
+    return _calculo(engine).executar(tabelas, forcar_completo=True)
+
+
+def test_sem_alteracoes_reutiliza_o_resultado(engine, tabelas):
+    """Segunda execução com as mesmas tabelas não recalcula ninguém"""
+    primeira = _calculo(engine).executar(tabelas)
+    segunda = _calculo(engine).executar(tabelas)
+
+    assert primeira['modo'] == 'completo'
+    assert (segunda['modo'], segunda['recalculados']) == ('sem_alteracoes', 0)
+    pd.testing.assert_frame_equal(segunda['resultado_df'], primeira['resultado_df'], check_dtype=False)
+
+
+def test_alteracao_de_colaborador_recalcula_so_ele(engine, tabelas):
+    """Mudança em uma linha de ausência recalcula apenas a matrícula afetada"""
+    _calculo(engine).executar(tabelas)
+    tabelas['ferias'] = pd.DataFrame({'MATRICULA': ['2', '3'], 'INICIO': ['2025-05-05', '2025-05-12'],
+                                      'FIM': ['2025-05-09', '2025-05-16']})
+
+    incremental = _calculo(engine).executar(tabelas)
+    assert (incremental['modo'], incremental['recalculados']) == ('incremental', 1)
+    assert incremental['mudancas'] == {'ferias': 1}
+    dias = incremental['resultado_df'].set_index('MATRICULA')['DIAS_ELEGIVEL']
+    assert dias['3'] == dias['2'] < dias['1']
+
+    esperado = _completo(engine, tabelas)
+    pd.testing.assert_frame_equal(incremental['resultado_df'], esperado['resultado_df'], check_dtype=False)
+    assert incremental['estatisticas'] == esperado['estatisticas']
+
+
+def test_alteracao_de_valor_do_sindicato_recalcula_os_colaboradores_do_sindicato(engine, tabelas):
+    """Mudança na tabela de valores atinge quem resolve para o sindicato alterado"""
+    _calculo(engine).executar(tabelas)
+    tabelas['base_sindicato_x_valor'] = pd.DataFrame({'SINDICATO': [PR], 'VALOR': [40.0]})
+
+    incremental = _calculo(engine).executar(tabelas)
+    assert (incremental['modo'], incremental['recalculados']) == ('incremental', 2)
+
+    resultado = incremental['resultado_df'].set_index('MATRICULA')
+    assert resultado.loc['3', 'VALOR_DIARIO'] == 40.0
+    assert resultado.loc['1', 'VALOR_DIARIO'] == 37.5
+    pd.testing.assert_frame_equal(
+        incremental['resultado_df'], _completo(engine, tabelas)['resultado_df'], check_dtype=False
+    )
+
+
+def test_mudanca_de_esquema_forca_recalculo_completo(engine, tabelas):
+    """Coluna nova na base invalida as assinaturas salvas"""
+    _calculo(engine).executar(tabelas)
+    tabelas['ativos'] = tabelas['ativos'].assign(CARGO='ANALISTA')
+
+    assert _calculo(engine).executar(tabelas)['modo'] == 'completo'
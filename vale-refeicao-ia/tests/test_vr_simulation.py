@@ -0,0 +1,36 @@
+"""Testes da simulação de cenários de VR"""
+
+import pandas as pd
+
+from src.utils.vr_simulation import grade_cenarios, preparar_base, simular_cenarios
+
+
+def _resultado():
+    """Dois elegíveis com valor da tabela de sindicatos (SP e RJ), 10 dias cada"""
+    return pd.DataFrame({
+        'MATRICULA': ['1', '2'],
+        'NOME': ['A', 'B'],
+        'SINDICATO': ['SINDPD SP', 'SINDPD RJ'],
+        'ESTADO': ['São Paulo (Tabela: R$ 37.50)', 'Rio de Janeiro (Tabela: R$ 35.00)'],
+        'STATUS': ['ELEGÍVEL', 'ELEGÍVEL'],
+        'MOTIVO_EXCLUSAO': ['', ''],
+        'DIAS_ELEGIVEL': [10, 10],
+        'VALOR_DIARIO': [37.5, 35.0],
+        'VALOR_TOTAL_VR': [375.0, 350.0]
+    })
+
+
+def test_valor_sp_do_cenario_substitui_a_tabela():
+    base = preparar_base(_resultado())
+
+    custos = simular_cenarios(base, [{}, {'valor_sp': 40}, {'valor_sp': 40, 'valores_sindicato': {'SINDPD SP': 50}}])
+
+    assert custos['VALOR_TOTAL_VR'].tolist() == [725.0, 750.0, 850.0]
+
+
+def test_valor_dia_util_define_sp_e_outros():
+    cenarios = grade_cenarios(valor_dia_util=[30, 32])
+
+    assert cenarios == [{'valor_sp': 30, 'valor_outros': 30}, {'valor_sp': 32, 'valor_outros': 32}]
+    custos = simular_cenarios(preparar_base(_resultado()), cenarios)
+    assert custos['VALOR_TOTAL_VR'].tolist() == [600.0, 640.0]
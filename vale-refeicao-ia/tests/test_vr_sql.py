@@ -0,0 +1,95 @@
+"""Testes do cálculo de vale refeição com pushdown para o SQLite"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from src.utils.vr_calculator import calcular_vale_refeicao, carregar_valores_sindicato
+from src.utils.vr_sql import calcular_vale_refeicao_sql, montar_sql_vale_refeicao
+
+EXCLUSOES = ['ferias', 'aprendiz', 'exterior']
+
+
+@pytest.fixture
+def tabelas():
+    return {
+        'ativos': pd.DataFrame({
+            'MATRICULA': [101, 102, 103, 104, 105, 106],
+            'NOME': ['Ana', 'Bia', 'Caio', None, 'Eva', 'Fabi'],
+            'SINDICATO': ['SINDPD SP - SIND.TRAB.EM PROC DADOS', 'SINDPD RJ - SINDICATO PROFISSIONAIS',
+                          'SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS', 'SINDPD SP - SIND.TRAB.EM PROC DADOS',
+                          None, 'SINDPPD RS - SINDICATO DOS TRAB. EM PROC.'],
+            'CARGO': ['ANALISTA'] * 6,
+        }),
+        'admissao_abril': pd.DataFrame({
+            'MATRICULA': [106, 107],
+            'SINDICATO': ['SINDPPD RS - SINDICATO DOS TRAB. EM PROC.', 'SINDPD SP - SIND.TRAB.EM PROC DADOS'],
+            'ADMISSAO': ['2025-04-10', '2025-04-15'],
+        }),
+        'ferias': pd.DataFrame({'MATRICULA': [102, 102], 'DIAS_DE_FERIAS': [10, 5]}),
+        'aprendiz': pd.DataFrame({'MATRICULA': [104, 102]}),
+        'base_sindicato_x_valor': pd.DataFrame({
+            'SINDICATO': ['SITEPD PR - SIND DOS TRAB EM EMPR PRIVADAS'], 'VALOR': [35.5]
+        }),
+    }
+
+
+@pytest.fixture
+def engine(tabelas):
+    engine = create_engine('sqlite://')
+    for nome, df in tabelas.items():
+        df.to_sql(nome, engine, index=False)
+    return engine
+
+
+def _colunas(tabelas):
+    return {nome: list(df.columns) for nome, df in tabelas.items()}
+
+
+def _em_memoria(tabelas, **kwargs):
+    ativos, admissoes = tabelas['ativos'], tabelas['admissao_abril']
+    colaboradores = pd.concat(
+        [ativos, admissoes[~admissoes['MATRICULA'].isin(ativos['MATRICULA'])]], ignore_index=True
+    )
+    return calcular_vale_refeicao(
+        colaboradores,
+        exclusoes={t: tabelas[t]['MATRICULA'] for t in EXCLUSOES if t in tabelas},
+        valores_sindicato=carregar_valores_sindicato(tabelas['base_sindicato_x_valor'])[0],
+        total_colaboradores=len(ativos),
+        **kwargs
+    )
+
+
+def test_pushdown_igual_ao_calculo_em_memoria(engine, tabelas):
+    """Mesmas linhas, motivos, valores e estatísticas do cálculo pandas"""
+    sql_df, sql_stats, lidos = calcular_vale_refeicao_sql(engine, _colunas(tabelas), EXCLUSOES, lote=2)
+    memoria_df, memoria_stats = _em_memoria(tabelas)
+
+    pd.testing.assert_frame_equal(sql_df, memoria_df, check_dtype=False)
+    assert sql_stats == memoria_stats
+    assert lidos['MATRICULA'].astype(str).tolist() == ['101', '102', '103', '104', '105', '106', '107']
+    assert sql_df.set_index('MATRICULA').loc['102', 'MOTIVO_EXCLUSAO'] == 'FERIAS'
+    assert sql_df.set_index('MATRICULA').loc['103', 'VALOR_DIARIO'] == 35.5
+
+
+def test_pushdown_com_dias_por_colaborador(engine, tabelas):
+    """Dias e motivos vindos do calendário são aplicados como no cálculo em memória"""
+    def dias_uteis(df):
+        dias = np.where(df['MATRICULA'].astype(str) == '107', 0, 20)
+        return dias, np.where(dias == 0, 'ADMISSAO_POSTERIOR', '')
+
+    sql_df, sql_stats, _ = calcular_vale_refeicao_sql(engine, _colunas(tabelas), EXCLUSOES, dias_uteis=dias_uteis)
+    dias, motivos = dias_uteis(sql_df)
+    memoria_df, memoria_stats = _em_memoria(tabelas, dias_uteis=dias, motivos_dias=motivos)
+
+    pd.testing.assert_frame_equal(sql_df, memoria_df, check_dtype=False)
+    assert sql_stats == memoria_stats
+    assert sql_df.set_index('MATRICULA').loc['107', 'MOTIVO_EXCLUSAO'] == 'ADMISSAO_POSTERIOR'
+
+
+def test_sql_seleciona_apenas_colunas_usadas(tabelas):
+    """Colunas que não entram no cálculo (ex.: CARGO) não são lidas"""
+    sql, usadas = montar_sql_vale_refeicao(_colunas(tabelas), EXCLUSOES)
+    assert usadas == ['MATRICULA', 'NOME', 'SINDICATO', 'ADMISSAO']
+    assert 'CARGO' not in sql